@@ -0,0 +1,68 @@
+"""
+Compare parsing Binance klines into unified dicts and into `CandleArrays`: time and memory held, on synthetic rows
+shaped like the `/klines` response.
+
+    python benchmarks/candle_arrays.py [--candles 100000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cex_adaptors.parsers.binance import BinanceParser  # noqa: E402
+
+INFO = {
+    "base": "BTC",
+    "quote": "USDT",
+    "settle": "USDT",
+    "multiplier": 1,
+    "is_spot": True,
+    "is_futures": False,
+    "is_perp": False,
+}
+
+
+def make_response(count: int) -> list:
+    start = 1700000000000
+    row = ["42000.1", "42010.5", "41990.0", "42005.2", "12.345"]
+    return [
+        [start + i * 60_000, *row, start + i * 60_000 + 59_999, "518000.12", 100, "1.2", "50000.0", "0"]
+        for i in range(count)
+    ]
+
+
+def measure(func, response: list):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = func(response)
+    elapsed = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return elapsed, size
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--candles", type=int, default=100000)
+    args = arg_parser.parse_args()
+
+    parser = BinanceParser()
+    response = make_response(args.candles)
+    dicts = measure(lambda r: parser.parse_candlesticks(r, INFO, "spot", "1m"), response)
+    arrays = measure(lambda r: parser.parse_candlesticks(r, INFO, "spot", "1m", as_arrays=True), response)
+
+    print(f"{args.candles} candles")
+    print(f"dicts          {dicts[0] * 1000:8.1f} ms {dicts[1] / 1e6:8.2f} MB")
+    print(f"CandleArrays   {arrays[0] * 1000:8.1f} ms {arrays[1] / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
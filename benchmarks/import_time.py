@@ -0,0 +1,54 @@
+"""
+Measure the import time of every adaptor in a fresh interpreter and check that pandas / numpy stay unloaded.
+
+    python benchmarks/import_time.py [--runs 5] [--budget 0.5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ADAPTORS = ["Binance", "Bitget", "Bybit", "Gateio", "Htx", "Kucoin", "Okx", "WOO"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import cex_adaptors
+adaptor = getattr(cex_adaptors, sys.argv[1])
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy": sorted(m for m in ("pandas", "numpy") if m in sys.modules)}))
+"""
+
+
+def measure(adaptor: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE, adaptor], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output)
+
+
+def main() -> int:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--budget", type=float, default=0.5, help="max median import seconds per adaptor")
+    args = arg_parser.parse_args()
+
+    failed = False
+    for adaptor in ADAPTORS:
+        results = [measure(adaptor) for _ in range(args.runs)]
+        median = statistics.median(r["seconds"] for r in results)
+        heavy = results[0]["heavy"]
+        ok = median <= args.budget and not heavy
+        failed |= not ok
+        print(
+            f"{adaptor:<8} {median * 1000:8.1f} ms  heavy modules: {', '.join(heavy) or '-'}  {'ok' if ok else 'FAIL'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Compare the memory held by exchange info as parsed dicts and as an `InstrumentRegistry` of `Instrument` records,
+using the OKX unit test fixtures replicated to a realistic instrument count.
+
+    python benchmarks/instrument_memory.py [--instruments 20000]
+"""
+
+import argparse
+import copy
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cex_adaptors.instruments import Instrument, InstrumentRegistry  # noqa: E402
+from cex_adaptors.parsers.okx import OkxParser  # noqa: E402
+
+FIXTURES = os.path.join(ROOT, "tests", "unit", "okx", "fixtures")
+
+
+def parsed_fixtures() -> list:
+    parser = OkxParser()
+    infos = []
+    for name, info_parser in (
+        ("spot_exchange_info", parser.spot_margin_exchange_info_parser),
+        ("perp_exchange_info", parser.futures_perp_exchange_info_parser),
+        ("futures_exchange_info", parser.futures_perp_exchange_info_parser),
+    ):
+        with open(os.path.join(FIXTURES, f"{name}.json")) as f:
+            infos.extend(parser.parse_exchange_info(json.load(f), info_parser).values())
+    return infos
+
+
+def build(templates: list, count: int) -> dict:
+    # fresh copies, as every exchange response is decoded into new objects
+    return {f"{i}": copy.deepcopy(templates[i % len(templates)]) for i in range(count)}
+
+
+def measure(factory) -> int:
+    gc.collect()
+    tracemalloc.start()
+    held = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--instruments", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    templates = parsed_fixtures()
+    as_dicts = measure(lambda: build(templates, args.instruments))
+    records = measure(lambda: {k: Instrument(v) for k, v in build(templates, args.instruments).items()})
+    compact = measure(lambda: InstrumentRegistry(build(templates, args.instruments)))
+    with_raw = measure(lambda: InstrumentRegistry(build(templates, args.instruments), keep_raw=True))
+
+    print(f"{args.instruments} instruments")
+    print(f"dicts with raw_data        {as_dicts / 1e6:8.2f} MB")
+    print(f"registry, keep_raw=True    {with_raw / 1e6:8.2f} MB")
+    print(f"Instrument records         {records / 1e6:8.2f} MB  ({as_dicts / records:.1f}x smaller)")
+    print(f"registry (default)         {compact / 1e6:8.2f} MB  (with market type / currency indexes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Time the accumulation of history pages as the number of pages grows: the former loop rebuilding a deduplicated
+list after every page against `TimestampBuffer`. Pages are synthetic, newest first, overlapping by one item like
+the serial cursors produce.
+
+    python benchmarks/pagination_scaling.py [--limit 1000] [--pages 10 50 100 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from cex_adaptors.pagination import TimestampBuffer  # noqa: E402
+
+
+def make_pages(pages: int, limit: int) -> list:
+    newest = pages * (limit - 1)
+    return [
+        [{"timestamp": t, "close": 1.0} for t in range(newest - p * (limit - 1), newest - p * (limit - 1) - limit, -1)]
+        for p in range(pages)
+    ]
+
+
+def rebuild_list(pages: list) -> list:
+    results = []
+    for page in pages:
+        results.extend(page)
+        results = list({v["timestamp"]: v for v in results}.values())
+    return sorted(results, key=lambda x: x["timestamp"], reverse=False)
+
+
+def timestamp_buffer(pages: list) -> list:
+    results = TimestampBuffer()
+    for page in pages:
+        results.add(page)
+    return results.sorted()
+
+
+def best_of(func, pages: list, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(pages)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--limit", type=int, default=1000)
+    arg_parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 100, 200])
+    args = arg_parser.parse_args()
+
+    print(f"{'pages':>6} {'items':>8} {'rebuilt list':>14} {'buffer':>10} {'buffer ms/page':>15}")
+    for count in args.pages:
+        pages = make_pages(count, args.limit)
+        assert rebuild_list(pages) == timestamp_buffer(pages)
+        old, new = best_of(rebuild_list, pages), best_of(timestamp_buffer, pages)
+        items = count * (args.limit - 1) + 1
+        print(f"{count:>6} {items:>8} {old * 1000:>12.1f}ms {new * 1000:>8.1f}ms {new * 1000 / count:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
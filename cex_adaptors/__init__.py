@@ -0,0 +1,28 @@
+import importlib
+
+# adaptor name -> module, imported on first attribute access so `import cex_adaptors` only loads what is used
+_ADAPTORS = {
+    "Binance": "binance",
+    "Bitget": "bitget",
+    "Bybit": "bybit",
+    "Gateio": "gateio",
+    "Htx": "htx",
+    "Kucoin": "kucoin",
+    "Okx": "okx",
+    "WOO": "woo",
+}
+
+__all__ = list(_ADAPTORS)
+
+
+def __getattr__(name: str):
+    module = _ADAPTORS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    adaptor = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = adaptor
+    return adaptor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_ADAPTORS))
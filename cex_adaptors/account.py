@@ -0,0 +1,92 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# order states after which an exchange pushes no more updates of the order
+FINAL_ORDER_STATUSES = {
+    # OKX
+    "filled",
+    "canceled",
+    "mmp_canceled",
+    # Binance
+    "FILLED",
+    "CANCELED",
+    "REJECTED",
+    "EXPIRED",
+    "EXPIRED_IN_MATCH",
+}
+
+
+class AccountState(object):
+    """
+    Orders and positions of an account as pushed by the exchange's private streams, see `LocalAccount`.
+
+    Orders are kept by order id in the format of the adaptor's order info. Finished orders are kept for
+    `max_finished_orders` more orders, long enough for a caller to pick up the acknowledgement of the order it just
+    placed. Positions are kept by instrument id in the format of `get_positions`, closed positions are dropped.
+    """
+
+    def __init__(self, max_finished_orders: int = 1000):
+        self.orders: Dict[str, dict] = {}
+        self.positions: Dict[str, dict] = {}
+        self.max_finished_orders = max_finished_orders
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+
+    def update(self, kind: str, record) -> None:
+        """
+        :param kind: "order" with an order, or "position" with `{instrument_id: position}`
+        """
+        if kind == "order":
+            self._update_order(record)
+        elif kind == "position":
+            for instrument_id, position in record.items():
+                if position["position"]:
+                    self.positions[instrument_id] = position
+                else:
+                    self.positions.pop(instrument_id, None)
+        else:
+            raise ValueError(f"Invalid account update: {kind}")
+
+    def _update_order(self, order: dict) -> None:
+        order_id = order["order_id"]
+        self.orders[order_id] = order
+        if order["status"] in FINAL_ORDER_STATUSES and order_id not in self._finished:
+            self._finished[order_id] = None
+            while len(self._finished) > self.max_finished_orders:
+                self.orders.pop(self._finished.popitem(last=False)[0], None)
+
+        for waiter in self._waiters.pop(order_id, []):
+            if not waiter.done():
+                waiter.set_result(order)
+
+    def open_orders(self, instrument_id: str = None) -> List[dict]:
+        return [
+            order
+            for order in self.orders.values()
+            if order["status"] not in FINAL_ORDER_STATUSES
+            and (instrument_id is None or order["perp_instrument_id"] == instrument_id)
+        ]
+
+    async def wait_order(self, order_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Latest update of an order, waiting for the first one when none arrived yet: the push of a new order may come
+        before or after the response of the request placing it
+
+        :return: the order, None when no update arrived within `timeout`
+        """
+        if order_id in self.orders:
+            return self.orders[order_id]
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(order_id, []).append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(order_id)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._waiters[order_id]
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import time
+from itertools import count
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from .pagination import (
+    HistoryPages,
+    TimestampBuffer,
+    as_list,
+    fetch_window,
+    plan_windows,
+)
+from .store import CandleStore, settled_candle_time
+
+
+class BackfillTask(NamedTuple):
+    """
+    One unit of scheduled work: a page-sized window of `pages`, or a whole gap fetched with
+    `get_history_candlesticks` when the instrument has no time-windowed endpoint (`pages` is None)
+    """
+
+    instrument_id: str
+    interval: str
+    start: int
+    end: int
+    market_type: str
+    pages: Optional[HistoryPages]
+
+
+class BackfillStats(object):
+    """
+    Progress of a `BackfillScheduler.run`, updated after every task
+    """
+
+    __slots__ = ("tasks", "done", "requests", "candles", "errors", "_started", "_finished")
+
+    def __init__(self, tasks: int):
+        self.tasks = tasks
+        self.done = 0
+        self.requests = 0
+        self.candles = 0
+        # failed task -> exception; their ranges stay uncovered and are picked up by the next run
+        self.errors: Dict[BackfillTask, BaseException] = {}
+        self._started = time.monotonic()
+        self._finished: Optional[float] = None
+
+    @property
+    def remaining(self) -> int:
+        return self.tasks - self.done - len(self.errors)
+
+    @property
+    def elapsed(self) -> float:
+        return (self._finished or time.monotonic()) - self._started
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def candles_per_second(self) -> float:
+        return self.candles / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"BackfillStats({self.done}/{self.tasks} tasks, {len(self.errors)} failed, {self.requests} requests, "
+            f"{self.candles} candles, {self.elapsed:.1f}s, {self.candles_per_second:.0f} candles/s)"
+        )
+
+
+class BackfillScheduler(object):
+    """
+    Bulk candle backfill of many instruments on one exchange into a `CandleStore`:
+
+        scheduler = BackfillScheduler(okx, store)
+        scheduler.add(okx.exchange_info.ids(is_perp=True), "1m", start, end)
+        stats = await scheduler.run()
+
+    The missing ranges of every instrument are split into page-sized windows and queued newest first across all
+    instruments, so recent data of every market lands before older history. At most `concurrency` pages are in flight
+    for the whole backfill, on top of the adaptor's own rate limiter, so the instruments share one request budget.
+    Every window is written to the store with its coverage as soon as it arrives; a crashed or failed run is resumed
+    by adding the same ranges to a new scheduler, which only plans what the store is still missing.
+    """
+
+    def __init__(self, adaptor, store: CandleStore, concurrency: Optional[int] = None):
+        """
+        :param adaptor: any adaptor with `iter_history_candlesticks`
+        :param store: store receiving the candles and their coverage
+        :param concurrency: max pages in flight across all instruments, the adaptor's `page_concurrency` by default
+        """
+        self.adaptor = adaptor
+        self.store = store
+        self.concurrency = concurrency or adaptor.page_concurrency or 1
+        self._queue: List[tuple] = []
+        # ties keep insertion order
+        self._order = count()
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def add(self, instrument_ids: List[str], interval: str, start: int, end: int) -> int:
+        """
+        Queue the ranges of `[start, end]` the store does not hold yet
+        :param instrument_ids: unified instrument ids
+        :param interval: unified interval
+        :param start: first candle timestamp in ms
+        :param end: last candle timestamp in ms
+        :return: number of tasks queued
+        """
+        queued = 0
+        for instrument_id in instrument_ids:
+            if instrument_id not in self.adaptor.exchange_info:
+                raise ValueError(f"{instrument_id} not found in {self.adaptor.name} exchange info")
+
+            info = self.adaptor.exchange_info[instrument_id]
+            market_type = self.adaptor.parser.parse_unified_market_type(info)
+            pages = self.adaptor._candlestick_pages(instrument_id, interval)
+            for gap_start, gap_end in self.store.gaps(self.adaptor.name, instrument_id, interval, start, end):
+                windows = (
+                    [(gap_start, gap_end)]
+                    if pages is None
+                    else plan_windows(gap_start, gap_end, pages.limit * pages.item_ms)
+                )
+                for window_start, window_end in windows:
+                    task = BackfillTask(instrument_id, interval, window_start, window_end, market_type, pages)
+                    heapq.heappush(self._queue, (-window_end, next(self._order), task))
+                    queued += 1
+        return queued
+
+    async def _fetch(self, task: BackfillTask, stats: BackfillStats) -> list:
+        if task.pages is None:
+            stats.requests += 1
+            return await self.adaptor.get_history_candlesticks(
+                task.instrument_id, task.interval, start=task.start, end=task.end
+            )
+
+        pages = task.pages
+
+        async def fetch_page(window_start: int, window_end: int) -> list:
+            stats.requests += 1
+            return as_list(await pages.fetch(**pages.cursor.params(window_start, window_end)))
+
+        buffer = TimestampBuffer()
+        window = (task.start, task.end)
+        buffer.add(await fetch_window(fetch_page, window, pages.limit, pages.item_ms, pages.cursor.newest_first))
+        # windows are widened by exclusive bounds and slack
+        return buffer.sorted(task.start, task.end)
+
+    async def _run_task(self, task: BackfillTask, stats: BackfillStats) -> None:
+        candles = await self._fetch(task, stats)
+        settled = settled_candle_time(task.interval)
+        covered = (task.start, min(task.end, settled)) if task.start <= settled else None
+        await asyncio.to_thread(
+            self.store.write,
+            self.adaptor.name,
+            task.instrument_id,
+            task.interval,
+            candles,
+            covered,
+            task.market_type,
+        )
+        stats.candles += len(candles)
+
+    async def run(self, on_progress: Callable[[BackfillStats], None] = None) -> BackfillStats:
+        """
+        Fetch every queued task, newest first. A failing task is recorded in `stats.errors` and leaves its range
+        uncovered; the other tasks carry on.
+        :param on_progress: called with the stats after every finished or failed task
+        :return: throughput and error stats of the run
+        """
+        stats = BackfillStats(len(self._queue))
+
+        async def worker():
+            while self._queue:
+                _, _, task = heapq.heappop(self._queue)
+                try:
+                    await self._run_task(task, stats)
+                    stats.done += 1
+                except Exception as e:
+                    stats.errors[task] = e
+                if on_progress is not None:
+                    on_progress(stats)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.concurrency, len(self._queue)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            stats._finished = time.monotonic()
+        return stats
+
+
+async def backfill_candlesticks(
+    adaptor,
+    store: CandleStore,
+    instrument_ids: List[str],
+    interval: str,
+    start: int,
+    end: int,
+    concurrency: Optional[int] = None,
+    on_progress: Callable[[BackfillStats], None] = None,
+) -> BackfillStats:
+    """
+    Backfill `[start, end]` of every instrument into `store`, see `BackfillScheduler`
+    """
+    scheduler = BackfillScheduler(adaptor, store, concurrency)
+    scheduler.add(instrument_ids, interval, start, end)
+    return await scheduler.run(on_progress)
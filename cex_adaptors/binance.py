@@ -1,44 +1,68 @@
-from typing import Literal, Optional
-
-from .exchanges.binance import BinanceInverse, BinanceLinear, BinanceSpot
+import asyncio
+from functools import partial
+from typing import Iterable, List, Literal, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.binance import (
+    BinanceInverse,
+    BinanceLinear,
+    BinanceSpot,
+    BinanceUserDataWebSocket,
+    BinanceWebSocket,
+)
+from .pagination import (
+    INTERVAL_MS,
+    SECOND_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+)
 from .parsers.binance import BinanceParser
+from .streaming import Stream, StreamingMixin
+
+# COIN-M klines reject a `startTime` to `endTime` span over 200 days
+INVERSE_KLINES_MAX_SPAN_MS = 200 * 86_400_000
 
 
-class Binance(object):
+class Binance(ExchangeInfoMixin, PaginationMixin, StreamingMixin):
     name = "binance"
 
     def __init__(self, api_key: str = None, api_secret: str = None):
         self.spot = BinanceSpot(api_key=api_key, api_secret=api_secret)
-        self.linear = BinanceLinear()
+        self.linear = BinanceLinear(api_key=api_key, api_secret=api_secret)
         self.inverse = BinanceInverse()
         self.parser = BinanceParser()
+        for client in (self.spot, self.linear, self.inverse):
+            client.response_checker = self.parser.check_response
 
         self.exchange_info = {}
 
     async def close(self):
+        # stop the background exchange info refresh before its clients go away
+        await super().close()
         await self.spot.close()
         await self.linear.close()
         await self.inverse.close()
 
-    async def sync_exchange_info(self) -> None:
-        self.exchange_info = await self.get_exchange_info()
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def get_exchange_info(self, market_type: Optional[Literal["spot", "margin", "futures", "perp"]] = None):
-        spot = self.parser.parse_exchange_info(
-            await self.spot._get_exchange_info(), self.parser.spot_exchange_info_parser
-        )
-        linear = self.parser.parse_exchange_info(
-            await self.linear._get_exchange_info(), self.parser.futures_exchange_info_parser("linear")
-        )
-        inverse = self.parser.parse_exchange_info(
-            await self.inverse._get_exchange_info(), self.parser.futures_exchange_info_parser("inverse")
-        )
-        self.exchange_info = {**spot, **linear, **inverse}
-        return (
-            self.exchange_info
-            if not market_type
-            else self.parser.query_dict(self.exchange_info, {f"is_{market_type}": True})
+        spot, linear, inverse = await asyncio.gather(
+            self._parse_exchange_info(self.spot._get_exchange_info(), self.parser.spot_exchange_info_parser),
+            self._parse_exchange_info(
+                self.linear._get_exchange_info(), self.parser.futures_exchange_info_parser("linear")
+            ),
+            self._parse_exchange_info(
+                self.inverse._get_exchange_info(), self.parser.futures_exchange_info_parser("inverse")
+            ),
         )
+        exchange_info = {**spot, **linear, **inverse}
+        return exchange_info if not market_type else self.parser.query_dict(exchange_info, {f"is_{market_type}": True})
 
     async def get_ticker(self, instrument_id: str):
         _symbol = self.exchange_info[instrument_id]["raw_data"]["symbol"]
@@ -52,6 +76,100 @@ class Binance(object):
         elif market_type == "inverse":
             return {instrument_id: self.parser.parse_ticker(await self.inverse._get_ticker(_symbol), info)}
 
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for market_type, ids in self._group_instruments(instrument_ids, self.parser.get_market_type).items():
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"{symbol.lower()}@ticker" for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                instrument_id = id_map[message["s"]]
+                yield instrument_id, self.parser.parse_ws_ticker(message, self.exchange_info[instrument_id])
+
+            streams.append(Stream(BinanceWebSocket(BinanceWebSocket.URLS[market_type], topics), parse))
+        return streams
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        streams = []
+        for market_type, ids in self._group_instruments(instrument_ids, self.parser.get_market_type).items():
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            # pushes name the exchange interval
+            interval_map = {self.parser.get_interval(interval): interval for interval in intervals}
+            topics = [f"{symbol.lower()}@kline_{interval}" for interval in interval_map for symbol in id_map]
+
+            def parse(message, id_map=id_map, interval_map=interval_map):
+                instrument_id = id_map[message["s"]]
+                data = message["k"]
+                candle = self.parser.parse_ws_candlestick(
+                    data, self.exchange_info[instrument_id], interval_map[data["i"]]
+                )
+                yield instrument_id, (candle, data["x"])
+
+            url = BinanceWebSocket.URLS[market_type]
+            streams.extend(
+                Stream(BinanceWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, BinanceWebSocket)
+            )
+        return streams
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for market_type, ids in self._group_instruments(instrument_ids, self.parser.get_market_type).items():
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            # trades aggregated by taker order and price
+            topics = [f"{symbol.lower()}@aggTrade" for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                instrument_id = id_map[message["s"]]
+                yield instrument_id, self.parser.parse_ws_trade(message, self.exchange_info[instrument_id])
+
+            url = BinanceWebSocket.URLS[market_type]
+            streams.extend(
+                Stream(BinanceWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, BinanceWebSocket)
+            )
+        return streams
+
+    def _account_streams(self, markets: Iterable[str] = ("spot", "margin")) -> List[Stream]:
+        """
+        One user data stream per market
+
+        :param markets: "spot", "margin" (the cross margin account) and "linear" (USDⓈ-M futures, the API key needs
+            futures permissions)
+        """
+        spot_map = self.parser.get_id_map(self.exchange_info, "spot")
+        linear_map = self.parser.get_id_symbol_map(self.exchange_info, "linear")
+
+        def parse_spot(message):
+            # balance events carry no position
+            if message["e"] == "executionReport" and message["s"] in spot_map:
+                yield "order", self.parser.parse_ws_order(message, self.exchange_info[spot_map[message["s"]]])
+
+        def parse_linear(message):
+            if message["e"] == "ORDER_TRADE_UPDATE" and message["o"]["s"] in linear_map:
+                info = self.exchange_info[linear_map[message["o"]["s"]]]
+                yield "order", self.parser.parse_ws_order(message["o"], info)
+            elif message["e"] == "ACCOUNT_UPDATE":
+                positions = self.parser.parse_ws_positions(message, linear_map)
+                if positions:
+                    yield "position", positions
+
+        clients = {
+            "spot": (self.spot._create_listen_key, self.spot._keep_alive_listen_key, parse_spot),
+            "margin": (
+                partial(self.spot._create_listen_key, margin=True),
+                partial(self.spot._keep_alive_listen_key, margin=True),
+                parse_spot,
+            ),
+            "linear": (self.linear._create_listen_key, self.linear._keep_alive_listen_key, parse_linear),
+        }
+        streams = []
+        for market in markets:
+            if market not in clients:
+                raise ValueError(f"Invalid market for {self.name} account streams: {market}")
+            create_listen_key, keep_alive, parse = clients[market]
+            url = BinanceWebSocket.URLS["linear" if market == "linear" else "spot"]
+            streams.append(Stream(BinanceUserDataWebSocket(url, create_listen_key, keep_alive), parse))
+        return streams
+
     async def get_tickers(self, market_type: Optional[Literal["spot", "margin", "futures", "perp"]] = None) -> dict:
         results = {}
 
@@ -95,6 +213,28 @@ class Binance(object):
             )
         }
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        if interval not in INTERVAL_MS:
+            return None
+
+        info = self.exchange_info[instrument_id]
+        market_type = self.parser.get_market_type(info)
+        limit = 1000
+        if market_type == "inverse":
+            # smaller pages keep each window within the span COIN-M accepts, e.g. 800 candles at 6h, 200 at 1d
+            limit = min(limit, INVERSE_KLINES_MAX_SPAN_MS // INTERVAL_MS[interval])
+        params = {"symbol": info["raw_data"]["symbol"], "interval": self.parser.get_interval(interval), "limit": limit}
+        fetch = {
+            "spot": self.spot._get_klines,
+            "linear": self.linear._get_klines,
+            "inverse": self.inverse._get_klines,
+        }[market_type]
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_candlesticks(await fetch(**params, **window), info, market_type, interval)
+
+        return HistoryPages(fetch_page, TimeCursor("startTime", "endTime"), limit, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = 500
     ) -> list:
@@ -121,26 +261,24 @@ class Binance(object):
 
         query_end = None
 
-        results = []
-        if start and end:
+        results = TimestampBuffer()
+        pages = self._candlestick_pages(instrument_id, interval) if start and end else None
+        if pages is not None:
+            return await self._fetch_pages(pages, start, end)
+
+        elif start and end:
             query_end = end
             while True:
                 params["endTime"] = query_end
                 result = self.parser.parse_candlesticks(
                     await method_map[market_type](**params), info, market_type, interval
                 )
-                results.extend(result)
-
-                # exclude the datas with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 query_end = min([v["timestamp"] for v in result]) - 1
                 if len(result) < limit or query_end <= start:
                     break
                 continue
-            return sorted(
-                [v for v in results if end >= v["timestamp"] >= start], key=lambda x: x["timestamp"], reverse=False
-            )
+            return results.sorted(start, end)
 
         elif num:
             while True:
@@ -149,16 +287,14 @@ class Binance(object):
                     await method_map[market_type](**params), info, market_type, interval
                 )
 
-                results.extend(result)
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if len(result) < limit or len(results) >= num:
                     break
 
                 query_end = min([v["timestamp"] for v in result]) - 1
                 continue
 
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
 
     async def get_current_funding_rate(self, instrument_id: str) -> dict:
         if instrument_id not in self.exchange_info:
@@ -198,44 +334,28 @@ class Binance(object):
             "limit": limit,
         }
 
-        results = []
+        results = TimestampBuffer()
         query_end = None
         if start and end:
-            query_start = start - 1
-            query_end = end + 1
-            while True:
-                params.update({"startTime": query_start, "endTime": query_end})
-                result = self.parser.parse_history_funding_rate(await method_map[market_type](**params), info)
-                results.extend(result)
-                results = list({v["timestamp"]: v for v in results}.values())
+            # funding timestamps are rounded to the second, so windows are widened by a second on both ends
+            cursor = TimeCursor("startTime", "endTime", slack=SECOND_MS)
+            fetch = method_map[market_type]
 
-                if len(result) < limit:
-                    break
-
-                query_start = max([v["timestamp"] for v in result]) - 1
+            async def fetch_page(**window) -> list:
+                return self.parser.parse_history_funding_rate(await fetch(**params, **window), info)
 
-                if query_start < end:
-                    break
-
-                continue
-            return sorted(
-                [v for v in results if end >= v["timestamp"] >= start], key=lambda x: x["timestamp"], reverse=False
-            )
+            return await self._fetch_funding_range(fetch_page, cursor, start, end, limit, info)
 
         elif num:
             while True:
                 params.update({"endTime": query_end} if query_end else {})
                 result = self.parser.parse_history_funding_rate(await method_map[market_type](**params), info)
-                results.extend(result)
-
-                # exclude the datas with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if len(result) < limit or len(results) >= num:
                     break
                 query_end = min([v["timestamp"] for v in result]) + 1
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
         else:
             raise ValueError("(start, end) or num must be provided")
 
@@ -301,7 +421,7 @@ class Binance(object):
     ):
         return NotImplemented
 
-    async def get_orderbook(self, instrument_id: str, depth: int = None) -> dict:
+    async def get_orderbook(self, instrument_id: str, depth: int = None, as_arrays: bool = False):
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} not found in exchange info")
 
@@ -321,7 +441,9 @@ class Binance(object):
         }
 
         params = {"symbol": symbol, "limit": limit_map[market_type]}
-        return self.parser.parse_orderbook(await method_map[market_type](**params), info, market_type, depth=depth)
+        return self.parser.parse_orderbook(
+            await method_map[market_type](**params), info, market_type, depth=depth, as_arrays=as_arrays
+        )
 
     # Private function
     async def get_spot_account_info(self) -> dict:
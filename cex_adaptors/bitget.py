@@ -1,18 +1,34 @@
-from .exchanges.bitget import BitgetUnified
+import asyncio
+from typing import Dict, List, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.bitget import BitgetUnified, BitgetWebSocket
+from .orderbook import OrderBook, OrderBookOutOfSync
+from .pagination import (
+    INTERVAL_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+    as_list,
+)
 from .parsers.bitget import BitgetParser
-from .utils import query_dict
+from .streaming import Stream, StreamingMixin
 
 
-class Bitget(BitgetUnified):
+class Bitget(ExchangeInfoMixin, PaginationMixin, StreamingMixin, BitgetUnified):
     name = "bitget"
 
     def __init__(self) -> None:
         super().__init__()
         self.parser = BitgetParser()
+        self.response_checker = self.parser.check_response
         self.exchange_info = {}
 
-    async def sync_exchange_info(self):
-        self.exchange_info = await self.get_exchange_info()
+    @property
+    def _derivative_product_types(self) -> list:
+        # inverse first, then one product type per linear settle currency
+        return ["COIN-FUTURES"] + [f"{settle}-FUTURES" for settle in self.parser.LINEAR_FUTURES_SETTLE]
 
     async def get_exchange_info(self, market_type: str = None):
         if market_type:
@@ -22,37 +38,33 @@ class Bitget(BitgetUnified):
                 )
             else:
                 derivative = {}
-                inverse = self.parser.parse_exchange_info(
-                    await self._get_derivative_exchange_info("COIN-FUTURES"),
-                    self.parser.derivative_exchange_info_parser,
-                )
-                derivative.update(inverse)
-
-                for settle in self.parser.LINEAR_FUTURES_SETTLE:
-                    sub_linear = self.parser.parse_exchange_info(
-                        await self._get_derivative_exchange_info(f"{settle}-FUTURES"),
-                        self.parser.derivative_exchange_info_parser,
+                for sub_derivative in await asyncio.gather(
+                    *(
+                        self._parse_exchange_info(
+                            self._get_derivative_exchange_info(product_type),
+                            self.parser.derivative_exchange_info_parser,
+                        )
+                        for product_type in self._derivative_product_types
                     )
-                    derivative.update(sub_linear)
+                ):
+                    derivative.update(sub_derivative)
 
-                instrument_id = list(query_dict(self.exchange_info, f"is_{market_type} == True").keys())
+                instrument_id = set(self.exchange_info.ids(**{f"is_{market_type}": True}))
                 return {k: v for k, v in derivative.items() if k in instrument_id}
         else:
-            spot = self.parser.parse_exchange_info(
-                await self._get_spot_exchange_info(), self.parser.spot_exchange_info_parser
-            )
-
-            inverse = self.parser.parse_exchange_info(
-                await self._get_derivative_exchange_info("COIN-FUTURES"),
-                self.parser.derivative_exchange_info_parser,
+            spot, inverse, *sub_linears = await asyncio.gather(
+                self._parse_exchange_info(self._get_spot_exchange_info(), self.parser.spot_exchange_info_parser),
+                *(
+                    self._parse_exchange_info(
+                        self._get_derivative_exchange_info(product_type),
+                        self.parser.derivative_exchange_info_parser,
+                    )
+                    for product_type in self._derivative_product_types
+                ),
             )
 
             linear_futures = {}
-            for settle in self.parser.LINEAR_FUTURES_SETTLE:
-                sub_linear = self.parser.parse_exchange_info(
-                    await self._get_derivative_exchange_info(f"{settle}-FUTURES"),
-                    self.parser.derivative_exchange_info_parser,
-                )
+            for sub_linear in sub_linears:
                 linear_futures.update(sub_linear)
 
             return {**spot, **inverse, **linear_futures}
@@ -74,7 +86,7 @@ class Bitget(BitgetUnified):
                     )
                     derivative.update(sub_linear)
 
-                instrument_id = list(query_dict(self.exchange_info, f"is_{market_type} == True").keys())
+                instrument_id = set(self.exchange_info.ids(**{f"is_{market_type}": True}))
                 return {k: v for k, v in derivative.items() if k in instrument_id}
         else:
             spot = self.parser.parse_tickers(await self._get_spot_tickers(), self.exchange_info, "spot")
@@ -105,6 +117,93 @@ class Bitget(BitgetUnified):
         params = {"symbol": _symbol} if market_type == "spot" else {"symbol": _symbol, "productType": product_type}
         return {instrument_id: self.parser.parse_raw_ticker(await method_map[market_type](**params), info, market_type)}
 
+    def _ws_id_map(self, instrument_ids: list) -> dict:
+        # spot and futures share symbols, the channel's instType tells them apart
+        id_map = {}
+        for instrument_id in instrument_ids:
+            info = self.exchange_info[instrument_id]
+            inst_type = "SPOT" if info["is_spot"] else self.parser.get_product_type(info)
+            id_map[(inst_type, info["raw_data"]["symbol"])] = instrument_id
+        return id_map
+
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        id_map = self._ws_id_map(instrument_ids)
+        topics = [{"instType": inst_type, "channel": "ticker", "instId": symbol} for inst_type, symbol in id_map]
+
+        def parse(message):
+            inst_type = message["arg"]["instType"]
+            for data in message["data"]:
+                instrument_id = id_map[(inst_type, data["instId"])]
+                info = self.exchange_info[instrument_id]
+                yield instrument_id, self.parser.parse_ws_ticker(data, info, self.parser.get_market_type(info))
+
+        return [Stream(BitgetWebSocket(BitgetWebSocket.URLS["public"], topics), parse)]
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        id_map = self._ws_id_map(instrument_ids)
+        # spot and futures candle channels share the futures interval names
+        channels = {f"candle{self.parser.get_interval(interval, 'derivative')}": interval for interval in intervals}
+        topics = [
+            {"instType": inst_type, "channel": channel, "instId": symbol}
+            for channel in channels
+            for inst_type, symbol in id_map
+        ]
+
+        def parse(message):
+            arg = message["arg"]
+            instrument_id = id_map[(arg["instType"], arg["instId"])]
+            info = self.exchange_info[instrument_id]
+            for data in message["data"]:
+                # candles carry no closed flag
+                yield instrument_id, (self.parser.parse_ws_candlestick(data, info, channels[arg["channel"]]), None)
+
+        url = BitgetWebSocket.URLS["public"]
+        return [Stream(BitgetWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, BitgetWebSocket)]
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        id_map = self._ws_id_map(instrument_ids)
+        topics = [{"instType": inst_type, "channel": "trade", "instId": symbol} for inst_type, symbol in id_map]
+
+        def parse(message):
+            arg = message["arg"]
+            instrument_id = id_map[(arg["instType"], arg["instId"])]
+            for data in message["data"]:
+                yield instrument_id, self.parser.parse_ws_trade(data, self.exchange_info[instrument_id])
+
+        url = BitgetWebSocket.URLS["public"]
+        return [Stream(BitgetWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, BitgetWebSocket)]
+
+    def _orderbook_streams(self, books: Dict[str, OrderBook]) -> List[Stream]:
+        channel_books = {}
+        for instrument_id, book in books.items():
+            info = self.exchange_info[instrument_id]
+            inst_type = "SPOT" if info["is_spot"] else self.parser.get_product_type(info)
+            channel_books.setdefault((inst_type, info["raw_data"]["symbol"]), []).append(book)
+        # "books" pushes a full snapshot on subscribe, then diffs with a checksum of the top 25 levels
+        topics = [{"instType": inst_type, "channel": "books", "instId": symbol} for inst_type, symbol in channel_books]
+        websocket = BitgetWebSocket(BitgetWebSocket.URLS["public"], topics)
+
+        def parse(message):
+            arg = message["arg"]
+            for data in message["data"]:
+                for book in channel_books[(arg["instType"], arg["instId"])]:
+                    try:
+                        applied = book.apply(
+                            data["bids"],
+                            data["asks"],
+                            timestamp=int(data["ts"]),
+                            sequence=data.get("seq"),
+                            checksum=data.get("checksum"),
+                            snapshot=message["action"] == "snapshot",
+                        )
+                    except OrderBookOutOfSync:
+                        websocket.reconnect()
+                        continue
+                    if applied:
+                        yield book.instrument_id, book
+
+        return [Stream(websocket, parse)]
+
     async def get_last_price(self, instrument_id: str) -> dict:
         ticker = await self.get_ticker(instrument_id)
         ticker = ticker[instrument_id]
@@ -143,7 +242,7 @@ class Bitget(BitgetUnified):
             await self._get_derivative_mark_index_price(_symbol, product_type), info, "mark"
         )
 
-    async def get_orderbook(self, instrument_id: str, depth: int = None) -> dict:
+    async def get_orderbook(self, instrument_id: str, depth: int = None, as_arrays: bool = False):
         if instrument_id not in self.exchange_info:
             raise f"{instrument_id} not found in {self.name} exchange info"
 
@@ -162,8 +261,13 @@ class Bitget(BitgetUnified):
             "spot": self._get_spot_merge_depth,
             "derivative": self._get_derivative_merge_market_depth,
         }
-        orderbook = self.parser.parse_orderbook(await method_map[_market_type](**params), info)
+        response = await method_map[_market_type](**params)
+        if as_arrays:
+            # sorted on construction
+            orderbook = self.parser.parse_orderbook(response, info, as_arrays=True)
+            return orderbook.truncate(depth) if depth else orderbook
 
+        orderbook = self.parser.parse_orderbook(response, info)
         if depth:
             orderbook["asks"] = sorted(orderbook["asks"], key=lambda x: x["price"], reverse=False)[:depth]
             orderbook["bids"] = sorted(orderbook["bids"], key=lambda x: x["price"], reverse=True)[:depth]
@@ -200,6 +304,30 @@ class Bitget(BitgetUnified):
             )
         }
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        if interval not in INTERVAL_MS:
+            return None
+
+        info = self.exchange_info[instrument_id]
+        market_type = self.parser.get_market_type(info)
+        limit = 300
+        params = {
+            "symbol": info["raw_data"]["symbol"],
+            "granularity": self.parser.get_interval(interval, market_type),
+            "limit": limit,
+        }
+        if market_type == "derivative":
+            params.update({"productType": self.parser.get_product_type(info)})
+        fetch = {
+            "spot": self._get_spot_candlesticks,
+            "derivative": self._get_derivative_candlesticks,
+        }[market_type]
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_candlesticks(await fetch(**params, **window), info, market_type, interval)
+
+        return HistoryPages(fetch_page, TimeCursor("startTime", "endTime"), limit, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -225,31 +353,30 @@ class Bitget(BitgetUnified):
         if market_type == "derivative":
             params.update({"productType": self.parser.get_product_type(self.exchange_info[instrument_id])})
 
-        results = []
+        results = TimestampBuffer()
         query_end = None
-        if start and end:
+        pages = self._candlestick_pages(instrument_id, interval) if start and end else None
+        if pages is not None:
+            return await self._fetch_pages(pages, start, end)
+
+        elif start and end:
             query_end = end
             while True:
                 params.update({"endTime": query_end})
-                result = self.parser.parse_candlesticks(
-                    await method_map[market_type](**params), info, market_type, interval
+                result = as_list(
+                    self.parser.parse_candlesticks(await method_map[market_type](**params), info, market_type, interval)
                 )
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if not result or len(result) < limit:
                     break
 
-                query_end = min([v["timestamp"] for v in result]) + 1
+                # `endTime` is inclusive
+                query_end = min([v["timestamp"] for v in result]) - 1
 
                 if query_end < start:
                     break
 
-            return sorted(
-                [i for i in results if start <= i["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return results.sorted(start, end)
         elif num:
             while True:
                 params.update({"endTime": query_end})
@@ -257,11 +384,7 @@ class Bitget(BitgetUnified):
                 result = self.parser.parse_candlesticks(
                     await method_map[market_type](**params), info, market_type, interval
                 )
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if not result or len(result) < limit:
                     break
 
@@ -269,7 +392,7 @@ class Bitget(BitgetUnified):
 
                 if len(results) >= num:
                     break
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
 
         else:
             raise ValueError("(start, end) or num must be provided")
@@ -301,42 +424,25 @@ class Bitget(BitgetUnified):
         page = 1
         params = {"symbol": _symbol, "productType": _product_type, "pageSize": limit, "pageNo": page}
 
-        results = []
+        results = TimestampBuffer()
         if start and end:
-            while True:
-                params.update({"pageNo": page})
-                result = self.parser.parse_history_funding_rate(
-                    await self._get_derivative_history_funding_rate(**params), info
-                )
-                results.extend(result)
 
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
+            async def fetch_page(page_no: int) -> list:
+                response = await self._get_derivative_history_funding_rate(**{**params, "pageNo": page_no})
+                return self.parser.parse_history_funding_rate(response, info)
 
-                if len(result) < limit:
-                    break
-                min_timestamp = min([i["timestamp"] for i in result])
-                if min_timestamp < start:
-                    break
-
-            return sorted(
-                [i for i in results if start <= i["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return await self._fetch_numbered_pages(fetch_page, start, end, limit)
         elif num:
             while True:
                 params.update({"pageNo": page})
                 result = self.parser.parse_history_funding_rate(
                     await self._get_derivative_history_funding_rate(**params), info
                 )
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if len(result) < limit or len(results) > num:
                     break
                 page += 1
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
         else:
             raise ValueError("(start, end) or num must be provided")
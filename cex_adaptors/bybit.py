@@ -1,29 +1,37 @@
-from typing import Literal, Optional
-
-from .exchanges.bybit import BybitUnified
+import asyncio
+from typing import Dict, List, Literal, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.bybit import BybitUnified, BybitWebSocket
+from .orderbook import OrderBook, OrderBookOutOfSync
+from .pagination import (
+    INTERVAL_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+    as_list,
+)
 from .parsers.bybit import BybitParser
+from .streaming import Stream, StreamingMixin
 
 
-class Bybit(BybitUnified):
+class Bybit(ExchangeInfoMixin, PaginationMixin, StreamingMixin, BybitUnified):
     name = "bybit"
 
     def __init__(self):
         super().__init__()
         self.parser = BybitParser()
+        self.response_checker = self.parser.check_response
         self.exchange_info = {}
 
-    async def sync_exchange_info(self):
-        self.exchange_info = await self.get_exchange_info()
-
     async def get_exchange_info(self, market_type: str = None):
-        spot = self.parser.parse_exchange_info(
-            await self._get_exchange_info("spot"), self.parser.spot_exchange_info_parser
-        )
-        linear = self.parser.parse_exchange_info(
-            await self._get_exchange_info("linear"), self.parser.perp_futures_exchange_info_parser
-        )
-        inverse = self.parser.parse_exchange_info(
-            await self._get_exchange_info("inverse"), self.parser.perp_futures_exchange_info_parser
+        spot, linear, inverse = await asyncio.gather(
+            self._parse_exchange_info(self._get_exchange_info("spot"), self.parser.spot_exchange_info_parser),
+            self._parse_exchange_info(self._get_exchange_info("linear"), self.parser.perp_futures_exchange_info_parser),
+            self._parse_exchange_info(
+                self._get_exchange_info("inverse"), self.parser.perp_futures_exchange_info_parser
+            ),
         )
 
         return {**spot, **linear, **inverse}
@@ -61,6 +69,63 @@ class Bybit(BybitUnified):
             )
         }
 
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for category, ids in self._group_instruments(instrument_ids, self.parser.get_category).items():
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"tickers.{symbol}" for symbol in id_map]
+            # derivatives push a snapshot then deltas of the changed fields only
+            tickers = {}
+
+            def parse(message, id_map=id_map, tickers=tickers):
+                data = message["data"]
+                symbol = data["symbol"]
+                if message.get("type") == "delta":
+                    if symbol not in tickers:
+                        return
+                    data = {**tickers[symbol], **data}
+                tickers[symbol] = data
+                info = self.exchange_info[id_map[symbol]]
+                market_type = self.parser.get_market_type(info)
+                yield id_map[symbol], self.parser.parse_ticker(data, market_type, info, timestamp=message["ts"])
+
+            streams.append(Stream(BybitWebSocket(BybitWebSocket.URLS[category], topics), parse))
+        return streams
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        streams = []
+        interval_map = {self.parser.get_interval(interval): interval for interval in intervals}
+        for category, ids in self._group_instruments(instrument_ids, self.parser.get_category).items():
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"kline.{interval}.{symbol}" for interval in interval_map for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                # "kline.<interval>.<symbol>"
+                _, interval, symbol = message["topic"].split(".", 2)
+                instrument_id = id_map[symbol]
+                for data in message["data"]:
+                    candle = self.parser.parse_ws_candlestick(
+                        data, self.exchange_info[instrument_id], interval_map[interval]
+                    )
+                    yield instrument_id, (candle, data["confirm"])
+
+            streams.append(Stream(BybitWebSocket(BybitWebSocket.URLS[category], topics), parse))
+        return streams
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for category, ids in self._group_instruments(instrument_ids, self.parser.get_category).items():
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"publicTrade.{symbol}" for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                for data in message["data"]:
+                    instrument_id = id_map[data["s"]]
+                    yield instrument_id, self.parser.parse_ws_trade(data, self.exchange_info[instrument_id])
+
+            streams.append(Stream(BybitWebSocket(BybitWebSocket.URLS[category], topics), parse))
+        return streams
+
     async def get_current_candlestick(self, instrument_id: str, interval: str) -> dict:
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} is not found in {self.name} exchange info.")
@@ -77,6 +142,25 @@ class Bybit(BybitUnified):
             instrument_id: self.parser.parse_candlesticks(await self._get_klines(**params), info, _category, interval)
         }
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        if interval not in INTERVAL_MS:
+            return None
+
+        info = self.exchange_info[instrument_id]
+        _category = self.parser.get_category(info)
+        limit = 1000
+        params = {
+            "symbol": info["raw_data"]["symbol"],
+            "interval": self.parser.get_interval(interval),
+            "limit": limit,
+            "category": _category,
+        }
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_candlesticks(await self._get_klines(**params, **window), info, _category, interval)
+
+        return HistoryPages(fetch_page, TimeCursor("start", "end", newest_first=True), limit, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = 30
     ) -> list:
@@ -89,43 +173,41 @@ class Bybit(BybitUnified):
 
         params = {"symbol": _symbol, "interval": _interval, "limit": limit, "category": _category}
 
-        results = []
+        results = TimestampBuffer()
         query_end = None
-        if start and end:
-            query_end = end + 1
+        pages = self._candlestick_pages(instrument_id, interval) if start and end else None
+        if pages is not None:
+            return await self._fetch_pages(pages, start, end)
+
+        elif start and end:
+            query_end = end
             while True:
                 params["end"] = query_end
-                klines = self.parser.parse_candlesticks(await self._get_klines(**params), info, _category, interval)
+                klines = as_list(
+                    self.parser.parse_candlesticks(await self._get_klines(**params), info, _category, interval)
+                )
                 if not klines:
                     break
-                results.extend(klines)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
-                query_end = min([v["timestamp"] for v in klines]) + 1
-                if len(klines) < limit or query_end <= start:
+                klines = results.add(klines)
+                # `end` is inclusive
+                query_end = min([v["timestamp"] for v in klines]) - 1
+                if len(klines) < limit or query_end < start:
                     break
                 continue
-            return sorted(
-                [v for v in results if end >= v["timestamp"] >= start], key=lambda x: x["timestamp"], reverse=False
-            )
+            return results.sorted(start, end)
 
         elif num:
             while True:
                 params.update({"end": query_end} if query_end else {})
                 klines = self.parser.parse_candlesticks(await self._get_klines(**params), info, _category, interval)
 
-                results.extend(klines)
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                klines = results.add(klines)
                 if len(klines) < limit or len(results) >= num:
                     break
                 query_end = min([v["timestamp"] for v in klines]) + 1
                 continue
 
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
         else:
             raise ValueError("(start, end) or num must be provided")
 
@@ -143,6 +225,11 @@ class Bybit(BybitUnified):
         }
         return {instrument_id: self.parser.parse_current_funding_rate(await self._get_ticker(**params), info)}
 
+    def _funding_interval_ms(self, info: dict) -> int:
+        # the instruments info lists the funding interval in minutes
+        minutes = info["raw_data"].get("fundingInterval")
+        return int(minutes) * 60_000 if minutes else super()._funding_interval_ms(info)
+
     async def get_history_funding_rate(self, instrument_id: str, start: int = None, end: int = None, num: int = 30):
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} is not supported")
@@ -154,45 +241,28 @@ class Bybit(BybitUnified):
 
         params = {"symbol": _symbol, "limit": limit, "category": _category}
 
-        results = []
+        results = TimestampBuffer()
         query_end = None
         if start and end:
-            query_end = end + 1
-            while True:
-                params["endTime"] = query_end
-                result = self.parser.parse_funding_rate(await self._get_funding_rate_history(**params), info)
-                results.extend(result)
+            cursor = TimeCursor("startTime", "endTime", newest_first=True)
 
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
+            async def fetch_page(**window) -> list:
+                return self.parser.parse_funding_rate(await self._get_funding_rate_history(**params, **window), info)
 
-                if len(result) < limit:
-                    break
-
-                query_end = min([v["timestamp"] for v in result])
-
-                if query_end <= start:
-                    break
-                continue
-            return sorted(
-                [v for v in results if end >= v["timestamp"] >= start], key=lambda x: x["timestamp"], reverse=False
-            )
+            return await self._fetch_funding_range(fetch_page, cursor, start, end, limit, info)
 
         elif num:
             while True:
                 params.update({"endTime": query_end} if query_end else {})
                 result = self.parser.parse_funding_rate(await self._get_funding_rate_history(**params), info)
 
-                results.extend(result)
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if len(result) < limit or len(results) >= num:
                     break
 
                 query_end = min([v["timestamp"] for v in result])
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
         else:
             raise ValueError("(start, end) or num must be provided")
 
@@ -209,7 +279,7 @@ class Bybit(BybitUnified):
 
         return self.parser.parse_open_interest(await self._get_open_interest(**params), info)
 
-    async def get_orderbook(self, instrument_id: str, depth: int = 100):
+    async def get_orderbook(self, instrument_id: str, depth: int = 100, as_arrays: bool = False):
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} not found in exchange info")
 
@@ -225,7 +295,37 @@ class Bybit(BybitUnified):
         _depth = min(depth, order_book_depth_map[_category])
 
         params = {"category": _category, "symbol": _symbol, "limit": _depth}
-        return self.parser.parse_orderbook(await self._get_orderbook(**params), info)
+        return self.parser.parse_orderbook(await self._get_orderbook(**params), info, as_arrays)
+
+    def _orderbook_streams(self, books: Dict[str, OrderBook]) -> List[Stream]:
+        streams = []
+        for category, ids in self._group_instruments(list(books), self.parser.get_category).items():
+            symbol_books = {self.exchange_info[i]["raw_data"]["symbol"]: books[i] for i in ids}
+            # 200 levels is the deepest book every category streams
+            topics = [f"orderbook.200.{symbol}" for symbol in symbol_books]
+            websocket = BybitWebSocket(BybitWebSocket.URLS[category], topics)
+
+            def parse(message, symbol_books=symbol_books, websocket=websocket):
+                data = message["data"]
+                book = symbol_books[data["s"]]
+                # Bybit has no book checksum; update ids of diffs are consecutive and restart at 1 with a snapshot
+                try:
+                    applied = book.apply(
+                        data["b"],
+                        data["a"],
+                        timestamp=message["ts"],
+                        sequence=data["u"],
+                        prev_sequence=data["u"] - 1,
+                        snapshot=message["type"] == "snapshot" or data["u"] == 1,
+                    )
+                except OrderBookOutOfSync:
+                    websocket.reconnect()
+                    return
+                if applied:
+                    yield book.instrument_id, book
+
+            streams.append(Stream(websocket, parse))
+        return streams
 
     async def get_last_price(self, instrument_id: str) -> dict:
         if instrument_id not in self.exchange_info:
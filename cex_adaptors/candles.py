@@ -0,0 +1,267 @@
+from typing import Dict, Hashable, Iterable, List, NamedTuple, Optional
+
+# float columns of a candle, in the order of the unified candlestick dicts
+CANDLE_COLUMNS = ("open", "high", "low", "close", "base_volume", "quote_volume", "contract_volume")
+
+
+def _import_numpy():
+    # numpy is an optional extra (`pip install cex-adaptors[numpy]`), only needed for the `as_arrays` outputs
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise ImportError(
+            "numpy is required for the `as_arrays` outputs, install it with `pip install cex-adaptors[numpy]`"
+        ) from e
+    return np
+
+
+class CandleColumns(NamedTuple):
+    """
+    Where each unified candle field sits in an exchange's raw candle row: a list index or a dict key, None for
+    fields the exchange does not report. Scales convert the raw values to the unified units, e.g. `timestamp_scale`
+    is 1000 for exchanges reporting seconds.
+    """
+
+    timestamp: Hashable
+    open: Hashable
+    high: Hashable
+    low: Hashable
+    close: Hashable
+    base_volume: Optional[Hashable]
+    quote_volume: Optional[Hashable]
+    contract_volume: Optional[Hashable]
+    timestamp_scale: int = 1
+    base_volume_scale: float = 1.0
+    quote_volume_scale: float = 1.0
+    contract_volume_scale: float = 1.0
+
+
+class CandleArrays(object):
+    """
+    Candles of one series as NumPy columns: `timestamp` (int64, ms) and the `CANDLE_COLUMNS` (float64, NaN where the
+    exchange reports nothing), with `instrument_id`, `market_type` and `interval` stored once instead of per row.
+    Columns are read as attributes or by name, `candles.close` / `candles["close"]`.
+    """
+
+    __slots__ = ("instrument_id", "market_type", "interval", "timestamp", *CANDLE_COLUMNS)
+
+    def __init__(self, instrument_id: str, market_type: str, interval: str, timestamp, **columns):
+        np = _import_numpy()
+        self.instrument_id = instrument_id
+        self.market_type = market_type
+        self.interval = interval
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        for name in CANDLE_COLUMNS:
+            setattr(self, name, np.asarray(columns[name], dtype=np.float64))
+
+    @classmethod
+    def from_rows(
+        cls, rows: list, columns: CandleColumns, instrument_id: str, market_type: str, interval: str
+    ) -> "CandleArrays":
+        """
+        Parse raw exchange candle rows in bulk, one column at a time
+        :param rows: candle lists or dicts as returned by the exchange
+        :param columns: the exchange's row layout
+        """
+        np = _import_numpy()
+
+        def column(key, dtype, scale):
+            if key is None:
+                return np.full(len(rows), np.nan)
+            values = np.array([row[key] for row in rows], dtype=dtype)
+            return values * scale if scale != 1 else values
+
+        return cls(
+            instrument_id,
+            market_type,
+            interval,
+            column(columns.timestamp, np.int64, columns.timestamp_scale),
+            open=column(columns.open, np.float64, 1),
+            high=column(columns.high, np.float64, 1),
+            low=column(columns.low, np.float64, 1),
+            close=column(columns.close, np.float64, 1),
+            base_volume=column(columns.base_volume, np.float64, columns.base_volume_scale),
+            quote_volume=column(columns.quote_volume, np.float64, columns.quote_volume_scale),
+            contract_volume=column(columns.contract_volume, np.float64, columns.contract_volume_scale),
+        )
+
+    @classmethod
+    def from_records(cls, records: List[dict], instrument_id: str, market_type: str, interval: str) -> "CandleArrays":
+        """
+        Columns of unified candlestick dicts, e.g. a `get_history_candlesticks` result
+        """
+        return cls.from_rows(records, CandleColumns("timestamp", *CANDLE_COLUMNS), instrument_id, market_type, interval)
+
+    @classmethod
+    def concat(cls, chunks: Iterable["CandleArrays"]) -> "CandleArrays":
+        """
+        Merge pages of one series into ascending, timestamp-unique columns; the last page wins on duplicates
+        """
+        np = _import_numpy()
+        chunks = list(chunks)
+        if not chunks:
+            raise ValueError("No candles to concatenate")
+
+        timestamp = np.concatenate([chunk.timestamp for chunk in chunks])
+        # np.unique keeps the first occurrence, reversing makes it the last
+        _, last = np.unique(timestamp[::-1], return_index=True)
+        order = len(timestamp) - 1 - last
+        first = chunks[0]
+        return cls(
+            first.instrument_id,
+            first.market_type,
+            first.interval,
+            timestamp[order],
+            **{name: np.concatenate([getattr(chunk, name) for chunk in chunks])[order] for name in CANDLE_COLUMNS},
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __getitem__(self, name: str):
+        if name != "timestamp" and name not in CANDLE_COLUMNS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __repr__(self) -> str:
+        return f"CandleArrays({self.instrument_id!r}, {self.market_type!r}, {self.interval!r}, {len(self)} candles)"
+
+    def to_records(self) -> List[dict]:
+        """
+        Unified candlestick dicts without `raw_data`
+        """
+        # NaN != NaN, missing values go back to None
+        columns = [self.timestamp.tolist()] + [
+            [v if v == v else None for v in getattr(self, name).tolist()] for name in CANDLE_COLUMNS
+        ]
+        return [
+            {
+                "timestamp": row[0],
+                "instrument_id": self.instrument_id,
+                "market_type": self.market_type,
+                "interval": self.interval,
+                **dict(zip(CANDLE_COLUMNS, row[1:])),
+            }
+            for row in zip(*columns)
+        ]
+
+
+_INTERVAL_UNIT_MS = {"s": 1000, "m": 60_000, "h": 3_600_000, "d": 86_400_000, "w": 604_800_000}
+# the epoch fell on a Thursday, weekly candles start on Mondays
+_WEEK_OFFSET_MS = 4 * _INTERVAL_UNIT_MS["d"]
+
+
+def parse_interval_ms(interval: str) -> int:
+    """
+    Length of a fixed interval in ms: a count and a unit of "s", "m", "h", "d" or "w", e.g. "1m", "90s" or "4h"
+    """
+    count, unit = interval[:-1], interval[-1:]
+    if unit not in _INTERVAL_UNIT_MS or not count.isdigit() or int(count) == 0:
+        raise ValueError(f"{interval} is not a fixed interval, e.g. 1m, 90s, 4h, 1d or 1w")
+    return int(count) * _INTERVAL_UNIT_MS[unit]
+
+
+def candle_start(timestamp: int, interval_ms: int) -> int:
+    """
+    Open time of the candle of `interval_ms` holding `timestamp`, in exchange alignment: multiples of the interval
+    since the epoch, weeks starting on Monday
+    """
+    offset = _WEEK_OFFSET_MS if interval_ms % _INTERVAL_UNIT_MS["w"] == 0 else 0
+    return timestamp - (timestamp - offset) % interval_ms
+
+
+class CandleCloser(object):
+    """
+    Closed flags of streamed candles. Kline streams push the candle in progress on every update and not every
+    exchange flags its final update: a candle of a series is closed at the latest when the next one starts.
+    Updates of candles older than the latest one of their series arrive late and are dropped.
+    """
+
+    def __init__(self):
+        # latest candle of every series
+        self._latest: Dict[Hashable, dict] = {}
+
+    def update(self, key: Hashable, candle: dict, closed: Optional[bool] = None) -> List[dict]:
+        """
+        :param key: series of the candle, e.g. `(instrument_id, interval)`
+        :param candle: unified candle
+        :param closed: whether the exchange flags the update as final, None when it does not tell
+        :return: copies of the candles to emit with a "closed" flag: the previous candle when this one closes it,
+            then this one; empty for late updates
+        """
+        latest = self._latest.get(key)
+        if latest is not None and (
+            candle["timestamp"] < latest["timestamp"]
+            or (candle["timestamp"] == latest["timestamp"] and latest["closed"])
+        ):
+            return []
+
+        candle = {**candle, "closed": bool(closed)}
+        self._latest[key] = candle
+        if latest is not None and not latest["closed"] and candle["timestamp"] > latest["timestamp"]:
+            return [{**latest, "closed": True}, dict(candle)]
+        return [dict(candle)]
+
+
+def _add_volume(total: Optional[float], volume: Optional[float]) -> Optional[float]:
+    # volumes an exchange does not report stay None
+    return None if total is None or volume is None else total + volume
+
+
+class TradeCandles(object):
+    """
+    Candles of any fixed interval built from unified trades, e.g. `subscribe_trades` records. A candle closes when
+    the first trade of a later one arrives; intervals without trades produce no candle, and trades of a candle
+    already closed are dropped.
+    """
+
+    def __init__(self, interval: str):
+        """
+        :param interval: see `parse_interval_ms`, e.g. "1m" or "15s"
+        """
+        self.interval = interval
+        self.interval_ms = parse_interval_ms(interval)
+        # candle in progress of every instrument
+        self._candles: Dict[str, dict] = {}
+
+    def update(self, trade: dict) -> List[dict]:
+        """
+        :param trade: unified trade
+        :return: copies of the candles changed by the trade with a "closed" flag: the candle it closed if any,
+            then the one in progress; empty for late trades
+        """
+        instrument_id = trade["perp_instrument_id"]
+        start = candle_start(trade["timestamp"], self.interval_ms)
+        candle = self._candles.get(instrument_id)
+        if candle is not None and start < candle["timestamp"]:
+            return []
+
+        results = []
+        price = trade["price"]
+        if candle is None or start > candle["timestamp"]:
+            if candle is not None:
+                results.append({**candle, "closed": True})
+            candle = {
+                "timestamp": start,
+                "perp_instrument_id": instrument_id,
+                "market_type": trade["market_type"],
+                "interval": self.interval,
+                "open": price,
+                "high": price,
+                "low": price,
+                "close": price,
+                "base_volume": trade["base_volume"],
+                "quote_volume": trade["quote_volume"],
+                "contract_volume": trade["contract_volume"],
+                "raw_data": None,
+                "closed": False,
+            }
+            self._candles[instrument_id] = candle
+        else:
+            candle["high"] = max(candle["high"], price)
+            candle["low"] = min(candle["low"], price)
+            candle["close"] = price
+            for name in ("base_volume", "quote_volume", "contract_volume"):
+                candle[name] = _add_volume(candle[name], trade[name])
+        results.append(dict(candle))
+        return results
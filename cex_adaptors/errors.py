@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class ExchangeError(ValueError):
+    """
+    Error payload returned by an exchange with a successful HTTP status.
+    `retryable` is decided by the parser from the exchange error code.
+    """
+
+    def __init__(self, message: str, code=None, retryable: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.retryable = retryable
+
+
+class HTTPError(Exception):
+    """
+    Non-200 HTTP response. 408, 429 and 5xx responses are transient and may be retried.
+    """
+
+    RETRYABLE_STATUS = (408, 429, 500, 502, 503, 504)
+
+    def __init__(self, status: int, reason: str, body: str, retry_after: Optional[float] = None):
+        super().__init__(f"Error {status} {reason} {body}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in self.RETRYABLE_STATUS
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a `Retry-After` header given either as delay seconds or as an HTTP date
+    :param value: raw header value
+    :return: seconds to wait, or None when the header is missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
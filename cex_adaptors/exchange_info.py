@@ -0,0 +1,230 @@
+import asyncio
+import inspect
+import json
+import os
+import time
+from collections.abc import Mapping
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional
+
+from .instruments import InstrumentRegistry
+
+SNAPSHOT_FORMAT = "cex-adaptors/exchange-info"
+SNAPSHOT_VERSION = 1
+
+
+def _json_default(value):
+    # `Instrument` records and their raw_data are read-only mappings
+    return dict(value) if isinstance(value, Mapping) else str(value)
+
+
+def save_snapshot(path: str, exchange: str, exchange_info: dict) -> None:
+    """
+    Write exchange info as JSON lines: a header line, then one `{"id": ..., "info": ...}` line per instrument.
+    The file is replaced atomically so readers never see a partial snapshot.
+    :param path: snapshot file path
+    :param exchange: adaptor name stored in the header
+    :param exchange_info: unified id -> instrument info
+    """
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "exchange": exchange,
+        "created_at": int(time.time() * 1000),
+        "count": len(exchange_info),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for instrument_id, info in exchange_info.items():
+            f.write(
+                json.dumps({"id": instrument_id, "info": info}, separators=(",", ":"), default=_json_default) + "\n"
+            )
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, exchange: str) -> Optional[dict]:
+    """
+    Read a snapshot written by `save_snapshot`
+    :param path: snapshot file path
+    :param exchange: adaptor name the snapshot must belong to
+    :return: `{"created_at": ms, "exchange_info": {...}}`, or None when the file is missing, from another
+        exchange, of another version or incomplete
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if (
+                header.get("format") != SNAPSHOT_FORMAT
+                or header.get("version") != SNAPSHOT_VERSION
+                or header.get("exchange") != exchange
+            ):
+                return None
+            exchange_info = {}
+            for line in f:
+                record = json.loads(line)
+                exchange_info[record["id"]] = record["info"]
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+    if len(exchange_info) != header.get("count"):
+        return None
+    return {"created_at": header.get("created_at"), "exchange_info": exchange_info}
+
+
+class ExchangeInfoEvent(NamedTuple):
+    """
+    One instrument change found by `ExchangeInfoMixin.refresh_exchange_info`.
+    `kind` is "added", "removed" or "changed"; `old` / `new` are None for added / removed instruments.
+    """
+
+    kind: str
+    instrument_id: str
+    old: Optional[dict] = None
+    new: Optional[dict] = None
+
+    @property
+    def changed_keys(self) -> List[str]:
+        if self.kind != "changed":
+            return []
+        return sorted(k for k in self.old.keys() | self.new.keys() if self.old.get(k) != self.new.get(k))
+
+
+def diff_exchange_info(current: dict, latest: dict) -> List[ExchangeInfoEvent]:
+    """
+    Compare two exchange info maps keyed by unified instrument id
+    :param current: exchange info held now
+    :param latest: freshly parsed exchange info
+    :return: added, removed and changed instruments
+    """
+    events = [
+        ExchangeInfoEvent("added", instrument_id, None, info)
+        for instrument_id, info in latest.items()
+        if instrument_id not in current
+    ]
+    for instrument_id, info in current.items():
+        if instrument_id not in latest:
+            events.append(ExchangeInfoEvent("removed", instrument_id, info, None))
+        elif latest[instrument_id] != info:
+            events.append(ExchangeInfoEvent("changed", instrument_id, info, latest[instrument_id]))
+    return events
+
+
+ExchangeInfoListener = Callable[[List[ExchangeInfoEvent]], Any]
+
+
+class ExchangeInfoMixin(object):
+    """
+    `sync_exchange_info` for the top-level adaptors, with an optional on-disk snapshot for warm starts, and
+    `refresh_exchange_info` to apply listings, delistings and instrument changes in place.
+    Adaptors provide `name`, `get_exchange_info()` and the `exchange_info` attribute.
+    """
+
+    _exchange_info_refresh: Optional[asyncio.Task] = None
+    _exchange_info_listeners: Optional[List[ExchangeInfoListener]] = None
+    _exchange_info: InstrumentRegistry = None
+    # keep the full raw instrument payloads in `exchange_info` instead of only the symbol fields
+    keep_raw_exchange_info: bool = False
+
+    @property
+    def exchange_info(self) -> InstrumentRegistry:
+        return self._exchange_info
+
+    @exchange_info.setter
+    def exchange_info(self, value: dict) -> None:
+        # every assignment is indexed, see `InstrumentRegistry`
+        if not isinstance(value, InstrumentRegistry):
+            value = InstrumentRegistry(value, keep_raw=self.keep_raw_exchange_info)
+        self._exchange_info = value
+
+    async def sync_exchange_info(
+        self, snapshot_path: str = None, refresh: bool = True, incremental: bool = False
+    ) -> None:
+        """
+        :param snapshot_path: when given, load exchange info from this snapshot if it is valid and refresh it in the
+            background, otherwise fetch it and write the snapshot
+        :param refresh: refresh a loaded snapshot in the background
+        :param incremental: update the current exchange info in place with `refresh_exchange_info` instead of
+            replacing it
+        """
+        if snapshot_path is None:
+            if incremental and self.exchange_info:
+                await self.refresh_exchange_info()
+            else:
+                self.exchange_info = await self.get_exchange_info()
+            return
+
+        snapshot = await asyncio.to_thread(load_snapshot, snapshot_path, self.name)
+        if snapshot is None:
+            await self._refresh_snapshot(snapshot_path)
+            return
+
+        self.exchange_info = snapshot["exchange_info"]
+        if refresh:
+            self._cancel_exchange_info_refresh()
+            self._exchange_info_refresh = asyncio.ensure_future(self._refresh_snapshot(snapshot_path))
+
+    async def _parse_exchange_info(self, response: Awaitable[dict], parser, **kwargs) -> dict:
+        """
+        Parse one instruments response as soon as it arrives; `get_exchange_info` gathers these so every
+        endpoint is fetched concurrently and parsing overlaps with the requests still in flight
+        """
+        return self.parser.parse_exchange_info(await response, parser, **kwargs)
+
+    async def _refresh_snapshot(self, snapshot_path: str) -> None:
+        if self.exchange_info:
+            await self.refresh_exchange_info()
+        else:
+            self.exchange_info = await self.get_exchange_info()
+        await asyncio.to_thread(save_snapshot, snapshot_path, self.name, self.exchange_info)
+
+    def add_exchange_info_listener(self, listener: ExchangeInfoListener) -> None:
+        """
+        Register a callable (sync or async) receiving the list of events of every refresh that changed something
+        """
+        if self._exchange_info_listeners is None:
+            self._exchange_info_listeners = []
+        self._exchange_info_listeners.append(listener)
+
+    def remove_exchange_info_listener(self, listener: ExchangeInfoListener) -> None:
+        if self._exchange_info_listeners and listener in self._exchange_info_listeners:
+            self._exchange_info_listeners.remove(listener)
+
+    async def refresh_exchange_info(self) -> List[ExchangeInfoEvent]:
+        """
+        Fetch exchange info and apply only the differences to `exchange_info` in place, so references to the map
+        and to untouched entries stay valid. Listeners are notified once per refresh with all events.
+        :return: added, removed and changed instruments
+        """
+        # compact first so entries that only differ in dropped raw fields are not reported as changed
+        latest = {k: self.exchange_info.compact(v) for k, v in (await self.get_exchange_info()).items()}
+        events = diff_exchange_info(self.exchange_info, latest)
+        for event in events:
+            if event.kind == "removed":
+                del self.exchange_info[event.instrument_id]
+            else:
+                self.exchange_info[event.instrument_id] = event.new
+
+        if events:
+            for listener in list(self._exchange_info_listeners or []):
+                result = listener(events)
+                if inspect.isawaitable(result):
+                    await result
+        return events
+
+    async def wait_exchange_info_refresh(self) -> None:
+        """
+        Wait for the background refresh started by `sync_exchange_info`, re-raising its error if it failed
+        """
+        if self._exchange_info_refresh is not None:
+            await self._exchange_info_refresh
+
+    def _cancel_exchange_info_refresh(self) -> None:
+        if self._exchange_info_refresh is not None and not self._exchange_info_refresh.done():
+            self._exchange_info_refresh.cancel()
+        self._exchange_info_refresh = None
+
+    async def close(self):
+        self._cancel_exchange_info_refresh()
+        parent_close = getattr(super(), "close", None)
+        if parent_close is not None:
+            await parent_close()
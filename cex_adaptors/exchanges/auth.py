@@ -45,6 +45,17 @@ class OkxAuth(object):
             print("header: ", header)
         return header
 
+    def get_ws_login_args(self) -> dict:
+        # WebSocket logins sign a timestamp in seconds with the path of a fixed verification request
+        timestamp = str(int(time.time()))
+        sign = self.sign(self.pre_hash(timestamp, "GET", "/users/self/verify", ""))
+        return {
+            "apiKey": self.api_key,
+            "passphrase": self.passphrase,
+            "timestamp": timestamp,
+            "sign": sign.decode("utf-8"),
+        }
+
     def sign(self, message):
         mac = hmac.new(bytes(self.api_secret, encoding="utf8"), bytes(message, encoding="utf-8"), digestmod="sha256")
         d = mac.digest()
@@ -1,60 +1,161 @@
+import asyncio
 import json
-from typing import Optional
+from typing import Callable, Optional
 
 import aiohttp
 
+from ..errors import ExchangeError, HTTPError, parse_retry_after
 from .auth import BinanceAuth, OkxAuth
-
-DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10, sock_connect=3, sock_read=5)
+from .cache import MISSING, ResponseCache, cache_bypassed
+from .rate_limit import RateLimiter, RateLimitStatus
+from .retry import TRANSIENT_ERRORS, RetryPolicy
+from .session import SESSIONS, SessionRegistry
+from .single_flight import SingleFlight, request_key
 
 
 class BaseClient(object):
     name = None
 
+    # {group: (capacity, period_seconds)} and {path_pattern: [(group, weight)]}, see `RateLimiter`
+    RATE_LIMITS = {}
+    RATE_LIMIT_RULES = {}
+    # {path_pattern: ttl}, see `ResponseCache`
+    CACHE_TTLS = {}
+
+    # connection pool shared with every other client in the process
+    session_registry: SessionRegistry = SESSIONS
+
     def __init__(self) -> None:
         self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(self.RATE_LIMITS, self.RATE_LIMIT_RULES) if self.RATE_LIMITS else None
+        )
+        self.retry_policy = RetryPolicy()
+        # Set by the adaptor to its parser's `check_response` so exchange error codes can be retried
+        self.response_checker: Optional[Callable[[dict], dict]] = None
+        # identical public GETs in flight at the same time share one round-trip
+        self.coalesce_requests = True
+        self.single_flight = SingleFlight()
+        self.response_cache = ResponseCache(self.CACHE_TTLS)
 
     def _get_session(self) -> aiohttp.ClientSession:
-        if self._session is None or self._session.closed:
-            connector = aiohttp.TCPConnector(
-                limit=100,
-                ttl_dns_cache=300,
-                use_dns_cache=True,
-                keepalive_timeout=60,
-            )
-            self._session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = self.session_registry.acquire()
+            self._session_loop = loop
         return self._session
 
-    async def _request(self, method: str, url: str, **kwargs):
-        if "auth_data" in kwargs:
-            # Private endpoint request
-            auth_data = kwargs.pop("auth_data")
-
-            # Split into different exchange method
-            if self.name == "okx":
-                auth = OkxAuth(**auth_data)
-                headers = auth.get_private_header(method, url, kwargs.get("params", {}))
-                kwargs["headers"] = headers
-                if method == "POST":
-                    kwargs["data"] = auth.body
-                    del kwargs["params"]
-            elif self.name == "binance":
-                auth = BinanceAuth(**auth_data)
-                headers = auth.get_private_header()
-                kwargs["params"] = auth.update_params(kwargs.get("params", {}))
-                kwargs["headers"] = headers
+    async def _request(self, method: str, url: str, retry_policy: Optional[RetryPolicy] = None, **kwargs):
+        # only unsigned GETs whose response depends on nothing but url and params are cached and coalesced
+        if method != "GET" or not kwargs.keys() <= {"params"}:
+            return await self._request_with_retry(method, url, retry_policy, **kwargs)
 
-        session = self._get_session()
-        if method == "GET":
-            async with session.get(url, **kwargs) as response:
-                return await self._handle_response(response)
-        elif method == "POST":
-            async with session.post(url, **kwargs) as response:
-                return await self._handle_response(response)
+        key = request_key(url, kwargs.get("params"))
+        ttl = self.response_cache.ttl_for(url, kwargs.get("params"))
+        if ttl and not cache_bypassed():
+            payload = self.response_cache.get(key)
+            if payload is not MISSING:
+                return payload
+
+        if self.coalesce_requests:
+            payload = await self.single_flight.do(
+                key, lambda: self._request_with_retry(method, url, retry_policy, **kwargs)
+            )
         else:
+            payload = await self._request_with_retry(method, url, retry_policy, **kwargs)
+
+        if ttl and self._is_success(payload):
+            self.response_cache.set(key, payload, ttl)
+        return payload
+
+    async def _request_with_retry(self, method: str, url: str, retry_policy: Optional[RetryPolicy] = None, **kwargs):
+        policy = retry_policy or self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            payload = None
+            try:
+                payload = await self._send(method, url, **kwargs)
+                self._check_payload(payload)
+                return payload
+            except ExchangeError as e:
+                if not policy.should_retry(method, attempt, e):
+                    # fatal codes are left to the parser, which raises the same error for the caller
+                    return payload
+                delay = policy.get_delay(attempt)
+            except (HTTPError,) + TRANSIENT_ERRORS as e:
+                if not policy.should_retry(method, attempt, e):
+                    raise
+                delay = policy.get_delay(attempt, getattr(e, "retry_after", None))
+            await asyncio.sleep(delay)
+
+    def _is_success(self, payload) -> bool:
+        if self.response_checker is None:
+            return True
+        try:
+            self.response_checker(payload)
+        except Exception:
+            return False
+        return True
+
+    def _check_payload(self, payload) -> None:
+        if self.response_checker is None:
+            return
+        try:
+            self.response_checker(payload)
+        except ExchangeError:
+            raise
+        except Exception:
+            # payloads the checker can't read are left to the parser, only exchange errors drive retries
+            pass
+
+    async def _send(self, method: str, url: str, **kwargs):
+        if method not in ("GET", "POST", "PUT"):
             raise ValueError(f"Invalid method: {method}")
 
+        # Private endpoint request
+        auth_data = kwargs.pop("auth_data", None)
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(url, kwargs.get("params"))
+
+        session = self._get_session()
+        async with self.session_registry.host_slot(url):
+            if auth_data is not None:
+                # signed once the limiter and host slot let the request go, so waiting on them cannot age its
+                # timestamp past the exchange's tolerance (Binance `recvWindow`, OKX 30s)
+                kwargs = self._sign(method, url, auth_data, kwargs)
+            async with session.request(method, url, **kwargs) as response:
+                return await self._handle_response(response)
+
+    def _sign(self, method: str, url: str, auth_data: dict, kwargs: dict) -> dict:
+        # Split into different exchange method
+        if self.name == "okx":
+            auth = OkxAuth(**auth_data)
+            headers = auth.get_private_header(method, url, kwargs.get("params", {}))
+            kwargs["headers"] = headers
+            if method == "POST":
+                kwargs["data"] = auth.body
+                del kwargs["params"]
+        elif self.name == "binance":
+            auth = BinanceAuth(**auth_data)
+            headers = auth.get_private_header()
+            # sign a copy so a retried request is signed again from the original params
+            kwargs["params"] = auth.update_params(dict(kwargs.get("params", {})))
+            kwargs["headers"] = headers
+        return kwargs
+
+    def _parse_rate_limit_headers(self, headers) -> Optional[RateLimitStatus]:
+        # Exchanges that report their remaining quota in response headers override this
+        return None
+
     async def _handle_response(self, response: aiohttp.ClientResponse):
+        if self.rate_limiter is not None:
+            status = self._parse_rate_limit_headers(response.headers)
+            if status is not None:
+                self.rate_limiter.observe(str(response.url), status)
+
         if response.status == 200:
             try:
                 return await response.json()
@@ -62,7 +163,11 @@ class BaseClient(object):
                 print(e)
                 return json.loads(await response.text())
         else:
-            raise Exception(f"Error {response.status} {response.reason} {await response.text()}")
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if response.status == 429 and retry_after is not None and self.rate_limiter is not None:
+                # hold back every request of the same group, not only the one being retried
+                self.rate_limiter.observe(str(response.url), RateLimitStatus(remaining=0, reset_after=retry_after))
+            raise HTTPError(response.status, response.reason, await response.text(), retry_after=retry_after)
 
     async def _get(self, url: str, **kwargs):
         return await self._request("GET", url, **kwargs)
@@ -70,6 +175,16 @@ class BaseClient(object):
     async def _post(self, url: str, **kwargs):
         return await self._request("POST", url, **kwargs)
 
+    async def _put(self, url: str, **kwargs):
+        return await self._request("PUT", url, **kwargs)
+
     async def close(self):
-        if self._session is not None and not self._session.closed:
-            await self._session.close()
+        if self._session is not None:
+            session, self._session, self._session_loop = self._session, None, None
+            await self.session_registry.release(session)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -1,10 +1,57 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional
+
+from ..errors import ExchangeError
 from .base import BaseClient
+from .cache import (
+    CLOSED_HISTORY_TTL,
+    FUNDING_TTL,
+    INSTRUMENTS_TTL,
+    TICKER_TTL,
+    ttl_if_closed,
+)
+from .rate_limit import RateLimitStatus, header_value, weight_by_limit, weight_by_param
+from .websocket import WebSocketClient
+
+# Kline weight on the futures APIs grows with `limit`
+_FUTURES_KLINES_WEIGHT = weight_by_limit([(99, 1), (499, 2), (1000, 5), (1500, 10)], default=2)
+# Depth weight on the futures APIs grows with `limit`
+_FUTURES_DEPTH_WEIGHT = weight_by_limit([(50, 2), (100, 5), (500, 10), (1000, 20)], default=2)
+
+
+def _parse_used_weight(headers, capacity: float) -> Optional[RateLimitStatus]:
+    # Binance reports the IP weight spent in the current calendar minute
+    used = header_value(headers, "X-MBX-USED-WEIGHT-1M")
+    if used is None:
+        return None
+    return RateLimitStatus(remaining=capacity - used, limit=capacity, reset_after=60 - time.time() % 60, group="weight")
 
 
 class BinanceSpot(BaseClient):
     BASE_ENDPOINT = "https://api{}.binance.com"
     name = "binance"
 
+    RATE_LIMITS = {"weight": (6000, 60), "sapi": (12000, 60)}
+    RATE_LIMIT_RULES = {
+        "/api/v3/exchangeInfo": [("weight", 20)],
+        "/api/v3/ticker/24hr": [("weight", weight_by_param("symbol", 2, 80))],
+        "/api/v3/klines": [("weight", 2)],
+        "/api/v3/depth": [("weight", weight_by_limit([(100, 5), (500, 25), (1000, 50), (5000, 250)], default=5))],
+        "/api/v3/trades": [("weight", 25)],
+        "/api/v3/account": [("weight", 20)],
+        "/sapi/v1/margin/priceIndex": [("sapi", 10)],
+        "/sapi/v1/margin/account": [("sapi", 10)],
+        "/sapi/v1/margin/order": [("sapi", 6)],
+        "/api/v3/userDataStream": [("weight", 2)],
+        "/sapi/v1/userDataStream": [("sapi", 1)],
+        "/api/*": [("weight", 1)],
+    }
+    CACHE_TTLS = {
+        "/api/v3/exchangeInfo": INSTRUMENTS_TTL,
+        "/api/v3/ticker/24hr": TICKER_TTL,
+    }
+
     def __init__(self, api_key: str, api_secret: str, api_version: int = 3):
         super().__init__()
         self.base_endpoint = self.BASE_ENDPOINT.format(api_version)
@@ -14,6 +61,9 @@ class BinanceSpot(BaseClient):
             "api_secret": api_secret,
         }
 
+    def _parse_rate_limit_headers(self, headers):
+        return _parse_used_weight(headers, self.RATE_LIMITS["weight"][0])
+
     async def _get_exchange_info(self):
         return await self._get(self.base_endpoint + "/api/v3/exchangeInfo")
 
@@ -88,14 +138,58 @@ class BinanceSpot(BaseClient):
 
         return await self._post(self.base_endpoint + "/sapi/v1/margin/order", params=params, auth_data=self.auth_data)
 
+    def _user_data_stream_path(self, margin: bool) -> str:
+        return "/sapi/v1/userDataStream" if margin else "/api/v3/userDataStream"
+
+    async def _create_listen_key(self, margin: bool = False):
+        # listen keys only take the API key, unsigned
+        return await self._post(
+            self.base_endpoint + self._user_data_stream_path(margin),
+            headers={"X-MBX-APIKEY": self.auth_data["api_key"]},
+        )
+
+    async def _keep_alive_listen_key(self, listen_key: str, margin: bool = False):
+        return await self._put(
+            self.base_endpoint + self._user_data_stream_path(margin),
+            params={"listenKey": listen_key},
+            headers={"X-MBX-APIKEY": self.auth_data["api_key"]},
+        )
+
 
 class BinanceLinear(BaseClient):
     BASE_ENDPOINT = "https://fapi.binance.com"
 
-    def __init__(self) -> None:
+    RATE_LIMITS = {"weight": (2400, 60), "funding_rate": (500, 300), "open_interest_hist": (1000, 300)}
+    RATE_LIMIT_RULES = {
+        "/fapi/v1/exchangeInfo": [("weight", 1)],
+        "/fapi/v1/ticker/24hr": [("weight", weight_by_param("symbol", 1, 40))],
+        "/fapi/v1/klines": [("weight", _FUTURES_KLINES_WEIGHT)],
+        "/fapi/v1/fundingRate": [("funding_rate", 1)],
+        "/fapi/v1/premiumIndex": [("weight", weight_by_param("symbol", 1, 10))],
+        "/fapi/v1/openInterest": [("weight", 1)],
+        "/fapi/v1/openInterestHist": [("open_interest_hist", 1)],
+        "/fapi/v1/depth": [("weight", _FUTURES_DEPTH_WEIGHT)],
+        "/fapi/*": [("weight", 1)],
+    }
+    CACHE_TTLS = {
+        "/fapi/v1/exchangeInfo": INSTRUMENTS_TTL,
+        "/fapi/v1/ticker/24hr": TICKER_TTL,
+        "/fapi/v1/premiumIndex": TICKER_TTL,
+        "/fapi/v1/fundingRate": ttl_if_closed("endTime", CLOSED_HISTORY_TTL, FUNDING_TTL),
+    }
+
+    def __init__(self, api_key: str = None, api_secret: str = None) -> None:
         super().__init__()
         self.linear_base_endpoint = self.BASE_ENDPOINT
 
+        self.auth_data = {
+            "api_key": api_key,
+            "api_secret": api_secret,
+        }
+
+    def _parse_rate_limit_headers(self, headers):
+        return _parse_used_weight(headers, self.RATE_LIMITS["weight"][0])
+
     async def _get_exchange_info(self):
         return await self._get(self.linear_base_endpoint + "/fapi/v1/exchangeInfo")
 
@@ -158,14 +252,47 @@ class BinanceLinear(BaseClient):
         params = {"symbol": symbol, "limit": limit}
         return await self._get(self.linear_base_endpoint + "/fapi/v1/depth", params=params)
 
+    async def _create_listen_key(self):
+        return await self._post(
+            self.linear_base_endpoint + "/fapi/v1/listenKey", headers={"X-MBX-APIKEY": self.auth_data["api_key"]}
+        )
+
+    async def _keep_alive_listen_key(self, listen_key: str):
+        # one listen key per API key, extended whatever key is passed
+        return await self._put(
+            self.linear_base_endpoint + "/fapi/v1/listenKey", headers={"X-MBX-APIKEY": self.auth_data["api_key"]}
+        )
+
 
 class BinanceInverse(BaseClient):
     BASE_ENDPOINT = "https://dapi.binance.com"
 
+    RATE_LIMITS = {"weight": (2400, 60), "open_interest_hist": (1000, 300)}
+    RATE_LIMIT_RULES = {
+        "/dapi/v1/exchangeInfo": [("weight", 1)],
+        "/dapi/v1/ticker/24hr": [("weight", weight_by_param("symbol", 1, 40))],
+        "/dapi/v1/klines": [("weight", _FUTURES_KLINES_WEIGHT)],
+        "/dapi/v1/fundingRate": [("weight", 1)],
+        "/dapi/v1/premiumIndex": [("weight", 10)],
+        "/dapi/v1/openInterest": [("weight", 1)],
+        "/dapi/v1/openInterestHist": [("open_interest_hist", 1)],
+        "/dapi/v1/depth": [("weight", _FUTURES_DEPTH_WEIGHT)],
+        "/dapi/*": [("weight", 1)],
+    }
+    CACHE_TTLS = {
+        "/dapi/v1/exchangeInfo": INSTRUMENTS_TTL,
+        "/dapi/v1/ticker/24hr": TICKER_TTL,
+        "/dapi/v1/premiumIndex": TICKER_TTL,
+        "/dapi/v1/fundingRate": ttl_if_closed("endTime", CLOSED_HISTORY_TTL, FUNDING_TTL),
+    }
+
     def __init__(self) -> None:
         super().__init__()
         self.inverse_base_endpoint = self.BASE_ENDPOINT
 
+    def _parse_rate_limit_headers(self, headers):
+        return _parse_used_weight(headers, self.RATE_LIMITS["weight"][0])
+
     async def _get_exchange_info(self):
         return await self._get(self.inverse_base_endpoint + "/dapi/v1/exchangeInfo")
 
@@ -235,3 +362,78 @@ class BinanceInverse(BaseClient):
     async def _get_order_book(self, symbol: str, limit: int = 1000):
         params = {"symbol": symbol, "limit": limit}
         return await self._get(self.inverse_base_endpoint + "/dapi/v1/depth", params=params)
+
+
+class BinanceWebSocket(WebSocketClient):
+    name = "binance"
+    URLS = {
+        "spot": "wss://stream.binance.com:9443/ws",
+        "linear": "wss://fstream.binance.com/ws",
+        "inverse": "wss://dstream.binance.com/ws",
+    }
+
+    # Binance pings every few minutes itself and accepts 5 incoming messages per second
+    SUBSCRIBE_BATCH = 200
+    # futures connections take 200 streams, spot ones 1024
+    MAX_TOPICS = 200
+
+    def _subscribe_messages(self, topics: list) -> list:
+        return [
+            {"method": "SUBSCRIBE", "params": batch, "id": request_id}
+            for request_id, batch in enumerate(self._batches(topics), start=1)
+        ]
+
+    def _is_data(self, message) -> bool:
+        if "error" in message:
+            raise ExchangeError(message["error"].get("msg"), code=message["error"].get("code"))
+        return "e" in message
+
+
+class BinanceUserDataWebSocket(BinanceWebSocket):
+    """
+    User data stream of one market, the account's order and balance events. The connection URL names a listen key,
+    created for every connection and kept alive while it lasts.
+    """
+
+    # listen keys expire 60 minutes after they were created or last kept alive
+    PING_INTERVAL = 30 * 60.0
+
+    def __init__(
+        self,
+        url: str,
+        create_listen_key: Callable[[], Awaitable[dict]],
+        keep_alive: Callable[[str], Awaitable[dict]],
+        **kwargs,
+    ):
+        """
+        :param create_listen_key: REST request creating a listen key, see `BinanceSpot._create_listen_key`
+        :param keep_alive: REST request extending the listen key passed
+        """
+        super().__init__(url, (), **kwargs)
+        self.create_listen_key = create_listen_key
+        self.keep_alive = keep_alive
+        self.listen_key: Optional[str] = None
+
+    async def _connect_url(self) -> str:
+        self.listen_key = (await self.create_listen_key())["listenKey"]
+        return f"{self.url}/{self.listen_key}"
+
+    def _subscribe_messages(self, topics: list) -> list:
+        # everything of the account is pushed without subscribing
+        return []
+
+    async def _ping(self) -> None:
+        while True:
+            await asyncio.sleep(self.PING_INTERVAL)
+            try:
+                await self.keep_alive(self.listen_key)
+            except Exception:
+                # a key that can't be extended expires, the next connection creates a new one
+                self.reconnect()
+                return
+
+    def _is_data(self, message) -> bool:
+        if message.get("e") == "listenKeyExpired":
+            self.reconnect()
+            return False
+        return super()._is_data(message)
@@ -1,9 +1,55 @@
+from ..errors import ExchangeError
 from .base import BaseClient
+from .cache import FUNDING_TTL, INSTRUMENTS_TTL, TICKER_TTL
+from .websocket import WebSocketClient
 
 
 class BitgetUnified(BaseClient):
     BASE_URL = "https://api.bitget.com"
 
+    # Bitget limits each public market endpoint to 20 requests per second per IP
+    RATE_LIMITS = {
+        "spot_symbols": (20, 1),
+        "spot_tickers": (20, 1),
+        "spot_candles": (20, 1),
+        "spot_orderbook": (20, 1),
+        "spot_merge_depth": (20, 1),
+        "mix_contracts": (20, 1),
+        "mix_tickers": (20, 1),
+        "mix_ticker": (20, 1),
+        "mix_candles": (20, 1),
+        "mix_symbol_price": (20, 1),
+        "mix_merge_depth": (20, 1),
+        "mix_current_fund_rate": (20, 1),
+        "mix_history_fund_rate": (20, 1),
+        "default": (20, 1),
+    }
+    RATE_LIMIT_RULES = {
+        "/api/v2/spot/public/symbols": [("spot_symbols", 1)],
+        "/api/v2/spot/market/tickers": [("spot_tickers", 1)],
+        "/api/v2/spot/market/candles": [("spot_candles", 1)],
+        "/api/v2/spot/market/orderbook": [("spot_orderbook", 1)],
+        "/api/v2/spot/market/merge-depth": [("spot_merge_depth", 1)],
+        "/api/v2/mix/market/contracts": [("mix_contracts", 1)],
+        "/api/v2/mix/market/tickers": [("mix_tickers", 1)],
+        "/api/v2/mix/market/ticker": [("mix_ticker", 1)],
+        "/api/v2/mix/market/candles": [("mix_candles", 1)],
+        "/api/v2/mix/market/symbol-price": [("mix_symbol_price", 1)],
+        "/api/v2/mix/market/merge-depth": [("mix_merge_depth", 1)],
+        "/api/v2/mix/market/current-fund-rate": [("mix_current_fund_rate", 1)],
+        "/api/v2/mix/market/history-fund-rate": [("mix_history_fund_rate", 1)],
+    }
+    CACHE_TTLS = {
+        "/api/v2/spot/public/symbols": INSTRUMENTS_TTL,
+        "/api/v2/mix/market/contracts": INSTRUMENTS_TTL,
+        "/api/v2/spot/market/tickers": TICKER_TTL,
+        "/api/v2/mix/market/tickers": TICKER_TTL,
+        "/api/v2/mix/market/ticker": TICKER_TTL,
+        "/api/v2/mix/market/symbol-price": TICKER_TTL,
+        "/api/v2/mix/market/current-fund-rate": TICKER_TTL,
+        "/api/v2/mix/market/history-fund-rate": FUNDING_TTL,
+    }
+
     def __init__(self) -> None:
         super().__init__()
         self.base_endpoint = self.BASE_URL
@@ -93,3 +139,22 @@ class BitgetUnified(BaseClient):
             if v
         }
         return await self._get(self.base_endpoint + "/api/v2/mix/market/history-fund-rate", params=params)
+
+
+class BitgetWebSocket(WebSocketClient):
+    name = "bitget"
+    URLS = {"public": "wss://ws.bitget.com/v2/ws/public"}
+
+    # Bitget drops connections without a ping for 2 minutes
+    PING_INTERVAL = 30.0
+
+    def _subscribe_messages(self, topics: list) -> list:
+        return [{"op": "subscribe", "args": batch} for batch in self._batches(topics)]
+
+    def _ping_message(self):
+        return "ping"
+
+    def _is_data(self, message) -> bool:
+        if message.get("event") == "error":
+            raise ExchangeError(message.get("msg"), code=message.get("code"))
+        return "data" in message
@@ -1,14 +1,49 @@
+from ..errors import ExchangeError
 from .base import BaseClient
+from .cache import (
+    CLOSED_HISTORY_TTL,
+    FUNDING_TTL,
+    INSTRUMENTS_TTL,
+    TICKER_TTL,
+    ttl_if_closed,
+)
+from .rate_limit import (
+    ENDPOINT_GROUP,
+    RateLimitStatus,
+    header_value,
+    reset_after_from_timestamp,
+)
+from .websocket import WebSocketClient
 
 
 class BybitUnified(BaseClient):
     name = "bybit"
     BASE_ENDPOINT = "https://api.bybit.com"
 
+    # Bybit caps every IP at 600 requests per 5 seconds across all endpoints
+    RATE_LIMITS = {"default": (600, 5)}
+    CACHE_TTLS = {
+        "/v5/market/instruments-info": INSTRUMENTS_TTL,
+        "/v5/market/tickers": TICKER_TTL,
+        "/v5/market/funding/history": ttl_if_closed("endTime", CLOSED_HISTORY_TTL, FUNDING_TTL),
+    }
+
     def __init__(self):
         super().__init__()
         self.base_endpoint = self.BASE_ENDPOINT
 
+    def _parse_rate_limit_headers(self, headers):
+        # the headers report the per-second limit of the requested endpoint, not the IP limit of "default"
+        remaining = header_value(headers, "X-Bapi-Limit-Status")
+        if remaining is None:
+            return None
+        return RateLimitStatus(
+            remaining=remaining,
+            limit=header_value(headers, "X-Bapi-Limit"),
+            reset_after=reset_after_from_timestamp(header_value(headers, "X-Bapi-Limit-Reset-Timestamp")),
+            group=ENDPOINT_GROUP,
+        )
+
     async def _get_exchange_info(self, category: str) -> dict:
         return await self._get(self.base_endpoint + "/v5/market/instruments-info", params={"category": category})
 
@@ -45,8 +80,8 @@ class BybitUnified(BaseClient):
             for k, v in {
                 "category": category,
                 "symbol": symbol,
-                "start_time": startTime,
-                "end_time": endTime,
+                "startTime": startTime,
+                "endTime": endTime,
                 "limit": limit,
             }.items()
             if v is not None
@@ -63,8 +98,8 @@ class BybitUnified(BaseClient):
                 "category": category,
                 "symbol": symbol,
                 "intervalTime": interval,
-                "start_time": startTime,
-                "end_time": endTime,
+                "startTime": startTime,
+                "endTime": endTime,
                 "limit": limit,
             }.items()
             if v
@@ -84,3 +119,27 @@ class BybitUnified(BaseClient):
         }
 
         return await self._get(self.base_endpoint + "/v5/market/orderbook", params=params)
+
+
+class BybitWebSocket(WebSocketClient):
+    name = "bybit"
+    URLS = {
+        "spot": "wss://stream.bybit.com/v5/public/spot",
+        "linear": "wss://stream.bybit.com/v5/public/linear",
+        "inverse": "wss://stream.bybit.com/v5/public/inverse",
+    }
+
+    # Bybit recommends a ping every 20 seconds and takes at most 10 topics per spot request
+    PING_INTERVAL = 20.0
+    SUBSCRIBE_BATCH = 10
+
+    def _subscribe_messages(self, topics: list) -> list:
+        return [{"op": "subscribe", "args": batch} for batch in self._batches(topics)]
+
+    def _ping_message(self):
+        return {"op": "ping"}
+
+    def _is_data(self, message) -> bool:
+        if message.get("op") == "subscribe" and not message.get("success"):
+            raise ExchangeError(message.get("ret_msg"))
+        return "topic" in message
@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fnmatch import fnmatchcase
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+from urllib.parse import urlsplit
+
+# seconds, or a callable receiving the request params and returning seconds (`None` / 0 disables caching)
+TTL = Union[int, float, Callable[[dict], Optional[float]]]
+
+MISSING = object()
+
+# default ttls in seconds used by the exchange clients
+INSTRUMENTS_TTL = 600
+TICKER_TTL = 1
+FUNDING_TTL = 60
+CLOSED_HISTORY_TTL = 24 * 60 * 60
+
+_bypass_cache: ContextVar[bool] = ContextVar("cex_adaptors_bypass_cache", default=False)
+
+
+@contextmanager
+def no_cache():
+    """
+    Skip cached responses for every request made inside the block, e.g.
+
+        with no_cache():
+            info = await okx.get_exchange_info()
+
+    Fresh responses are still stored, so the block also refreshes the cache.
+    """
+    token = _bypass_cache.set(True)
+    try:
+        yield
+    finally:
+        _bypass_cache.reset(token)
+
+
+def cache_bypassed() -> bool:
+    return _bypass_cache.get()
+
+
+def ttl_if_closed(end_key: str, closed_ttl: float, open_ttl: float) -> Callable[[dict], float]:
+    """
+    Build a ttl for history endpoints: a window ending in the past can't change anymore
+    :param end_key: params key holding the window end timestamp (seconds or milliseconds)
+    :param closed_ttl: ttl when the window end is in the past
+    :param open_ttl: ttl when the window is open ended or reaches the present
+    :return: callable mapping request params to a ttl
+    """
+
+    def ttl(params: dict) -> float:
+        end = params.get(end_key)
+        if end is None:
+            return open_ttl
+        end = float(end)
+        if end > 1e12:
+            end /= 1000
+        return closed_ttl if end < time.time() else open_ttl
+
+    return ttl
+
+
+class ResponseCache(object):
+    """
+    In-memory TTL cache of decoded responses bounded to `maxsize` entries with LRU eviction.
+
+    `ttls` maps a URL path pattern (fnmatch style, as in `RateLimiter` rules) to a `TTL`;
+    paths without a matching pattern are not cached.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, TTL]] = None, maxsize: int = 1024):
+        self.ttls = ttls or {}
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._resolved: Dict[str, Optional[TTL]] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def ttl_for(self, url: str, params: Optional[dict] = None) -> Optional[float]:
+        path = urlsplit(url).path
+        if path not in self._resolved:
+            self._resolved[path] = next((t for pattern, t in self.ttls.items() if fnmatchcase(path, pattern)), None)
+        ttl = self._resolved[path]
+        return ttl(params or {}) if callable(ttl) else ttl
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return MISSING
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,13 +1,47 @@
+import time
+
+from ..errors import ExchangeError
 from .base import BaseClient
+from .cache import FUNDING_TTL, INSTRUMENTS_TTL, TICKER_TTL
+from .rate_limit import RateLimitStatus, header_value, reset_after_from_timestamp
+from .websocket import WebSocketClient
 
 
 class GateioUnified(BaseClient):
     BASE_URL = "https://api.gateio.ws/api/v4"
 
+    # Gate.io public endpoints allow 200 requests per 10 seconds for each market
+    RATE_LIMITS = {"spot": (200, 10), "futures": (200, 10), "delivery": (200, 10)}
+    RATE_LIMIT_RULES = {
+        "/api/v4/spot/*": [("spot", 1)],
+        "/api/v4/futures/*": [("futures", 1)],
+        "/api/v4/delivery/*": [("delivery", 1)],
+    }
+    CACHE_TTLS = {
+        "/api/v4/spot/currency_pairs": INSTRUMENTS_TTL,
+        "/api/v4/futures/*/contracts": INSTRUMENTS_TTL,
+        "/api/v4/delivery/*/contracts": INSTRUMENTS_TTL,
+        "/api/v4/spot/tickers": TICKER_TTL,
+        "/api/v4/futures/*/tickers": TICKER_TTL,
+        "/api/v4/delivery/*/tickers": TICKER_TTL,
+        "/api/v4/futures/*/premium_index": TICKER_TTL,
+        "/api/v4/futures/*/funding_rate": FUNDING_TTL,
+    }
+
     def __init__(self) -> None:
         super().__init__()
         self.base_url = self.BASE_URL
 
+    def _parse_rate_limit_headers(self, headers):
+        remaining = header_value(headers, "X-Gate-RateLimit-Requests-Remain")
+        if remaining is None:
+            return None
+        return RateLimitStatus(
+            remaining=remaining,
+            limit=header_value(headers, "X-Gate-RateLimit-Limit"),
+            reset_after=reset_after_from_timestamp(header_value(headers, "X-Gate-RateLimit-Reset-Timestamp")),
+        )
+
     async def _get_currency_pairs(self):
         return await self._get(self.base_url + "/spot/currency_pairs")
 
@@ -68,8 +102,10 @@ class GateioUnified(BaseClient):
 
         return await self._get(self.base_url + f"/delivery/{settle}/candlesticks", params=params)
 
-    async def _get_futures_funding_rate_history(self, settle: str, contract: str, limit: int = None):
-        params = {k: v for k, v in {"contract": contract, "limit": limit}.items() if v}
+    async def _get_futures_funding_rate_history(
+        self, settle: str, contract: str, limit: int = None, _from: int = None, to: int = None
+    ):
+        params = {k: v for k, v in {"contract": contract, "limit": limit, "from": _from, "to": to}.items() if v}
         return await self._get(self.base_url + f"/futures/{settle}/funding_rate", params=params)
 
     async def _get_perp_premium_index_kline(
@@ -91,3 +127,41 @@ class GateioUnified(BaseClient):
             if v
         }
         return await self._get(self.base_url + f"/futures/{settle}/premium_index", params=params)
+
+
+class GateioWebSocket(WebSocketClient):
+    name = "gateio"
+    URLS = {
+        "spot": "wss://api.gateio.ws/ws/v4/",
+        "perp": "wss://fx-ws.gateio.ws/v4/ws/{settle}",
+        "futures": "wss://fx-ws.gateio.ws/v4/ws/delivery/{settle}",
+    }
+
+    PING_INTERVAL = 20.0
+    SUBSCRIBE_BATCH = 100
+
+    def _subscribe_messages(self, topics: list) -> list:
+        # topics are `[channel, payload]` pairs, one request per channel for symbols; full payloads, such as the
+        # `[interval, symbol]` of candlesticks, take a request each
+        channels = {}
+        requests = []
+        for channel, payload in topics:
+            if isinstance(payload, list):
+                requests.append((channel, payload))
+            else:
+                channels.setdefault(channel, []).append(payload)
+        requests.extend((channel, batch) for channel, payloads in channels.items() for batch in self._batches(payloads))
+        return [
+            {"time": int(time.time()), "channel": channel, "event": "subscribe", "payload": payload}
+            for channel, payload in requests
+        ]
+
+    def _ping_message(self):
+        # "spot.ping" on the spot endpoint, "futures.ping" on the futures ones
+        market = self.topics[0][0].split(".")[0] if self.topics else "spot"
+        return {"time": int(time.time()), "channel": f"{market}.ping"}
+
+    def _is_data(self, message) -> bool:
+        if message.get("error"):
+            raise ExchangeError(message["error"].get("message"), code=message["error"].get("code"))
+        return message.get("event") == "update"
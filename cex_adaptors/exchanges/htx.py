@@ -1,9 +1,28 @@
+import gzip
+import json
+
+import aiohttp
+
+from ..errors import ExchangeError
 from .base import BaseClient
+from .cache import FUNDING_TTL, INSTRUMENTS_TTL, TICKER_TTL
+from .websocket import WebSocketClient
 
 
 class HtxSpot(BaseClient):
     BASE_URL = "https://api.huobi.pro"
 
+    # HTX allows 100 requests per 10 seconds per IP for reference data and 800 per second for market data
+    RATE_LIMITS = {"reference": (100, 10), "market": (800, 1)}
+    RATE_LIMIT_RULES = {
+        "/market/*": [("market", 1)],
+        "/v*/settings/*": [("reference", 1)],
+    }
+    CACHE_TTLS = {
+        "/v2/settings/common/symbols": INSTRUMENTS_TTL,
+        "/market/tickers": TICKER_TTL,
+    }
+
     def __init__(self):
         super().__init__()
         self.base_endpoint = self.BASE_URL
@@ -23,6 +42,20 @@ class HtxSpot(BaseClient):
 class HtxFutures(BaseClient):
     BASE_URL = "https://api.hbdm.com"
 
+    # HTX derivatives allow 800 market-data requests per second and 240 other public requests per 3 seconds
+    RATE_LIMITS = {"public": (240, 3), "market": (800, 1)}
+    RATE_LIMIT_RULES = {
+        "*/market/*": [("market", 1)],
+        "/*": [("public", 1)],
+    }
+    CACHE_TTLS = {
+        "/*/swap_contract_info": INSTRUMENTS_TTL,
+        "/api/v1/contract_contract_info": INSTRUMENTS_TTL,
+        "/*/market/detail/batch_merged": TICKER_TTL,
+        "/*/swap_funding_rate": TICKER_TTL,
+        "/*/swap_historical_funding_rate": FUNDING_TTL,
+    }
+
     def __init__(self):
         super().__init__()
         self.base_endpoint = self.BASE_URL
@@ -137,3 +170,32 @@ class HtxFutures(BaseClient):
     async def _get_inverse_swap_kline_data_of_mark_price(self, contract_code: str, period: str, size: int):
         params = {"contract_code": contract_code, "period": period, "size": size}
         return await self._get(self.base_endpoint + "/index/market/history/swap_mark_price_kline", params=params)
+
+
+class HtxWebSocket(WebSocketClient):
+    name = "htx"
+    URLS = {
+        "spot": "wss://api.huobi.pro/ws",
+        "linear": "wss://api.hbdm.com/linear-swap-ws",
+        "inverse_perp": "wss://api.hbdm.com/swap-ws",
+        "inverse_futures": "wss://api.hbdm.com/ws",
+    }
+
+    def _subscribe_messages(self, topics: list) -> list:
+        return [{"sub": topic, "id": topic} for topic in topics]
+
+    def _decode(self, message):
+        # market data frames are gzip compressed
+        data = gzip.decompress(message.data) if message.type == aiohttp.WSMsgType.BINARY else message.data
+        return json.loads(data)
+
+    def _reply(self, message):
+        # HTX pings every 5 seconds and disconnects after 2 unanswered pings
+        if "ping" in message:
+            return {"pong": message["ping"]}
+        return None
+
+    def _is_data(self, message) -> bool:
+        if message.get("status") == "error":
+            raise ExchangeError(message.get("err-msg"), code=message.get("err-code"))
+        return "ch" in message and "tick" in message
@@ -1,13 +1,66 @@
+import time
+from typing import Awaitable, Callable, Iterable, Optional
+from uuid import uuid4
+
+from ..errors import ExchangeError
 from .base import BaseClient
+from .cache import (
+    CLOSED_HISTORY_TTL,
+    FUNDING_TTL,
+    INSTRUMENTS_TTL,
+    TICKER_TTL,
+    ttl_if_closed,
+)
+from .rate_limit import RateLimitStatus, header_value
+from .websocket import WebSocketClient
+
+
+def _parse_pool_headers(headers) -> Optional[RateLimitStatus]:
+    # KuCoin reports the resource pool quota; `gw-ratelimit-reset` is in milliseconds
+    remaining = header_value(headers, "gw-ratelimit-remaining")
+    if remaining is None:
+        return None
+    reset = header_value(headers, "gw-ratelimit-reset")
+    return RateLimitStatus(
+        remaining=remaining,
+        limit=header_value(headers, "gw-ratelimit-limit"),
+        reset_after=reset / 1000 if reset is not None else None,
+        group="public",
+    )
 
 
 class KucoinSpot(BaseClient):
     BASE_ENDPOINT = "https://api.kucoin.com"
 
+    # KuCoin public resource pool for spot, weights as published per endpoint
+    RATE_LIMITS = {"public": (2000, 30)}
+    RATE_LIMIT_RULES = {
+        "/api/v3/currencies": [("public", 3)],
+        "/api/v2/symbols": [("public", 4)],
+        "/api/v1/market/allTickers": [("public", 15)],
+        "/api/v1/market/stats": [("public", 15)],
+        "/api/v1/market/candles": [("public", 3)],
+        "/api/v1/mark-price/*/current": [("public", 2)],
+        "/api/v1/market/orderbook/level2_20": [("public", 2)],
+        "/api/v1/market/orderbook/level2_100": [("public", 4)],
+        "/api/v3/market/orderbook/level2": [("public", 3)],
+        "/api/*": [("public", 1)],
+    }
+    CACHE_TTLS = {
+        "/api/v3/currencies": INSTRUMENTS_TTL,
+        "/api/v2/symbols": INSTRUMENTS_TTL,
+        "/api/v1/market/allTickers": TICKER_TTL,
+        "/api/v1/market/stats": TICKER_TTL,
+        "/api/v1/mark-price/*/current": TICKER_TTL,
+    }
+
     def __init__(self) -> None:
         super().__init__()
         self.spot_base_endpoint = self.BASE_ENDPOINT
 
+    def _parse_rate_limit_headers(self, headers):
+        return _parse_pool_headers(headers)
+
     async def _get_currency_list(self):
         return await self._get(self.spot_base_endpoint + "/api/v3/currencies")
 
@@ -50,14 +103,44 @@ class KucoinSpot(BaseClient):
     async def _get_full_orderbook(self, symbol: str):
         return await self._get(self.spot_base_endpoint + f"/api/v3/market/orderbook/level2", params={"symbol": symbol})
 
+    async def _get_public_ws_token(self):
+        return await self._post(self.spot_base_endpoint + "/api/v1/bullet-public")
+
 
 class KucoinFutures(BaseClient):
     BASE_ENDPOINT = "https://api-futures.kucoin.com"
 
+    # KuCoin public resource pool for futures, weights as published per endpoint
+    RATE_LIMITS = {"public": (2000, 30)}
+    RATE_LIMIT_RULES = {
+        "/api/v1/contracts/active": [("public", 3)],
+        "/api/v1/contracts/*": [("public", 3)],
+        "/api/v1/ticker": [("public", 2)],
+        "/api/v1/kline/query": [("public", 3)],
+        "/api/v1/mark-price/*/current": [("public", 3)],
+        "/api/v1/level2/depth*": [("public", 5)],
+        "/api/v1/level2/snapshot": [("public", 3)],
+        "/api/v1/funding-rate/*/current": [("public", 2)],
+        "/api/v1/contract/funding-rates": [("public", 5)],
+        "/api/*": [("public", 1)],
+    }
+    CACHE_TTLS = {
+        "/api/v1/contracts/active": INSTRUMENTS_TTL,
+        # the detail of one contract carries its latest prices, behind the futures tickers
+        "/api/v1/contracts/*": TICKER_TTL,
+        "/api/v1/ticker": TICKER_TTL,
+        "/api/v1/mark-price/*/current": TICKER_TTL,
+        "/api/v1/funding-rate/*/current": TICKER_TTL,
+        "/api/v1/contract/funding-rates": ttl_if_closed("to", CLOSED_HISTORY_TTL, FUNDING_TTL),
+    }
+
     def __init__(self) -> None:
         super().__init__()
         self.futures_base_endpoint = self.BASE_ENDPOINT
 
+    def _parse_rate_limit_headers(self, headers):
+        return _parse_pool_headers(headers)
+
     async def _get_symbol_list(self):
         return await self._get(self.futures_base_endpoint + "/api/v1/contracts/active")
 
@@ -127,3 +210,49 @@ class KucoinFutures(BaseClient):
             if v is not None
         }
         return await self._get(self.futures_base_endpoint + "/api/v1/funding-history", params=params)
+
+    async def _get_public_ws_token(self):
+        return await self._post(self.futures_base_endpoint + "/api/v1/bullet-public")
+
+
+class KucoinWebSocket(WebSocketClient):
+    name = "kucoin"
+
+    # symbols per topic, e.g. "/market/snapshot:BTC-USDT,ETH-USDT"
+    SUBSCRIBE_BATCH = 100
+    # symbols one connection takes across its topics
+    MAX_TOPICS = 400
+
+    def __init__(self, token_fetcher: Callable[[], Awaitable[dict]], topics: Iterable = (), **kwargs):
+        """
+        :param token_fetcher: the bullet endpoint of the market, e.g. `KucoinSpot._get_public_ws_token`
+        :param topics: topics as "prefix:symbol", e.g. "/market/snapshot:BTC-USDT"
+        """
+        super().__init__(None, topics, **kwargs)
+        self.token_fetcher = token_fetcher
+
+    async def _connect_url(self) -> str:
+        # every connection takes a fresh token, which also names the server and its ping interval
+        data = (await self.token_fetcher())["data"]
+        server = data["instanceServers"][0]
+        self.PING_INTERVAL = server["pingInterval"] / 1000
+        return f"{server['endpoint']}?token={data['token']}&connectId={uuid4().hex}"
+
+    def _subscribe_messages(self, topics: list) -> list:
+        prefixes = {}
+        for topic in topics:
+            prefix, symbol = topic.split(":", 1)
+            prefixes.setdefault(prefix, []).append(symbol)
+        return [
+            {"id": uuid4().hex, "type": "subscribe", "topic": f"{prefix}:{','.join(batch)}", "response": True}
+            for prefix, symbols in prefixes.items()
+            for batch in self._batches(symbols)
+        ]
+
+    def _ping_message(self):
+        return {"id": str(int(time.time() * 1000)), "type": "ping"}
+
+    def _is_data(self, message) -> bool:
+        if message.get("type") == "error":
+            raise ExchangeError(message.get("data"), code=message.get("code"))
+        return message.get("type") == "message"
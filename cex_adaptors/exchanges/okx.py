@@ -1,10 +1,73 @@
+import aiohttp
+
+from ..errors import ExchangeError
+from .auth import OkxAuth
 from .base import BaseClient
+from .cache import (
+    CLOSED_HISTORY_TTL,
+    FUNDING_TTL,
+    INSTRUMENTS_TTL,
+    TICKER_TTL,
+    ttl_if_closed,
+)
+from .websocket import WebSocketClient
 
 
 class OkxUnified(BaseClient):
     name = "okx"
     BASE_ENDPOINT = "https://www.okx.com"
 
+    # OKX limits every endpoint separately (requests per 2 seconds per IP or per user id)
+    RATE_LIMITS = {
+        "default": (10, 2),
+        "instruments": (20, 2),
+        "tickers": (20, 2),
+        "ticker": (20, 2),
+        "candles": (40, 2),
+        "books": (40, 2),
+        "funding_rate": (20, 2),
+        "funding_rate_history": (10, 2),
+        "index_tickers": (20, 2),
+        "mark_price": (10, 2),
+        "open_interest": (20, 2),
+        "balance": (10, 2),
+        "positions": (10, 2),
+        "account_config": (5, 2),
+        "order": (60, 2),
+        "cancel_order": (60, 2),
+        "orders_pending": (60, 2),
+        "orders_history": (40, 2),
+    }
+    RATE_LIMIT_RULES = {
+        "/api/v5/public/instruments": [("instruments", 1)],
+        "/api/v5/market/tickers": [("tickers", 1)],
+        "/api/v5/market/ticker": [("ticker", 1)],
+        "/api/v5/market/candles": [("candles", 1)],
+        "/api/v5/market/books": [("books", 1)],
+        "/api/v5/public/funding-rate": [("funding_rate", 1)],
+        "/api/v5/public/funding-rate-history": [("funding_rate_history", 1)],
+        "/api/v5/market/index-tickers": [("index_tickers", 1)],
+        "/api/v5/public/mark-price": [("mark_price", 1)],
+        "/api/v5/public/open-interest": [("open_interest", 1)],
+        "/api/v5/account/balance": [("balance", 1)],
+        "/api/v5/account/positions": [("positions", 1)],
+        "/api/v5/account/config": [("account_config", 1)],
+        "/api/v5/trade/order": [("order", 1)],
+        "/api/v5/trade/cancel-order": [("cancel_order", 1)],
+        "/api/v5/trade/orders-pending": [("orders_pending", 1)],
+        "/api/v5/trade/orders-history": [("orders_history", 1)],
+    }
+    CACHE_TTLS = {
+        "/api/v5/public/instruments": INSTRUMENTS_TTL,
+        "/api/v5/market/tickers": TICKER_TTL,
+        "/api/v5/market/ticker": TICKER_TTL,
+        "/api/v5/market/index-tickers": TICKER_TTL,
+        "/api/v5/public/mark-price": TICKER_TTL,
+        "/api/v5/public/funding-rate": TICKER_TTL,
+        # `after` returns records older than the timestamp
+        "/api/v5/public/funding-rate-history": ttl_if_closed("after", CLOSED_HISTORY_TTL, FUNDING_TTL),
+    }
+
     def __init__(
         self,
         api_key: str,
@@ -183,3 +246,54 @@ class OkxUnified(BaseClient):
         return await self._get(
             self.BASE_ENDPOINT + "/api/v5/trade/orders-history", auth_data=self.auth_data, params=params
         )
+
+
+class OkxWebSocket(WebSocketClient):
+    name = "okx"
+    # candles are pushed on the business endpoint only
+    URLS = {
+        "public": "wss://ws.okx.com:8443/ws/v5/public",
+        "business": "wss://ws.okx.com:8443/ws/v5/business",
+        "private": "wss://ws.okx.com:8443/ws/v5/private",
+        "private_demo": "wss://wspap.okx.com:8443/ws/v5/private",
+    }
+
+    # OKX drops connections idle for 30 seconds
+    PING_INTERVAL = 25.0
+
+    def _subscribe_messages(self, topics: list) -> list:
+        return [{"op": "subscribe", "args": batch} for batch in self._batches(topics)]
+
+    def _ping_message(self):
+        return "ping"
+
+    def _is_data(self, message) -> bool:
+        if message.get("event") == "error":
+            raise ExchangeError(message.get("msg"), code=message.get("code"))
+        return "data" in message
+
+
+class OkxPrivateWebSocket(OkxWebSocket):
+    """
+    Connection to the private endpoint, logged in with the REST credentials before the account channels are
+    subscribed
+    """
+
+    # seconds to wait for the answer to a login
+    LOGIN_TIMEOUT = 10.0
+
+    def __init__(self, url: str, topics, auth_data: dict, **kwargs):
+        super().__init__(url, topics, **kwargs)
+        self.auth_data = auth_data
+
+    async def _authenticate(self) -> None:
+        await self._send({"op": "login", "args": [OkxAuth(**self.auth_data).get_ws_login_args()]})
+        while True:
+            frame = await self._ws.receive(timeout=self.LOGIN_TIMEOUT)
+            if frame.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                raise ConnectionError(f"{self.name} WebSocket closed during login")
+            message = self._decode(frame)
+            if isinstance(message, dict) and message.get("event") in ("login", "error"):
+                break
+        if message["event"] == "error" or message.get("code") != "0":
+            raise ExchangeError(message.get("msg"), code=message.get("code"))
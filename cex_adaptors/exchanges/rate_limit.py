@@ -0,0 +1,242 @@
+import asyncio
+import time
+from fnmatch import fnmatchcase
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+Weight = Union[int, float, Callable[[dict], float]]
+
+# `RateLimitStatus.group` of quotas the exchange reports per endpoint rather than per limiter group
+ENDPOINT_GROUP = "endpoint"
+
+
+class RateLimitStatus(NamedTuple):
+    """
+    Server-reported quota parsed from response headers.
+    `group` pins the status to one limiter group; `None` applies it to the groups the request path resolves to, and
+    `ENDPOINT_GROUP` to the request path alone.
+    """
+
+    remaining: float
+    limit: Optional[float] = None
+    reset_after: Optional[float] = None
+    group: Optional[str] = None
+
+
+def header_value(headers, name: str, method: callable = float):
+    value = headers.get(name) if headers is not None else None
+    if value in (None, ""):
+        return None
+    try:
+        return method(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def reset_after_from_timestamp(timestamp: Optional[float]) -> Optional[float]:
+    """
+    Convert an epoch reset timestamp (seconds or milliseconds) into seconds from now
+    """
+    if timestamp is None:
+        return None
+    if timestamp > 1e12:
+        timestamp /= 1000
+    return max(0.0, timestamp - time.time())
+
+
+class TokenBucket(object):
+    """
+    Async token bucket holding `capacity` tokens refilled evenly over `period` seconds.
+
+    Reservations are taken synchronously and may drive the balance negative, so concurrent callers
+    are served in arrival order without a lock and each one sleeps only for its own deficit.
+    """
+
+    def __init__(self, capacity: float, period: float, budget_ratio: float = 0.95):
+        if capacity <= 0 or period <= 0:
+            raise ValueError(f"Invalid token bucket: capacity={capacity}, period={period}")
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.rate = self.capacity / self.period
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+        # share of the server-reported window this process may spend, see `sync`
+        self.budget_ratio = budget_ratio
+        self.window_remaining: Optional[float] = None
+        self.window_reset_at: Optional[float] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, weight: float = 1) -> float:
+        """
+        Take `weight` tokens from the bucket
+        :param weight: number of tokens the request costs
+        :return: seconds to wait before the request may be sent
+        """
+        if weight > self.capacity:
+            raise ValueError(f"Weight {weight} exceeds bucket capacity {self.capacity}")
+        self._refill()
+        self.tokens -= weight
+        delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+        if self.window_reset_at is not None:
+            now = time.monotonic()
+            if now >= self.window_reset_at:
+                self.window_remaining = self.window_reset_at = None
+            else:
+                self.window_remaining -= weight
+                if self.window_remaining < 0:
+                    delay = max(delay, self.window_reset_at - now)
+        return delay
+
+    def sync(self, remaining: float, limit: float = None, reset_after: float = None) -> None:
+        """
+        Align the bucket with the quota the exchange reports for the current window
+        :param remaining: tokens the server says are left in the window
+        :param limit: window size reported by the server, defaults to the bucket capacity
+        :param reset_after: seconds until the server window resets, defaults to the bucket period
+        """
+        limit = self.capacity if limit is None else limit
+        reset_after = self.period if reset_after is None else reset_after
+
+        usable = remaining - limit + self.budget_ratio * limit
+        now = time.monotonic()
+        if self.window_reset_at is not None and now < self.window_reset_at:
+            # responses can arrive out of order; the lowest report within one window wins
+            usable = min(usable, self.window_remaining)
+        self.window_remaining = usable
+        self.window_reset_at = now + reset_after
+
+        self._refill()
+        self.tokens = min(self.tokens, max(usable, 0.0))
+
+    async def acquire(self, weight: float = 1) -> None:
+        delay = self.reserve(weight)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class RateLimiter(object):
+    """
+    Weight-aware rate limiter shared by every request of one exchange client.
+
+    `limits` maps a group name to `(capacity, period_seconds)`. `rules` maps a URL path pattern
+    (fnmatch style, e.g. "/api/v5/market/candles" or "/futures/*/contracts") to a list of
+    `(group, weight)` pairs; `weight` is a number or a callable receiving the request params.
+    Paths without a matching rule cost 1 token of `default_group` when that group exists.
+    Quotas reported per endpoint (`ENDPOINT_GROUP`) get a bucket of their own per path, refilled over
+    `endpoint_period` seconds, which every later request of that path takes 1 token from as well.
+    """
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]],
+        rules: Optional[Dict[str, List[Tuple[str, Weight]]]] = None,
+        default_group: str = "default",
+        budget_ratio: float = 0.95,
+        endpoint_period: float = 1,
+    ):
+        self.buckets = {
+            group: TokenBucket(capacity, period, budget_ratio=budget_ratio)
+            for group, (capacity, period) in limits.items()
+        }
+        self.rules = rules or {}
+        self.default_group = default_group
+        self.budget_ratio = budget_ratio
+        self.endpoint_period = endpoint_period
+        self.endpoint_buckets: Dict[str, TokenBucket] = {}
+        self._resolved: Dict[str, List[Tuple[str, Weight]]] = {}
+
+        for pattern, costs in self.rules.items():
+            for group, _ in costs:
+                if group not in self.buckets:
+                    raise ValueError(f"Rule `{pattern}` refers to unknown rate limit group `{group}`")
+
+    def resolve(self, url: str) -> List[Tuple[str, Weight]]:
+        path = urlsplit(url).path
+        if path not in self._resolved:
+            costs = next((c for pattern, c in self.rules.items() if fnmatchcase(path, pattern)), None)
+            if costs is None:
+                costs = [(self.default_group, 1)] if self.default_group in self.buckets else []
+            self._resolved[path] = costs
+        return self._resolved[path]
+
+    def reserve(self, url: str, params: dict = None) -> float:
+        delay = 0.0
+        for group, weight in self.resolve(url):
+            cost = weight(params or {}) if callable(weight) else weight
+            delay = max(delay, self.buckets[group].reserve(cost))
+        if self.endpoint_buckets:
+            bucket = self.endpoint_buckets.get(urlsplit(url).path)
+            if bucket is not None:
+                delay = max(delay, bucket.reserve(1))
+        return delay
+
+    async def acquire(self, url: str, params: dict = None) -> None:
+        delay = self.reserve(url, params)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def observe(self, url: str, status: RateLimitStatus) -> None:
+        """
+        Feed a server-reported quota back into scheduling
+        :param url: url of the request the status was returned for
+        :param status: quota parsed from the response headers
+        """
+        if status.group == ENDPOINT_GROUP:
+            self._observe_endpoint(urlsplit(url).path, status)
+            return
+        groups = [status.group] if status.group else [group for group, _ in self.resolve(url)]
+        for group in groups:
+            if group in self.buckets:
+                self.buckets[group].sync(status.remaining, status.limit, status.reset_after)
+
+    def _observe_endpoint(self, path: str, status: RateLimitStatus) -> None:
+        bucket = self.endpoint_buckets.get(path)
+        if bucket is None:
+            if not status.limit:
+                return
+            bucket = self.endpoint_buckets[path] = TokenBucket(
+                status.limit, self.endpoint_period, budget_ratio=self.budget_ratio
+            )
+        bucket.sync(status.remaining, status.limit, status.reset_after)
+
+
+def weight_by_limit(steps: List[Tuple[int, float]], default: float, key: str = "limit") -> Callable[[dict], float]:
+    """
+    Build a weight function for endpoints whose cost grows with the requested page size
+    :param steps: ascending `(max_limit, weight)` pairs
+    :param default: weight when `key` is missing from params
+    :param key: params key holding the page size
+    :return: callable mapping request params to a weight
+    """
+
+    def weight(params: dict) -> float:
+        if params.get(key) is None:
+            return default
+        limit = int(params[key])
+        for max_limit, _weight in steps:
+            if limit <= max_limit:
+                return _weight
+        return steps[-1][1]
+
+    return weight
+
+
+def weight_by_param(key: str, with_param: float, without_param: float) -> Callable[[dict], float]:
+    """
+    Build a weight function for endpoints that are cheaper when filtered by a single symbol
+    :param key: params key whose presence selects the cheaper weight
+    :param with_param: weight when `key` is given
+    :param without_param: weight when `key` is missing
+    :return: callable mapping request params to a weight
+    """
+
+    def weight(params: dict) -> float:
+        return with_param if params.get(key) else without_param
+
+    return weight
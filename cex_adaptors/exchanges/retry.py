@@ -0,0 +1,54 @@
+import asyncio
+import random
+from typing import Optional, Tuple
+
+import aiohttp
+
+from ..errors import ExchangeError, HTTPError
+
+# Transport failures that never reached the exchange's matching logic
+TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+
+
+class RetryPolicy(object):
+    """
+    Exponential backoff with full jitter for transient failures.
+
+    Only idempotent methods (`GET` by default) are retried. A delay announced by the server through
+    `Retry-After` replaces the computed backoff.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        methods: Tuple[str, ...] = ("GET",),
+    ):
+        if max_attempts < 1:
+            raise ValueError(f"max_attempts must be at least 1, got {max_attempts}")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.methods = tuple(m.upper() for m in methods)
+
+    def is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (HTTPError, ExchangeError)):
+            return error.retryable
+        return isinstance(error, TRANSIENT_ERRORS)
+
+    def should_retry(self, method: str, attempt: int, error: Exception) -> bool:
+        """
+        :param method: HTTP method of the failed request
+        :param attempt: number of attempts made so far, starting at 1
+        :param error: error raised by the last attempt
+        """
+        return attempt < self.max_attempts and method.upper() in self.methods and self.is_retryable(error)
+
+    def get_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
@@ -0,0 +1,106 @@
+import asyncio
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10, sock_connect=3, sock_read=5)
+
+
+class _LoopSessions(object):
+    __slots__ = ("session", "refs", "host_slots")
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.refs = 0
+        self.host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+class SessionRegistry(object):
+    """
+    Process-wide pool of `aiohttp.ClientSession` shared by every exchange client.
+
+    One session (and so one connector, DNS cache and set of keep-alive TLS connections) is kept per event
+    loop and reference counted by the clients holding it; the last `release` closes it. Concurrent requests
+    are capped per host with `limit_per_host`, overridable for single hosts through `host_limits`.
+    """
+
+    def __init__(
+        self,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        host_limits: Optional[Dict[str, int]] = None,
+        timeout: aiohttp.ClientTimeout = DEFAULT_TIMEOUT,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.host_limits = dict(host_limits or {})
+        self.timeout = timeout
+        # sessions are bound to the loop they were created in
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopSessions]" = weakref.WeakKeyDictionary()
+
+    def _entry(self) -> _LoopSessions:
+        loop = asyncio.get_running_loop()
+        entry = self._loops.get(loop)
+        if entry is None:
+            entry = self._loops[loop] = _LoopSessions()
+        return entry
+
+    def acquire(self) -> aiohttp.ClientSession:
+        """
+        Take a reference on the session of the running event loop, creating it when needed
+        :return: shared client session
+        """
+        entry = self._entry()
+        if entry.session is None or entry.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                # per-host caps are enforced by `host_slot` so they can differ between hosts
+                limit_per_host=0,
+                ttl_dns_cache=300,
+                use_dns_cache=True,
+                keepalive_timeout=60,
+            )
+            entry.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            entry.refs = 0
+        entry.refs += 1
+        return entry.session
+
+    async def release(self, session: aiohttp.ClientSession) -> None:
+        """
+        Drop a reference taken with `acquire`, closing the session once no client holds it
+        :param session: session returned by `acquire`
+        """
+        entry = self._loops.get(asyncio.get_running_loop())
+        if entry is None or entry.session is not session:
+            # session of a loop that is gone, or one that was already replaced
+            return
+        entry.refs -= 1
+        if entry.refs <= 0:
+            entry.session, entry.refs = None, 0
+            entry.host_slots.clear()
+            if not session.closed:
+                await session.close()
+
+    def set_host_limit(self, host: str, limit: int) -> None:
+        """
+        Cap concurrent requests to one host, e.g. `set_host_limit("fapi.binance.com", 50)`.
+        Only affects slots created afterwards.
+        """
+        self.host_limits[host] = limit
+
+    def host_slot(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        slots = self._entry().host_slots
+        slot = slots.get(host)
+        if slot is None:
+            slot = slots[host] = asyncio.Semaphore(self.host_limits.get(host, self.limit_per_host))
+        return slot
+
+    @property
+    def open_sessions(self) -> int:
+        return sum(1 for entry in self._loops.values() if entry.session is not None and not entry.session.closed)
+
+
+SESSIONS = SessionRegistry()
@@ -0,0 +1,49 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+def request_key(url: str, params: Optional[dict] = None) -> Hashable:
+    """
+    Identity of a GET request, independent of the order params were given in
+    """
+    if not params:
+        return url, ()
+    return url, tuple(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+class SingleFlight(object):
+    """
+    Coalesce concurrent calls sharing a key into one execution.
+
+    The first caller starts the call, later callers with the same key await the same result until it
+    completes; the key is forgotten as soon as the call finishes, so nothing is cached afterwards.
+    A cancelled caller does not cancel the shared call for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.shared = 0
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        if not future.cancelled():
+            # mark the error as retrieved when every waiter went away before it was raised
+            future.exception()
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None and future.get_loop() is not asyncio.get_running_loop():
+            future = None
+        if future is None:
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+            self.started += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def __len__(self) -> int:
+        return len(self._calls)
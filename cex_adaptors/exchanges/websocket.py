@@ -0,0 +1,205 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Iterable, List, Optional
+
+import aiohttp
+
+from .retry import TRANSIENT_ERRORS, RetryPolicy
+from .session import SESSIONS, SessionRegistry
+
+# failures of one connection attempt that are worth reconnecting after
+CONNECTION_ERRORS = TRANSIENT_ERRORS + (aiohttp.WSServerHandshakeError, ConnectionError)
+
+
+class WebSocketClient(object):
+    """
+    One exchange WebSocket connection that outlives disconnects.
+
+    `messages()` connects, subscribes every topic, and yields the decoded data messages. When the connection drops it
+    reconnects with the backoff of `reconnect_policy` and subscribes the same topics again, so consumers only see a
+    gap in the data. Subclasses describe the exchange protocol: the login of private connections (`_authenticate`),
+    how topics are subscribed (`_subscribe_messages`), the application-level ping (`PING_INTERVAL`, `_ping_message`),
+    frame decoding (`_decode`), messages that need an answer (`_reply`) and which messages carry data (`_is_data`).
+    """
+
+    name = None
+
+    # seconds between the application-level pings some exchanges require, None when protocol pings are enough
+    PING_INTERVAL: Optional[float] = None
+    # protocol ping frames are sent this often, a connection without a pong within half of it is dropped
+    HEARTBEAT: Optional[float] = 30.0
+    # topics per subscribe request
+    SUBSCRIBE_BATCH = 50
+    # topics one connection takes, None when the exchange sets no limit
+    MAX_TOPICS: Optional[int] = None
+
+    # connection pool shared with the REST clients
+    session_registry: SessionRegistry = SESSIONS
+
+    def __init__(
+        self,
+        url: str = None,
+        topics: Iterable = (),
+        reconnect_policy: Optional[RetryPolicy] = None,
+        max_reconnects: Optional[int] = None,
+    ):
+        """
+        :param url: WebSocket endpoint, see `_connect_url` for exchanges handing out the endpoint per connection
+        :param topics: exchange topics to subscribe, in the format of `_subscribe_messages`
+        :param reconnect_policy: backoff between reconnects, only `get_delay` is used
+        :param max_reconnects: consecutive failed connections before `messages()` raises, None to retry forever
+        """
+        self.url = url
+        self.topics: List[Any] = []
+        self._topic_keys = set()
+        self._add_topics(topics)
+        self.reconnect_policy = reconnect_policy or RetryPolicy(base_delay=0.5, max_delay=30.0)
+        self.max_reconnects = max_reconnects
+        # connections made after the first one
+        self.reconnects = 0
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        # close of a connection dropped by `reconnect`
+        self._dropping: Optional[asyncio.Future] = None
+        self._closed = False
+
+    def _add_topics(self, topics: Iterable) -> list:
+        added = []
+        for topic in topics:
+            key = json.dumps(topic, sort_keys=True)
+            if key not in self._topic_keys:
+                self._topic_keys.add(key)
+                self.topics.append(topic)
+                added.append(topic)
+        return added
+
+    def _batches(self, topics: list) -> List[list]:
+        return [topics[i : i + self.SUBSCRIBE_BATCH] for i in range(0, len(topics), self.SUBSCRIBE_BATCH)]
+
+    async def _connect_url(self) -> str:
+        return self.url
+
+    async def _authenticate(self) -> None:
+        """
+        Log in right after connecting, before any topic is subscribed; raise `ExchangeError` when the exchange
+        rejects the credentials
+        """
+
+    def _subscribe_messages(self, topics: list) -> list:
+        """
+        :return: requests subscribing `topics`, sent in order
+        """
+        raise NotImplementedError
+
+    def _ping_message(self) -> Any:
+        return None
+
+    def _decode(self, message: aiohttp.WSMessage) -> Any:
+        """
+        :return: the decoded frame, None for frames to skip (e.g. a plain "pong")
+        """
+        try:
+            return json.loads(message.data)
+        except ValueError:
+            return None
+
+    def _reply(self, message) -> Any:
+        """
+        :return: the answer to a message expecting one, such as a server ping, None otherwise
+        """
+        return None
+
+    def _is_data(self, message) -> bool:
+        """
+        Tell data pushes from acknowledgements and raise `ExchangeError` for error events
+        """
+        return True
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and not self._ws.closed
+
+    async def _send(self, payload) -> None:
+        await self._ws.send_str(payload if isinstance(payload, str) else json.dumps(payload))
+
+    async def subscribe(self, topics: Iterable) -> None:
+        """
+        Add topics, subscribed at once when connected and on every reconnect
+        """
+        added = self._add_topics(topics)
+        if added and self.connected:
+            for payload in self._subscribe_messages(added):
+                await self._send(payload)
+
+    def reconnect(self) -> None:
+        """
+        Drop the current connection, `messages()` connects again and subscribes every topic, e.g. for fresh order
+        book snapshots after a sequence gap
+        """
+        if self.connected and self._dropping is None:
+            self._dropping = asyncio.ensure_future(self._ws.close())
+
+    async def _ping(self) -> None:
+        while True:
+            await asyncio.sleep(self.PING_INTERVAL)
+            await self._send(self._ping_message())
+
+    async def _connection(self, session: aiohttp.ClientSession) -> AsyncIterator:
+        async with session.ws_connect(await self._connect_url(), heartbeat=self.HEARTBEAT) as ws:
+            self._ws = ws
+            pinger = None
+            try:
+                await self._authenticate()
+                for payload in self._subscribe_messages(list(self.topics)):
+                    await self._send(payload)
+                if self.PING_INTERVAL:
+                    pinger = asyncio.ensure_future(self._ping())
+
+                async for frame in ws:
+                    if frame.type == aiohttp.WSMsgType.ERROR:
+                        return
+                    if frame.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                        continue
+                    message = self._decode(frame)
+                    if message is None:
+                        continue
+                    reply = self._reply(message)
+                    if reply is not None:
+                        await self._send(reply)
+                    elif self._is_data(message):
+                        yield message
+            finally:
+                self._ws = None
+                self._dropping = None
+                if pinger is not None:
+                    pinger.cancel()
+
+    async def messages(self) -> AsyncIterator:
+        """
+        Data messages of every subscribed topic, across reconnects, until `close()`
+        """
+        self._closed = False
+        session = self.session_registry.acquire()
+        failures = 0
+        try:
+            while True:
+                try:
+                    async for message in self._connection(session):
+                        failures = 0
+                        yield message
+                except CONNECTION_ERRORS:
+                    pass
+                if self._closed:
+                    return
+
+                failures += 1
+                if self.max_reconnects is not None and failures > self.max_reconnects:
+                    raise ConnectionError(f"{self.name} WebSocket lost after {self.max_reconnects} reconnects")
+                await asyncio.sleep(self.reconnect_policy.get_delay(failures))
+                self.reconnects += 1
+        finally:
+            await self.session_registry.release(session)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._ws is not None:
+            await self._ws.close()
@@ -1,10 +1,14 @@
 from .base import BaseClient
+from .cache import INSTRUMENTS_TTL
 
 
 class WOOUnified(BaseClient):
     name = "woo"
     BASE_ENDPOINT = "https://api.woo.org"
 
+    RATE_LIMITS = {"default": (10, 1)}
+    CACHE_TTLS = {"/v1/public/info": INSTRUMENTS_TTL}
+
     def __init__(self):
         super().__init__()
         self.base_endpoint = self.BASE_ENDPOINT
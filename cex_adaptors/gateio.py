@@ -1,8 +1,21 @@
-from .exchanges.gateio import GateioUnified
+import asyncio
+from typing import List, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.gateio import GateioUnified, GateioWebSocket
+from .pagination import (
+    INTERVAL_MS,
+    SECOND_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+)
 from .parsers.gateio import GateioParser
+from .streaming import Stream, StreamingMixin
 
 
-class Gateio(GateioUnified):
+class Gateio(ExchangeInfoMixin, PaginationMixin, StreamingMixin, GateioUnified):
     name = "gateio"
 
     PERP_SETTLE = ["btc", "usdt", "usd"]
@@ -10,30 +23,29 @@ class Gateio(GateioUnified):
     def __init__(self):
         super().__init__()
         self.parser = GateioParser()
+        self.response_checker = self.parser.check_response
         self.exchange_info = {}
 
-    async def sync_exchange_info(self):
-        self.exchange_info = await self.get_exchange_info()
-
     async def get_exchange_info(self):
-        spot = self.parser.parse_exchange_info(await self._get_currency_pairs(), self.parser.spot_exchange_info_parser)
+        futures_settle = "usdt"
+        spot, *perp_list, futures = await asyncio.gather(
+            self._parse_exchange_info(self._get_currency_pairs(), self.parser.spot_exchange_info_parser),
+            *(
+                self._parse_exchange_info(
+                    self._get_perp_info(settle), self.parser.perp_exchange_info_parser, settle=settle.upper()
+                )
+                for settle in self.PERP_SETTLE
+            ),
+            self._parse_exchange_info(
+                self._get_futures_info(futures_settle),
+                self.parser.futures_exchange_info_parser,
+                settle=futures_settle.upper(),
+            ),
+        )
 
         perps = {}
-        for settle in self.PERP_SETTLE:
-            perp = self.parser.parse_exchange_info(
-                await self._get_perp_info(settle),
-                self.parser.perp_exchange_info_parser,
-                settle=settle.upper(),
-            )
+        for perp in perp_list:
             perps.update(perp)
-
-        settle = "usdt"
-        futures = self.parser.parse_exchange_info(
-            await self._get_futures_info(settle),
-            self.parser.futures_exchange_info_parser,
-            settle=settle.upper(),
-        )
-
         return {**spot, **perps, **futures}
 
     async def get_tickers(self, market_type: str = None) -> dict:
@@ -80,6 +92,74 @@ class Gateio(GateioUnified):
 
         return {instrument_id: self.parser.parse_raw_ticker(await method_map[market_type](**params), market_type, info)}
 
+    def _ws_endpoint(self, info: dict) -> tuple:
+        # spot has one endpoint, perps and dated futures one per settle currency
+        market_type = self.parser.get_market_type(info)
+        return market_type, None if market_type == "spot" else info["settle"].lower()
+
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for (market_type, settle), ids in self._group_instruments(instrument_ids, self._ws_endpoint).items():
+            raw_key, channel = ("id", "spot.tickers") if market_type == "spot" else ("name", "futures.tickers")
+            id_map = {self.exchange_info[i]["raw_data"][raw_key]: i for i in ids}
+            topics = [[channel, symbol] for symbol in id_map]
+
+            def parse(message, id_map=id_map, market_type=market_type):
+                result = message["result"]
+                # spot pushes one ticker, futures a list
+                for data in result if isinstance(result, list) else [result]:
+                    instrument_id = id_map[data["currency_pair" if market_type == "spot" else "contract"]]
+                    yield instrument_id, self.parser.parse_ticker(data, market_type, self.exchange_info[instrument_id])
+
+            url = GateioWebSocket.URLS[market_type].format(settle=settle)
+            streams.append(Stream(GateioWebSocket(url, topics), parse))
+        return streams
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        streams = []
+        interval_map = {self.parser.get_interval(interval): interval for interval in intervals}
+        for (market_type, settle), ids in self._group_instruments(instrument_ids, self._ws_endpoint).items():
+            raw_key, channel = (
+                ("id", "spot.candlesticks") if market_type == "spot" else ("name", "futures.candlesticks")
+            )
+            id_map = {self.exchange_info[i]["raw_data"][raw_key]: i for i in ids}
+            topics = [[channel, [interval, symbol]] for interval in interval_map for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                result = message["result"]
+                # spot pushes one candle, futures a list
+                for data in result if isinstance(result, list) else [result]:
+                    # "n" is "<interval>_<symbol>", `w` is set once the candle is complete
+                    interval, symbol = data["n"].split("_", 1)
+                    instrument_id = id_map[symbol]
+                    candle = self.parser.parse_ws_candlestick(
+                        data, self.exchange_info[instrument_id], interval_map[interval]
+                    )
+                    yield instrument_id, (candle, data.get("w"))
+
+            url = GateioWebSocket.URLS[market_type].format(settle=settle)
+            streams.extend(
+                Stream(GateioWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, GateioWebSocket)
+            )
+        return streams
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for (market_type, settle), ids in self._group_instruments(instrument_ids, self._ws_endpoint).items():
+            raw_key, channel = ("id", "spot.trades") if market_type == "spot" else ("name", "futures.trades")
+            id_map = {self.exchange_info[i]["raw_data"][raw_key]: i for i in ids}
+            topics = [[channel, symbol] for symbol in id_map]
+
+            def parse(message, id_map=id_map, market_type=market_type):
+                result = message["result"]
+                for data in result if isinstance(result, list) else [result]:
+                    instrument_id = id_map[data["currency_pair" if market_type == "spot" else "contract"]]
+                    yield instrument_id, self.parser.parse_ws_trade(data, self.exchange_info[instrument_id])
+
+            url = GateioWebSocket.URLS[market_type].format(settle=settle)
+            streams.append(Stream(GateioWebSocket(url, topics), parse))
+        return streams
+
     async def get_current_candlestick(self, instrument_id: str, interval: str) -> dict:
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} not found in {self.name} exchange info")
@@ -108,6 +188,31 @@ class Gateio(GateioUnified):
             )
         }
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        if interval not in INTERVAL_MS:
+            return None
+
+        info = self.exchange_info[instrument_id]
+        market_type = self.parser.get_market_type(info)
+        # gate rejects `limit` together with `from` / `to`, a window holds at most `limit` candles instead
+        params = {
+            "symbol": info["raw_data"]["id" if market_type == "spot" else "name"],
+            "interval": self.parser.get_interval(interval),
+        }
+        if market_type in ["futures", "perp"]:
+            params["settle"] = info["settle"].lower()
+        fetch = {
+            "spot": self._get_spot_klines,
+            "futures": self._get_futures_klines,
+            "perp": self._get_perp_klines,
+        }[market_type]
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_candlesticks(await fetch(**params, **window), info, market_type, interval)
+
+        limit = 1000 if market_type == "spot" else 2000
+        return HistoryPages(fetch_page, TimeCursor("start", "end", unit=SECOND_MS), limit, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -141,16 +246,20 @@ class Gateio(GateioUnified):
         if market_type in ["futures", "perp"]:
             params["settle"] = info["settle"].lower()
 
-        results = []
+        results = TimestampBuffer()
         query_end = None
-        if start and end:
+        pages = self._candlestick_pages(instrument_id, interval) if start and end else None
+        if pages is not None:
+            return await self._fetch_pages(pages, start, end)
+
+        elif start and end:
             query_end = str(int(str(end)[:10]) + 1)
             while True:
                 params.update({"end": query_end})
                 result = self.parser.parse_candlesticks(
                     await method_map[market_type](**params), info, market_type, interval
                 )
-                results.extend(result)
+                result = results.add(result)
 
                 if len(result) < limit_map[market_type]:
                     break
@@ -163,9 +272,7 @@ class Gateio(GateioUnified):
                 query_end = str(int(str(query_end)[:10]) + 1)
                 continue
 
-            return sorted(
-                [v for v in results if start <= v["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return results.sorted(start, end)
 
         elif num:
             while True:
@@ -173,14 +280,14 @@ class Gateio(GateioUnified):
                 result = self.parser.parse_candlesticks(
                     await method_map[market_type](**params), info, market_type, interval
                 )
-                results.extend(result)
+                result = results.add(result)
 
                 if len(result) < limit_map[market_type] or len(results) >= num:
                     break
                 query_end = str(int(str(min([v["timestamp"] for v in result]))[:10]) + 1)
 
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
         else:
             raise ValueError("(start, end) or num must be provided")
 
@@ -202,6 +309,11 @@ class Gateio(GateioUnified):
         }
         return {instrument_id: self.parser.parse_current_funding_rate(await method_map[market_type](**params), info)}
 
+    def _funding_interval_ms(self, info: dict) -> int:
+        # contracts list their funding interval in seconds
+        seconds = info["raw_data"].get("funding_interval")
+        return int(seconds) * SECOND_MS if seconds else super()._funding_interval_ms(info)
+
     async def get_history_funding_rate(
         self, instrument_id: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -210,15 +322,22 @@ class Gateio(GateioUnified):
 
         info = self.exchange_info[instrument_id]
 
-        params = {"contract": info["raw_data"]["name"], "settle": info["settle"].lower(), "limit": 1000}
-
-        results = self.parser.parse_history_funding_rate(await self._get_futures_funding_rate_history(**params), info)
+        limit = 1000
+        params = {"contract": info["raw_data"]["name"], "settle": info["settle"].lower(), "limit": limit}
 
         if start and end:
-            return sorted(
-                [v for v in results if start <= v["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
-        elif num:
+            # `from` / `to` in seconds bound each window instead of the latest `limit` rows only
+            cursor = TimeCursor("_from", "to", unit=SECOND_MS, newest_first=True)
+
+            async def fetch_page(**window) -> list:
+                return self.parser.parse_history_funding_rate(
+                    await self._get_futures_funding_rate_history(**params, **window), info
+                )
+
+            return await self._fetch_funding_range(fetch_page, cursor, start, end, limit, info)
+
+        results = self.parser.parse_history_funding_rate(await self._get_futures_funding_rate_history(**params), info)
+        if num:
             return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
         else:
             raise ValueError("(start, end) or num must be provided")
@@ -1,36 +1,55 @@
-from .exchanges.htx import HtxFutures, HtxSpot
+import asyncio
+from typing import List, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.htx import HtxFutures, HtxSpot, HtxWebSocket
+from .pagination import (
+    INTERVAL_MS,
+    SECOND_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+)
 from .parsers.htx import HtxParser
-from .utils import query_dict
+from .streaming import Stream, StreamingMixin
 
 
-class Htx(object):
+class Htx(ExchangeInfoMixin, PaginationMixin, StreamingMixin):
     name = "htx"
 
     def __init__(self):
         self.spot = HtxSpot()
         self.futures = HtxFutures()
         self.parser = HtxParser()
+        for client in (self.spot, self.futures):
+            client.response_checker = self.parser.check_htx_response
         self.exchange_info = {}
 
     async def close(self):
+        # stop the background exchange info refresh before its clients go away
+        await super().close()
         await self.spot.close()
         await self.futures.close()
 
-    async def sync_exchange_info(self):
-        self.exchange_info = await self.get_exchange_info()
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def get_exchange_info(self, market_type: str = None):
-        spot = self.parser.parse_exchange_info(
-            await self.spot._get_exchange_info(), self.parser.spot_exchange_info_parser
-        )
-        linear = self.parser.parse_exchange_info(
-            await self.futures._get_linear_contract_info(), self.parser.linear_exchange_info_parser
-        )
-        inverse_futures = self.parser.parse_exchange_info(
-            await self.futures._get_inverse_futures_info(), self.parser.inverse_futures_exchange_info_parser
-        )
-        inverse_perp = self.parser.parse_exchange_info(
-            await self.futures._get_inverse_perp_info(), self.parser.inverse_perp_exchange_info_parser
+        spot, linear, inverse_futures, inverse_perp = await asyncio.gather(
+            self._parse_exchange_info(self.spot._get_exchange_info(), self.parser.spot_exchange_info_parser),
+            self._parse_exchange_info(
+                self.futures._get_linear_contract_info(), self.parser.linear_exchange_info_parser
+            ),
+            self._parse_exchange_info(
+                self.futures._get_inverse_futures_info(), self.parser.inverse_futures_exchange_info_parser
+            ),
+            self._parse_exchange_info(
+                self.futures._get_inverse_perp_info(), self.parser.inverse_perp_exchange_info_parser
+            ),
         )
 
         return {**spot, **linear, **inverse_futures, **inverse_perp}
@@ -53,7 +72,7 @@ class Htx(object):
                 )
                 results = {**linear, **inverse_perp, **inverse_futures}
 
-                instrument_id = list(query_dict(self.exchange_info, f"is_{market_type} == True").keys())
+                instrument_id = set(self.exchange_info.ids(**{f"is_{market_type}": True}))
                 return {k: v for k, v in results.items() if k in instrument_id}
         else:
             spot = self.parser.parse_tickers(await self.spot._get_tickers(), self.exchange_info, "spot")
@@ -70,13 +89,77 @@ class Htx(object):
             return {**spot, **linear, **inverse_perp, **inverse_futures}
 
     async def get_ticker(self, instrument_id: str) -> dict:
-        # HTX do not support get_ticker endpoint, can only get one ticker from get_tickers
-        tickers = await self.get_tickers()
-        if instrument_id not in tickers:
+        # HTX do not support get_ticker endpoint, can only get one ticker from the tickers of its market type
+        if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} not found in {self.name} exchange info")
 
+        market_type = self.parser.get_market_type(self.exchange_info[instrument_id])
+        method_map = {
+            "spot": self.spot._get_tickers,
+            "linear": self.futures._get_linear_contract_tickers,
+            "inverse_perp": self.futures._get_inverse_perp_tickers,
+            "inverse_futures": self.futures._get_inverse_futures_tickers,
+        }
+        tickers = self.parser.parse_tickers(await method_map[market_type](), self.exchange_info, market_type)
+        if instrument_id not in tickers:
+            raise ValueError(f"{instrument_id} not found in {self.name} tickers")
+
         return {instrument_id: tickers[instrument_id]}
 
+    def _ws_id_map(self, ids: list, market_type: str) -> dict:
+        # instrument ids by the symbol of their market data channels
+        if market_type == "spot":
+            return {self.exchange_info[i]["raw_data"]["sc"]: i for i in ids}
+        elif market_type == "inverse_futures":
+            return {self.parser.parse_inverse_futures_symbol(self.exchange_info[i]["raw_data"]): i for i in ids}
+        return {self.exchange_info[i]["raw_data"]["contract_code"]: i for i in ids}
+
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for market_type, ids in self._group_instruments(instrument_ids, self.parser.get_market_type).items():
+            id_map = self._ws_id_map(ids, market_type)
+            topics = [f"market.{symbol}.detail" for symbol in id_map]
+
+            def parse(message, id_map=id_map, market_type=market_type):
+                # "market.<symbol>.detail", the 24h stats carry no timestamp of their own
+                instrument_id = id_map[message["ch"].split(".")[1]]
+                tick = {**message["tick"], "ts": message["ts"]}
+                yield instrument_id, self.parser.parse_ticker(tick, market_type, self.exchange_info[instrument_id])
+
+            streams.append(Stream(HtxWebSocket(HtxWebSocket.URLS[market_type], topics), parse))
+        return streams
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        streams = []
+        for market_type, ids in self._group_instruments(instrument_ids, self.parser.get_market_type).items():
+            id_map = self._ws_id_map(ids, market_type)
+            periods = {self.parser.get_interval(interval, market_type): interval for interval in intervals}
+            topics = [f"market.{symbol}.kline.{period}" for period in periods for symbol in id_map]
+
+            def parse(message, id_map=id_map, periods=periods):
+                # "market.<symbol>.kline.<period>", candles carry no closed flag
+                _, symbol, _, period = message["ch"].split(".")
+                instrument_id = id_map[symbol]
+                info = self.exchange_info[instrument_id]
+                yield instrument_id, (self.parser.parse_ws_candlestick(message["tick"], info, periods[period]), None)
+
+            streams.append(Stream(HtxWebSocket(HtxWebSocket.URLS[market_type], topics), parse))
+        return streams
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        streams = []
+        for market_type, ids in self._group_instruments(instrument_ids, self.parser.get_market_type).items():
+            id_map = self._ws_id_map(ids, market_type)
+            topics = [f"market.{symbol}.trade.detail" for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                instrument_id = id_map[message["ch"].split(".")[1]]
+                for data in message["tick"]["data"]:
+                    yield instrument_id, self.parser.parse_ws_trade(data, self.exchange_info[instrument_id])
+
+            streams.append(Stream(HtxWebSocket(HtxWebSocket.URLS[market_type], topics), parse))
+        return streams
+
     async def get_current_candlestick(self, instrument_id: str, interval: str) -> dict:
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} not in {self.name} exchange info")
@@ -113,6 +196,31 @@ class Htx(object):
             )
         }
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        info = self.exchange_info[instrument_id]
+        market_type = self.parser.get_market_type(info)
+        # spot klines take no time range
+        if market_type == "spot" or interval not in INTERVAL_MS:
+            return None
+
+        fetch = {
+            "linear": self.futures._get_linear_contract_klines,
+            "inverse_futures": self.futures._get_inverse_futures_klines,
+            "inverse_perp": self.futures._get_inverse_perp_klines,
+        }[market_type]
+        # `size` is ignored when `from` / `to` are given, a window holds at most `limit` candles instead
+        params = {
+            "symbol": info["raw_data"]["contract_code"]
+            if market_type != "inverse_futures"
+            else self.parser.parse_inverse_futures_symbol(info["raw_data"]),
+            "period": self.parser.get_interval(interval, market_type),
+        }
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_candlesticks(await fetch(**params, **window), info, market_type, interval)
+
+        return HistoryPages(fetch_page, TimeCursor("start", "end", unit=SECOND_MS), 2000, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -151,20 +259,20 @@ class Htx(object):
             "period": _interval,
             "limit": limit_map[market_type],
         }
-        results = []
+        results = TimestampBuffer()
         query_end = None
-        if start and end and market_type != "spot":
+        pages = self._candlestick_pages(instrument_id, interval) if start and end else None
+        if pages is not None:
+            return await self._fetch_pages(pages, start, end)
+
+        elif start and end and market_type != "spot":
             query_end = end
             while True:
                 params["end"] = str(query_end)[:10]
                 result = self.parser.parse_candlesticks(
                     await method_map[market_type](**params), info, market_type, interval
                 )
-                results.extend(result)
-
-                # exclude datas with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 temp_end = str(min([v["timestamp"] for v in result]))[:10]
                 if len(result) < limit_map[market_type] or temp_end == query_end:
                     break
@@ -172,9 +280,7 @@ class Htx(object):
                 query_end = temp_end  # get the earliest timestamp in 10 digits
                 if query_end <= start:
                     break
-            return sorted(
-                [v for v in results if start <= v["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return results.sorted(start, end)
 
         elif num:
             while True:
@@ -182,7 +288,7 @@ class Htx(object):
                 result = self.parser.parse_candlesticks(
                     await method_map[market_type](**params), info, market_type, interval
                 )
-                results.extend(result)
+                result = results.add(result)
 
                 temp_end = str(min([v["timestamp"] for v in result]))[:10]
                 if len(result) < limit_map[market_type] or temp_end == query_end:
@@ -191,7 +297,7 @@ class Htx(object):
                 query_end = temp_end  # get the earliest timestamp in 10 digits
                 if len(results) >= num:
                     break
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
 
         else:
             raise ValueError("(start, end) or num must be provided")
@@ -229,44 +335,26 @@ class Htx(object):
         index = 1
         params = {"contract_code": info["raw_data"]["contract_code"], "page_size": limit}
 
-        results = []
+        results = TimestampBuffer()
         if start and end:
-            while True:
-                params.update({"page_index": index})
-                result = self.parser.parse_history_funding_rate(await method_map[market_type](**params), info)
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
+            fetch = method_map[market_type]
 
-                if len(result) < limit:
-                    break
-
-                query_start = min([v["timestamp"] for v in result])
-                if query_start <= start:
-                    break
-                index += 1
-                continue
+            async def fetch_page(page_index: int) -> list:
+                return self.parser.parse_history_funding_rate(await fetch(**params, page_index=page_index), info)
 
-            return sorted(
-                [v for v in results if start <= v["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return await self._fetch_numbered_pages(fetch_page, start, end, limit)
 
         elif num:
             while True:
                 params.update({"page_index": index})
                 result = self.parser.parse_history_funding_rate(await method_map[market_type](**params), info)
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if len(result) < limit or len(results) > num:
                     break
 
                 index += 1
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
         else:
             raise ValueError("(start, end) or num must be provided")
 
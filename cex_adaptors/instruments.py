@@ -0,0 +1,325 @@
+import sys
+from collections.abc import Mapping
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+FLAG_KEYS = ("is_spot", "is_margin", "is_futures", "is_perp", "is_linear", "is_inverse")
+FIELD_KEYS = ("base", "quote", "settle")
+
+# unified exchange info fields produced by every parser's `*_exchange_info_parser`
+INSTRUMENT_FIELDS = (
+    "active",
+    *FLAG_KEYS,
+    "symbol",
+    *FIELD_KEYS,
+    "multiplier",
+    "leverage",
+    "listing_time",
+    "expiration_time",
+    "contract_size",
+    "tick_size",
+    "min_order_size",
+    "max_order_size",
+    "raw_data",
+)
+# raw_data keys the adaptors and parsers read to build request parameters and symbol maps, and the funding intervals
+# funding history windows are planned with (Bybit, Kucoin, Gate.io)
+RAW_SYMBOL_KEYS = (
+    "symbol",
+    "instId",
+    "instType",
+    "id",
+    "name",
+    "sc",
+    "contract_code",
+    "contract_type",
+    "fundingInterval",
+    "fundingRateGranularity",
+    "funding_interval",
+)
+INTERNED_FIELDS = ("symbol", *FIELD_KEYS)
+
+# a raw_data key, or a callable deriving the exchange symbol from raw_data
+RawKey = Union[str, Callable[[dict], Hashable]]
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _SlottedMapping(Mapping):
+    """
+    Read-only mapping over the `__slots__` named in `FIELDS`; unset slots are absent keys
+    """
+
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    __delattr__ = __setattr__
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (key for key in self.FIELDS if hasattr(self, key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> dict:
+        return {key: dict(value) if isinstance(value, Mapping) else value for key, value in self.items()}
+
+
+class RawSymbols(_SlottedMapping):
+    """
+    The `RAW_SYMBOL_KEYS` of an instrument's raw payload, all that the adaptors read from `raw_data`
+    """
+
+    __slots__ = RAW_SYMBOL_KEYS
+    FIELDS = RAW_SYMBOL_KEYS
+    _FIELD_SET = frozenset(RAW_SYMBOL_KEYS)
+
+    def __init__(self, raw_data: Mapping):
+        for key in RAW_SYMBOL_KEYS:
+            if key in raw_data:
+                object.__setattr__(self, key, _intern(raw_data[key]))
+
+    def __reduce__(self):
+        return RawSymbols, (self.to_dict(),)
+
+
+class Instrument(_SlottedMapping):
+    """
+    Immutable, slotted exchange info entry, read like the dict it replaces (`info["base"]`, `info.get("is_perp")`).
+
+    base / quote / settle / symbol are interned so thousands of instruments share one string per currency, and
+    `raw_data` is reduced to `RawSymbols` unless `keep_raw` is set. Fields missing from the source dict are
+    absent from the mapping as well.
+    """
+
+    __slots__ = INSTRUMENT_FIELDS + ("_keep_raw",)
+    FIELDS = INSTRUMENT_FIELDS
+    _FIELD_SET = frozenset(INSTRUMENT_FIELDS)
+
+    def __init__(self, info: Mapping, keep_raw: bool = False):
+        object.__setattr__(self, "_keep_raw", keep_raw)
+        for key, value in info.items():
+            if key == "raw_data" and isinstance(value, Mapping) and not keep_raw:
+                value = value if isinstance(value, RawSymbols) else RawSymbols(value)
+            elif key in INTERNED_FIELDS:
+                value = _intern(value)
+            object.__setattr__(self, key, value)
+
+    def __reduce__(self):
+        return Instrument, (self.to_dict(), self._keep_raw)
+
+
+def as_dict(info):
+    """
+    An `Instrument` as the plain dict it was built from, any other entry unchanged
+    """
+    return info.to_dict() if isinstance(info, Instrument) else info
+
+
+def to_instrument(info, keep_raw: bool = False):
+    """
+    Compact a parsed exchange info entry into an `Instrument`; entries carrying fields outside
+    `INSTRUMENT_FIELDS` are returned unchanged
+    """
+    if isinstance(info, Instrument) or not isinstance(info, Mapping) or not info.keys() <= Instrument._FIELD_SET:
+        return info
+    return Instrument(info, keep_raw)
+
+
+class InstrumentRegistry(dict):
+    """
+    `exchange_info` map (unified instrument id -> info) with indexes kept up to date on every write.
+
+    Market type flags (`is_spot`, `is_perp`, ...) and `base` / `quote` / `settle` are indexed eagerly, so
+    `ids` / `select` cost O(k) in the size of the smallest matching index instead of a scan of every instrument.
+    Exchange symbol maps built by `id_map` are cached until the next write.
+    Entries are stored as compact `Instrument` records, see `to_instrument`; `keep_raw` retains the full raw_data.
+    """
+
+    def __init__(self, *args, keep_raw: bool = False, **kwargs):
+        super().__init__()
+        self.keep_raw = keep_raw
+        self._indexes: Dict[Tuple[str, Hashable], Dict[str, None]] = {}
+        self._id_maps: Dict[Hashable, Dict[Hashable, str]] = {}
+        self.update(*args, **kwargs)
+
+    # --- index maintenance ---
+
+    def _index_keys(self, info) -> List[Tuple[str, Hashable]]:
+        if not isinstance(info, Mapping):
+            return []
+        keys = [(flag, True) for flag in FLAG_KEYS if bool(info.get(flag))]
+        keys.extend((field, info[field]) for field in FIELD_KEYS if info.get(field) is not None)
+        return keys
+
+    def _add_to_indexes(self, instrument_id: str, info) -> None:
+        for key in self._index_keys(info):
+            self._indexes.setdefault(key, {})[instrument_id] = None
+
+    def _remove_from_indexes(self, instrument_id: str, info) -> None:
+        for key in self._index_keys(info):
+            index = self._indexes.get(key)
+            if index is not None:
+                index.pop(instrument_id, None)
+                if not index:
+                    del self._indexes[key]
+
+    def compact(self, info):
+        return to_instrument(info, self.keep_raw)
+
+    def __setitem__(self, instrument_id: str, info) -> None:
+        info = self.compact(info)
+        if instrument_id in self:
+            self._remove_from_indexes(instrument_id, dict.__getitem__(self, instrument_id))
+        super().__setitem__(instrument_id, info)
+        self._add_to_indexes(instrument_id, info)
+        self._id_maps.clear()
+
+    def __delitem__(self, instrument_id: str) -> None:
+        info = dict.__getitem__(self, instrument_id)
+        super().__delitem__(instrument_id)
+        self._remove_from_indexes(instrument_id, info)
+        self._id_maps.clear()
+
+    def update(self, *args, **kwargs) -> None:
+        for instrument_id, info in dict(*args, **kwargs).items():
+            self[instrument_id] = info
+
+    def setdefault(self, instrument_id: str, default=None):
+        if instrument_id not in self:
+            self[instrument_id] = default
+        return self[instrument_id]
+
+    _MISSING = object()
+
+    def pop(self, instrument_id: str, default=_MISSING):
+        if instrument_id not in self:
+            if default is self._MISSING:
+                raise KeyError(instrument_id)
+            return default
+        info = self[instrument_id]
+        del self[instrument_id]
+        return info
+
+    def popitem(self):
+        instrument_id = next(reversed(self))
+        return instrument_id, self.pop(instrument_id)
+
+    def clear(self) -> None:
+        super().clear()
+        self._indexes.clear()
+        self._id_maps.clear()
+
+    def copy(self) -> "InstrumentRegistry":
+        return InstrumentRegistry(self, keep_raw=self.keep_raw)
+
+    def to_dict(self) -> dict:
+        """
+        Plain `{instrument_id: info}` copy with the `Instrument` records as dicts, e.g. for `json.dumps` or pandas
+        """
+        return {instrument_id: as_dict(info) for instrument_id, info in self.items()}
+
+    def __reduce__(self):
+        # rebuild through __init__ so copies and pickles get their indexes
+        return _rebuild_registry, (dict(self), self.keep_raw)
+
+    # --- lookups ---
+
+    def ids(self, any_of: Optional[Iterable[str]] = None, **criteria) -> List[str]:
+        """
+        Instrument ids matching every criterion, e.g. `ids(is_perp=True, base="BTC")`
+        :param any_of: flags of which at least one must be True, e.g. `("is_perp", "is_futures")`
+        :param criteria: flag or base / quote / settle values that must all match
+        :return: matching ids in insertion order of the smallest index
+        """
+        include: List[Dict[str, None]] = []
+        exclude: List[Dict[str, None]] = []
+        for key, value in criteria.items():
+            if key in FLAG_KEYS and value is False:
+                exclude.append(self._indexes.get((key, True), {}))
+            else:
+                include.append(self._indexes.get((key, value), {}))
+
+        if any_of is not None:
+            union: Dict[str, None] = {}
+            for flag in any_of:
+                union.update(self._indexes.get((flag, True), {}))
+            include.append(union)
+
+        if not include:
+            candidates: Iterable[str] = self.keys()
+            others: List[Dict[str, None]] = []
+        else:
+            include.sort(key=len)
+            candidates, others = include[0], include[1:]
+        return [
+            instrument_id
+            for instrument_id in candidates
+            if all(instrument_id in index for index in others) and not any(instrument_id in e for e in exclude)
+        ]
+
+    def select(self, any_of: Optional[Iterable[str]] = None, **criteria) -> dict:
+        return {instrument_id: self[instrument_id] for instrument_id in self.ids(any_of, **criteria)}
+
+    def id_map(self, raw_key: RawKey, any_of: Optional[Iterable[str]] = None, **criteria) -> Dict[Hashable, str]:
+        """
+        Exchange symbol -> unified id for the matching instruments, cached until the registry changes
+        :param raw_key: raw_data key holding the exchange symbol, or a callable receiving raw_data
+        """
+        cache_key = (raw_key, tuple(any_of) if any_of is not None else None, tuple(sorted(criteria.items())))
+        id_map = self._id_maps.get(cache_key)
+        if id_map is None:
+            id_map = self._id_maps[cache_key] = {
+                _raw_symbol(self[instrument_id], raw_key): instrument_id
+                for instrument_id in self.ids(any_of, **criteria)
+            }
+        return id_map
+
+
+def _rebuild_registry(items: dict, keep_raw: bool) -> InstrumentRegistry:
+    return InstrumentRegistry(items, keep_raw=keep_raw)
+
+
+def _raw_symbol(info: dict, raw_key: RawKey) -> Hashable:
+    return raw_key(info["raw_data"]) if callable(raw_key) else info["raw_data"][raw_key]
+
+
+def _matches(info: dict, any_of: Optional[Iterable[str]], criteria: dict) -> bool:
+    if any_of is not None and not any(bool(info.get(flag)) for flag in any_of):
+        return False
+    return all(info.get(key) == value for key, value in criteria.items())
+
+
+def select_instruments(infos: dict, any_of: Optional[Iterable[str]] = None, **criteria) -> dict:
+    """
+    Filter exchange info by market type flags and base / quote / settle, using the registry indexes when `infos`
+    is an `InstrumentRegistry` and a linear scan otherwise
+    """
+    if isinstance(infos, InstrumentRegistry):
+        return infos.select(any_of, **criteria)
+    return {k: v for k, v in infos.items() if _matches(v, any_of, criteria)}
+
+
+def instrument_id_map(infos: dict, raw_key: RawKey, any_of: Optional[Iterable[str]] = None, **criteria) -> dict:
+    """
+    Exchange symbol -> unified id for the instruments matching the filters, see `select_instruments`
+    """
+    if isinstance(infos, InstrumentRegistry):
+        return infos.id_map(raw_key, any_of, **criteria)
+    return {_raw_symbol(v, raw_key): k for k, v in select_instruments(infos, any_of, **criteria).items()}
@@ -1,41 +1,57 @@
 import asyncio
-import time
-
-from .exchanges.kucoin import KucoinFutures, KucoinSpot
+from functools import partial
+from typing import Dict, List, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.kucoin import KucoinFutures, KucoinSpot, KucoinWebSocket
+from .orderbook import OrderBook, SnapshotSync
+from .pagination import (
+    INTERVAL_MS,
+    SECOND_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+)
 from .parsers.kucoin import KucoinParser
-from .utils import query_dict
+from .streaming import Stream, StreamingMixin
 
 
-class Kucoin(object):
+class Kucoin(ExchangeInfoMixin, PaginationMixin, StreamingMixin):
     name = "kucoin"
 
     def __init__(self):
         self.spot = KucoinSpot()
         self.futures = KucoinFutures()
         self.parser = KucoinParser()
+        for client in (self.spot, self.futures):
+            client.response_checker = self.parser.check_response
 
         self.exchange_info = {}
 
     async def close(self):
+        # stop the background exchange info refresh before its clients go away
+        await super().close()
         await self.spot.close()
         await self.futures.close()
 
-    async def sync_exchange_info(self):
-        self.exchange_info = await self.get_exchange_info()
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     async def get_exchange_info(self) -> dict:
-        spot = self.parser.parse_exchange_info(
-            await self.spot._get_symbol_list(), self.parser.spot_exchange_info_parser
-        )
-        futures = self.parser.parse_exchange_info(
-            await self.futures._get_symbol_list(), self.parser.futures_exchange_info_parser
+        spot, futures = await asyncio.gather(
+            self._parse_exchange_info(self.spot._get_symbol_list(), self.parser.spot_exchange_info_parser),
+            self._parse_exchange_info(self.futures._get_symbol_list(), self.parser.futures_exchange_info_parser),
         )
 
         return {**spot, **futures}
 
     async def get_tickers(self, market_type: str = None) -> dict:
         async def _get_derivative_tickers():
-            ids = list(query_dict(self.exchange_info, "is_futures == True or is_perp == True").keys())
+            ids = self.exchange_info.ids(any_of=("is_futures", "is_perp"))
             num_batch = 30
             results = {}
             for i in range(0, len(ids), num_batch):
@@ -43,10 +59,8 @@ class Kucoin(object):
                 for instrument_id in ids[i : i + num_batch]:
                     _symbol = self.exchange_info[instrument_id]["raw_data"]["symbol"]
                     tasks.append(self.futures._get_symbol_detail(_symbol))
+                # requests are paced by the futures client's rate limiter
                 raw_tickers = await asyncio.gather(*tasks)
-                # rest for 5 sec for every 5 requests to avoid rate limit
-                if i % 5 == 0:
-                    time.sleep(3)
                 parsed_tickers = self.parser.parse_derivative_tickers(raw_tickers, self.exchange_info)
                 results.update(parsed_tickers)
             return results
@@ -60,7 +74,7 @@ class Kucoin(object):
             tickers = {**spot_tickers, **derivative_tickers}
 
             if market_type:
-                ids = list(query_dict(self.exchange_info, f"is_{market_type} == True").keys())
+                ids = set(self.exchange_info.ids(**{f"is_{market_type}": True}))
                 return {k: v for k, v in tickers.items() if k in ids}
             else:
                 return tickers
@@ -80,6 +94,27 @@ class Kucoin(object):
 
         return {instrument_id: self.parser.parse_ticker(await method_map[market_type](_symbol), info, market_type)}
 
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        markets = {
+            "spot": (self.spot._get_public_ws_token, "/market/snapshot"),
+            "derivative": (self.futures._get_public_ws_token, "/contractMarket/snapshot"),
+        }
+        streams = []
+        groups = self._group_instruments(instrument_ids, lambda info: "spot" if info["is_spot"] else "derivative")
+        for market_type, ids in groups.items():
+            token_fetcher, prefix = markets[market_type]
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"{prefix}:{symbol}" for symbol in id_map]
+
+            def parse(message, id_map=id_map, market_type=market_type):
+                instrument_id = id_map[message["topic"].split(":", 1)[1]]
+                # spot snapshots nest the ticker one level deeper
+                data = message["data"]["data"] if market_type == "spot" else message["data"]
+                yield instrument_id, self.parser.parse_ws_ticker(data, self.exchange_info[instrument_id], market_type)
+
+            streams.append(Stream(KucoinWebSocket(token_fetcher, topics), parse))
+        return streams
+
     async def get_last_price(self, instrument_id: str) -> dict:
         ticker = await self.get_ticker(instrument_id)
         ticker = ticker[instrument_id]
@@ -120,7 +155,7 @@ class Kucoin(object):
 
         return self.parser.parse_index_price(await self.futures._get_current_mark_price(_symbol), info)
 
-    async def get_orderbook(self, instrument_id: str, depth: int = None):
+    async def get_orderbook(self, instrument_id: str, depth: int = None, as_arrays: bool = False):
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} is not found in {self.name} exchange info.")
 
@@ -132,8 +167,13 @@ class Kucoin(object):
             "derivative": self.futures._get_full_orderbook,
         }
 
-        results = self.parser.parse_orderbook(await method_map[market_type](_symbol), info, market_type)
+        response = await method_map[market_type](_symbol)
+        if as_arrays:
+            # sorted on construction
+            orderbook = self.parser.parse_orderbook(response, info, market_type, as_arrays=True)
+            return orderbook.truncate(depth) if depth else orderbook
 
+        results = self.parser.parse_orderbook(response, info, market_type)
         results["bids"] = sorted(results["bids"], key=lambda x: x["price"], reverse=True)
         results["asks"] = sorted(results["asks"], key=lambda x: x["price"])
         if depth:
@@ -141,6 +181,132 @@ class Kucoin(object):
             results["asks"] = results["asks"][:depth]
         return results
 
+    async def _orderbook_snapshot(self, symbol: str, market_type: str) -> dict:
+        if market_type == "spot":
+            data = self.parser.check_response(await self.spot._get_full_orderbook(symbol))["data"]
+            timestamp = data["time"]
+        else:
+            data = self.parser.check_response(await self.futures._get_full_orderbook(symbol))["data"]
+            # nanoseconds
+            timestamp = data["ts"] // 1_000_000
+        return {"bids": data["bids"], "asks": data["asks"], "timestamp": timestamp, "sequence": int(data["sequence"])}
+
+    def _apply_spot_level2(self, book: OrderBook, data: dict) -> bool:
+        if data["sequenceEnd"] <= book.sequence:
+            return False
+        # every change carries its own sequence, the ones already in the book are skipped; a "0" price only advances
+        # the sequence
+        changes = data["changes"]
+        bids, asks = (
+            [level for level in changes[side] if int(level[2]) > book.sequence and level[0] != "0"]
+            for side in ("bids", "asks")
+        )
+        return book.apply(
+            bids,
+            asks,
+            timestamp=data["time"],
+            sequence=data["sequenceEnd"],
+            prev_sequence=max(data["sequenceStart"] - 1, book.sequence),
+        )
+
+    def _apply_futures_level2(self, book: OrderBook, data: dict) -> bool:
+        if data["sequence"] <= book.sequence:
+            return False
+        price, side, size = data["change"].split(",")
+        levels = [[price, size]]
+        return book.apply(
+            levels if side == "buy" else [],
+            levels if side == "sell" else [],
+            timestamp=data["timestamp"],
+            sequence=data["sequence"],
+            prev_sequence=data["sequence"] - 1,
+        )
+
+    def _orderbook_streams(self, books: Dict[str, OrderBook]) -> List[Stream]:
+        # the level2 channels only push diffs, books start from a REST snapshot and are fetched again after a gap
+        markets = {
+            "spot": (self.spot._get_public_ws_token, "/market/level2", self._apply_spot_level2),
+            "derivative": (self.futures._get_public_ws_token, "/contractMarket/level2", self._apply_futures_level2),
+        }
+        streams = []
+        groups = self._group_instruments(list(books), lambda info: "spot" if info["is_spot"] else "derivative")
+        for market_type, ids in groups.items():
+            token_fetcher, prefix, apply_diff = markets[market_type]
+            syncs = {}
+            for instrument_id in ids:
+                symbol = self.exchange_info[instrument_id]["raw_data"]["symbol"]
+                fetch = partial(self._orderbook_snapshot, symbol, market_type)
+                syncs[symbol] = SnapshotSync(books[instrument_id], fetch, apply_diff)
+            topics = [f"{prefix}:{symbol}" for symbol in syncs]
+
+            def parse(message, syncs=syncs):
+                sync = syncs[message["topic"].split(":", 1)[1]]
+                if sync.push(message["data"]):
+                    yield sync.book.instrument_id, sync.book
+
+            def close(syncs=syncs):
+                for sync in syncs.values():
+                    sync.cancel()
+
+            streams.append(Stream(KucoinWebSocket(token_fetcher, topics), parse, close))
+        return streams
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        markets = {
+            "spot": (self.spot._get_public_ws_token, "/market/candles"),
+            "derivative": (self.futures._get_public_ws_token, "/contractMarket/limitCandle"),
+        }
+        streams = []
+        groups = self._group_instruments(instrument_ids, lambda info: "spot" if info["is_spot"] else "derivative")
+        for market_type, ids in groups.items():
+            token_fetcher, prefix = markets[market_type]
+            # both markets name the intervals of the spot klines
+            types = {}
+            for interval in intervals:
+                self.parser.get_interval(interval, market_type)
+                types[self.parser.get_interval(interval, "spot")] = interval
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"{prefix}:{symbol}_{candle_type}" for candle_type in types for symbol in id_map]
+
+            def parse(message, id_map=id_map, types=types):
+                # "<prefix>:<symbol>_<type>", candles carry no closed flag
+                symbol, candle_type = message["topic"].split(":", 1)[1].rsplit("_", 1)
+                instrument_id = id_map[symbol]
+                info = self.exchange_info[instrument_id]
+                candle = self.parser.parse_ws_candlestick(message["data"]["candles"], info, types[candle_type])
+                yield instrument_id, (candle, None)
+
+            for chunk in self._split_topics(topics, KucoinWebSocket):
+                websocket = KucoinWebSocket(token_fetcher, chunk)
+                # one symbol and interval per candle topic
+                websocket.SUBSCRIBE_BATCH = 1
+                streams.append(Stream(websocket, parse))
+        return streams
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        markets = {
+            "spot": (self.spot._get_public_ws_token, "/market/match"),
+            "derivative": (self.futures._get_public_ws_token, "/contractMarket/execution"),
+        }
+        streams = []
+        groups = self._group_instruments(instrument_ids, lambda info: "spot" if info["is_spot"] else "derivative")
+        for market_type, ids in groups.items():
+            token_fetcher, prefix = markets[market_type]
+            id_map = {self.exchange_info[i]["raw_data"]["symbol"]: i for i in ids}
+            topics = [f"{prefix}:{symbol}" for symbol in id_map]
+
+            def parse(message, id_map=id_map):
+                instrument_id = id_map[message["data"]["symbol"]]
+                yield instrument_id, self.parser.parse_ws_trade(message["data"], self.exchange_info[instrument_id])
+
+            for chunk in self._split_topics(topics, KucoinWebSocket):
+                websocket = KucoinWebSocket(token_fetcher, chunk)
+                if market_type == "derivative":
+                    # the futures execution topic takes one symbol
+                    websocket.SUBSCRIBE_BATCH = 1
+                streams.append(Stream(websocket, parse))
+        return streams
+
     async def get_current_candlestick(self, instrument_id: str, interval: str) -> dict:
         if instrument_id not in self.exchange_info:
             raise ValueError(f"{instrument_id} is not found in {self.name} exchange info.")
@@ -166,6 +332,27 @@ class Kucoin(object):
             )
         }
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        if interval not in INTERVAL_MS:
+            return None
+
+        info = self.exchange_info[instrument_id]
+        market_type = "spot" if info["is_spot"] else "derivative"
+        params = {
+            "symbol": info["raw_data"]["symbol"],
+            "granularity" if market_type == "derivative" else "type": self.parser.get_interval(interval, market_type),
+        }
+        fetch = self.spot._get_klines if market_type == "spot" else self.futures._get_klines
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_history_candlesticks(await fetch(**params, **window), info, market_type, interval)
+
+        # spot takes seconds and answers newest first, futures milliseconds and oldest first
+        if market_type == "spot":
+            cursor = TimeCursor("start", "end", unit=SECOND_MS, newest_first=True)
+            return HistoryPages(fetch_page, cursor, 100, INTERVAL_MS[interval])
+        return HistoryPages(fetch_page, TimeCursor("start", "end"), 200, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -187,9 +374,13 @@ class Kucoin(object):
             "granularity" if market_type == "derivative" else "type": _interval,
         }
 
-        results = []
+        results = TimestampBuffer()
         query_end = None
-        if start and end:
+        pages = self._candlestick_pages(instrument_id, interval) if start and end else None
+        if pages is not None:
+            return await self._fetch_pages(pages, start, end)
+
+        elif start and end:
             query_end = self.parser.parse_kucoin_timestamp(end, market_type) + 1
             while True:
                 params.update({"end": query_end})
@@ -197,23 +388,17 @@ class Kucoin(object):
                     await method_map[market_type](**params), info, market_type, interval
                 )
 
-                results.extend(klines)
-
-                # exclude same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                klines = results.add(klines)
                 if len(klines) < limit_map[market_type]:
                     break
 
-                query_end = min([v["timestamp"] for v in results])
+                query_end = min(v["timestamp"] for v in klines)
                 if query_end < start:
                     break
 
-                query_end = self.parser.parse_kucoin_timestamp(min([v["timestamp"] for v in results]), market_type) + 1
+                query_end = self.parser.parse_kucoin_timestamp(min([v["timestamp"] for v in klines]), market_type) + 1
                 continue
-            return sorted(
-                [v for v in results if start <= v["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return results.sorted(start, end)
 
         elif num:
             while True:
@@ -222,11 +407,7 @@ class Kucoin(object):
                     await method_map[market_type](**params), info, market_type, interval
                 )
 
-                results.extend(klines)
-
-                # exclude same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                klines = results.add(klines)
                 if len(results) >= num or len(klines) < limit_map[market_type]:
                     break
 
@@ -236,7 +417,7 @@ class Kucoin(object):
                     else min(v["timestamp"] for v in klines)
                 ) + 1
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
 
         else:
             raise ValueError("Invalid parameters. (start, end) or (end, num) or (num) must be provided.")
@@ -254,6 +435,11 @@ class Kucoin(object):
             )
         }
 
+    def _funding_interval_ms(self, info: dict) -> int:
+        # contracts list their funding interval in ms
+        granularity = info["raw_data"].get("fundingRateGranularity")
+        return int(granularity) if granularity else super()._funding_interval_ms(info)
+
     async def get_history_funding_rate(
         self, instrument_id: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -265,50 +451,31 @@ class Kucoin(object):
 
         params = {"symbol": _symbol}
 
-        results = []
+        results = TimestampBuffer()
         query_end = end if end else self.parser.get_timestamp()
         query_start = start if start else query_end - 10 * 365 * 24 * 60 * 60 * 1000
         implied_limit = 100
         if start and end:
-            while True:
-                params.update({"to": query_end, "_from": query_start})
-                result = self.parser.parse_history_funding_rate(
-                    await self.futures._get_public_funding_history(**params), info
-                )
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
-                if len(result) < implied_limit:
-                    break
-
-                query_end = min([v["timestamp"] for v in result])
+            cursor = TimeCursor("_from", "to", newest_first=True)
 
-                if min([v["timestamp"] for v in results]) < start:
-                    break
-                continue
+            async def fetch_page(**window) -> list:
+                response = await self.futures._get_public_funding_history(**params, **window)
+                return self.parser.parse_history_funding_rate(response, info)
 
-            return sorted(
-                [v for v in results if start <= v["timestamp"] <= end], key=lambda x: x["timestamp"], reverse=False
-            )
+            return await self._fetch_funding_range(fetch_page, cursor, start, end, implied_limit, info)
         elif num:
             while True:
                 params.update({"to": query_end, "_from": query_start})
                 result = self.parser.parse_history_funding_rate(
                     await self.futures._get_public_funding_history(**params), info
                 )
-                results.extend(result)
-
-                # exclude data with same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if len(result) < implied_limit or len(results) >= num:
                     break
 
-                query_end = min([v["timestamp"] for v in results])
+                query_end = min([v["timestamp"] for v in result])
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
 
         else:
             raise ValueError("(start, end) or num must be provided")
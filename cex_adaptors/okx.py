@@ -1,28 +1,21 @@
 import asyncio
-import math
-
-from .exchanges.okx import OkxUnified
+from typing import Dict, List, Optional
+
+from .exchange_info import ExchangeInfoMixin
+from .exchanges.okx import OkxPrivateWebSocket, OkxUnified, OkxWebSocket
+from .orderbook import OrderBook, OrderBookOutOfSync
+from .pagination import (
+    INTERVAL_MS,
+    HistoryPages,
+    PaginationMixin,
+    TimeCursor,
+    TimestampBuffer,
+)
 from .parsers.okx import OkxParser
+from .streaming import Stream, StreamingMixin
+
 
-_INTERVAL_MS = {
-    "1m": 60_000,
-    "3m": 180_000,
-    "5m": 300_000,
-    "15m": 900_000,
-    "30m": 1_800_000,
-    "1h": 3_600_000,
-    "2h": 7_200_000,
-    "4h": 14_400_000,
-    "6h": 21_600_000,
-    "12h": 43_200_000,
-    "1d": 86_400_000,
-    "2d": 172_800_000,
-    "3d": 259_200_000,
-    "1w": 604_800_000,
-}
-
-
-class Okx(OkxUnified):
+class Okx(ExchangeInfoMixin, PaginationMixin, StreamingMixin, OkxUnified):
     name = "okx"
     market_type_map = {"spot": "SPOT", "margin": "MARGIN", "futures": "FUTURES", "perp": "SWAP"}
     _market_type_map = {"SPOT": "spot", "MARGIN": "margin", "FUTURES": "futures", "SWAP": "perp"}
@@ -31,11 +24,9 @@ class Okx(OkxUnified):
         super().__init__(api_key=api_key, api_secret=api_secret, passphrase=passphrase, flag=flag)
 
         self.parser = OkxParser()
+        self.response_checker = self.parser.check_response
         self.exchange_info = {}
 
-    async def sync_exchange_info(self):
-        self.exchange_info = await self.get_exchange_info()
-
     async def get_exchange_info(self, market_type: str = None):
         if market_type:
             parser = (
@@ -48,16 +39,20 @@ class Okx(OkxUnified):
             )
 
         else:
-            spot_raw, margin_raw, futures_raw, perp_raw = await asyncio.gather(
-                self._get_exchange_info("SPOT"),
-                self._get_exchange_info("MARGIN"),
-                self._get_exchange_info("FUTURES"),
-                self._get_exchange_info("SWAP"),
+            spot, margin, futures, perp = await asyncio.gather(
+                self._parse_exchange_info(
+                    self._get_exchange_info("SPOT"), self.parser.spot_margin_exchange_info_parser
+                ),
+                self._parse_exchange_info(
+                    self._get_exchange_info("MARGIN"), self.parser.spot_margin_exchange_info_parser
+                ),
+                self._parse_exchange_info(
+                    self._get_exchange_info("FUTURES"), self.parser.futures_perp_exchange_info_parser
+                ),
+                self._parse_exchange_info(
+                    self._get_exchange_info("SWAP"), self.parser.futures_perp_exchange_info_parser
+                ),
             )
-            spot = self.parser.parse_exchange_info(spot_raw, self.parser.spot_margin_exchange_info_parser)
-            margin = self.parser.parse_exchange_info(margin_raw, self.parser.spot_margin_exchange_info_parser)
-            futures = self.parser.parse_exchange_info(futures_raw, self.parser.futures_perp_exchange_info_parser)
-            perp = self.parser.parse_exchange_info(perp_raw, self.parser.futures_perp_exchange_info_parser)
             exchange_info = {**self.parser.combine_spot_margin_exchange_info(spot, margin), **futures, **perp}
         return exchange_info
 
@@ -85,6 +80,19 @@ class Okx(OkxUnified):
         info = self.exchange_info[instrument_id]
         return self.parser.parse_ticker(await self._get_ticker(_instrument_id), market_type, info)
 
+    def _ticker_streams(self, instrument_ids: list) -> List[Stream]:
+        # spot and margin share an instId, records go to the requested id
+        id_map = {self.exchange_info[i]["raw_data"]["instId"]: i for i in instrument_ids}
+        topics = [{"channel": "tickers", "instId": inst_id} for inst_id in id_map]
+
+        def parse(message):
+            for data in message["data"]:
+                info = self.exchange_info[id_map[data["instId"]]]
+                market_type = self._market_type_map[data["instType"]]
+                yield id_map[data["instId"]], self.parser.parse_ticker(data, market_type, info)
+
+        return [Stream(OkxWebSocket(OkxWebSocket.URLS["public"], topics), parse)]
+
     async def get_current_candlestick(self, instrument_id: str, interval: str) -> dict:
         if instrument_id not in self.exchange_info:
             raise Exception(f"{instrument_id} not in exchange_info")
@@ -98,6 +106,20 @@ class Okx(OkxUnified):
 
         return {instrument_id: self.parser.parse_candlesticks(await self._get_klines(**params), info, interval)}
 
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        if interval not in INTERVAL_MS:
+            return None
+
+        info = self.exchange_info[instrument_id]
+        limit = 300
+        params = {"instId": info["raw_data"]["instId"], "bar": self.parser.get_interval(interval), "limit": limit}
+
+        async def fetch_page(**window) -> list:
+            return self.parser.parse_candlesticks(await self._get_klines(**params, **window), info, interval)
+
+        cursor = TimeCursor("before", "after", exclusive=True, newest_first=True)
+        return HistoryPages(fetch_page, cursor, limit, INTERVAL_MS[interval])
+
     async def get_history_candlesticks(
         self, instrument_id: str, interval: str, start: int = None, end: int = None, num: int = None
     ) -> list:
@@ -108,67 +130,38 @@ class Okx(OkxUnified):
 
         params = {"instId": _instrument_id, "bar": _interval, "limit": limit}
 
-        results = []
+        results = TimestampBuffer()
         if start and end:
-            interval_ms = _INTERVAL_MS.get(interval)
-            if interval_ms is not None:
-                # Page spans `limit * interval_ms`; anchors paginate backwards from `end + 1`.
-                page_span = limit * interval_ms
-                num_pages = math.ceil((end - start) / page_span) + 1
-                anchors = [end + 1 - i * page_span for i in range(num_pages) if end + 1 - i * page_span > start]
-
-                raw_pages = await asyncio.gather(
-                    *(self._get_klines(instId=_instrument_id, bar=_interval, limit=limit, after=a) for a in anchors)
-                )
-                dedup = {}
-                for raw in raw_pages:
-                    page = self.parser.parse_candlesticks(raw, info, interval)
-                    if isinstance(page, dict):
-                        page = [page]
-                    for item in page:
-                        dedup[item["timestamp"]] = item
-                results = sorted(
-                    (v for v in dedup.values() if start <= v["timestamp"] <= end),
-                    key=lambda x: x["timestamp"],
-                )
+            pages = self._candlestick_pages(instrument_id, interval)
+            if pages is not None:
+                results = await self._fetch_pages(pages, start, end)
             else:
                 # Unknown ms-per-candle (e.g. 1M/3M); fall back to serial pagination.
                 query_end = end + 1
                 while True:
                     params.update({"after": query_end})
                     datas = self.parser.parse_candlesticks(await self._get_klines(**params), info, interval)
-                    results.extend(datas)
-
-                    # exclude same timestamp datas
-                    results = list({v["timestamp"]: v for v in results}.values())
-
+                    datas = results.add(datas)
                     if not datas or len(datas) < limit:
                         break
-                    query_end = min(v["timestamp"] for v in datas) + 1
-                    if query_end < start:
+                    # `after` is exclusive, the oldest candle of this page is the next cursor
+                    query_end = min(v["timestamp"] for v in datas)
+                    if query_end <= start:
                         break
-                results = sorted(
-                    [v for v in results if start <= v["timestamp"] <= end],
-                    key=lambda x: x["timestamp"],
-                    reverse=False,
-                )
+                results = results.sorted(start, end)
         elif num:
             query_end = end
             while True:
                 params.update({"after": query_end} if query_end else {})
                 datas = self.parser.parse_candlesticks(await self._get_klines(**params), info, interval)
-                results.extend(datas)
-
-                # exclude same timestamp datas
-                results = list({v["timestamp"]: v for v in results}.values())
-
-                if not datas or len(datas) < limit:
+                datas = results.add(datas)
+                if not datas or len(datas) < limit or len(results) >= num:
                     break
 
                 query_end = min([v["timestamp"] for v in datas])
                 continue
 
-            results = sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            results = results.latest(num)
         else:
             raise Exception("invalid params")
 
@@ -184,26 +177,16 @@ class Okx(OkxUnified):
         _instrument_id = info["raw_data"]["instId"]
         limit = 100
         params = {"instId": _instrument_id, "limit": limit}
-        results = []
+        results = TimestampBuffer()
         query_end = None
 
         if start and end:
-            query_end = end + 1
-            while True:
-                params.update({"after": query_end})
-                result = self.parser.parse_funding_rates(
-                    await self._get_history_funding_rate(**params),
-                    info,
-                )
-                results.extend(result)
-                if not result or len(result) < limit:
-                    break
-                query_end = min([v["timestamp"] for v in result])
+            cursor = TimeCursor("before", "after", exclusive=True, newest_first=True)
 
-                if query_end < start:
-                    break
-                continue
-            return [v for v in results if start <= v["timestamp"] <= end]
+            async def fetch_page(**window) -> list:
+                return self.parser.parse_funding_rates(await self._get_history_funding_rate(**params, **window), info)
+
+            return await self._fetch_funding_range(fetch_page, cursor, start, end, limit, info)
 
         elif num:
             while True:
@@ -212,17 +195,13 @@ class Okx(OkxUnified):
                     await self._get_history_funding_rate(**params),
                     info,
                 )
-                results.extend(result)
-
-                # exclude same timestamp
-                results = list({v["timestamp"]: v for v in results}.values())
-
+                result = results.add(result)
                 if not result or len(result) < limit or len(results) >= num:
                     break
 
                 query_end = min([v["timestamp"] for v in result])
                 continue
-            return sorted(results, key=lambda x: x["timestamp"], reverse=False)[-num:]
+            return results.latest(num)
 
         else:
             raise Exception("(start, end) or num must be provided")
@@ -275,12 +254,92 @@ class Okx(OkxUnified):
         else:
             raise Exception("perp_instrument_id or market must be provided")
 
-    async def get_orderbook(self, instrument_id: str, depth: int = 20):
+    async def get_orderbook(self, instrument_id: str, depth: int = 20, as_arrays: bool = False):
         if instrument_id not in self.exchange_info:
             raise Exception(f"{instrument_id} not in exchange_info")
         info = self.exchange_info[instrument_id]
         _instrument_id = info["raw_data"]["instId"]
-        return self.parser.parse_orderbook(await self._get_orderbook(_instrument_id, str(depth)), info)
+        return self.parser.parse_orderbook(await self._get_orderbook(_instrument_id, str(depth)), info, as_arrays)
+
+    def _orderbook_streams(self, books: Dict[str, OrderBook]) -> List[Stream]:
+        # spot and margin share an instId and its book updates
+        inst_books = {}
+        for instrument_id, book in books.items():
+            inst_books.setdefault(self.exchange_info[instrument_id]["raw_data"]["instId"], []).append(book)
+        # "books" pushes a snapshot on subscribe, then diffs of up to 400 levels with sequence ids and a checksum
+        topics = [{"channel": "books", "instId": inst_id} for inst_id in inst_books]
+        websocket = OkxWebSocket(OkxWebSocket.URLS["public"], topics)
+
+        def parse(message):
+            for data in message["data"]:
+                for book in inst_books[message["arg"]["instId"]]:
+                    try:
+                        applied = book.apply(
+                            data["bids"],
+                            data["asks"],
+                            timestamp=int(data["ts"]),
+                            sequence=data["seqId"],
+                            prev_sequence=data["prevSeqId"],
+                            checksum=data["checksum"],
+                            snapshot=message["action"] == "snapshot",
+                        )
+                    except OrderBookOutOfSync:
+                        # resubscribing sends fresh snapshots
+                        websocket.reconnect()
+                        continue
+                    if applied:
+                        yield book.instrument_id, book
+
+        return [Stream(websocket, parse)]
+
+    def _candlestick_streams(self, instrument_ids: list, intervals: list) -> List[Stream]:
+        id_map = {self.exchange_info[i]["raw_data"]["instId"]: i for i in instrument_ids}
+        channels = {f"candle{self.parser.get_interval(interval)}": interval for interval in intervals}
+        topics = [{"channel": channel, "instId": inst_id} for channel in channels for inst_id in id_map]
+
+        def parse(message):
+            instrument_id = id_map[message["arg"]["instId"]]
+            interval = channels[message["arg"]["channel"]]
+            info = self.exchange_info[instrument_id]
+            for data in message["data"]:
+                # the rows of the REST endpoint, "confirm" is "1" once the candle is complete
+                candle = self.parser.parse_candlesticks({"code": "0", "data": [data]}, info, interval)
+                yield instrument_id, (candle, data[8] == "1")
+
+        url = OkxWebSocket.URLS["business"]
+        return [Stream(OkxWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, OkxWebSocket)]
+
+    def _trade_streams(self, instrument_ids: list) -> List[Stream]:
+        id_map = {self.exchange_info[i]["raw_data"]["instId"]: i for i in instrument_ids}
+        topics = [{"channel": "trades", "instId": inst_id} for inst_id in id_map]
+
+        def parse(message):
+            for data in message["data"]:
+                instrument_id = id_map[data["instId"]]
+                yield instrument_id, self.parser.parse_ws_trade(data, self.exchange_info[instrument_id])
+
+        url = OkxWebSocket.URLS["public"]
+        return [Stream(OkxWebSocket(url, chunk), parse) for chunk in self._split_topics(topics, OkxWebSocket)]
+
+    def _account_streams(self) -> List[Stream]:
+        # "positions" pushes a snapshot of the open positions on subscribe, "orders" only pushes changes
+        topics = [{"channel": "orders", "instType": "ANY"}, {"channel": "positions", "instType": "ANY"}]
+        id_map = self.parser.get_id_map(self.exchange_info)
+
+        def parse(message):
+            for data in message["data"]:
+                if data["instId"] not in id_map:
+                    continue
+                # the rows of the REST endpoints
+                response = {"code": "0", "data": [data]}
+                if message["arg"]["channel"] == "orders":
+                    info = self.exchange_info[id_map[data["instId"]]]
+                    yield "order", self.parser.parse_order_info(response, info)
+                else:
+                    yield "position", self.parser.parse_positions(response, self.exchange_info)
+
+        url = OkxWebSocket.URLS["private_demo" if self.flag == "1" else "private"]
+        return [Stream(OkxPrivateWebSocket(url, topics, self.auth_data), parse)]
 
     # Private endpoint
 
@@ -310,7 +369,7 @@ class Okx(OkxUnified):
                 tgtCcy="quote_ccy" if in_quote else "base_ccy",
             )
         )
-        return self.parser.parse_order_info(await self._get_order_info(_instrument_id, order_id), info)
+        return await self._placed_order_info(_instrument_id, order_id, info)
 
     async def place_limit_order(
         self, instrument_id: str, side: str, price: float, volume: float, in_quote: bool = False
@@ -332,7 +391,14 @@ class Okx(OkxUnified):
                 tgtCcy="quote_ccy" if in_quote else "base_ccy",
             )
         )
-        return self.parser.parse_order_info(await self._get_order_info(_instrument_id, order_id), info)
+        return await self._placed_order_info(_instrument_id, order_id, info)
+
+    async def _placed_order_info(self, inst_id: str, order_id: str, info: dict) -> dict:
+        # pushed by a running `watch_account`, saving a round-trip
+        order = await self._pushed_order(order_id)
+        if order is not None:
+            return order
+        return self.parser.parse_order_info(await self._get_order_info(inst_id, order_id), info)
 
     async def cancel_order(self, instrument_id: str, order_id: str):
         if instrument_id not in self.exchange_info:
@@ -0,0 +1,477 @@
+import asyncio
+import zlib
+from bisect import bisect_left, insort
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .candles import _import_numpy
+
+# levels per side hashed by the OKX and Bitget book checksums
+CHECKSUM_LEVELS = 25
+
+
+class OrderBookOutOfSync(Exception):
+    """
+    An update does not follow the local book: a sequence gap or a checksum mismatch. The book needs a new snapshot.
+    """
+
+
+class OrderBookSide(object):
+    """
+    Price levels of one side, keyed by price. Levels are kept as the exchange sent them (`[price, size, ...]`) so
+    checksums hash the original strings.
+
+    Keys are sorted with the best price last, prices negated on the ask side, so the busy top of the book sits at the
+    cheap end of the list for inserts and deletes and the best level is read in constant time.
+    """
+
+    __slots__ = ("_sign", "_keys", "_levels")
+
+    def __init__(self, is_bid: bool):
+        self._sign = 1.0 if is_bid else -1.0
+        self._keys: List[float] = []
+        self._levels: Dict[float, Sequence] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._levels.clear()
+
+    def update(self, levels: Iterable[Sequence]) -> None:
+        """
+        :param levels: `[price, size, ...]`, a zero size deletes the level
+        """
+        for level in levels:
+            key = self._sign * float(level[0])
+            if float(level[1]) == 0:
+                if self._levels.pop(key, None) is not None:
+                    del self._keys[bisect_left(self._keys, key)]
+            else:
+                if key not in self._levels:
+                    insort(self._keys, key)
+                self._levels[key] = level
+
+    def best(self) -> Optional[Sequence]:
+        return self._levels[self._keys[-1]] if self._keys else None
+
+    def top(self, depth: Optional[int] = None) -> List[Sequence]:
+        """
+        :return: raw levels, best first
+        """
+        keys = self._keys if depth is None else self._keys[-depth:] if depth > 0 else []
+        return [self._levels[key] for key in reversed(keys)]
+
+
+def _parse_level(level: Sequence) -> dict:
+    # OKX levels carry the number of orders as 4th field
+    return {
+        "price": float(level[0]),
+        "volume": float(level[1]),
+        "order_number": int(level[3]) if len(level) > 3 else None,
+    }
+
+
+class OrderBook(object):
+    """
+    L2 order book of one instrument, maintained from a snapshot and streamed diffs.
+
+    `apply` validates every update against the book, best bid/ask are read in constant time and `top` returns the
+    first levels in the output format of `get_orderbook`. A book that fell out of sync ignores updates until the
+    next snapshot.
+    """
+
+    __slots__ = ("instrument_id", "bids", "asks", "sequence", "timestamp", "synced")
+
+    def __init__(self, instrument_id: str):
+        self.instrument_id = instrument_id
+        self.bids = OrderBookSide(is_bid=True)
+        self.asks = OrderBookSide(is_bid=False)
+        self.sequence: Optional[int] = None
+        self.timestamp: Optional[int] = None
+        # False until the first snapshot and after an update failed validation
+        self.synced = False
+
+    def __repr__(self) -> str:
+        return f"OrderBook({self.instrument_id}, {len(self.bids)} bids, {len(self.asks)} asks, seq={self.sequence})"
+
+    def apply(
+        self,
+        bids: Iterable[Sequence],
+        asks: Iterable[Sequence],
+        timestamp: Optional[int] = None,
+        sequence: Optional[int] = None,
+        prev_sequence: Optional[int] = None,
+        checksum: Optional[int] = None,
+        snapshot: bool = False,
+    ) -> bool:
+        """
+        Apply a snapshot or a diff
+        :param bids: bid levels `[price, size, ...]`, zero sizes delete levels
+        :param asks: ask levels
+        :param timestamp: exchange timestamp in ms
+        :param sequence: sequence number of the update
+        :param prev_sequence: sequence the update follows, checked against the book's for diffs
+        :param checksum: exchange checksum of the top levels once the update is applied, see `checksum`
+        :param snapshot: replace the book instead of updating it
+        :return: False when the book is out of sync and the diff was ignored
+        :raise OrderBookOutOfSync: on a sequence gap or checksum mismatch, the book stays out of sync
+        """
+        if snapshot:
+            self.bids.clear()
+            self.asks.clear()
+        elif not self.synced:
+            return False
+        elif prev_sequence is not None and prev_sequence != self.sequence:
+            self.synced = False
+            raise OrderBookOutOfSync(
+                f"{self.instrument_id} update follows sequence {prev_sequence}, book is at {self.sequence}"
+            )
+
+        self.bids.update(bids)
+        self.asks.update(asks)
+        self.sequence = sequence
+        self.timestamp = timestamp
+        if checksum is not None and checksum != self.checksum():
+            self.synced = False
+            raise OrderBookOutOfSync(f"{self.instrument_id} checksum mismatch at sequence {sequence}")
+        self.synced = True
+        return True
+
+    def checksum(self, levels: int = CHECKSUM_LEVELS) -> int:
+        """
+        CRC32 of the top levels interleaved as `bid price:bid size:ask price:ask size:...`, as a signed 32-bit int,
+        the book checksum of OKX and Bitget
+        """
+        bids = self.bids.top(levels)
+        asks = self.asks.top(levels)
+        fields = []
+        for i in range(max(len(bids), len(asks))):
+            if i < len(bids):
+                fields.extend(bids[i][:2])
+            if i < len(asks):
+                fields.extend(asks[i][:2])
+        crc = zlib.crc32(":".join(fields).encode())
+        return crc - (1 << 32) if crc >= 1 << 31 else crc
+
+    @property
+    def best_bid(self) -> Optional[dict]:
+        level = self.bids.best()
+        return _parse_level(level) if level is not None else None
+
+    @property
+    def best_ask(self) -> Optional[dict]:
+        level = self.asks.best()
+        return _parse_level(level) if level is not None else None
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        bid = self.bids.best()
+        ask = self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (float(bid[0]) + float(ask[0])) / 2
+
+    def top(self, depth: Optional[int] = None) -> dict:
+        """
+        :param depth: levels per side, every level by default
+        :return: the book in the output format of `get_orderbook`
+        """
+        return {
+            "timestamp": self.timestamp,
+            "perp_instrument_id": self.instrument_id,
+            "asks": [_parse_level(level) for level in self.asks.top(depth)],
+            "bids": [_parse_level(level) for level in self.bids.top(depth)],
+            "raw_data": None,
+        }
+
+    def to_arrays(self, depth: Optional[int] = None) -> "OrderBookArrays":
+        """
+        Copy of the first levels as an `OrderBookArrays`, for vectorised queries; requires numpy
+        """
+        return OrderBookArrays.from_levels(
+            self.instrument_id, self.bids.top(depth), self.asks.top(depth), self.timestamp
+        )
+
+
+class SnapshotSync(object):
+    """
+    Keeps an `OrderBook` in sync on streams pushing diffs only: diffs are buffered while a REST snapshot is fetched,
+    then the ones newer than the snapshot are replayed onto it. The same happens again after a gap.
+
+    The snapshot is fetched in the background and applied with the next diff, so `push` stays synchronous.
+    """
+
+    def __init__(
+        self,
+        book: OrderBook,
+        fetch_snapshot: Callable[[], Awaitable[dict]],
+        apply_diff: Callable[[OrderBook, dict], bool],
+    ):
+        """
+        :param book: book to maintain
+        :param fetch_snapshot: returns the keyword arguments of `OrderBook.apply` for the snapshot
+        :param apply_diff: applies one diff to the book, skipping diffs older than the book and raising
+            `OrderBookOutOfSync` on gaps
+        """
+        self.book = book
+        self.fetch_snapshot = fetch_snapshot
+        self.apply_diff = apply_diff
+        self._pending: List[dict] = []
+        self._task: Optional[asyncio.Future] = None
+
+    def push(self, diff: dict) -> bool:
+        """
+        :return: True when the book is in sync and includes `diff`
+        """
+        if self.book.synced:
+            try:
+                return self.apply_diff(self.book, diff)
+            except OrderBookOutOfSync:
+                pass
+
+        self._pending.append(diff)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.fetch_snapshot())
+            return False
+        if not self._task.done():
+            return False
+
+        task, self._task = self._task, None
+        if task.exception() is not None:
+            # fetched again with the next diff, the buffer keeps growing until then
+            return False
+        pending, self._pending = self._pending, []
+        self.book.apply(**task.result(), snapshot=True)
+        try:
+            for diff in pending:
+                self.apply_diff(self.book, diff)
+        except OrderBookOutOfSync:
+            # the snapshot is older than the buffered diffs
+            return False
+        return True
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+class BookSideArrays(object):
+    """
+    Price levels of one side as contiguous float64 `price` and `size` arrays, best level first, so the first levels
+    are a slice of the arrays. Updates find a level by binary search and shift the arrays in place; depth, VWAP and
+    slippage queries run vectorised over the levels.
+    """
+
+    __slots__ = ("is_bid", "_sign", "_key", "_price", "_size", "_len")
+
+    def __init__(self, price, size, is_bid: bool):
+        """
+        :param price: level prices, in any order
+        :param size: level sizes
+        :param is_bid: bids are sorted descending, asks ascending
+        """
+        np = _import_numpy()
+        self.is_bid = is_bid
+        # `_key` ascends for both sides (negated bid prices) for `np.searchsorted`
+        self._sign = -1.0 if is_bid else 1.0
+        price = np.asarray(price, dtype=np.float64)
+        order = np.argsort(self._sign * price, kind="stable")
+        self._price = price[order]
+        self._size = np.asarray(size, dtype=np.float64)[order]
+        self._key = self._sign * self._price
+        self._len = len(self._price)
+
+    @classmethod
+    def _view(cls, side: "BookSideArrays", depth: int) -> "BookSideArrays":
+        view = cls.__new__(cls)
+        view.is_bid = side.is_bid
+        view._sign = side._sign
+        view._len = min(depth, side._len)
+        for name in ("_key", "_price", "_size"):
+            array = getattr(side, name)[: view._len]
+            array.flags.writeable = False
+            setattr(view, name, array)
+        return view
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __repr__(self) -> str:
+        return f"BookSideArrays({'bids' if self.is_bid else 'asks'}, {self._len} levels)"
+
+    @property
+    def price(self):
+        return self._price[: self._len]
+
+    @property
+    def size(self):
+        return self._size[: self._len]
+
+    def top(self, depth: int) -> Tuple:
+        """
+        :return: `(price, size)` of the first `depth` levels, views of the book's arrays
+        """
+        return self._price[: min(depth, self._len)], self._size[: min(depth, self._len)]
+
+    def _grow(self) -> None:
+        np = _import_numpy()
+        capacity = max(2 * len(self._price), 16)
+        for name in ("_key", "_price", "_size"):
+            array = np.empty(capacity, dtype=np.float64)
+            array[: self._len] = getattr(self, name)[: self._len]
+            setattr(self, name, array)
+
+    def update(self, price: float, size: float) -> None:
+        """
+        Set the size of a level, a zero size deletes it
+        """
+        if not self._price.flags.writeable:
+            raise ValueError("Top-N views of an order book are read-only")
+        np = _import_numpy()
+        key = self._sign * price
+        n = self._len
+        i = int(np.searchsorted(self._key[:n], key))
+        exists = i < n and self._key[i] == key
+
+        if size == 0:
+            if exists:
+                for array in (self._key, self._price, self._size):
+                    array[i : n - 1] = array[i + 1 : n]
+                self._len -= 1
+        elif exists:
+            self._size[i] = size
+        else:
+            if n == len(self._price):
+                self._grow()
+            for array, value in ((self._key, key), (self._price, price), (self._size, size)):
+                array[i + 1 : n + 1] = array[i:n]
+                array[i] = value
+            self._len += 1
+
+    def truncate(self, depth: int) -> None:
+        self._len = min(depth, self._len)
+
+    def depth(self, price: float) -> float:
+        """
+        :return: total size of the levels at `price` or better
+        """
+        np = _import_numpy()
+        end = int(np.searchsorted(self._key[: self._len], self._sign * price, side="right"))
+        return float(self._size[:end].sum())
+
+    def vwap(self, volume: float) -> Optional[float]:
+        """
+        Average price of a market order taking `volume` from this side
+        :return: None when the side holds less than `volume`
+        """
+        if volume <= 0:
+            raise ValueError(f"volume must be positive, got {volume}")
+        np = _import_numpy()
+        price = self.price
+        cumulative = np.cumsum(self.size)
+        if not len(cumulative) or cumulative[-1] < volume:
+            return None
+        # levels before `end` are taken entirely, the rest of the volume comes from level `end`
+        end = int(np.searchsorted(cumulative, volume))
+        filled = cumulative[end - 1] if end else 0.0
+        notional = float(np.dot(price[:end], self._size[:end])) + price[end] * (volume - filled)
+        return float(notional / volume)
+
+    def slippage(self, volume: float) -> Optional[float]:
+        """
+        :return: relative distance between the VWAP of `volume` and the best price, None without enough liquidity
+        """
+        vwap = self.vwap(volume)
+        if vwap is None:
+            return None
+        best = float(self._price[0])
+        return abs(vwap - best) / best
+
+
+class OrderBookArrays(object):
+    """
+    Order book as `BookSideArrays`, the array counterpart of the `get_orderbook` dicts (`as_arrays=True`):
+
+        book = await okx.get_orderbook("BTC/USDT:USDT-PERP", as_arrays=True)
+        book.asks.vwap(10), book.bids.depth(36900), book.top(5).bids.price
+
+    `top` returns views sharing memory with the book; they are read-only.
+    """
+
+    __slots__ = ("instrument_id", "timestamp", "bids", "asks")
+
+    def __init__(self, instrument_id: str, bids: BookSideArrays, asks: BookSideArrays, timestamp: Optional[int]):
+        self.instrument_id = instrument_id
+        self.bids = bids
+        self.asks = asks
+        self.timestamp = timestamp
+
+    @classmethod
+    def from_levels(
+        cls, instrument_id: str, bids: List[Sequence], asks: List[Sequence], timestamp: Optional[int] = None
+    ) -> "OrderBookArrays":
+        """
+        Parse raw exchange levels `[price, size, ...]` in bulk, in any order
+        """
+        np = _import_numpy()
+
+        def side(levels: List[Sequence], is_bid: bool) -> BookSideArrays:
+            price = np.array([level[0] for level in levels], dtype=np.float64)
+            size = np.array([level[1] for level in levels], dtype=np.float64)
+            return BookSideArrays(price, size, is_bid)
+
+        return cls(instrument_id, side(bids, True), side(asks, False), timestamp)
+
+    def __repr__(self) -> str:
+        return f"OrderBookArrays({self.instrument_id!r}, {len(self.bids)} bids, {len(self.asks)} asks)"
+
+    @property
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return (float(self.bids.price[0]), float(self.bids.size[0])) if len(self.bids) else None
+
+    @property
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return (float(self.asks.price[0]), float(self.asks.size[0])) if len(self.asks) else None
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        if not len(self.bids) or not len(self.asks):
+            return None
+        return float(self.bids.price[0] + self.asks.price[0]) / 2
+
+    @property
+    def spread(self) -> Optional[float]:
+        if not len(self.bids) or not len(self.asks):
+            return None
+        return float(self.asks.price[0] - self.bids.price[0])
+
+    def update(self, bids: Iterable[Sequence], asks: Iterable[Sequence], timestamp: Optional[int] = None) -> None:
+        """
+        Apply diff levels `[price, size, ...]`, zero sizes delete levels
+        """
+        for side, levels in ((self.bids, bids), (self.asks, asks)):
+            for level in levels:
+                side.update(float(level[0]), float(level[1]))
+        if timestamp is not None:
+            self.timestamp = timestamp
+
+    def truncate(self, depth: int) -> "OrderBookArrays":
+        """
+        Keep the first `depth` levels per side, in place
+        """
+        self.bids.truncate(depth)
+        self.asks.truncate(depth)
+        return self
+
+    def top(self, depth: int) -> "OrderBookArrays":
+        """
+        :return: read-only view of the first `depth` levels per side, without copying
+        """
+        return OrderBookArrays(
+            self.instrument_id,
+            BookSideArrays._view(self.bids, depth),
+            BookSideArrays._view(self.asks, depth),
+            self.timestamp,
+        )
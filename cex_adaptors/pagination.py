@@ -0,0 +1,366 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional, Tuple
+
+# ms per candle of the unified intervals with a fixed length (months are not)
+INTERVAL_MS = {
+    "1m": 60_000,
+    "3m": 180_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "30m": 1_800_000,
+    "1h": 3_600_000,
+    "2h": 7_200_000,
+    "4h": 14_400_000,
+    "6h": 21_600_000,
+    "8h": 28_800_000,
+    "12h": 43_200_000,
+    "1d": 86_400_000,
+    "2d": 172_800_000,
+    "3d": 259_200_000,
+    "1w": 604_800_000,
+}
+
+# shortest funding interval listed by the exchanges, funding items are at least this far apart
+MIN_FUNDING_INTERVAL_MS = 3_600_000
+# funding interval of most perpetuals, windows of funding history are planned with it when the exchange does not list
+# the instrument's own interval
+DEFAULT_FUNDING_INTERVAL_MS = 28_800_000
+
+# pages of one history call in flight at once; the client rate limiter still paces the requests themselves
+DEFAULT_PAGE_CONCURRENCY = 8
+
+SECOND_MS = 1000
+
+Window = Tuple[int, int]
+# fetches the items of one window, inclusive on both ends, already parsed and carrying "timestamp"
+PageFetcher = Callable[[int, int], Awaitable[list]]
+
+
+class TimeCursor(NamedTuple):
+    """
+    How a history endpoint bounds a time range: the request parameters holding the window start and end, their
+    unit in ms (1 or `SECOND_MS`), whether the exchange treats them as exclusive (OKX `before` / `after`),
+    extra ms `slack` to widen windows by when the returned timestamps are rounded, and whether a full page holds the
+    newest items of the window (OKX, Bybit) rather than the oldest
+    """
+
+    start_param: str
+    end_param: str
+    unit: int = 1
+    exclusive: bool = False
+    slack: int = 0
+    newest_first: bool = False
+
+    def params(self, start: int, end: int) -> dict:
+        start, end = (start - self.slack) // self.unit, (end + self.slack) // self.unit
+        if self.exclusive:
+            start, end = start - 1, end + 1
+        return {self.start_param: start, self.end_param: end}
+
+
+class HistoryPages(NamedTuple):
+    """
+    A history endpoint paged by time window: `fetch` receives the `cursor` parameters as keywords and returns
+    parsed items, at most `limit` per window, at least `item_ms` apart
+    """
+
+    fetch: Callable[..., Awaitable]
+    cursor: TimeCursor
+    limit: int
+    item_ms: int
+
+
+def as_list(page) -> list:
+    # candlestick parsers return a lone candle as a dict
+    return [page] if isinstance(page, dict) else list(page)
+
+
+class TimestampBuffer(object):
+    """
+    History items accumulated page by page, keyed by "timestamp" so overlapping pages deduplicate in O(page);
+    sorting happens once when the result is read
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self):
+        self._items = {}
+
+    def add(self, page) -> list:
+        """
+        :param page: parsed items, or a lone candle dict
+        :return: the page as a list, for cursor math on the page alone
+        """
+        page = as_list(page)
+        for item in page:
+            self._items[item["timestamp"]] = item
+        return page
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def sorted(self, start: int = None, end: int = None) -> list:
+        """
+        Items ascending by timestamp, limited to `[start, end]` when given
+        """
+        timestamps = sorted(self._items)
+        if start is not None:
+            timestamps = timestamps[bisect_left(timestamps, start) :]
+        if end is not None:
+            timestamps = timestamps[: bisect_right(timestamps, end)]
+        return [self._items[t] for t in timestamps]
+
+    def latest(self, num: int) -> list:
+        return self.sorted()[-num:] if num else []
+
+
+def plan_windows(start: int, end: int, span: int) -> List[Window]:
+    """
+    Split `[start, end]` into consecutive inclusive windows of at most `span` ms, oldest first
+    :param start: first timestamp in ms
+    :param end: last timestamp in ms
+    :param span: window length in ms, e.g. `limit * interval_ms`
+    """
+    if span <= 0:
+        raise ValueError(f"Invalid page span: {span}")
+    return [(s, min(s + span - 1, end)) for s in range(start, end + 1, span)]
+
+
+async def fetch_window(fetch: PageFetcher, window: Window, limit: int, step: int, newest_first: bool = False) -> list:
+    """
+    Fetch the items of one window; a window planned too wide for the page size is finished serially instead of losing
+    data, from the end of the window the full page did not reach
+    :param fetch: coroutine function fetching one page of the window
+    :param window: inclusive `(start, end)` in ms
+    :param limit: page size of the endpoint, a full page means the window may hold more items
+    :param step: minimum ms between two items
+    :param newest_first: whether a full page holds the newest items of the window, see `TimeCursor`
+    :return: items of every page, in page order
+    """
+    window_start, window_end = window
+    items = []
+    while True:
+        page = await fetch(window_start, window_end)
+        items.extend(page)
+        if len(page) < limit:
+            return items
+        if newest_first:
+            window_end = min(v["timestamp"] for v in page) - step
+        else:
+            window_start = max(v["timestamp"] for v in page) + step
+        if window_start > window_end:
+            return items
+
+
+async def fetch_windows(
+    fetch: PageFetcher,
+    windows: List[Window],
+    limit: int,
+    concurrency: Optional[int] = DEFAULT_PAGE_CONCURRENCY,
+    step: int = 1,
+    newest_first: bool = False,
+) -> list:
+    """
+    Fetch every window concurrently, at most `concurrency` at a time, and merge the items
+    :param fetch: coroutine function fetching one window
+    :param windows: windows from `plan_windows`
+    :param limit: page size of the endpoint, a full page means the window may hold more items
+    :param concurrency: max windows in flight, None for no bound
+    :param step: minimum ms between two items, e.g. the candle interval
+    :param newest_first: whether a full page holds the newest items of the window, see `TimeCursor`
+    :return: items deduplicated by timestamp and sorted ascending
+    """
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def run(window: Window) -> list:
+        if semaphore is None:
+            return await fetch_window(fetch, window, limit, step, newest_first)
+        async with semaphore:
+            return await fetch_window(fetch, window, limit, step, newest_first)
+
+    buffer = TimestampBuffer()
+    for page in await asyncio.gather(*(run(window) for window in windows)):
+        buffer.add(page)
+    return buffer.sorted()
+
+
+async def iter_time_range(
+    fetch: Callable[..., Awaitable],
+    cursor: TimeCursor,
+    start: int,
+    end: int,
+    limit: int,
+    item_ms: int,
+    concurrency: Optional[int] = DEFAULT_PAGE_CONCURRENCY,
+    step: Optional[int] = None,
+) -> AsyncIterator[list]:
+    """
+    Stream `[start, end]` from an endpoint taking a time window, one window of up to `limit` items per chunk, oldest
+    first. Up to `concurrency` windows are fetched ahead of the consumer, so at most that many pages are held at once.
+    :param fetch: coroutine function receiving the cursor parameters as keywords and returning parsed items
+    :param cursor: the endpoint's window parameters
+    :param start: first timestamp in ms
+    :param end: last timestamp in ms
+    :param limit: max items per response
+    :param item_ms: ms between two items, the candle interval or the funding interval; windows span `limit` of them
+    :param concurrency: max windows in flight, None for no bound
+    :param step: min ms between two items, to continue a window after a full page; `item_ms` when None, smaller when
+        items may come closer together than planned (funding)
+    :return: chunks of items sorted ascending by timestamp, each chunk strictly after the previous one
+    """
+
+    async def fetch_page(window_start: int, window_end: int) -> list:
+        return as_list(await fetch(**cursor.params(window_start, window_end)))
+
+    windows = plan_windows(start, end, limit * item_ms)
+    step = step or item_ms
+    ahead = concurrency or len(windows)
+    remaining = iter(windows)
+    pending = deque()
+    last = start - 1
+    try:
+        while True:
+            for window in islice(remaining, ahead - len(pending)):
+                pending.append(
+                    asyncio.ensure_future(fetch_window(fetch_page, window, limit, step, cursor.newest_first))
+                )
+            if not pending:
+                return
+            buffer = TimestampBuffer()
+            buffer.add(await pending.popleft())
+            # windows are widened by exclusive bounds and slack, items already yielded are dropped
+            chunk = buffer.sorted(last + 1, end)
+            if chunk:
+                last = chunk[-1]["timestamp"]
+                yield chunk
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def fetch_time_range(
+    fetch: Callable[..., Awaitable],
+    cursor: TimeCursor,
+    start: int,
+    end: int,
+    limit: int,
+    item_ms: int,
+    concurrency: Optional[int] = DEFAULT_PAGE_CONCURRENCY,
+    step: Optional[int] = None,
+) -> list:
+    """
+    Fetch `[start, end]` from an endpoint taking a time window: windows of `limit` items are planned up front and
+    fetched concurrently, then merged. See `iter_time_range` for the parameters.
+    :return: items within `[start, end]` sorted ascending by timestamp
+    """
+    items = []
+    async for chunk in iter_time_range(fetch, cursor, start, end, limit, item_ms, concurrency, step):
+        items.extend(chunk)
+    return items
+
+
+async def fetch_numbered_pages(
+    fetch: Callable[[int], Awaitable],
+    start: int,
+    end: int,
+    limit: int,
+    concurrency: Optional[int] = DEFAULT_PAGE_CONCURRENCY,
+    first_page: int = 1,
+) -> list:
+    """
+    Fetch `[start, end]` from an endpoint paged by number, newest first (HTX, Bitget funding history).
+    Pages are requested `concurrency` at a time until one is short or reaches back past `start`.
+    :param fetch: coroutine function receiving the page number and returning parsed items
+    :return: items within `[start, end]` sorted ascending by timestamp
+    """
+    batch_size = concurrency or 1
+    buffer = TimestampBuffer()
+    page_no = first_page
+    while True:
+        pages = await asyncio.gather(*(fetch(n) for n in range(page_no, page_no + batch_size)))
+        for page in map(buffer.add, pages):
+            if len(page) < limit or min(v["timestamp"] for v in page) < start:
+                return buffer.sorted(start, end)
+        page_no += batch_size
+
+
+class PaginationMixin(object):
+    """
+    History pagination for the top-level adaptors, bounded by `page_concurrency` pages in flight per call.
+    Adaptors describe their windowed candlestick endpoint in `_candlestick_pages`, used by both
+    `get_history_candlesticks` and `iter_history_candlesticks`.
+    """
+
+    page_concurrency: Optional[int] = DEFAULT_PAGE_CONCURRENCY
+
+    async def _fetch_time_range(
+        self,
+        fetch: Callable[..., Awaitable],
+        cursor: TimeCursor,
+        start: int,
+        end: int,
+        limit: int,
+        item_ms: int,
+        step: Optional[int] = None,
+    ) -> list:
+        return await fetch_time_range(fetch, cursor, start, end, limit, item_ms, self.page_concurrency, step)
+
+    def _funding_interval_ms(self, info: dict) -> int:
+        """
+        :return: funding interval of the instrument, overridden by exchanges listing it in the instrument info
+        """
+        return DEFAULT_FUNDING_INTERVAL_MS
+
+    async def _fetch_funding_range(
+        self, fetch: Callable[..., Awaitable], cursor: TimeCursor, start: int, end: int, limit: int, info: dict
+    ) -> list:
+        # windows hold `limit` funding intervals of the instrument; one holding more, e.g. after the exchange shortened
+        # the interval, is finished with extra pages
+        item_ms = self._funding_interval_ms(info)
+        return await self._fetch_time_range(fetch, cursor, start, end, limit, item_ms, step=MIN_FUNDING_INTERVAL_MS)
+
+    async def _fetch_numbered_pages(self, fetch: Callable[[int], Awaitable], start: int, end: int, limit: int) -> list:
+        return await fetch_numbered_pages(fetch, start, end, limit, self.page_concurrency)
+
+    def _candlestick_pages(self, instrument_id: str, interval: str) -> Optional[HistoryPages]:
+        """
+        :return: the candlestick endpoint of the instrument, None when `interval` has no fixed length (months) or the
+            market has no time-windowed endpoint, which leaves `get_history_candlesticks` to page serially
+        """
+        return None
+
+    async def _fetch_pages(self, pages: HistoryPages, start: int, end: int) -> list:
+        return await self._fetch_time_range(pages.fetch, pages.cursor, start, end, pages.limit, pages.item_ms)
+
+    async def iter_history_candlesticks(self, instrument_id: str, interval: str, start: int, end: int):
+        """
+        Stream the candles of `[start, end]` as they are fetched, in page-sized chunks in ascending time order, so a
+        long backfill can be written out with bounded memory:
+
+            async for candles in okx.iter_history_candlesticks("BTC/USDT:USDT-PERP", "1m", start, end):
+                store.write(candles)
+
+        :param instrument_id: unified instrument id
+        :param interval: unified interval
+        :param start: first candle timestamp in ms
+        :param end: last candle timestamp in ms
+        :return: async iterator of candle lists, each as returned by `get_history_candlesticks`
+        """
+        if instrument_id not in self.exchange_info:
+            raise ValueError(f"{instrument_id} not found in {self.name} exchange info")
+
+        pages = self._candlestick_pages(instrument_id, interval)
+        if pages is None:
+            # serial pagination walks backwards from `end`, the range is only ordered once complete
+            candles = await self.get_history_candlesticks(instrument_id, interval, start=start, end=end)
+            if candles:
+                yield candles
+            return
+
+        async for chunk in iter_time_range(
+            pages.fetch, pages.cursor, start, end, pages.limit, pages.item_ms, self.page_concurrency
+        ):
+            yield chunk
@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
 
-from ..utils import query_dict
+from ..candles import CandleArrays, CandleColumns
+from ..errors import ExchangeError
+from ..instruments import InstrumentRegistry, instrument_id_map
+from ..orderbook import OrderBookArrays
 
 
 class Parser:
@@ -21,6 +24,14 @@ class Parser:
     INVERSE_TYPES = ["InverseFutures", "InversePerpetual", "inverse"]
     STABLE_CURRENCY = ["USDT", "USDC"]
     FIAT_CURRENCY = ["USD"]
+    # exchange error codes that signal a transient failure worth retrying
+    RETRYABLE_ERROR_CODES = []
+    # key of the unified instrument id in parsed candles
+    CANDLE_ID_KEY = "perp_instrument_id"
+
+    @classmethod
+    def exchange_error(cls, message: str, code=None) -> ExchangeError:
+        return ExchangeError(message, code=code, retryable=str(code) in cls.RETRYABLE_ERROR_CODES)
 
     @staticmethod
     def parse_str(data: str, method: callable):
@@ -37,6 +48,67 @@ class Parser:
                 results[key] = parser[key]
         return results
 
+    def parse_candle_arrays(self, datas: list, info: dict, interval: str, columns: CandleColumns) -> CandleArrays:
+        """
+        Columnar candles parsed in bulk from the raw rows, see `CandleArrays`; requires numpy
+        """
+        return CandleArrays.from_rows(
+            datas, columns, self.parse_unified_id(info), self.parse_unified_market_type(info), interval
+        )
+
+    def parse_orderbook_arrays(self, bids: list, asks: list, info: dict, timestamp: int = None) -> OrderBookArrays:
+        """
+        Array-backed order book parsed in bulk from the raw levels, see `OrderBookArrays`; requires numpy
+        """
+        return OrderBookArrays.from_levels(self.parse_unified_id(info), bids, asks, timestamp)
+
+    def parse_trade_volumes(self, size: float, price: float, info: dict, unit: str = "base") -> dict:
+        """
+        Unified volumes of a trade
+        :param unit: what the exchange's trade size counts, "base" or "quote" currency, or "contracts"
+        """
+        contract_size = info["contract_size"] or 1
+        if unit == "contracts":
+            value = size * contract_size
+            # inverse contracts are worth a fixed amount of quote currency
+            base_volume, quote_volume = (value / price, value) if info["is_inverse"] else (value, value * price)
+        elif unit == "quote":
+            base_volume, quote_volume = size / price, size
+        else:
+            base_volume, quote_volume = size, size * price
+        return {
+            "base_volume": base_volume,
+            "quote_volume": quote_volume,
+            "contract_volume": (quote_volume if info["is_inverse"] else base_volume) / contract_size,
+        }
+
+    def parse_unified_trade(
+        self,
+        info: dict,
+        timestamp: int,
+        trade_id,
+        side: str,
+        price: float,
+        size: float,
+        unit: str = "base",
+        raw_data=None,
+    ) -> dict:
+        """
+        Unified public trade
+        :param side: taker side, "buy" or "sell"
+        :param unit: see `parse_trade_volumes`
+        """
+        return {
+            "timestamp": int(timestamp),
+            "perp_instrument_id": self.parse_unified_id(info),
+            "market_type": self.parse_unified_market_type(info),
+            "trade_id": str(trade_id),
+            "side": side.lower(),
+            "price": float(price),
+            **self.parse_trade_volumes(float(size), float(price), info, unit),
+            "raw_data": raw_data,
+        }
+
     def parse_timestamp_to_str(self, timestamp: int, _format: str = "%y%m%d") -> str:
         return datetime.fromtimestamp(timestamp / 1000).strftime(_format)
 
@@ -105,11 +177,8 @@ class Parser:
     @staticmethod
     def get_id_symbol_map(info: dict, market_type: str, key: str = "symbol") -> dict:
         if market_type in ["linear", "inverse"]:
-            info = query_dict(info, f"is_{market_type} == True and is_spot == False")
-        else:
-            info = query_dict(info, f"is_{market_type} == True")
-
-        return {v["raw_data"][key]: k for k, v in info.items()}
+            return instrument_id_map(info, key, **{f"is_{market_type}": True, "is_spot": False})
+        return instrument_id_map(info, key, **{f"is_{market_type}": True})
 
     @staticmethod
     def parse_str_to_timestamp(_str: str, _format: str = "%Y%m%d") -> int:
@@ -117,6 +186,8 @@ class Parser:
 
     @staticmethod
     def query_dict(datas: dict, query: dict) -> dict:
+        if isinstance(datas, InstrumentRegistry) and len(query) == 1:
+            return datas.select(**query)
         filtered_data = {}
         for key, value in datas.items():
             if any(value.get(k) == v for k, v in query.items()):
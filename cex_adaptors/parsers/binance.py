@@ -1,9 +1,17 @@
+from ..candles import CandleColumns
+from ..instruments import instrument_id_map
 from .base import Parser
 
 
 class BinanceParser(Parser):
-    @staticmethod
-    def check_response(response: dict):
+    # -1001 internal disconnect, -1003 too many requests, -1007 backend timeout
+    RETRYABLE_ERROR_CODES = ["-1001", "-1003", "-1007"]
+
+    @classmethod
+    def check_response(cls, response: dict):
+        if isinstance(response, dict) and "msg" in response and isinstance(response.get("code"), int):
+            if response["code"] < 0:
+                raise cls.exchange_error(f"Error when parsing Binance response: {response}", response["code"])
         return {"code": 200, "status": "success", "data": response}
 
     @property
@@ -96,9 +104,71 @@ class BinanceParser(Parser):
             "raw_data": response,
         }
 
+    # REST ticker keys of the `<symbol>@ticker` stream fields
+    WS_TICKER_KEYS = {
+        "openTime": "O",
+        "closeTime": "C",
+        "openPrice": "o",
+        "highPrice": "h",
+        "lowPrice": "l",
+        "lastPrice": "c",
+        "volume": "v",
+        "priceChange": "p",
+        "priceChangePercent": "P",
+    }
+
+    def parse_ws_ticker(self, data: dict, info: dict) -> dict:
+        response = {key: data[field] for key, field in self.WS_TICKER_KEYS.items()}
+        # `q` is the quote volume on spot and USDS-M, the base volume on COIN-M
+        response["quoteVolume" if info["is_linear"] else "baseVolume"] = data["q"]
+        return {**self.parse_ticker(response, info), "raw_data": data}
+
+    def parse_ws_candlestick(self, data: dict, info: dict, interval: str) -> dict:
+        """
+        :param data: "k" of a kline push, mapped onto the rows of the klines endpoint
+        """
+        row = [data["t"], data["o"], data["h"], data["l"], data["c"], data["v"], data["T"], data["q"]]
+        return {**self.parse_candlesticks([row], info, self.get_market_type(info), interval), "raw_data": data}
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        # `m` is set when the buyer is the maker, COIN-M quantities count contracts
+        side = "sell" if data["m"] else "buy"
+        unit = "contracts" if info["is_inverse"] else "base"
+        return self.parse_unified_trade(info, data["T"], data["a"], side, data["p"], data["q"], unit, raw_data=data)
+
+    def parse_ws_order(self, data: dict, info: dict) -> dict:
+        """
+        Order of an `executionReport` event of the spot and margin user data streams, or of the `o` object of a
+        futures `ORDER_TRADE_UPDATE`, in the format of `parse_margin_market_order`
+        """
+        return {
+            "timestamp": int(data["T"]),
+            "perp_instrument_id": self.parse_unified_id(info),
+            "side": data["S"].lower(),
+            "price": self.parse_str(data["p"], float),
+            "volume": self.parse_str(data["z"], float),
+            # commission of the last fill only
+            "fee_ccy": data.get("N"),
+            "fee": self.parse_str(data.get("n"), float),
+            "order_id": str(data["i"]),
+            "order_type": data["o"].lower(),
+            "status": data["X"],
+            "raw_data": data,
+        }
+
+    def parse_ws_positions(self, data: dict, id_map: dict) -> dict:
+        """
+        Positions changed by a futures `ACCOUNT_UPDATE` event, in the format of `get_positions`; hedge mode reports
+        the long and short side of an instrument separately, the last one wins
+        """
+        return {
+            id_map[position["s"]]: {"position": float(position["pa"]), "raw_data": position}
+            for position in data["a"]["P"]
+            if position["s"] in id_map
+        }
+
     def get_id_map(self, infos: dict, market_type: str) -> dict:
-        infos = self.query_dict(infos, {f"is_{market_type}": True})
-        return {v["raw_data"]["symbol"]: k for k, v in infos.items()}
+        return instrument_id_map(infos, "symbol", **{f"is_{market_type}": True})
 
     def parse_tickers(self, response: dict, market_type: str, infos: dict) -> dict:
         response = self.check_response(response)
@@ -233,9 +303,12 @@ class BinanceParser(Parser):
             "raw_data": data,
         }
 
-    def parse_orderbook(self, response: dict, info: dict, market_type: str, depth: int) -> dict:
+    def parse_orderbook(self, response: dict, info: dict, market_type: str, depth: int, as_arrays: bool = False) -> any:
         response = self.check_response(response)
         data = response["data"]
+        if as_arrays:
+            orderbook = self.parse_orderbook_arrays(data["bids"], data["asks"], info, self.get_timestamp())
+            return orderbook.truncate(depth) if depth else orderbook
 
         results = {
             "timestamp": self.get_timestamp(),
@@ -297,9 +370,13 @@ class BinanceParser(Parser):
             "raw_data": data,
         }
 
-    def parse_candlesticks(self, response: dict, info: dict, market_type: str, interval: str) -> any:
+    def parse_candlesticks(
+        self, response: dict, info: dict, market_type: str, interval: str, as_arrays: bool = False
+    ) -> any:
         response = self.check_response(response)
         datas = response["data"]
+        if as_arrays:
+            return self.parse_candle_arrays(datas, info, interval, CandleColumns(0, 1, 2, 3, 4, 5, 7, 5))
         instrument_id = self.parse_unified_id(info)
         market_type = self.parse_unified_market_type(info)
 
@@ -1,8 +1,11 @@
-from ..utils import query_dict
+from ..candles import CandleColumns
+from ..instruments import instrument_id_map
 from .base import Parser
 
 
 class BitgetParser(Parser):
+    # 429 / 40010 too many requests, 40015 system error, 40200 server upgrade
+    RETRYABLE_ERROR_CODES = ["429", "40010", "40015", "40200"]
     LINEAR_FUTURES_SETTLE = ["USDT", "USDC"]
 
     INTERVAL_MAP = {
@@ -48,7 +51,7 @@ class BitgetParser(Parser):
                 "timestamp": self.parse_str(response["requestTime"], int),
             }
         else:
-            raise ValueError(f"Error in parsing Bitget response: {response}")
+            raise self.exchange_error(f"Error in parsing Bitget response: {response}", response.get("code"))
 
     @property
     def spot_exchange_info_parser(self):
@@ -113,11 +116,8 @@ class BitgetParser(Parser):
 
     def get_bitget_id_map(self, exchange_info: dict, market_type: str) -> dict:
         if market_type == "derivative":
-            infos = query_dict(exchange_info, "is_perp == True or is_futures == True")
-        else:
-            infos = query_dict(exchange_info, f"is_{market_type} == True")
-
-        return {v["raw_data"]["symbol"]: k for k, v in infos.items()}
+            return instrument_id_map(exchange_info, "symbol", any_of=("is_perp", "is_futures"))
+        return instrument_id_map(exchange_info, "symbol", **{f"is_{market_type}": True})
 
     def parse_ticker(self, response: dict, info: dict, market_type: str):
         return {
@@ -136,6 +136,12 @@ class BitgetParser(Parser):
             "raw_data": response,
         }
 
+    def parse_ws_ticker(self, data: dict, info: dict, market_type: str):
+        # the spot ticker channel only names the 24h open `open24h`, like the futures one
+        if market_type == "spot" and "open" not in data:
+            return {**self.parse_ticker({**data, "open": data["open24h"]}, info, market_type), "raw_data": data}
+        return self.parse_ticker(data, info, market_type)
+
     def parse_raw_ticker(self, response: dict, info: dict, market_type: str):
         response = self.check_response(response)
         data = response["data"][0]
@@ -191,9 +197,15 @@ class BitgetParser(Parser):
             raise ValueError(f"Invalid interval {interval}")
         return self.INTERVAL_MAP[market_type][interval]
 
-    def parse_candlesticks(self, response: dict, info: dict, market_type: str, interval: str) -> any:
+    def parse_candlesticks(
+        self, response: dict, info: dict, market_type: str, interval: str, as_arrays: bool = False
+    ) -> any:
         response = self.check_response(response)
         datas = response["data"]
+        if as_arrays:
+            contract_size = 1 if market_type == "spot" else info["contract_size"]
+            columns = CandleColumns(0, 1, 2, 3, 4, 5, 6, 5, contract_volume_scale=1 / contract_size)
+            return self.parse_candle_arrays(datas, info, interval, columns)
         update_ = {
             "perp_instrument_id": self.parse_unified_id(info),
             "market_type": self.parse_unified_market_type(info),
@@ -204,7 +216,20 @@ class BitgetParser(Parser):
             result = self.parse_candlestick(data, info, market_type)
             result.update(update_)
             results.append(result)
-        return results if len(results) > 1 else results[0]
+        return results if len(results) != 1 else results[0]
+
+    def parse_ws_candlestick(self, data: list, info: dict, interval: str) -> dict:
+        return {
+            **self.parse_candlestick(data, info, self.get_market_type(info)),
+            "perp_instrument_id": self.parse_unified_id(info),
+            "market_type": self.parse_unified_market_type(info),
+            "interval": interval,
+        }
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        return self.parse_unified_trade(
+            info, data["ts"], data["tradeId"], data["side"], data["price"], data["size"], raw_data=data
+        )
 
     def parse_candlestick(self, data: list, info: dict, market_type: str):
         return {
@@ -251,9 +276,11 @@ class BitgetParser(Parser):
             for data in datas
         ]
 
-    def parse_orderbook(self, response: dict, info: dict) -> dict:
+    def parse_orderbook(self, response: dict, info: dict, as_arrays: bool = False) -> any:
         response = self.check_response(response)
         datas = response["data"]
+        if as_arrays:
+            return self.parse_orderbook_arrays(datas["bids"], datas["asks"], info, self.parse_str(datas["ts"], int))
 
         return {
             "timestamp": self.parse_str(datas["ts"], int),
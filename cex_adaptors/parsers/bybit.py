@@ -1,7 +1,11 @@
+from ..candles import CandleColumns
 from .base import Parser
 
 
 class BybitParser(Parser):
+    # 10000 server timeout, 10002 request time exceeds window, 10006 too many visits, 10016 server error
+    RETRYABLE_ERROR_CODES = ["10000", "10002", "10006", "10016"]
+
     INTERVAL_MAP = {
         "1m": "1",
         "3m": "3",
@@ -20,7 +24,7 @@ class BybitParser(Parser):
 
     def check_response(self, response: dict):
         if response["retCode"] != 0:
-            raise ValueError(f"Error in parsing Bybit response: {response}")
+            raise self.exchange_error(f"Error in parsing Bybit response: {response}", response["retCode"])
         else:
             return {
                 "code": 200,
@@ -147,9 +151,15 @@ class BybitParser(Parser):
             raise ValueError(f"Invalid interval: {interval}")
         return self.INTERVAL_MAP[interval]
 
-    def parse_candlesticks(self, response: dict, info: dict, market_type: str, interval: str) -> any:
+    def parse_candlesticks(
+        self, response: dict, info: dict, market_type: str, interval: str, as_arrays: bool = False
+    ) -> any:
         response = self.check_response(response)
         datas = response["data"]
+        if as_arrays:
+            contract_size = 1 if market_type == "spot" else info["contract_size"]
+            columns = CandleColumns(0, 1, 2, 3, 4, 5, 6, 5, contract_volume_scale=1 / contract_size)
+            return self.parse_candle_arrays(datas, info, interval, columns)
 
         market = self.parse_unified_market_type(info)
         instrument_id = self.parse_unified_id(info)
@@ -174,7 +184,22 @@ class BybitParser(Parser):
             for data in datas
         ]
 
-        return results if len(results) > 1 else results[0]
+        return results if len(results) != 1 else results[0]
+
+    def parse_ws_candlestick(self, data: dict, info: dict, interval: str) -> dict:
+        """
+        :param data: one candle of a kline push, mapped onto the rows of the kline endpoint
+        """
+        row = [data["start"], data["open"], data["high"], data["low"], data["close"], data["volume"], data["turnover"]]
+        response = {"retCode": 0, "result": {"list": [row]}, "time": data["timestamp"]}
+        return {**self.parse_candlesticks(response, info, self.get_category(info), interval), "raw_data": data}
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        # inverse contracts are sized in USD
+        unit = "quote" if info["is_inverse"] else "base"
+        return self.parse_unified_trade(
+            info, data["T"], data["i"], data["S"], data["p"], data["v"], unit, raw_data=data
+        )
 
     def get_category(self, info: dict) -> str:
         if info["is_spot"] or info["is_margin"]:
@@ -237,12 +262,14 @@ class BybitParser(Parser):
             )
         return results[0] if len(results) == 1 else results
 
-    def parse_orderbook(self, response: dict, info: dict) -> dict:
+    def parse_orderbook(self, response: dict, info: dict, as_arrays: bool = False) -> any:
         response = self.check_response(response)
         datas = response["data"]
 
         asks = datas["a"]
         bids = datas["b"]
+        if as_arrays:
+            return self.parse_orderbook_arrays(bids, asks, info, self.parse_str(datas["ts"], int))
 
         return {
             "timestamp": self.parse_str(datas["ts"], int),
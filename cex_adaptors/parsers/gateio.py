@@ -1,3 +1,5 @@
+from ..candles import CandleColumns
+from ..instruments import instrument_id_map
 from .base import Parser
 
 
@@ -19,8 +21,12 @@ class GateioParser(Parser):
     def __init__(self):
         super().__init__()
 
-    @staticmethod
-    def check_response(response: dict):
+    RETRYABLE_ERROR_CODES = ["TOO_MANY_REQUESTS", "SERVER_ERROR", "TOO_BUSY"]
+
+    @classmethod
+    def check_response(cls, response: dict):
+        if isinstance(response, dict) and "label" in response and "message" in response:
+            raise cls.exchange_error(f"Error when parsing Gateio response: {response}", response["label"])
         return {"code": 200, "status": "success", "data": response}
 
     @property
@@ -137,8 +143,7 @@ class GateioParser(Parser):
             "futures": "name",
             "perp": "name",
         }
-        infos = self.query_dict(exchange_info, {f"is_{market_type}": True})
-        return {v["raw_data"][raw_id[market_type]]: k for k, v in infos.items()}
+        return instrument_id_map(exchange_info, raw_id[market_type], **{f"is_{market_type}": True})
 
     def parse_tickers(self, response: dict, exchange_info: dict, market_type: str) -> dict:
         response = self.check_response(response)
@@ -228,9 +233,28 @@ class GateioParser(Parser):
             for data in datas
         ]
 
-    def parse_candlesticks(self, response: dict, info: dict, market_type: str, interval: str) -> any:
+    def parse_candlesticks(
+        self, response: dict, info: dict, market_type: str, interval: str, as_arrays: bool = False
+    ) -> any:
         response = self.check_response(response)
         datas = response["data"]
+        if as_arrays:
+            if market_type == "spot":
+                columns = CandleColumns(0, 5, 3, 4, 2, 6, 1, 6, timestamp_scale=1000)
+            else:
+                columns = CandleColumns(
+                    "t",
+                    "o",
+                    "h",
+                    "l",
+                    "c",
+                    "v",
+                    "sum" if market_type == "perp" else None,
+                    "v",
+                    timestamp_scale=1000,
+                    base_volume_scale=info["contract_size"],
+                )
+            return self.parse_candle_arrays(datas, info, interval, columns)
         udpate_ = {
             "perp_instrument_id": self.parse_unified_id(info),
             "market_type": self.parse_unified_market_type(info),
@@ -248,7 +272,39 @@ class GateioParser(Parser):
             result = method_map[market_type](data, info)
             result.update(udpate_)
             results.append(result)
-        return results if len(results) > 1 else results[0]
+        return results if len(results) != 1 else results[0]
+
+    def parse_ws_candlestick(self, data: dict, info: dict, interval: str) -> dict:
+        """
+        :param data: result of a candlesticks push, mapped onto the candles of the REST endpoints
+        """
+        market_type = self.get_market_type(info)
+        if market_type == "spot":
+            # `v` is the quote volume, `a` the base volume
+            row = [data["t"], data["v"], data["c"], data["h"], data["l"], data["o"], data["a"]]
+            candle = self.parse_spot_candlestick(row, info)
+        elif market_type == "perp":
+            # the push has no quote volume
+            candle = self.parse_perp_candlestick({**data, "sum": None}, info)
+        else:
+            candle = self.parse_futures_candlestick(data, info)
+        return {
+            **candle,
+            "perp_instrument_id": self.parse_unified_id(info),
+            "market_type": self.parse_unified_market_type(info),
+            "interval": interval,
+            "raw_data": data,
+        }
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        if info["is_spot"]:
+            side, size, unit = data["side"], data["amount"], "base"
+        else:
+            # futures sizes count contracts, negative for sells
+            size = float(data["size"])
+            side, size, unit = "buy" if size > 0 else "sell", abs(size), "contracts"
+        timestamp = self.parse_str(data["create_time_ms"], float)
+        return self.parse_unified_trade(info, timestamp, data["id"], side, data["price"], size, unit, raw_data=data)
 
     def parse_spot_candlestick(self, data: list, info: dict) -> dict:
         return {
@@ -1,9 +1,11 @@
-from ..utils import query_dict
+from ..candles import CandleColumns
+from ..instruments import instrument_id_map
 from .base import Parser
 
 
 class HtxParser(Parser):
 
+    RETRYABLE_ERROR_CODES = ["1000", "1001", "1032", "too-many-request", "system-busy"]
     response_keys = ["data", "ticks"]
 
     INTERVAL_MAP = {
@@ -62,7 +64,8 @@ class HtxParser(Parser):
                     results.update({"timestamp": response["ts"]} if "ts" in response else {})
                     return results
         else:
-            raise ValueError(f"Error when parsing HTX response: {response}")
+            code = response.get("err-code", response.get("err_code"))
+            raise self.exchange_error(f"Error when parsing HTX response: {response}", code)
 
     @property
     def spot_exchange_info_parser(self) -> dict:
@@ -199,15 +202,14 @@ class HtxParser(Parser):
             "inverse_futures": "symbol",
         }
         if market_type == "linear":
-            infos = query_dict(exchange_info, "(is_perp == True or is_futures == True) and is_linear == True")
+            return instrument_id_map(
+                exchange_info, keys_map[market_type], any_of=("is_perp", "is_futures"), is_linear=True
+            )
         elif market_type == "inverse_perp":
-            infos = query_dict(exchange_info, "is_perp == True and is_inverse == True")
+            return instrument_id_map(exchange_info, keys_map[market_type], is_perp=True, is_inverse=True)
         elif market_type == "inverse_futures":
-            infos = query_dict(exchange_info, "is_futures == True and is_inverse == True")
-            return {self.parse_inverse_futures_symbol(v["raw_data"]): k for k, v in infos.items()}
-        else:
-            infos = self.query_dict(exchange_info, {f"is_{market_type}": True})
-        return {v["raw_data"][keys_map[market_type]]: k for k, v in infos.items()}
+            return instrument_id_map(exchange_info, self.parse_inverse_futures_symbol, is_futures=True, is_inverse=True)
+        return instrument_id_map(exchange_info, keys_map[market_type], **{f"is_{market_type}": True})
 
     def parse_inverse_futures_symbol(self, datas: dict) -> str:
         contract_type_map = {
@@ -385,7 +387,9 @@ class HtxParser(Parser):
             for data in datas
         ]
 
-    def parse_candlesticks(self, response: dict, info: dict, market_type: str, interval: str) -> any:
+    def parse_candlesticks(
+        self, response: dict, info: dict, market_type: str, interval: str, as_arrays: bool = False
+    ) -> any:
         """
         - spot :
         [
@@ -430,6 +434,20 @@ class HtxParser(Parser):
 
         response = self.check_htx_response(response)
         datas = response["data"]
+        if as_arrays:
+            columns = CandleColumns(
+                "id",
+                "open",
+                "high",
+                "low",
+                "close",
+                "amount",
+                "vol" if market_type != "linear" else "trade_turnover",
+                "amount" if market_type == "spot" else "vol",
+                timestamp_scale=1000,
+                quote_volume_scale=1 if info["is_linear"] else info["contract_size"],
+            )
+            return self.parse_candle_arrays(datas, info, interval, columns)
 
         update_ = {
             "perp_instrument_id": self.parse_unified_id(info),
@@ -444,7 +462,7 @@ class HtxParser(Parser):
             result.update(update_)
             results.append(result)
 
-        return results if len(results) > 1 else results[0]
+        return results if len(results) != 1 else results[0]
 
     def parse_candlestick(self, data: dict, info: dict, market_type: str) -> dict:
 
@@ -463,6 +481,22 @@ class HtxParser(Parser):
             "raw_data": data,
         }
 
+    def parse_ws_candlestick(self, data: dict, info: dict, interval: str) -> dict:
+        return {
+            **self.parse_candlestick(data, info, self.get_market_type(info)),
+            "perp_instrument_id": self.parse_unified_id(info),
+            "market_type": self.parse_unified_market_type(info),
+            "interval": interval,
+        }
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        # contract trades count contracts in `amount`
+        unit = "base" if info["is_spot"] else "contracts"
+        trade_id = data.get("tradeId", data["id"])
+        return self.parse_unified_trade(
+            info, data["ts"], trade_id, data["direction"], data["price"], data["amount"], unit, raw_data=data
+        )
+
     def parse_index_price(self, response: dict, info: dict, market_type: str) -> dict:
         response = self.check_htx_response(response)
         data = response["data"][0]
@@ -1,4 +1,5 @@
-from ..utils import query_dict
+from ..candles import CandleColumns
+from ..instruments import instrument_id_map
 from .base import Parser
 
 
@@ -33,12 +34,15 @@ class KucoinParser(Parser):
         "1w": 10080,
     }
 
-    @staticmethod
-    def check_response(response: dict):
+    # 429000 too many requests, 500000 internal server error
+    RETRYABLE_ERROR_CODES = ["429000", "500000"]
+
+    @classmethod
+    def check_response(cls, response: dict):
         if response.get("code") == "200000":
             return {"code": 200, "status": "success", "data": response["data"]}
         else:
-            raise ValueError(f"Error when checking response: {response} in KucoinParser")
+            raise cls.exchange_error(f"Error when checking response: {response} in KucoinParser", response.get("code"))
 
     def parse_kucoin_base_currency(self, base: str) -> str:
         base = base.replace("XBT", "BTC")
@@ -107,10 +111,8 @@ class KucoinParser(Parser):
 
     def get_id_map(self, infos: dict, market_type: str) -> dict:
         if market_type == "derivative":
-            infos = query_dict(infos, f"is_futures == True or is_perp == True")
-        else:
-            infos = query_dict(infos, f"is_{market_type} == True")
-        return {v["raw_data"]["symbol"]: k for k, v in infos.items()}
+            return instrument_id_map(infos, "symbol", any_of=("is_futures", "is_perp"))
+        return instrument_id_map(infos, "symbol", **{f"is_{market_type}": True})
 
     def parse_spot_tickers(self, response: dict, infos: dict) -> dict:
         response = self.check_response(response)
@@ -174,6 +176,19 @@ class KucoinParser(Parser):
         else:
             return self.parse_derivative_ticker(data, info)
 
+    def parse_ws_ticker(self, data: dict, info: dict, market_type: str) -> dict:
+        # the snapshot channels name some REST ticker fields differently
+        if market_type == "spot":
+            response = {**data, "last": data["lastTradedPrice"], "time": data["datetime"]}
+            return {**self.parse_spot_ticker(response, info), "raw_data": data}
+        response = {
+            **data,
+            "lastTradePrice": data["lastPrice"],
+            "volumeOf24h": data["volume"],
+            "turnoverOf24h": data["turnover"],
+        }
+        return {**self.parse_derivative_ticker(response, info), "raw_data": data}
+
     def parse_spot_ticker(self, response: dict, info: dict) -> dict:
         data = response
 
@@ -250,9 +265,11 @@ class KucoinParser(Parser):
             "raw_data": data,
         }
 
-    def parse_orderbook(self, response: dict, info: dict, market_type: str) -> dict:
+    def parse_orderbook(self, response: dict, info: dict, market_type: str, as_arrays: bool = False) -> any:
         response = self.check_response(response)
         data = response["data"]
+        if as_arrays:
+            return self.parse_orderbook_arrays(data["bids"], data["asks"], info, self.parse_str(data["ts"], int))
 
         return {
             "timestamp": self.parse_str(data["ts"], int),
@@ -323,9 +340,18 @@ class KucoinParser(Parser):
         )
         return result
 
-    def parse_history_candlesticks(self, response: dict, info: dict, market_type: str, interval: str) -> list:
+    def parse_history_candlesticks(
+        self, response: dict, info: dict, market_type: str, interval: str, as_arrays: bool = False
+    ) -> list:
         response = self.check_response(response)
         datas = response["data"]
+        if as_arrays:
+            if market_type == "spot":
+                # spot candles are stamped in seconds
+                columns = CandleColumns(0, 1, 3, 4, 2, 5, 6, 5, timestamp_scale=1000)
+            else:
+                columns = CandleColumns(0, 1, 3, 4, 2, None, 5, None)
+            return self.parse_candle_arrays(datas, info, interval, columns)
 
         update_ = {
             "perp_instrument_id": self.parse_unified_id(info),
@@ -353,3 +379,34 @@ class KucoinParser(Parser):
             "contract_volume": self.parse_str(data[5], float) if market_type == "spot" else None,
             "raw_data": data,
         }
+
+    def parse_ws_candlestick(self, data: list, info: dict, interval: str) -> dict:
+        """
+        :param data: "candles" of a candles push, ordered like the spot klines on both markets: time, open, close,
+            high, low, volume and turnover
+        """
+        result = self.parse_candlestick(data, info, "spot")
+        if not info["is_spot"]:
+            # futures volumes count lots
+            lots = self.parse_str(data[5], float)
+            result["contract_volume"] = lots
+            result["base_volume"] = lots * info["contract_size"] if info["is_linear"] else None
+            result["quote_volume"] = (
+                self.parse_str(data[6], float) if info["is_linear"] else lots * info["contract_size"]
+            )
+        result.update(
+            {
+                "perp_instrument_id": self.parse_unified_id(info),
+                "market_type": self.parse_unified_market_type(info),
+                "interval": interval,
+            }
+        )
+        return result
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        # trades are stamped in ns, futures sizes count lots
+        timestamp = int(data["time" if info["is_spot"] else "ts"]) // 1_000_000
+        unit = "base" if info["is_spot"] else "contracts"
+        return self.parse_unified_trade(
+            info, timestamp, data["tradeId"], data["side"], data["price"], data["size"], unit, raw_data=data
+        )
@@ -1,10 +1,13 @@
 from datetime import datetime as dt
 from datetime import timedelta as td
 
+from ..candles import CandleColumns
+from ..instruments import instrument_id_map
 from .base import Parser
 
 
 class OkxParser(Parser):
+    CANDLE_ID_KEY = "instrument_id"
     interval_map = {
         "1m": "1m",
         "3m": "3m",
@@ -27,12 +30,15 @@ class OkxParser(Parser):
     market_type_map = {"spot": "SPOT", "margin": "MARGIN", "futures": "FUTURES", "perp": "SWAP"}
     _market_type_map = {"SPOT": "spot", "MARGIN": "margin", "FUTURES": "futures", "SWAP": "perp"}
 
-    @staticmethod
-    def check_response(response: dict):
+    # 50001 service unavailable, 50004 endpoint timeout, 50011 rate limit, 50013 system busy, 50026 system error
+    RETRYABLE_ERROR_CODES = ["50001", "50004", "50011", "50013", "50026"]
+
+    @classmethod
+    def check_response(cls, response: dict):
         if response.get("code") == "0":
             return {"code": 200, "status": "success", "data": response["data"]}
         else:
-            raise ValueError(f"Error when parsing OKX response: {response}")
+            raise cls.exchange_error(f"Error when parsing OKX response: {response}", response.get("code"))
 
     def _parse_leverage(self, lever: any):
         return int(lever) if lever else 1
@@ -166,8 +172,8 @@ class OkxParser(Parser):
 
     def get_id_map(self, infos: dict, market_type: str = None) -> dict:
         if market_type:
-            infos = self.query_dict(infos, {f"is_{market_type}": True})
-        return {v["raw_data"]["instId"]: k for k, v in infos.items()}
+            return instrument_id_map(infos, "instId", **{f"is_{market_type}": True})
+        return instrument_id_map(infos, "instId")
 
     def parse_tickers(self, response: dict, market_type: str, infos: dict) -> dict:
         response = self.check_response(response)
@@ -390,12 +396,14 @@ class OkxParser(Parser):
 
         return results[0] if len(results) == 1 else results
 
-    def parse_orderbook(self, response: dict, info: dict) -> dict:
+    def parse_orderbook(self, response: dict, info: dict, as_arrays: bool = False) -> any:
         response = self.check_response(response)
         datas = response["data"][0]
 
         asks = datas["asks"]
         bids = datas["bids"]
+        if as_arrays:
+            return self.parse_orderbook_arrays(bids, asks, info, self.parse_str(datas["ts"], int))
         return {
             "timestamp": self.parse_str(datas["ts"], int),
             "perp_instrument_id": self.parse_unified_id(info),
@@ -418,7 +426,7 @@ class OkxParser(Parser):
             "raw_data": datas,
         }
 
-    def parse_candlesticks(self, response: dict, info: dict, interval: str) -> any:
+    def parse_candlesticks(self, response: dict, info: dict, interval: str, as_arrays: bool = False) -> any:
         def parse_volumes(data: list, market_type: str) -> dict:
             return {
                 "base_volume": self.parse_str(data[5 if market_type == "spot" else 6], float),
@@ -431,6 +439,9 @@ class OkxParser(Parser):
 
         instrument_id = self.parse_unified_id(info)
         market_type = self.parse_unified_market_type(info)
+        if as_arrays:
+            columns = CandleColumns(0, 1, 2, 3, 4, 5 if market_type == "spot" else 6, 7, 5)
+            return self.parse_candle_arrays(datas, info, interval, columns)
 
         results = []
         for data in datas:
@@ -452,4 +463,11 @@ class OkxParser(Parser):
                 }
             )
 
-        return results if len(results) > 1 else results[0]
+        return results if len(results) != 1 else results[0]
+
+    def parse_ws_trade(self, data: dict, info: dict) -> dict:
+        # derivative sizes count contracts
+        unit = "base" if info["is_spot"] or info["is_margin"] else "contracts"
+        return self.parse_unified_trade(
+            info, data["ts"], data["tradeId"], data["side"], data["px"], data["sz"], unit, raw_data=data
+        )
@@ -0,0 +1,371 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from .candles import CANDLE_COLUMNS, CandleArrays, CandleColumns, parse_interval_ms
+from .pagination import INTERVAL_MS, MIN_FUNDING_INTERVAL_MS
+
+Range = Tuple[int, int]
+
+# upper bound of a month candle, which has no fixed length
+_MONTH_MS = 31 * INTERVAL_MS["1d"]
+
+FUNDING_COLUMNS = ("funding_rate", "realized_rate")
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    """
+    Union of inclusive ms ranges, sorted, with overlapping and adjacent ranges joined
+    """
+    merged: List[Range] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(covered: List[Range], start: int, end: int) -> List[Range]:
+    """
+    Parts of `[start, end]` outside the sorted, merged `covered` ranges
+    """
+    gaps: List[Range] = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - 1))
+        cursor = covered_end + 1
+        if cursor > end:
+            return gaps
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+def settled_candle_time(interval: str) -> int:
+    """
+    Latest open time of a closed candle of `interval`; the newest candle may still be open, a range reaching past
+    this time is stored but fetched again next time
+    """
+    return _now() - INTERVAL_MS.get(interval, _MONTH_MS)
+
+
+class _HistoryStore(object):
+    """
+    SQLite tables of one kind of timestamped history: `{TABLE}_series` names each series by its `KEY` columns,
+    `{TABLE}` holds the rows and `{TABLE}_coverage` the time ranges fetched completely, so ranges without rows
+    (listing, maintenance) are not fetched again. Stores of different kinds can share one database file.
+    """
+
+    TABLE: str = ""
+    KEY: Tuple[str, ...] = ()
+    COLUMNS: Tuple[str, ...] = ()
+
+    def __init__(self, path: str):
+        """
+        :param path: database file, ":memory:" for a store that lives as long as the object
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # blocking calls run in worker threads, serialised by the lock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.executescript(self._schema())
+
+    @classmethod
+    def _schema(cls) -> str:
+        return f"""
+        CREATE TABLE IF NOT EXISTS {cls.TABLE}_series (
+            id INTEGER PRIMARY KEY,
+            {", ".join(f"{name} TEXT NOT NULL" for name in cls.KEY)},
+            market_type TEXT,
+            UNIQUE ({", ".join(cls.KEY)})
+        );
+        CREATE TABLE IF NOT EXISTS {cls.TABLE} (
+            series_id INTEGER NOT NULL,
+            timestamp INTEGER NOT NULL,
+            {", ".join(f"{name} REAL" for name in cls.COLUMNS)},
+            PRIMARY KEY (series_id, timestamp)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS {cls.TABLE}_coverage (
+            series_id INTEGER NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time INTEGER NOT NULL,
+            PRIMARY KEY (series_id, start_time)
+        ) WITHOUT ROWID;
+        """
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _series(self, key: tuple, create: bool = False, market_type: str = None) -> Optional[tuple]:
+        # (id, market_type) of the series, created on demand
+        where = " AND ".join(f"{name} = ?" for name in self.KEY)
+        row = self._db.execute(f"SELECT id, market_type FROM {self.TABLE}_series WHERE {where}", key).fetchone()
+        if row is not None or not create:
+            return row
+        series_id = self._db.execute(
+            f"INSERT INTO {self.TABLE}_series ({', '.join(self.KEY)}, market_type) VALUES (?{', ?' * len(self.KEY)})",
+            (*key, market_type),
+        ).lastrowid
+        return series_id, market_type
+
+    def _coverage(self, key: tuple) -> List[Range]:
+        with self._lock:
+            series = self._series(key)
+            if series is None:
+                return []
+            rows = self._db.execute(
+                f"SELECT start_time, end_time FROM {self.TABLE}_coverage WHERE series_id = ? ORDER BY start_time",
+                (series[0],),
+            )
+            return [tuple(row) for row in rows]
+
+    def _write(self, key: tuple, rows: List[dict], covered: Optional[Range], market_type: Optional[str]) -> None:
+        market_type = market_type or next((v["market_type"] for v in rows), None)
+        with self._lock, self._db:
+            series_id = self._series(key, True, market_type)[0]
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO {self.TABLE} VALUES (?, ?{', ?' * len(self.COLUMNS)})",
+                [(series_id, v["timestamp"], *(v[name] for name in self.COLUMNS)) for v in rows],
+            )
+            if covered is None:
+                return
+            start, end = covered
+            # ranges overlapping or touching the new one are folded into it
+            overlapping = f"FROM {self.TABLE}_coverage WHERE series_id = ? AND start_time <= ? AND end_time >= ?"
+            params = (series_id, end + 1, start - 1)
+            (start, end), *_ = merge_ranges(
+                [(start, end), *self._db.execute(f"SELECT start_time, end_time {overlapping}", params)]
+            )
+            self._db.execute(f"DELETE {overlapping}", params)
+            self._db.execute(f"INSERT INTO {self.TABLE}_coverage VALUES (?, ?, ?)", (series_id, start, end))
+
+    def _read(self, key: tuple, start: int, end: int) -> Tuple[Optional[str], list]:
+        # (market_type, ascending rows of timestamp and COLUMNS)
+        with self._lock:
+            series = self._series(key)
+            if series is None:
+                return None, []
+            rows = self._db.execute(
+                f"SELECT timestamp, {', '.join(self.COLUMNS)} FROM {self.TABLE} "
+                "WHERE series_id = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp",
+                (series[0], start, end),
+            ).fetchall()
+        return series[1], rows
+
+    async def _backfill(self, key: tuple, gaps: List[Range], fetch, settled: int, market_type: str) -> None:
+        """
+        Fetch and store every gap; the coverage of each stops at `settled`, past which rows may still change
+        :param fetch: async generator function receiving a gap and yielding ascending chunks of rows
+        """
+        for gap_start, gap_end in gaps:
+            async for chunk in fetch(gap_start, gap_end):
+                # chunks arrive in time order, everything up to the last row is complete
+                covered = (gap_start, min(chunk[-1]["timestamp"], settled)) if chunk else None
+                if covered is not None and covered[1] < gap_start:
+                    covered = None
+                await asyncio.to_thread(self._write, key, chunk, covered, market_type)
+            if gap_start <= settled:
+                await asyncio.to_thread(self._write, key, [], (gap_start, min(gap_end, settled)), market_type)
+
+
+class CandleStore(_HistoryStore):
+    """
+    SQLite store of unified candles keyed by exchange, unified instrument id and interval.
+    `get_history_candlesticks` fetches only the ranges missing from the store and serves the rest locally.
+    """
+
+    TABLE = "candles"
+    KEY = ("exchange", "instrument_id", "interval")
+    COLUMNS = CANDLE_COLUMNS
+
+    def coverage(self, exchange: str, instrument_id: str, interval: str) -> List[Range]:
+        """
+        :return: sorted, merged ranges known to be complete in the store
+        """
+        return self._coverage((exchange, instrument_id, interval))
+
+    def gaps(self, exchange: str, instrument_id: str, interval: str, start: int, end: int) -> List[Range]:
+        """
+        :return: parts of `[start, end]` that have not been fetched yet
+        """
+        return missing_ranges(self.coverage(exchange, instrument_id, interval), start, end)
+
+    def write(
+        self,
+        exchange: str,
+        instrument_id: str,
+        interval: str,
+        candles: List[dict],
+        covered: Optional[Range] = None,
+        market_type: str = None,
+    ) -> None:
+        """
+        Upsert unified candles and mark `covered` as complete
+        :param candles: candles as returned by `get_history_candlesticks`
+        :param covered: inclusive ms range the candles were fetched for, None to store them without coverage
+        :param market_type: unified market type of a new series, taken from the candles when omitted
+        """
+        self._write((exchange, instrument_id, interval), candles, covered, market_type)
+
+    def read(
+        self,
+        exchange: str,
+        instrument_id: str,
+        interval: str,
+        start: int,
+        end: int,
+        as_arrays: bool = False,
+        id_key: str = "instrument_id",
+    ):
+        """
+        Stored candles of `[start, end]`, ascending
+        :param as_arrays: return a `CandleArrays` instead of unified dicts, see `CandleArrays`
+        :param id_key: key of the instrument id in the dicts, the adaptor parser's `CANDLE_ID_KEY` to read candles
+            like the adaptor returns them
+        """
+        market_type, rows = self._read((exchange, instrument_id, interval), start, end)
+        if as_arrays:
+            return CandleArrays.from_rows(rows, CandleColumns(*range(8)), instrument_id, market_type, interval)
+        return [
+            {
+                "timestamp": row[0],
+                id_key: instrument_id,
+                "market_type": market_type,
+                "interval": interval,
+                **dict(zip(CANDLE_COLUMNS, row[1:])),
+            }
+            for row in rows
+        ]
+
+    async def get_history_candlesticks(
+        self, adaptor, instrument_id: str, interval: str, start: int, end: int, as_arrays: bool = False
+    ):
+        """
+        `adaptor.get_history_candlesticks(instrument_id, interval, start=start, end=end)` through the store: only the
+        gaps are fetched, streamed into the store chunk by chunk, and the range is then read locally. An interrupted
+        backfill resumes after the last stored chunk.
+        :param adaptor: any adaptor with `iter_history_candlesticks`
+        """
+        key = (adaptor.name, instrument_id, interval)
+        market_type = adaptor.parser.parse_unified_market_type(adaptor.exchange_info[instrument_id])
+        settled = min(end, settled_candle_time(interval))
+        gaps = await asyncio.to_thread(self.gaps, *key, start, end)
+
+        def fetch(gap_start: int, gap_end: int):
+            return adaptor.iter_history_candlesticks(instrument_id, interval, gap_start, gap_end)
+
+        await self._backfill(key, gaps, fetch, settled, market_type)
+        return await asyncio.to_thread(self.read, *key, start, end, as_arrays, adaptor.parser.CANDLE_ID_KEY)
+
+    async def record_candlesticks(self, exchange: str, updates: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """
+        Store the closed candles of a stream as they complete, passing every update through:
+
+            async for candle in store.record_candlesticks(okx.name, okx.subscribe_candlesticks(ids, "1m")):
+                ...
+
+        The range of a closed candle is marked as complete, so backfills of the recorded series only fetch what
+        the stream missed.
+        :param updates: `{instrument_id: candle}` updates of `subscribe_candlesticks` or
+            `subscribe_trade_candlesticks`
+        """
+        async for update in updates:
+            for instrument_id, candle in update.items():
+                if not candle.get("closed"):
+                    continue
+                try:
+                    start = candle["timestamp"]
+                    covered = (start, start + parse_interval_ms(candle["interval"]) - 1)
+                except ValueError:
+                    # month candles have no fixed length
+                    covered = None
+                key = (exchange, instrument_id, candle["interval"])
+                await asyncio.to_thread(self._write, key, [candle], covered, candle["market_type"])
+            yield update
+
+
+class FundingRateStore(_HistoryStore):
+    """
+    SQLite store of settled funding rates keyed by exchange and unified instrument id. Settled periods never change,
+    so `get_history_funding_rate` serves them locally and only asks the exchange for ranges not stored yet and for
+    the recent tail.
+    """
+
+    TABLE = "funding_rates"
+    KEY = ("exchange", "instrument_id")
+    COLUMNS = FUNDING_COLUMNS
+
+    def coverage(self, exchange: str, instrument_id: str) -> List[Range]:
+        """
+        :return: sorted, merged ranges known to be complete in the store
+        """
+        return self._coverage((exchange, instrument_id))
+
+    def gaps(self, exchange: str, instrument_id: str, start: int, end: int) -> List[Range]:
+        """
+        :return: parts of `[start, end]` that have not been fetched yet
+        """
+        return missing_ranges(self.coverage(exchange, instrument_id), start, end)
+
+    def write(
+        self,
+        exchange: str,
+        instrument_id: str,
+        funding_rates: List[dict],
+        covered: Optional[Range] = None,
+        market_type: str = None,
+    ) -> None:
+        """
+        Upsert unified funding rates and mark `covered` as complete
+        :param funding_rates: funding rates as returned by `get_history_funding_rate`
+        :param covered: inclusive ms range the rates were fetched for, None to store them without coverage
+        :param market_type: unified market type of a new series, taken from the rates when omitted
+        """
+        self._write((exchange, instrument_id), funding_rates, covered, market_type)
+
+    def read(self, exchange: str, instrument_id: str, start: int, end: int) -> List[dict]:
+        """
+        Stored funding rates of `[start, end]`, ascending
+        """
+        market_type, rows = self._read((exchange, instrument_id), start, end)
+        return [
+            {
+                "timestamp": row[0],
+                "perp_instrument_id": instrument_id,
+                "market_type": market_type,
+                **dict(zip(FUNDING_COLUMNS, row[1:])),
+            }
+            for row in rows
+        ]
+
+    async def get_history_funding_rate(self, adaptor, instrument_id: str, start: int, end: int) -> List[dict]:
+        """
+        `adaptor.get_history_funding_rate(instrument_id, start=start, end=end)` through the store: only the gaps are
+        fetched from the exchange, the range is then read locally
+        :param adaptor: any adaptor with `get_history_funding_rate`
+        """
+        key = (adaptor.name, instrument_id)
+        market_type = adaptor.parser.parse_unified_market_type(adaptor.exchange_info[instrument_id])
+        # a payment appears once its period settles, the last funding interval may still be missing
+        settled = min(end, _now() - MIN_FUNDING_INTERVAL_MS)
+        gaps = await asyncio.to_thread(self.gaps, *key, start, end)
+
+        async def fetch(gap_start: int, gap_end: int):
+            yield await adaptor.get_history_funding_rate(instrument_id, start=gap_start, end=gap_end)
+
+        await self._backfill(key, gaps, fetch, settled, market_type)
+        return await asyncio.to_thread(self.read, *key, start, end)
@@ -0,0 +1,390 @@
+import asyncio
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .account import AccountState
+from .candles import CandleCloser, TradeCandles
+from .exchanges.websocket import WebSocketClient
+from .orderbook import OrderBook
+
+# records buffered between the connections and a slow consumer before the connections wait
+STREAM_BUFFER = 10_000
+
+
+class Stream(NamedTuple):
+    """
+    One WebSocket connection of a subscription and how its data messages turn into `(instrument_id, record)` pairs
+    in the unified schema
+    """
+
+    websocket: WebSocketClient
+    parse: Callable[[Any], Iterable[Tuple[str, Any]]]
+    # releases what `parse` holds on to, e.g. pending snapshot requests, once the stream stops
+    close: Optional[Callable[[], None]] = None
+
+
+async def merge_streams(streams: List[Stream]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Records of every stream as they arrive. The connections are closed once the consumer stops iterating, an error
+    raised by one of them (e.g. a rejected subscription) ends the iteration.
+    """
+    queue = asyncio.Queue(STREAM_BUFFER)
+
+    async def pump(stream: Stream) -> None:
+        try:
+            async for message in stream.websocket.messages():
+                for record in stream.parse(message):
+                    await queue.put(record)
+        except Exception as e:
+            await queue.put(e)
+
+    tasks = [asyncio.ensure_future(pump(stream)) for stream in streams]
+    try:
+        while True:
+            record = await queue.get()
+            if isinstance(record, Exception):
+                raise record
+            yield record
+    finally:
+        for stream in streams:
+            await stream.websocket.close()
+            if stream.close is not None:
+                stream.close()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class StreamingMixin(object):
+    """
+    WebSocket subscriptions of the top-level adaptors. Adaptors describe the connections of a subscription in
+    `_ticker_streams`, `_orderbook_streams`, `_candlestick_streams`, `_trade_streams` and `_account_streams`; every
+    call opens its own connections, closed when the iteration stops.
+    """
+
+    # account cache of `watch_account` while it runs, placed orders are acknowledged from its pushes
+    _local_account: Optional["LocalAccount"] = None
+    # seconds to wait for the push of a placed order before asking the REST API
+    order_ack_timeout = 2.0
+
+    def _check_instruments(self, instrument_ids: List[str]) -> None:
+        for instrument_id in instrument_ids:
+            if instrument_id not in self.exchange_info:
+                raise ValueError(f"{instrument_id} not found in {self.name} exchange info")
+
+    def _group_instruments(self, instrument_ids: List[str], key: Callable[[dict], Hashable]) -> Dict[Hashable, list]:
+        # instrument ids by connection, e.g. by market type for exchanges with one endpoint per market
+        groups = {}
+        for instrument_id in instrument_ids:
+            groups.setdefault(key(self.exchange_info[instrument_id]), []).append(instrument_id)
+        return groups
+
+    @staticmethod
+    def _split_topics(topics: list, websocket_class: type) -> List[list]:
+        # topics of every connection, for subscriptions larger than one connection of the exchange takes
+        size = websocket_class.MAX_TOPICS or len(topics) or 1
+        return [topics[i : i + size] for i in range(0, len(topics), size)]
+
+    def _ticker_streams(self, instrument_ids: List[str]) -> List[Stream]:
+        raise NotImplementedError(f"{self.name} has no ticker stream")
+
+    async def subscribe_tickers(self, instrument_ids: List[str]) -> AsyncIterator[dict]:
+        """
+        Push-based `get_ticker`: every ticker update of the instruments as it is published, reconnecting and
+        resubscribing after disconnects
+
+            async for ticker in okx.subscribe_tickers(["BTC/USDT:USDT-PERP", "ETH/USDT:USDT-PERP"]):
+                ...
+
+        :param instrument_ids: unified instrument ids
+        :return: async iterator of `{instrument_id: ticker}`, the ticker as parsed by `get_ticker`
+        """
+        self._check_instruments(instrument_ids)
+        if not instrument_ids:
+            return
+        async for instrument_id, ticker in merge_streams(self._ticker_streams(instrument_ids)):
+            yield {instrument_id: ticker}
+
+    def _orderbook_streams(self, books: Dict[str, OrderBook]) -> List[Stream]:
+        """
+        :param books: empty book of every instrument, kept in sync by the streams' parse functions
+        :return: streams yielding `(instrument_id, book)` after every update applied to a book in sync
+        """
+        raise NotImplementedError(f"{self.name} has no order book stream")
+
+    async def subscribe_orderbooks(self, instrument_ids: List[str]) -> AsyncIterator[OrderBook]:
+        """
+        Local L2 order books maintained from the exchange's incremental depth stream: a snapshot, then diffs checked
+        against the sequence numbers and checksums the exchange publishes. A book that falls out of sync is
+        resynchronised from a new snapshot and skipped until then.
+
+            async for book in okx.subscribe_orderbooks(["BTC/USDT:USDT-PERP"]):
+                book.best_bid, book.best_ask, book.top(5)
+
+        :param instrument_ids: unified instrument ids
+        :return: async iterator of the `OrderBook` updated, the same object for an instrument every time
+        """
+        self._check_instruments(instrument_ids)
+        if not instrument_ids:
+            return
+        books = {instrument_id: OrderBook(instrument_id) for instrument_id in instrument_ids}
+        async for _, book in merge_streams(self._orderbook_streams(books)):
+            yield book
+
+    def watch_orderbooks(self, instrument_ids: List[str]) -> "LocalOrderBooks":
+        """
+        Order books kept up to date in the background, see `LocalOrderBooks`
+        """
+        self._check_instruments(instrument_ids)
+        return LocalOrderBooks(self, instrument_ids)
+
+    def _candlestick_streams(self, instrument_ids: List[str], intervals: List[str]) -> List[Stream]:
+        """
+        :return: streams yielding `(instrument_id, (candle, closed))` for every kline update: the candle as parsed by
+            `get_current_candlestick` and whether the exchange flags it final, None when the exchange does not tell
+        """
+        raise NotImplementedError(f"{self.name} has no candlestick stream")
+
+    async def subscribe_candlesticks(
+        self, instrument_ids: List[str], intervals: Union[str, List[str]]
+    ) -> AsyncIterator[dict]:
+        """
+        Push-based `get_current_candlestick` for every pair of instrument and interval, over as few connections as
+        the exchange allows. Every update of the candle in progress is yielded with `"closed": False`, followed by
+        the final candle with `"closed": True` once it is complete.
+
+            async for candle in okx.subscribe_candlesticks(["BTC/USDT:USDT-PERP"], ["1m", "1h"]):
+                ...
+
+        :param instrument_ids: unified instrument ids
+        :param intervals: intervals supported by the exchange's kline stream, see `subscribe_trade_candlesticks` for
+            any other interval
+        :return: async iterator of `{instrument_id: candle}`
+        """
+        self._check_instruments(instrument_ids)
+        intervals = [intervals] if isinstance(intervals, str) else list(intervals)
+        if not instrument_ids or not intervals:
+            return
+        closer = CandleCloser()
+        async for instrument_id, (candle, closed) in merge_streams(
+            self._candlestick_streams(instrument_ids, intervals)
+        ):
+            for result in closer.update((instrument_id, candle["interval"]), candle, closed):
+                yield {instrument_id: result}
+
+    def _trade_streams(self, instrument_ids: List[str]) -> List[Stream]:
+        """
+        :return: streams yielding `(instrument_id, trade)` for every public trade, see `Parser.parse_unified_trade`
+        """
+        raise NotImplementedError(f"{self.name} has no trade stream")
+
+    async def subscribe_trades(self, instrument_ids: List[str]) -> AsyncIterator[dict]:
+        """
+        Public trades of the instruments as they happen, with the taker side and the volumes in base, quote and
+        contracts
+
+        :param instrument_ids: unified instrument ids
+        :return: async iterator of `{instrument_id: trade}`
+        """
+        self._check_instruments(instrument_ids)
+        if not instrument_ids:
+            return
+        async for instrument_id, trade in merge_streams(self._trade_streams(instrument_ids)):
+            yield {instrument_id: trade}
+
+    async def subscribe_trade_candlesticks(
+        self, instrument_ids: List[str], intervals: Union[str, List[str]]
+    ) -> AsyncIterator[dict]:
+        """
+        `subscribe_candlesticks` for any fixed interval, e.g. "15s" or "7m": candles are built locally from the
+        public trade stream, one connection per market for every interval, see `TradeCandles`. Intervals without
+        trades produce no candle, and candles start with the first trade received.
+
+        :param instrument_ids: unified instrument ids
+        :param intervals: see `parse_interval_ms`
+        :return: async iterator of `{instrument_id: candle}`, `raw_data` is None
+        """
+        self._check_instruments(instrument_ids)
+        intervals = [intervals] if isinstance(intervals, str) else list(intervals)
+        builders = [TradeCandles(interval) for interval in intervals]
+        if not instrument_ids or not builders:
+            return
+        async for instrument_id, trade in merge_streams(self._trade_streams(instrument_ids)):
+            for builder in builders:
+                for candle in builder.update(trade):
+                    yield {instrument_id: candle}
+
+    def _account_streams(self, **options) -> List[Stream]:
+        """
+        :return: authenticated streams yielding `("order", order)` for every order update, the order in the format
+            of the adaptor's order info, and `("position", {instrument_id: position})` in the format of
+            `get_positions`
+        """
+        raise NotImplementedError(f"{self.name} has no account stream")
+
+    async def subscribe_account(self, **options) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Order and position updates of the account as the exchange pushes them
+
+            async for kind, record in okx.subscribe_account():
+                ...
+
+        :param options: exchange specific, e.g. the markets of Binance's user data streams
+        :return: async iterator of `("order", order)` and `("position", {instrument_id: position})`
+        """
+        async for kind, record in merge_streams(self._account_streams(**options)):
+            yield kind, record
+
+    def watch_account(self, **options) -> "LocalAccount":
+        """
+        Orders and positions kept up to date in the background, see `LocalAccount`
+        """
+        return LocalAccount(self, **options)
+
+    async def _pushed_order(self, order_id: str) -> Optional[dict]:
+        # the order as pushed to a running `watch_account`, None to fall back to polling
+        account = self._local_account
+        if account is None or not account.connected:
+            return None
+        return await account.state.wait_order(order_id, self.order_ack_timeout)
+
+
+class LocalAccount(object):
+    """
+    Orders and positions of the account maintained by a background task from the exchange's private streams:
+
+        async with okx.watch_account() as account:
+            order = await okx.place_limit_order("BTC/USDT:USDT-PERP", "buy", 20000, 1)
+            await account.wait_order(order["order_id"], timeout=10)
+            account.positions, account.open_orders()
+
+    While it runs, the adaptor acknowledges placed orders from their push instead of requesting the order again.
+    Orders only appear with their first update after the stream started, positions with their first change or the
+    snapshot some exchanges push on subscribe.
+    """
+
+    def __init__(self, adaptor: StreamingMixin, **options):
+        self.adaptor = adaptor
+        self.options = options
+        self.state = AccountState()
+        self._streams: List[Stream] = []
+        self._task: Optional[asyncio.Future] = None
+
+    @property
+    def orders(self) -> Dict[str, dict]:
+        return self.state.orders
+
+    @property
+    def positions(self) -> Dict[str, dict]:
+        return self.state.positions
+
+    @property
+    def connected(self) -> bool:
+        return bool(self._streams) and all(stream.websocket.connected for stream in self._streams)
+
+    def open_orders(self, instrument_id: str = None) -> List[dict]:
+        return self.state.open_orders(instrument_id)
+
+    async def wait_order(self, order_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        See `AccountState.wait_order`
+        """
+        return await self.state.wait_order(order_id, timeout)
+
+    async def _run(self) -> None:
+        self._streams = self.adaptor._account_streams(**self.options)
+        try:
+            async for kind, record in merge_streams(self._streams):
+                self.state.update(kind, record)
+        finally:
+            self._streams = []
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+            self.adaptor._local_account = self
+
+    async def close(self) -> None:
+        if self.adaptor._local_account is self:
+            self.adaptor._local_account = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self) -> "LocalAccount":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class LocalOrderBooks(object):
+    """
+    Order books of several instruments maintained by a background task, read from memory at any time:
+
+        async with okx.watch_orderbooks(["BTC/USDT:USDT-PERP"]) as books:
+            await books.wait_synced()
+            books["BTC/USDT:USDT-PERP"].best_bid
+
+    Reads never wait for the network; check `OrderBook.synced` before trusting a book after a disconnect.
+    """
+
+    def __init__(self, adaptor: StreamingMixin, instrument_ids: List[str]):
+        self.adaptor = adaptor
+        self.books = {instrument_id: OrderBook(instrument_id) for instrument_id in instrument_ids}
+        self._synced = asyncio.Event()
+        self._task: Optional[asyncio.Future] = None
+
+    def __getitem__(self, instrument_id: str) -> OrderBook:
+        return self.books[instrument_id]
+
+    def __iter__(self):
+        return iter(self.books.values())
+
+    async def _run(self) -> None:
+        async for _ in merge_streams(self.adaptor._orderbook_streams(self.books)):
+            if not self._synced.is_set() and all(book.synced for book in self.books.values()):
+                self._synced.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def wait_synced(self) -> None:
+        """
+        Wait for the first snapshot of every book, raising the error that stopped the streams if any
+        """
+        self.start()
+        waiter = asyncio.ensure_future(self._synced.wait())
+        try:
+            await asyncio.wait([waiter, self._task], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiter.cancel()
+        if self._task.done():
+            self._task.result()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def __aenter__(self) -> "LocalOrderBooks":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -1,9 +1,42 @@
-import pandas as pd
+from .instruments import as_dict, select_instruments
+
+
+def _import_pandas():
+    # pandas is an optional extra (`pip install cex-adaptors[pandas]`), only needed for DataFrame export
+    try:
+        import pandas as pd
+    except ImportError as e:
+        raise ImportError(
+            "pandas is required for this function, install it with `pip install cex-adaptors[pandas]`"
+        ) from e
+    return pd
+
+
+def to_dataframe(dictionary: dict):
+    """
+    Convert a nested dictionary (e.g. exchange info or tickers) to a pandas DataFrame, one row per outer key
+    :param dictionary: dictionary to convert
+    :return: pandas.DataFrame
+    """
+    pd = _import_pandas()
+    # exchange info holds read-only `Instrument` mappings, which pandas would read as sequences of their keys
+    return pd.DataFrame({key: as_dict(value) for key, value in dictionary.items()}).T
+
+
+def filter_dict(dictionary: dict, **criteria) -> dict:
+    """
+    Filter a nested dictionary by exact values of the inner dictionaries without pandas,
+    e.g. `filter_dict(exchange_info, is_perp=True, settle="USDT")`
+    :param dictionary: dictionary to filter
+    :param criteria: inner key -> required value
+    :return: filtered dictionary
+    """
+    return select_instruments(dictionary, **criteria)
 
 
 def query_dict(dictionary: dict, query: str, query_env: dict = None) -> dict:
     """
-    Query a dictionary with a query string
+    Query a dictionary with a query string, requires pandas. Use `filter_dict` for exact-value filters.
     :param dictionary: dictionary to query
     :param query: query string
     :param query_env: additional variables for query execution
@@ -12,7 +45,7 @@ def query_dict(dictionary: dict, query: str, query_env: dict = None) -> dict:
     if not query:
         return dictionary
 
-    df = pd.DataFrame(dictionary).T
+    df = to_dataframe(dictionary)
 
     if query_env:
         df = df.query(query, local_dict=query_env)
@@ -11,6 +11,8 @@ setup(
     version="1.0.7",
     packages=find_packages(),
     install_requires=load_requirements(),
+    # DataFrame export (`cex_adaptors.utils.to_dataframe` / `query_dict`), columnar candles (`as_arrays=True`)
+    extras_require={"pandas": ["pandas==2.2.3", "numpy==2.2.2"], "numpy": ["numpy==2.2.2"]},
     long_description=open("README.md").read(),
     long_description_content_type="text/markdown",
 )
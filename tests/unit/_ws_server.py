@@ -0,0 +1,67 @@
+import json
+
+from aiohttp import WSMsgType, web
+from aiohttp.test_utils import TestServer
+
+
+class ReplayServer(object):
+    """
+    Local stand-in for an exchange WebSocket endpoint. Every connection reads `subscribe_requests` messages, then
+    replays the recorded frames; the first `drops` connections are closed right after, the others stay open and
+    record what the client sends. Endpoints taking a path after the URL, like listen keys, are served as well.
+    """
+
+    def __init__(self, frames: list, subscribe_requests: int = 1, drops: int = 0):
+        self.frames = frames
+        self.subscribe_requests = subscribe_requests
+        self.drops = drops
+        self.connections = 0
+        # (connection number, decoded message) of everything the clients sent
+        self.received = []
+        # request path of every connection
+        self.paths = []
+        self._server = None
+
+    async def __aenter__(self) -> "ReplayServer":
+        app = web.Application()
+        app.router.add_get("/ws", self._handle)
+        app.router.add_get("/ws/{tail:.+}", self._handle)
+        self._server = TestServer(app)
+        await self._server.start_server()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._server.close()
+
+    @property
+    def url(self) -> str:
+        return str(self._server.make_url("/ws"))
+
+    def _record(self, connection: int, message) -> None:
+        try:
+            self.received.append((connection, json.loads(message.data)))
+        except ValueError:
+            self.received.append((connection, message.data))
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.paths.append(request.path)
+        self.connections += 1
+        connection = self.connections
+
+        for _ in range(self.subscribe_requests):
+            self._record(connection, await ws.receive())
+        for frame in self.frames:
+            if isinstance(frame, bytes):
+                await ws.send_bytes(frame)
+            else:
+                await ws.send_str(frame if isinstance(frame, str) else json.dumps(frame))
+
+        if connection <= self.drops:
+            await ws.close()
+            return ws
+        async for message in ws:
+            if message.type == WSMsgType.TEXT:
+                self._record(connection, message)
+        return ws
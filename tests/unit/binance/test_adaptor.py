@@ -1,8 +1,13 @@
+import asyncio
 import unittest
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, patch
 
 from cex_adaptors.binance import Binance
+from cex_adaptors.candles import CANDLE_COLUMNS
+from cex_adaptors.exchanges.binance import BinanceUserDataWebSocket, BinanceWebSocket
+from cex_adaptors.exchanges.retry import RetryPolicy
+from tests.unit._ws_server import ReplayServer
 from tests.unit.binance._fixtures import load
 
 
@@ -98,6 +103,128 @@ class TestBinanceTickers(BinanceAdaptorTestCase):
         self.assertNotIn("BTC/USD:BTC-PERP", result)
 
 
+class TestBinanceTickerStream(BinanceAdaptorTestCase):
+    async def test_subscribe_tickers_across_markets(self):
+        async with ReplayServer(load("ws_spot_tickers")) as spot, ReplayServer(load("ws_linear_tickers")) as linear:
+            with patch.dict(BinanceWebSocket.URLS, {"spot": spot.url, "linear": linear.url}):
+                updates = {}
+                stream = self.binance.subscribe_tickers(["BTC/USDT:USDT", "BTC/USDT:USDT-PERP"])
+                async for update in stream:
+                    updates.update(update)
+                    if len(updates) == 2:
+                        break
+                await stream.aclose()
+
+        self.assertEqual(spot.received, [(1, {"method": "SUBSCRIBE", "params": ["btcusdt@ticker"], "id": 1})])
+        for instrument_id, rest in (("BTC/USDT:USDT", "spot_ticker"), ("BTC/USDT:USDT-PERP", "linear_ticker")):
+            expected = self.binance.parser.parse_ticker(load(rest), self.binance.exchange_info[instrument_id])
+            self.assertEqual({**updates[instrument_id], "raw_data": None}, {**expected, "raw_data": None})
+        self.assertEqual(updates["BTC/USDT:USDT"]["raw_data"]["e"], "24hrTicker")
+
+
+class TestBinanceCandlestickStream(BinanceAdaptorTestCase):
+    async def test_subscribe_candlesticks_parses_like_the_klines(self):
+        async with ReplayServer(load("ws_spot_klines")) as server:
+            with patch.dict(BinanceWebSocket.URLS, {"spot": server.url}):
+                updates = []
+                stream = self.binance.subscribe_candlesticks(["BTC/USDT:USDT"], ["1m"])
+                async for update in stream:
+                    updates.append(update["BTC/USDT:USDT"])
+                    if len(updates) == 2:
+                        break
+                await stream.aclose()
+
+        self.assertEqual(server.received, [(1, {"method": "SUBSCRIBE", "params": ["btcusdt@kline_1m"], "id": 1})])
+        self.assertEqual([candle["closed"] for candle in updates], [False, True])
+        row = [1700000040000, "37000.00", "37030.00", "36990.00", "37025.00", "3.00000", 1700000099999, "111015.00000"]
+        rest = self.binance.parser.parse_candlesticks([row], self.binance.exchange_info["BTC/USDT:USDT"], "spot", "1m")
+        self.assertEqual({**updates[1], "raw_data": None}, {**rest, "raw_data": None, "closed": True})
+
+    def test_inverse_trades_count_contracts(self):
+        (stream,) = self.binance._trade_streams(["BTC/USD:BTC-PERP"])
+        self.assertEqual(stream.websocket.topics, ["btcusd_perp@aggTrade"])
+        ((instrument_id, trade),) = stream.parse(load("ws_inverse_agg_trades")[0])
+
+        self.assertEqual(instrument_id, "BTC/USD:BTC-PERP")
+        # the buyer made the market, the taker sold 74 contracts of 100 USD
+        self.assertEqual((trade["side"], trade["trade_id"], trade["contract_volume"]), ("sell", "5933014", 74.0))
+        self.assertEqual((trade["quote_volume"], trade["base_volume"]), (7400.0, 0.2))
+
+    def test_topics_are_split_across_connections(self):
+        symbols = ["BTC/USDT:USDT", "ETH/USDT:USDT", "SOL/BUSD:BUSD"]
+        intervals = ["1m", "3m", "5m", "15m", "30m", "1h", "2h", "4h", "6h", "8h", "12h", "1d", "3d", "1w", "1M"]
+        self.assertEqual(len(self.binance._candlestick_streams(symbols, intervals)), 1)
+        with patch.object(BinanceWebSocket, "MAX_TOPICS", 20):
+            streams = self.binance._candlestick_streams(symbols, intervals)
+        self.assertEqual([len(stream.websocket.topics) for stream in streams], [20, 20, 5])
+
+
+class TestBinanceAccountStream(BinanceAdaptorTestCase):
+    async def test_margin_user_data_stream(self):
+        self.binance.spot._create_listen_key = AsyncMock(return_value={"listenKey": "listen-key"})
+        async with ReplayServer(load("ws_spot_user_data"), subscribe_requests=0) as server:
+            with patch.dict(BinanceWebSocket.URLS, {"spot": server.url}):
+                stream = self.binance.subscribe_account(markets=["margin"])
+                kind, order = await stream.__anext__()
+                await stream.aclose()
+
+        self.binance.spot._create_listen_key.assert_awaited_once_with(margin=True)
+        self.assertEqual(server.paths, ["/ws/listen-key"])
+        self.assertEqual(server.received, [])
+        self.assertEqual(kind, "order")
+        self.assertEqual(order["perp_instrument_id"], "BTC/USDT:USDT")
+        self.assertEqual((order["order_id"], order["side"], order["order_type"]), ("4293153", "buy", "limit"))
+        self.assertEqual((order["status"], order["price"], order["volume"]), ("FILLED", 37000.0, 0.01))
+        self.assertEqual((order["fee_ccy"], order["fee"], order["timestamp"]), ("BTC", 0.00001, 1700000041000))
+
+    def test_linear_orders_and_positions(self):
+        (stream,) = self.binance._account_streams(markets=["linear"])
+        updates = [update for message in load("ws_linear_user_data") for update in stream.parse(message)]
+
+        (_, order), (_, positions) = updates
+        self.assertEqual([kind for kind, _ in updates], ["order", "position"])
+        self.assertEqual((order["perp_instrument_id"], order["order_id"]), ("BTC/USDT:USDT-PERP", "8886774"))
+        self.assertEqual((order["side"], order["volume"], order["fee"]), ("sell", 0.002, 0.0296))
+        # ETHUSDT is not listed in the exchange info
+        self.assertEqual(list(positions), ["BTC/USDT:USDT-PERP"])
+        self.assertEqual(positions["BTC/USDT:USDT-PERP"]["position"], -0.002)
+
+    def test_unknown_market(self):
+        with self.assertRaises(ValueError):
+            self.binance._account_streams(markets=["inverse"])
+
+    async def test_listen_key_is_kept_alive(self):
+        create_listen_key = AsyncMock(return_value={"listenKey": "listen-key"})
+        keep_alive = AsyncMock(return_value={})
+        async with ReplayServer(load("ws_spot_user_data"), subscribe_requests=0) as server:
+            websocket = BinanceUserDataWebSocket(server.url, create_listen_key, keep_alive)
+            websocket.PING_INTERVAL = 0.01
+            messages = websocket.messages()
+            self.assertEqual((await messages.__anext__())["e"], "executionReport")
+            while keep_alive.await_count < 2:
+                await asyncio.sleep(0.01)
+            await websocket.close()
+            await messages.aclose()
+
+        keep_alive.assert_awaited_with("listen-key")
+        self.assertEqual(websocket.reconnects, 0)
+
+    async def test_expired_listen_key_is_replaced(self):
+        create_listen_key = AsyncMock(side_effect=[{"listenKey": "first"}, {"listenKey": "second"}])
+        frames = [load("ws_spot_user_data")[0], {"e": "listenKeyExpired", "E": 1700000041000, "listenKey": "first"}]
+        async with ReplayServer(frames, subscribe_requests=0) as server:
+            websocket = BinanceUserDataWebSocket(
+                server.url, create_listen_key, AsyncMock(), reconnect_policy=RetryPolicy(base_delay=0)
+            )
+            messages = websocket.messages()
+            for _ in range(2):
+                self.assertEqual((await messages.__anext__())["e"], "executionReport")
+            await websocket.close()
+            await messages.aclose()
+
+        self.assertEqual(server.paths, ["/ws/first", "/ws/second"])
+
+
 class TestBinanceCandlesticks(BinanceAdaptorTestCase):
     async def test_history_candlesticks_num(self):
         self.binance.spot._get_klines = AsyncMock(return_value=load("spot_klines"))
@@ -122,6 +249,92 @@ class TestBinanceCandlesticks(BinanceAdaptorTestCase):
             self.assertGreaterEqual(kline["timestamp"], start)
             self.assertLessEqual(kline["timestamp"], end)
 
+    async def test_history_candlesticks_pages_are_planned_and_fetched_concurrently(self):
+        in_flight, peak, windows = 0, 0, []
+
+        async def klines(symbol, interval, limit, startTime, endTime):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            windows.append((startTime, endTime))
+            return [[t, "1", "1", "1", "1", "1", t + 59_999, "1"] for t in range(startTime, endTime + 1, 60_000)]
+
+        self.binance.spot._get_klines = AsyncMock(side_effect=klines)
+        start = 1700000000000
+        end = start + 3 * 1000 * 60_000 - 1
+
+        result = await self.binance.get_history_candlesticks("BTC/USDT:USDT", "1m", start=start, end=end)
+
+        self.assertEqual(len(result), 3000)
+        self.assertEqual([v["timestamp"] for v in result], list(range(start, end, 60_000)))
+        self.assertEqual(
+            sorted(windows), [(start + i * 60_000_000, start + (i + 1) * 60_000_000 - 1) for i in range(3)]
+        )
+        self.assertEqual(peak, 3)
+
+    async def test_inverse_history_candlestick_windows_stay_within_200_days(self):
+        windows = []
+
+        async def klines(symbol, interval, limit, startTime, endTime):
+            windows.append((startTime, endTime, limit))
+            return [
+                [t, "1", "1", "1", "1", "1", t + 86_399_999, "1"] for t in range(startTime, endTime + 1, 86_400_000)
+            ]
+
+        self.binance.inverse._get_klines = AsyncMock(side_effect=klines)
+        start = 1600000000000
+        end = start + 500 * 86_400_000 - 1
+
+        result = await self.binance.get_history_candlesticks("BTC/USD:BTC-PERP", "1d", start=start, end=end)
+
+        self.assertEqual([v["timestamp"] for v in result], list(range(start, end, 86_400_000)))
+        self.assertEqual(len(windows), 3)
+        self.assertTrue(all(e - s < 200 * 86_400_000 and limit == 200 for s, e, limit in windows))
+
+    async def test_iter_history_candlesticks_streams_chunks_in_order(self):
+        requested = []
+
+        async def klines(symbol, interval, limit, startTime, endTime):
+            requested.append(startTime)
+            # later windows answer first
+            await asyncio.sleep(0.001 * (5 - len(requested)))
+            return [[t, "1", "1", "1", "1", "1", t + 59_999, "1"] for t in range(startTime, endTime + 1, 60_000)]
+
+        self.binance.spot._get_klines = AsyncMock(side_effect=klines)
+        self.binance.page_concurrency = 2
+        start = 1700000000000
+        end = start + 5 * 1000 * 60_000 - 1
+
+        chunks = [chunk async for chunk in self.binance.iter_history_candlesticks("BTC/USDT:USDT", "1m", start, end)]
+        self.assertEqual([len(chunk) for chunk in chunks], [1000] * 5)
+        self.assertEqual([v["timestamp"] for chunk in chunks for v in chunk], list(range(start, end, 60_000)))
+
+        # the consumer stopping early leaves at most `page_concurrency` windows fetched ahead
+        requested.clear()
+        async for _ in self.binance.iter_history_candlesticks("BTC/USDT:USDT", "1m", start, end):
+            break
+        self.assertLessEqual(len(requested), 3)
+
+    async def test_iter_history_candlesticks_unknown_instrument(self):
+        with self.assertRaises(ValueError):
+            async for _ in self.binance.iter_history_candlesticks("XYZ/USDT:USDT", "1m", 0, 1):
+                pass
+
+    async def test_candles_as_arrays_match_the_dicts(self):
+        info = self.binance.exchange_info["BTC/USDT:USDT-PERP"]
+        records = self.binance.parser.parse_candlesticks(load("linear_klines"), info, "linear", "1h")
+        arrays = self.binance.parser.parse_candlesticks(load("linear_klines"), info, "linear", "1h", as_arrays=True)
+
+        self.assertEqual(len(arrays), len(records))
+        self.assertEqual(str(arrays.timestamp.dtype), "int64")
+        self.assertEqual(arrays.instrument_id, "BTC/USDT:USDT-PERP")
+        fields = ("timestamp", *CANDLE_COLUMNS)
+        self.assertEqual(
+            [{k: v[k] for k in fields} for v in arrays.to_records()], [{k: v[k] for k in fields} for v in records]
+        )
+
     async def test_current_candlestick(self):
         # parser returns a single dict when only one kline is supplied
         self.binance.spot._get_klines = AsyncMock(return_value=load("spot_klines")[:1])
@@ -158,6 +371,16 @@ class TestBinanceFundingRate(BinanceAdaptorTestCase):
         self.assertTrue(all(start <= item["timestamp"] <= end for item in result))
         self.assertEqual(len(result), 2)
 
+    async def test_history_funding_rate_long_window_is_split(self):
+        self.binance.linear._get_funding_rate_history = AsyncMock(return_value=[])
+
+        start = 1600000000000
+        end = start + 365 * 86_400_000
+        await self.binance.get_history_funding_rate("BTC/USDT:USDT-PERP", start=start, end=end)
+
+        # one year of 8h funding is 2 windows of 1000 entries
+        self.assertEqual(self.binance.linear._get_funding_rate_history.await_count, 2)
+
 
 class TestBinanceDerivedPrices(BinanceAdaptorTestCase):
     async def test_index_price_linear(self):
@@ -206,6 +429,14 @@ class TestBinanceOrderbook(BinanceAdaptorTestCase):
         self.binance.linear._get_order_book.assert_awaited_once_with(symbol="BTCUSDT", limit=1000)
         self.assertEqual(len(result["bids"]), 2)
 
+    async def test_orderbook_as_arrays(self):
+        self.binance.spot._get_order_book = AsyncMock(return_value=load("spot_orderbook"))
+
+        result = await self.binance.get_orderbook("BTC/USDT:USDT", depth=2, as_arrays=True)
+        self.assertEqual(result.instrument_id, "BTC/USDT:USDT")
+        self.assertEqual(result.bids.price.tolist(), [19999.0, 19998.5])
+        self.assertEqual(result.spread, 2.0)
+
 
 class TestBinanceRejectsUnknownInstrument(BinanceAdaptorTestCase):
     async def test_unknown_instrument_current_candlestick(self):
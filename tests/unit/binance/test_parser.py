@@ -245,6 +245,13 @@ class TestBinanceOrderbook(unittest.TestCase):
         self.assertEqual(len(result["bids"]), 2)
         self.assertEqual(len(result["asks"]), 2)
 
+    def test_parse_orderbook_as_arrays(self):
+        result = self.parser.parse_orderbook(load("spot_orderbook"), self.spot_info, "spot", depth=2, as_arrays=True)
+        expected = self.parser.parse_orderbook(load("spot_orderbook"), self.spot_info, "spot", depth=2)
+
+        self.assertEqual(result.bids.price.tolist(), [bid["price"] for bid in expected["bids"]])
+        self.assertEqual(result.asks.size.tolist(), [ask["volume"] for ask in expected["asks"]])
+
 
 if __name__ == "__main__":
     unittest.main()
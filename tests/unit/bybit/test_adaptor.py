@@ -1,8 +1,12 @@
 import unittest
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from cex_adaptors.bybit import Bybit
+from cex_adaptors.candles import CANDLE_COLUMNS
+from cex_adaptors.exchanges.bybit import BybitWebSocket
+from cex_adaptors.orderbook import OrderBook
+from tests.unit._ws_server import ReplayServer
 from tests.unit.bybit._fixtures import load
 
 
@@ -102,6 +106,82 @@ class TestBybitTickers(BybitAdaptorTestCase):
         self.assertNotIn("BTC/USD:BTC-PERP", result)
 
 
+class TestBybitTickerStream(BybitAdaptorTestCase):
+    async def test_deltas_are_merged_into_the_snapshot(self):
+        async with ReplayServer(load("ws_linear_tickers")) as server:
+            with patch.dict(BybitWebSocket.URLS, {"linear": server.url}):
+                updates = []
+                stream = self.bybit.subscribe_tickers(["BTC/USDT:USDT-PERP"])
+                async for update in stream:
+                    updates.append(update["BTC/USDT:USDT-PERP"])
+                    if len(updates) == 2:
+                        break
+                await stream.aclose()
+
+        self.assertEqual(server.received, [(1, {"op": "subscribe", "args": ["tickers.BTCUSDT"]})])
+        snapshot, delta = updates
+        expected = self.bybit.parser.parse_raw_ticker(
+            load("linear_ticker"), "linear", self.bybit.exchange_info["BTC/USDT:USDT-PERP"]
+        )
+        self.assertEqual({**snapshot, "raw_data": None}, {**expected, "raw_data": None})
+        self.assertEqual((delta["timestamp"], delta["last"], delta["base_volume"]), (1700086400100, 20050.0, 1005.0))
+        self.assertEqual(delta["open"], 19900.0)
+
+
+class TestBybitCandlestickStream(BybitAdaptorTestCase):
+    def test_klines_parse_like_the_rest_endpoint(self):
+        (stream,) = self.bybit._candlestick_streams(["BTC/USDT:USDT-PERP"], ["5m"])
+        self.assertEqual(stream.websocket.topics, ["kline.5.BTCUSDT"])
+        ((instrument_id, (candle, closed)),) = stream.parse(load("ws_linear_klines")[1])
+
+        info = self.bybit.exchange_info["BTC/USDT:USDT-PERP"]
+        row = ["1699999800000", "37000", "37030", "36990", "37025", "3", "111015"]
+        rest = self.bybit.parser.parse_candlesticks(
+            {"retCode": 0, "result": {"list": [row]}, "time": 1700000100001}, info, "linear", "5m"
+        )
+        self.assertEqual((instrument_id, closed), ("BTC/USDT:USDT-PERP", True))
+        self.assertEqual({**candle, "raw_data": None}, {**rest, "raw_data": None})
+
+    def test_inverse_trades_are_sized_in_usd(self):
+        (stream,) = self.bybit._trade_streams(["BTC/USD:BTC-PERP"])
+        ((_, trade),) = stream.parse(load("ws_inverse_trades")[1])
+
+        self.assertEqual((trade["side"], trade["price"], trade["timestamp"]), ("buy", 37000.0, 1700000041000))
+        self.assertEqual((trade["quote_volume"], trade["base_volume"]), (3700.0, 0.1))
+
+
+class TestBybitOrderBookStream(BybitAdaptorTestCase):
+    async def test_deltas_follow_update_ids(self):
+        book = OrderBook("BTC/USDT:USDT-PERP")
+        (stream,) = self.bybit._orderbook_streams({book.instrument_id: book})
+        stream.websocket.reconnect = MagicMock()
+        frames = load("ws_linear_orderbook")[1:]
+
+        updates = [(update.sequence, update.top()) for frame in frames[:2] for _, update in stream.parse(frame)]
+        self.assertEqual([sequence for sequence, _ in updates], [1000, 1001])
+        top = updates[1][1]
+        self.assertEqual([(level["price"], level["volume"]) for level in top["bids"]], [(19999.5, 0.8), (19998.5, 2.0)])
+        self.assertEqual([(level["price"], level["volume"]) for level in top["asks"]], [(20001.0, 0.4), (20002.0, 3.2)])
+        self.assertEqual(top["timestamp"], 1700086400100)
+
+        # update id 1002 is missing: the deltas after the gap are dropped and the book resubscribes
+        self.assertEqual([list(stream.parse(frame)) for frame in frames[2:]], [[], []])
+        self.assertFalse(book.synced)
+        self.assertEqual(book.best_ask["price"], 20001.0)
+        stream.websocket.reconnect.assert_called_once()
+
+    async def test_subscribe_orderbooks(self):
+        async with ReplayServer(load("ws_linear_orderbook")[:3]) as server:
+            with patch.dict(BybitWebSocket.URLS, {"linear": server.url}):
+                stream = self.bybit.subscribe_orderbooks(["BTC/USDT:USDT-PERP"])
+                book = await stream.__anext__()
+                await stream.aclose()
+
+        self.assertEqual(server.received, [(1, {"op": "subscribe", "args": ["orderbook.200.BTCUSDT"]})])
+        self.assertEqual(book.instrument_id, "BTC/USDT:USDT-PERP")
+        self.assertTrue(book.synced)
+
+
 class TestBybitCandlesticks(BybitAdaptorTestCase):
     async def test_history_candlesticks_num(self):
         # spot_klines has 3 entries, less than limit=1000 so the loop exits
@@ -126,6 +206,19 @@ class TestBybitCandlesticks(BybitAdaptorTestCase):
             self.assertGreaterEqual(kline["timestamp"], start)
             self.assertLessEqual(kline["timestamp"], end)
 
+    async def test_history_candlesticks_empty_window(self):
+        empty = load("linear_klines")
+        empty["result"]["list"] = []
+        self.bybit._get_klines = AsyncMock(return_value=empty)
+
+        start = 1700000000000
+        result = await self.bybit.get_history_candlesticks(
+            "BTC/USDT:USDT-PERP", "1h", start=start, end=start + 3_600_000
+        )
+
+        self.assertEqual(result, [])
+        self.assertEqual(self.bybit._get_klines.await_args.kwargs["start"], start)
+
     async def test_current_candlestick(self):
         raw = load("spot_klines")
         raw["result"]["list"] = raw["result"]["list"][:1]
@@ -145,6 +238,19 @@ class TestBybitCandlesticks(BybitAdaptorTestCase):
         self.assertEqual(called_kwargs["category"], "spot")
         self.assertEqual(called_kwargs["symbol"], "BTCUSDT")
 
+    async def test_candles_as_arrays_match_the_dicts(self):
+        info = self.bybit.exchange_info["BTC/USDT:USDT-PERP"]
+        records = self.bybit.parser.parse_candlesticks(load("linear_klines"), info, "linear", "1h")
+        arrays = self.bybit.parser.parse_candlesticks(load("linear_klines"), info, "linear", "1h", as_arrays=True)
+
+        self.assertEqual(len(arrays), len(records))
+        self.assertEqual(str(arrays.timestamp.dtype), "int64")
+        self.assertEqual(arrays.instrument_id, "BTC/USDT:USDT-PERP")
+        fields = ("timestamp", *CANDLE_COLUMNS)
+        self.assertEqual(
+            [{k: v[k] for k in fields} for v in arrays.to_records()], [{k: v[k] for k in fields} for v in records]
+        )
+
 
 class TestBybitFundingRate(BybitAdaptorTestCase):
     async def test_current_funding_rate_linear(self):
@@ -173,6 +279,14 @@ class TestBybitFundingRate(BybitAdaptorTestCase):
         self.assertTrue(all(start <= item["timestamp"] <= end for item in result))
         self.assertEqual(len(result), 3)
 
+    def test_funding_interval_of_the_instrument(self):
+        info = self.bybit.exchange_info["BTC/USDT:USDT-PERP"]
+        self.assertEqual(self.bybit._funding_interval_ms(info), 28_800_000)
+        # kept in the compacted exchange info
+        hourly = {**info.to_dict(), "raw_data": {**info["raw_data"], "fundingInterval": 60}}
+        self.bybit.exchange_info["BTC/USDT:USDT-PERP"] = hourly
+        self.assertEqual(self.bybit._funding_interval_ms(self.bybit.exchange_info["BTC/USDT:USDT-PERP"]), 3_600_000)
+
 
 class TestBybitDerivedPrices(BybitAdaptorTestCase):
     async def test_index_price_linear(self):
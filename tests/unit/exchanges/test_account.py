@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from cex_adaptors.account import AccountState
+
+
+def order(order_id: str, status: str, instrument_id: str = "BTC/USDT:USDT-PERP") -> dict:
+    return {"order_id": order_id, "status": status, "perp_instrument_id": instrument_id}
+
+
+class TestAccountState(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.state = AccountState(max_finished_orders=2)
+
+    def test_orders_keep_their_latest_update(self):
+        self.state.update("order", order("1", "live"))
+        self.state.update("order", order("2", "live", "ETH/USDT:USDT-PERP"))
+        self.state.update("order", order("1", "partially_filled"))
+
+        self.assertEqual(self.state.orders["1"]["status"], "partially_filled")
+        self.assertEqual([o["order_id"] for o in self.state.open_orders()], ["1", "2"])
+        self.assertEqual([o["order_id"] for o in self.state.open_orders("ETH/USDT:USDT-PERP")], ["2"])
+
+        self.state.update("order", order("1", "filled"))
+        self.assertEqual([o["order_id"] for o in self.state.open_orders()], ["2"])
+
+    def test_finished_orders_are_bounded(self):
+        self.state.update("order", order("1", "live"))
+        for order_id, status in [("2", "FILLED"), ("3", "canceled"), ("4", "EXPIRED")]:
+            self.state.update("order", order(order_id, status))
+
+        # the oldest finished order is dropped, open orders stay
+        self.assertEqual(sorted(self.state.orders), ["1", "3", "4"])
+        self.state.update("order", order("4", "EXPIRED"))
+        self.assertEqual(sorted(self.state.orders), ["1", "3", "4"])
+
+    def test_closed_positions_are_dropped(self):
+        self.state.update(
+            "position", {"BTC/USDT:USDT-PERP": {"position": 2.0}, "ETH/USDT:USDT-PERP": {"position": -1.0}}
+        )
+        self.state.update("position", {"BTC/USDT:USDT-PERP": {"position": 0.0}})
+
+        self.assertEqual(self.state.positions, {"ETH/USDT:USDT-PERP": {"position": -1.0}})
+        with self.assertRaises(ValueError):
+            self.state.update("balance", {})
+
+    async def test_wait_order_returns_a_known_order(self):
+        self.state.update("order", order("1", "live"))
+        self.assertEqual((await self.state.wait_order("1", 0))["status"], "live")
+
+    async def test_wait_order_waits_for_the_push(self):
+        waiter = asyncio.ensure_future(self.state.wait_order("1", 1))
+        await asyncio.sleep(0)
+        self.state.update("order", order("1", "filled"))
+
+        self.assertEqual((await waiter)["status"], "filled")
+        self.assertEqual(self.state._waiters, {})
+
+    async def test_wait_order_times_out(self):
+        self.assertIsNone(await self.state.wait_order("1", 0.01))
+        self.assertEqual(self.state._waiters, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
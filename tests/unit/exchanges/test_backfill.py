@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+from cex_adaptors.backfill import BackfillScheduler, backfill_candlesticks
+from cex_adaptors.binance import Binance
+from cex_adaptors.store import CandleStore
+from tests.unit.binance._fixtures import load
+
+START = 1700000000000
+MINUTE = 60_000
+INSTRUMENTS = ["BTC/USDT:USDT", "ETH/USDT:USDT"]
+
+
+class TestBackfillScheduler(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.binance = Binance()
+        self.binance.spot._get_exchange_info = AsyncMock(return_value=load("spot_exchange_info"))
+        self.binance.linear._get_exchange_info = AsyncMock(return_value=load("linear_exchange_info"))
+        self.binance.inverse._get_exchange_info = AsyncMock(return_value=load("inverse_exchange_info"))
+        await self.binance.sync_exchange_info()
+
+        self.requests, self.in_flight, self.peak, self.failing = [], 0, 0, set()
+
+        async def klines(symbol, interval, limit, startTime, endTime):
+            self.requests.append((symbol, startTime))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            await asyncio.sleep(0.001)
+            self.in_flight -= 1
+            if (symbol, startTime) in self.failing:
+                raise ConnectionError(symbol)
+            return [
+                [t, "1", "2", "0.5", "1.5", "10", t + MINUTE - 1, "15"] for t in range(startTime, endTime + 1, MINUTE)
+            ]
+
+        self.binance.spot._get_klines = AsyncMock(side_effect=klines)
+        self.store = CandleStore(":memory:")
+        self.end = START + 3000 * MINUTE - 1
+
+    async def asyncTearDown(self):
+        self.store.close()
+        await self.binance.close()
+
+    async def test_all_instruments_are_stored_newest_first(self):
+        scheduler = BackfillScheduler(self.binance, self.store, concurrency=1)
+        self.assertEqual(scheduler.add(INSTRUMENTS, "1m", START, self.end), 6)
+
+        stats = await scheduler.run()
+        self.assertEqual((stats.done, stats.requests, stats.candles, stats.remaining), (6, 6, 6000, 0))
+        self.assertEqual(stats.errors, {})
+        self.assertGreater(stats.candles_per_second, 0)
+        self.assertEqual(
+            self.requests,
+            [(symbol, START + n * 1000 * MINUTE) for n in (2, 1, 0) for symbol in ("BTCUSDT", "ETHUSDT")],
+        )
+        for instrument_id in INSTRUMENTS:
+            self.assertEqual(self.store.coverage("binance", instrument_id, "1m"), [(START, self.end)])
+            self.assertEqual(len(self.store.read("binance", instrument_id, "1m", START, self.end)), 3000)
+
+    async def test_pages_share_one_concurrency_budget(self):
+        progress = []
+        stats = await backfill_candlesticks(
+            self.binance, self.store, INSTRUMENTS, "1m", START, self.end, concurrency=2, on_progress=progress.append
+        )
+        self.assertEqual(stats.done, 6)
+        self.assertEqual(self.peak, 2)
+        self.assertEqual(len(progress), 6)
+
+    async def test_failed_windows_are_resumed(self):
+        self.failing.add(("ETHUSDT", START + 1000 * MINUTE))
+        stats = await backfill_candlesticks(self.binance, self.store, INSTRUMENTS, "1m", START, self.end)
+        self.assertEqual(stats.done, 5)
+        (task,) = stats.errors
+        self.assertEqual((task.instrument_id, task.start), ("ETH/USDT:USDT", START + 1000 * MINUTE))
+        self.assertIsInstance(stats.errors[task], ConnectionError)
+
+        self.failing.clear()
+        self.requests.clear()
+        scheduler = BackfillScheduler(self.binance, self.store)
+        self.assertEqual(scheduler.add(INSTRUMENTS, "1m", START, self.end), 1)
+        await scheduler.run()
+        self.assertEqual(self.requests, [("ETHUSDT", START + 1000 * MINUTE)])
+        self.assertEqual(self.store.coverage("binance", "ETH/USDT:USDT", "1m"), [(START, self.end)])
+
+    async def test_unknown_instrument(self):
+        with self.assertRaises(ValueError):
+            BackfillScheduler(self.binance, self.store).add(["DOGE/USDT:USDT"], "1m", START, self.end)
+
+
+if __name__ == "__main__":
+    unittest.main()
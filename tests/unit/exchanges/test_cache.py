@@ -0,0 +1,143 @@
+import time
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from cex_adaptors.exchanges.binance import BinanceLinear
+from cex_adaptors.exchanges.bybit import BybitUnified
+from cex_adaptors.exchanges.cache import (
+    INSTRUMENTS_TTL,
+    MISSING,
+    TICKER_TTL,
+    ResponseCache,
+    no_cache,
+    ttl_if_closed,
+)
+from cex_adaptors.exchanges.kucoin import KucoinFutures
+from cex_adaptors.exchanges.okx import OkxUnified
+from cex_adaptors.parsers.okx import OkxParser
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_ttl_resolution(self):
+        cache = ResponseCache({"/api/v5/public/instruments": 600, "/futures/*/tickers": 1})
+        self.assertEqual(cache.ttl_for("https://www.okx.com/api/v5/public/instruments"), 600)
+        self.assertEqual(cache.ttl_for("https://api.gateio.ws/futures/usdt/tickers"), 1)
+        self.assertIsNone(cache.ttl_for("https://www.okx.com/api/v5/market/books"))
+
+    def test_entries_expire(self):
+        cache = ResponseCache()
+        cache.set("k", 1, ttl=10)
+        self.assertEqual(cache.get("k"), 1)
+        with patch("cex_adaptors.exchanges.cache.time.monotonic", return_value=time.monotonic() + 11):
+            self.assertIs(cache.get("k"), MISSING)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+        cache.set("a", 1, 10)
+        cache.set("b", 2, 10)
+        cache.get("a")
+        cache.set("c", 3, 10)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_stats(self):
+        cache = ResponseCache()
+        cache.get("a")
+        cache.set("a", 1, 10)
+        cache.get("a")
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_closed_history_window(self):
+        ttl = ttl_if_closed("endTime", 86400, 60)
+        self.assertEqual(ttl({}), 60)
+        self.assertEqual(ttl({"endTime": int(time.time() * 1000) - 1000}), 86400)
+        self.assertEqual(ttl({"endTime": int(time.time() * 1000) + 60_000}), 60)
+        self.assertEqual(ttl({"endTime": int(time.time()) - 10}), 86400)
+
+
+class TestClientCache(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = OkxUnified(None, None, None)
+        self.client.response_checker = OkxParser.check_response
+        self.ok = {"code": "0", "msg": "", "data": []}
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_cached_endpoint_is_served_from_cache(self):
+        with patch.object(self.client, "_send", AsyncMock(return_value=self.ok)) as send:
+            await self.client._get_exchange_info("SPOT")
+            await self.client._get_exchange_info("SPOT")
+            await self.client._get_exchange_info("SWAP")
+        self.assertEqual(send.await_count, 2)
+        self.assertEqual(self.client.response_cache.hits, 1)
+
+    async def test_uncached_endpoint_always_fetches(self):
+        with patch.object(self.client, "_send", AsyncMock(return_value=self.ok)) as send:
+            await self.client._get_orderbook("BTC-USDT", 20)
+            await self.client._get_orderbook("BTC-USDT", 20)
+        self.assertEqual(send.await_count, 2)
+
+    async def test_no_cache_skips_lookup_but_refreshes(self):
+        fresh = {"code": "0", "msg": "", "data": [{"instId": "BTC-USDT"}]}
+        with patch.object(self.client, "_send", AsyncMock(side_effect=[self.ok, fresh])) as send:
+            await self.client._get_exchange_info("SPOT")
+            with no_cache():
+                self.assertEqual(await self.client._get_exchange_info("SPOT"), fresh)
+            self.assertEqual(await self.client._get_exchange_info("SPOT"), fresh)
+        self.assertEqual(send.await_count, 2)
+
+    async def test_error_payloads_are_not_cached(self):
+        error = {"code": "51001", "msg": "Instrument ID does not exist", "data": []}
+        with patch.object(self.client, "_send", AsyncMock(side_effect=[error, self.ok])) as send:
+            await self.client._get_exchange_info("SPOT")
+            await self.client._get_exchange_info("SPOT")
+        self.assertEqual(send.await_count, 2)
+
+    async def test_closed_funding_window_is_cached(self):
+        client = BinanceLinear()
+        past = int(time.time() * 1000) - 3600_000
+        with patch.object(client, "_send", AsyncMock(return_value=[])):
+            await client._get_funding_rate_history("BTCUSDT", endTime=past)
+        key = next(iter(client.response_cache._entries))
+        expires_at, _ = client.response_cache._entries[key]
+        self.assertGreater(expires_at - time.monotonic(), 3600)
+        await client.close()
+
+    async def test_bybit_funding_window_is_sent_and_cached_by_its_end(self):
+        client = BybitUnified()
+        past = int(time.time() * 1000) - 3600_000
+        with patch.object(client, "_send", AsyncMock(return_value={"retCode": 0, "result": {"list": []}})) as send:
+            await client._get_funding_rate_history("linear", "BTCUSDT", startTime=past - 3600_000, endTime=past)
+        self.assertEqual(
+            send.call_args.kwargs["params"],
+            {"category": "linear", "symbol": "BTCUSDT", "startTime": past - 3600_000, "endTime": past},
+        )
+        expires_at, _ = next(iter(client.response_cache._entries.values()))
+        self.assertGreater(expires_at - time.monotonic(), 3600)
+        await client.close()
+
+    async def test_kucoin_contract_detail_expires_like_a_ticker(self):
+        client = KucoinFutures()
+        base = client.futures_base_endpoint
+        self.assertEqual(client.response_cache.ttl_for(base + "/api/v1/contracts/active"), INSTRUMENTS_TTL)
+        self.assertEqual(client.response_cache.ttl_for(base + "/api/v1/contracts/XBTUSDTM"), TICKER_TTL)
+
+        now = time.monotonic()
+        with patch.object(client, "_send", AsyncMock(return_value={"code": "200000", "data": {}})) as send:
+            with patch("cex_adaptors.exchanges.cache.time.monotonic", return_value=now):
+                await client._get_symbol_detail("XBTUSDTM")
+                await client._get_symbol_detail("XBTUSDTM")
+            with patch("cex_adaptors.exchanges.cache.time.monotonic", return_value=now + TICKER_TTL + 0.1):
+                await client._get_symbol_detail("XBTUSDTM")
+        self.assertEqual(send.await_count, 2)
+        await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import math
+import unittest
+
+from cex_adaptors.candles import (
+    CandleArrays,
+    CandleCloser,
+    CandleColumns,
+    TradeCandles,
+    candle_start,
+    parse_interval_ms,
+)
+from cex_adaptors.parsers.kucoin import KucoinParser
+
+INFO = {
+    "base": "BTC",
+    "quote": "USDT",
+    "settle": "USDT",
+    "multiplier": 1,
+    "is_spot": True,
+    "is_futures": False,
+    "is_perp": False,
+}
+
+
+def candle(timestamp, close, quote_volume=None):
+    return {
+        "timestamp": timestamp,
+        "open": 1.0,
+        "high": 2.0,
+        "low": 0.5,
+        "close": close,
+        "base_volume": 10.0,
+        "quote_volume": quote_volume,
+        "contract_volume": 10.0,
+    }
+
+
+class TestCandleArrays(unittest.TestCase):
+    def test_rows_in_bulk_with_scales_and_missing_fields(self):
+        rows = [["1700000060", "1", "3", "0.5", "2", "10"], ["1700000000", "1", "2", "0.5", "1.5", "20"]]
+        columns = CandleColumns(0, 1, 2, 3, 4, 5, None, 5, timestamp_scale=1000, contract_volume_scale=0.5)
+        candles = CandleArrays.from_rows(rows, columns, "BTC/USDT:USDT", "spot", "1m")
+
+        self.assertEqual(candles.timestamp.tolist(), [1700000060000, 1700000000000])
+        self.assertEqual(candles["close"].tolist(), [2.0, 1.5])
+        self.assertEqual(candles.contract_volume.tolist(), [5.0, 10.0])
+        self.assertTrue(all(math.isnan(v) for v in candles.quote_volume))
+        self.assertIsNone(candles.to_records()[0]["quote_volume"])
+        with self.assertRaises(KeyError):
+            candles["raw_data"]
+
+    def test_concat_sorts_and_keeps_the_latest_page(self):
+        first = CandleArrays.from_records([candle(2, 1.0), candle(1, 1.0)], "BTC/USDT:USDT", "spot", "1m")
+        second = CandleArrays.from_records([candle(3, 3.0), candle(2, 2.0)], "BTC/USDT:USDT", "spot", "1m")
+
+        merged = CandleArrays.concat([first, second])
+        self.assertEqual(merged.timestamp.tolist(), [1, 2, 3])
+        self.assertEqual(merged.close.tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(merged.interval, "1m")
+        with self.assertRaises(ValueError):
+            CandleArrays.concat([])
+
+    def test_kucoin_spot_seconds(self):
+        parser = KucoinParser()
+        response = {"code": "200000", "data": [["1700000000", "1", "2", "3", "0.5", "10", "20"]]}
+        candles = parser.parse_history_candlesticks(response, INFO, "spot", "1m", as_arrays=True)
+        records = parser.parse_history_candlesticks(response, INFO, "spot", "1m")
+
+        self.assertEqual(candles.timestamp.tolist(), [records[0]["timestamp"]])
+        self.assertEqual(candles.to_records()[0]["close"], records[0]["close"])
+
+
+def trade(timestamp, price, base_volume=1.0, quote_volume=None):
+    return {
+        "timestamp": timestamp,
+        "perp_instrument_id": "BTC/USDT:USDT-PERP",
+        "market_type": "perp",
+        "price": price,
+        "base_volume": base_volume,
+        "quote_volume": price * base_volume if quote_volume is None else quote_volume,
+        "contract_volume": base_volume * 100,
+    }
+
+
+class TestStreamedCandles(unittest.TestCase):
+    def test_parse_interval_ms(self):
+        self.assertEqual(parse_interval_ms("15s"), 15_000)
+        self.assertEqual(parse_interval_ms("7m"), 420_000)
+        self.assertEqual(parse_interval_ms("1w"), 604_800_000)
+        for interval in ("1M", "m", "0m", "1.5h"):
+            with self.assertRaises(ValueError):
+                parse_interval_ms(interval)
+
+    def test_candle_start(self):
+        # 2023-11-14 22:13:20 UTC, a Tuesday
+        self.assertEqual(candle_start(1700000000000, parse_interval_ms("1h")), 1699999200000)
+        # Monday 2023-11-13 00:00 UTC
+        self.assertEqual(candle_start(1700000000000, parse_interval_ms("1w")), 1699833600000)
+
+    def test_closer_closes_on_the_next_candle(self):
+        closer = CandleCloser()
+        self.assertEqual([v["closed"] for v in closer.update("1m", candle(0, 1.0))], [False])
+        self.assertEqual([v["closed"] for v in closer.update("1m", candle(0, 2.0))], [False])
+
+        closed, current = closer.update("1m", candle(60, 3.0))
+        self.assertEqual((closed["timestamp"], closed["close"], closed["closed"]), (0, 2.0, True))
+        self.assertEqual((current["timestamp"], current["closed"]), (60, False))
+        # late update of the closed candle
+        self.assertEqual(closer.update("1m", candle(0, 4.0)), [])
+        # series are independent
+        self.assertEqual(len(closer.update("5m", candle(0, 1.0))), 1)
+
+    def test_closer_with_exchange_flags(self):
+        closer = CandleCloser()
+        closer.update("1m", candle(0, 1.0), False)
+        (final,) = closer.update("1m", candle(0, 2.0), True)
+        self.assertEqual((final["close"], final["closed"]), (2.0, True))
+        # the final candle is not emitted twice
+        self.assertEqual(closer.update("1m", candle(0, 2.0), True), [])
+        self.assertEqual([v["closed"] for v in closer.update("1m", candle(60, 3.0), False)], [False])
+
+    def test_trade_candles(self):
+        candles = TradeCandles("15s")
+        (first,) = candles.update(trade(1_000, 100.0))
+        self.assertEqual((first["timestamp"], first["open"], first["closed"]), (0, 100.0, False))
+
+        candles.update(trade(2_000, 103.0, 2.0))
+        (current,) = candles.update(trade(14_999, 99.0))
+        self.assertEqual([current[k] for k in ("open", "high", "low", "close")], [100.0, 103.0, 99.0, 99.0])
+        self.assertEqual((current["base_volume"], current["quote_volume"]), (4.0, 405.0))
+        self.assertEqual(current["contract_volume"], 400.0)
+        self.assertEqual((current["interval"], current["perp_instrument_id"]), ("15s", "BTC/USDT:USDT-PERP"))
+
+        closed, current = candles.update(trade(45_000, 101.0))
+        self.assertEqual((closed["timestamp"], closed["close"], closed["closed"]), (0, 99.0, True))
+        # no trades between 15s and 45s, no candle
+        self.assertEqual((current["timestamp"], current["open"], current["closed"]), (45_000, 101.0, False))
+        self.assertEqual(candles.update(trade(10_000, 1.0)), [])
+
+    def test_trade_candles_keep_missing_volumes(self):
+        candles = TradeCandles("1m")
+        candles.update({**trade(0, 100.0), "quote_volume": None})
+        (current,) = candles.update(trade(1, 100.0))
+        self.assertIsNone(current["quote_volume"])
+        self.assertEqual(current["base_volume"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
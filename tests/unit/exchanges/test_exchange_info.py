@@ -0,0 +1,208 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from cex_adaptors.binance import Binance
+from cex_adaptors.exchange_info import diff_exchange_info, load_snapshot, save_snapshot
+from cex_adaptors.gateio import Gateio
+from cex_adaptors.okx import Okx
+
+INFO = {
+    "BTC/USDT:USDT": {"active": True, "base": "BTC", "quote": "USDT", "raw_data": {"instId": "BTC-USDT-SWAP"}},
+    "ETH/USDT": {"active": True, "base": "ETH", "quote": "USDT", "raw_data": {"instId": "ETH-USDT"}},
+}
+
+
+class TestSnapshotFile(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "okx.jsonl")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_round_trip(self):
+        save_snapshot(self.path, "okx", INFO)
+        snapshot = load_snapshot(self.path, "okx")
+        self.assertEqual(snapshot["exchange_info"], INFO)
+        self.assertIsInstance(snapshot["created_at"], int)
+
+    def test_one_instrument_per_line(self):
+        save_snapshot(self.path, "okx", INFO)
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 1 + len(INFO))
+        self.assertEqual(json.loads(lines[0])["version"], 1)
+
+    def test_invalid_snapshots_are_ignored(self):
+        self.assertIsNone(load_snapshot(self.path, "okx"))
+
+        save_snapshot(self.path, "okx", INFO)
+        self.assertIsNone(load_snapshot(self.path, "binance"))
+
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        with open(self.path, "w") as f:
+            f.write("\n".join(lines[:-1]) + "\n")
+        self.assertIsNone(load_snapshot(self.path, "okx"))
+
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"format": "cex-adaptors/exchange-info", "version": 0, "exchange": "okx"}) + "\n")
+        self.assertIsNone(load_snapshot(self.path, "okx"))
+
+
+class TestDiff(unittest.TestCase):
+    def test_added_removed_changed(self):
+        latest = {
+            "BTC/USDT:USDT": {**INFO["BTC/USDT:USDT"], "active": False},
+            "SOL/USDT": {"active": True, "base": "SOL", "quote": "USDT", "raw_data": {}},
+        }
+        events = {e.instrument_id: e for e in diff_exchange_info(INFO, latest)}
+        self.assertEqual(events["SOL/USDT"].kind, "added")
+        self.assertEqual(events["ETH/USDT"].kind, "removed")
+        self.assertEqual(events["BTC/USDT:USDT"].kind, "changed")
+        self.assertEqual(events["BTC/USDT:USDT"].changed_keys, ["active"])
+
+    def test_identical_maps(self):
+        self.assertEqual(diff_exchange_info(INFO, json.loads(json.dumps(INFO))), [])
+
+
+class TestIncrementalRefresh(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.okx = Okx()
+        self.okx.exchange_info = json.loads(json.dumps(INFO))
+
+    async def asyncTearDown(self):
+        await self.okx.close()
+
+    async def test_refresh_updates_in_place_and_notifies(self):
+        exchange_info = self.okx.exchange_info
+        untouched = exchange_info["ETH/USDT"]
+        latest = {
+            "BTC/USDT:USDT": {**INFO["BTC/USDT:USDT"], "active": False},
+            "ETH/USDT": json.loads(json.dumps(INFO["ETH/USDT"])),
+            "SOL/USDT": {"active": True, "base": "SOL", "quote": "USDT", "raw_data": {}},
+        }
+        received = []
+        self.okx.add_exchange_info_listener(received.append)
+
+        with patch.object(self.okx, "get_exchange_info", AsyncMock(return_value=latest)):
+            events = await self.okx.refresh_exchange_info()
+
+        self.assertIs(self.okx.exchange_info, exchange_info)
+        self.assertIs(self.okx.exchange_info["ETH/USDT"], untouched)
+        self.assertEqual(self.okx.exchange_info, latest)
+        self.assertEqual(sorted(e.kind for e in events), ["added", "changed"])
+        self.assertEqual(received, [events])
+
+    async def test_dropped_raw_fields_are_not_changes(self):
+        latest = json.loads(json.dumps(INFO))
+        latest["ETH/USDT"]["raw_data"]["lotSz"] = "0.0001"
+        with patch.object(self.okx, "get_exchange_info", AsyncMock(return_value=latest)):
+            self.assertEqual(await self.okx.refresh_exchange_info(), [])
+
+    async def test_async_listener_and_no_event_refresh(self):
+        listener = AsyncMock()
+        self.okx.add_exchange_info_listener(listener)
+        with patch.object(self.okx, "get_exchange_info", AsyncMock(return_value={"ETH/USDT": INFO["ETH/USDT"]})):
+            await self.okx.sync_exchange_info(incremental=True)
+            listener.assert_awaited_once()
+            self.assertEqual(listener.await_args.args[0][0].kind, "removed")
+
+            await self.okx.refresh_exchange_info()
+        listener.assert_awaited_once()
+
+        self.okx.remove_exchange_info_listener(listener)
+        self.assertEqual(self.okx._exchange_info_listeners, [])
+
+
+class TestWarmStart(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "okx.jsonl")
+        self.okx = Okx()
+
+    async def asyncTearDown(self):
+        await self.okx.close()
+        self.dir.cleanup()
+
+    async def test_without_snapshot_fetches_and_writes_it(self):
+        with patch.object(self.okx, "get_exchange_info", AsyncMock(return_value=INFO)) as fetch:
+            await self.okx.sync_exchange_info(snapshot_path=self.path)
+        fetch.assert_awaited_once()
+        self.assertEqual(self.okx.exchange_info, INFO)
+        self.assertEqual(load_snapshot(self.path, "okx")["exchange_info"], INFO)
+
+    async def test_snapshot_is_served_before_refresh(self):
+        save_snapshot(self.path, "okx", INFO)
+        fresh = {**INFO, "SOL/USDT": {"active": True, "base": "SOL", "quote": "USDT", "raw_data": {}}}
+        release = asyncio.Event()
+
+        async def slow_fetch():
+            await release.wait()
+            return fresh
+
+        with patch.object(self.okx, "get_exchange_info", side_effect=slow_fetch):
+            await self.okx.sync_exchange_info(snapshot_path=self.path)
+            self.assertEqual(self.okx.exchange_info, INFO)
+
+            release.set()
+            await self.okx.wait_exchange_info_refresh()
+        self.assertEqual(self.okx.exchange_info, fresh)
+        self.assertEqual(load_snapshot(self.path, "okx")["exchange_info"], fresh)
+
+    async def test_refresh_can_be_skipped(self):
+        save_snapshot(self.path, "okx", INFO)
+        with patch.object(self.okx, "get_exchange_info", AsyncMock(return_value={})) as fetch:
+            await self.okx.sync_exchange_info(snapshot_path=self.path, refresh=False)
+            await self.okx.wait_exchange_info_refresh()
+        fetch.assert_not_awaited()
+        self.assertEqual(self.okx.exchange_info, INFO)
+
+    async def test_close_cancels_pending_refresh(self):
+        save_snapshot(self.path, "okx", INFO)
+        with patch.object(self.okx, "get_exchange_info", side_effect=asyncio.Event().wait):
+            await self.okx.sync_exchange_info(snapshot_path=self.path)
+            task = self.okx._exchange_info_refresh
+            await self.okx.close()
+            await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+
+    async def test_composite_adaptor(self):
+        binance = Binance()
+        with patch.object(binance, "get_exchange_info", AsyncMock(return_value=INFO)):
+            await binance.sync_exchange_info()
+        self.assertEqual(binance.exchange_info, INFO)
+        await binance.close()
+
+
+class TestConcurrentFetch(IsolatedAsyncioTestCase):
+    async def test_gateio_endpoints_are_fetched_concurrently(self):
+        gateio = Gateio()
+        in_flight, peak, settles = 0, 0, []
+
+        async def endpoint(settle=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            settles.append(settle)
+            return []
+
+        with patch.object(gateio, "_get_currency_pairs", side_effect=endpoint), patch.object(
+            gateio, "_get_perp_info", side_effect=endpoint
+        ), patch.object(gateio, "_get_futures_info", side_effect=endpoint):
+            self.assertEqual(await gateio.get_exchange_info(), {})
+
+        self.assertEqual(peak, 2 + len(gateio.PERP_SETTLE))
+        self.assertCountEqual(settles, [None, "usdt", *gateio.PERP_SETTLE])
+        await gateio.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+import cex_adaptors
+from cex_adaptors.utils import filter_dict, to_dataframe
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+
+class TestStartupImports(unittest.TestCase):
+    def test_adaptors_do_not_import_pandas(self):
+        modules = ", ".join(
+            f"cex_adaptors.{name}" for name in ("binance", "bitget", "bybit", "gateio", "htx", "kucoin", "okx", "woo")
+        )
+        output = run_python(f"import sys, {modules}; print('pandas' in sys.modules, 'numpy' in sys.modules)")
+        self.assertEqual(output.split(), ["False", "False"])
+
+    def test_package_root_imports_adaptors_lazily(self):
+        output = run_python(
+            "import sys, cex_adaptors; before = 'cex_adaptors.binance' in sys.modules; cex_adaptors.Okx; "
+            "print(before, 'cex_adaptors.okx' in sys.modules, 'cex_adaptors.binance' in sys.modules)"
+        )
+        self.assertEqual(output.split(), ["False", "True", "False"])
+
+    def test_unknown_attribute(self):
+        from cex_adaptors.okx import Okx
+
+        self.assertIs(cex_adaptors.Okx, Okx)
+        with self.assertRaises(AttributeError):
+            cex_adaptors.Kraken
+
+
+class TestUtils(unittest.TestCase):
+    def test_filter_dict(self):
+        infos = {"a": {"is_perp": True, "base": "BTC"}, "b": {"is_perp": False, "base": "BTC"}}
+        self.assertEqual(filter_dict(infos, is_perp=True), {"a": infos["a"]})
+        self.assertEqual(filter_dict(infos, base="BTC"), infos)
+
+    def test_dataframe_export_requires_pandas(self):
+        with patch.dict(sys.modules, {"pandas": None}):
+            with self.assertRaisesRegex(ImportError, r"cex-adaptors\[pandas\]"):
+                to_dataframe({"a": {"x": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,188 @@
+import copy
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from cex_adaptors.exchange_info import load_snapshot, save_snapshot
+from cex_adaptors.instruments import (
+    Instrument,
+    InstrumentRegistry,
+    instrument_id_map,
+    select_instruments,
+)
+from cex_adaptors.okx import Okx
+from cex_adaptors.parsers.binance import BinanceParser
+from cex_adaptors.utils import query_dict, to_dataframe
+from tests.unit.binance._fixtures import load
+
+
+def instrument(base, quote, settle, market, raw_symbol):
+    return {
+        "base": base,
+        "quote": quote,
+        "settle": settle,
+        "is_spot": market == "spot",
+        "is_margin": False,
+        "is_futures": market == "futures",
+        "is_perp": market == "perp",
+        "is_linear": settle == quote,
+        "is_inverse": settle == base,
+        "raw_data": {"symbol": raw_symbol},
+    }
+
+
+INFOS = {
+    "BTC/USDT:USDT": instrument("BTC", "USDT", "USDT", "spot", "BTCUSDT"),
+    "ETH/USDT:USDT": instrument("ETH", "USDT", "USDT", "spot", "ETHUSDT"),
+    "BTC/USDT:USDT-PERP": instrument("BTC", "USDT", "USDT", "perp", "BTCUSDT"),
+    "BTC/USD:BTC-PERP": instrument("BTC", "USD", "BTC", "perp", "BTCUSD_PERP"),
+    "BTC/USDT:USDT-240329": instrument("BTC", "USDT", "USDT", "futures", "BTCUSDT_240329"),
+}
+
+
+class TestInstrumentRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = InstrumentRegistry(INFOS)
+
+    def test_behaves_like_the_plain_dict(self):
+        self.assertEqual(self.registry, INFOS)
+        self.assertEqual(list(self.registry), list(INFOS))
+
+    def test_flag_and_field_lookups(self):
+        self.assertEqual(self.registry.ids(is_spot=True), ["BTC/USDT:USDT", "ETH/USDT:USDT"])
+        self.assertEqual(
+            self.registry.ids(base="BTC", is_linear=True, is_spot=False),
+            ["BTC/USDT:USDT-PERP", "BTC/USDT:USDT-240329"],
+        )
+        self.assertEqual(self.registry.ids(settle="BTC"), ["BTC/USD:BTC-PERP"])
+        self.assertEqual(self.registry.ids(quote="EUR"), [])
+
+    def test_any_of(self):
+        self.assertCountEqual(
+            self.registry.ids(any_of=("is_perp", "is_futures"), is_linear=True),
+            ["BTC/USDT:USDT-PERP", "BTC/USDT:USDT-240329"],
+        )
+
+    def test_writes_keep_indexes_current(self):
+        self.registry["SOL/USDT:USDT"] = instrument("SOL", "USDT", "USDT", "spot", "SOLUSDT")
+        self.assertIn("SOL/USDT:USDT", self.registry.ids(is_spot=True))
+
+        self.registry["SOL/USDT:USDT"] = instrument("SOL", "USDT", "USDT", "perp", "SOLUSDT")
+        self.assertNotIn("SOL/USDT:USDT", self.registry.ids(is_spot=True))
+        self.assertIn("SOL/USDT:USDT", self.registry.ids(is_perp=True))
+
+        del self.registry["SOL/USDT:USDT"]
+        self.registry.pop("ETH/USDT:USDT")
+        self.assertEqual(self.registry.ids(is_spot=True), ["BTC/USDT:USDT"])
+        self.assertEqual(self.registry.ids(base="SOL"), [])
+
+        self.registry.clear()
+        self.assertEqual(self.registry.ids(is_perp=True), [])
+
+    def test_id_map_is_cached_until_next_write(self):
+        id_map = self.registry.id_map("symbol", is_perp=True)
+        self.assertEqual(id_map, {"BTCUSDT": "BTC/USDT:USDT-PERP", "BTCUSD_PERP": "BTC/USD:BTC-PERP"})
+        self.assertIs(self.registry.id_map("symbol", is_perp=True), id_map)
+
+        self.registry.update({"ETH/USDT:USDT-PERP": instrument("ETH", "USDT", "USDT", "perp", "ETHUSDT")})
+        self.assertIn("ETHUSDT", self.registry.id_map("symbol", is_perp=True))
+
+    def test_callable_raw_key(self):
+        id_map = self.registry.id_map(lambda raw: raw["symbol"].lower(), is_inverse=True)
+        self.assertEqual(id_map, {"btcusd_perp": "BTC/USD:BTC-PERP"})
+
+    def test_copy_and_pickle_rebuild_indexes(self):
+        for clone in (copy.deepcopy(self.registry), pickle.loads(pickle.dumps(self.registry)), self.registry.copy()):
+            self.assertIsInstance(clone, InstrumentRegistry)
+            self.assertEqual(clone.ids(is_spot=True), ["BTC/USDT:USDT", "ETH/USDT:USDT"])
+
+    def test_plain_dict_fallback_matches_registry(self):
+        for criteria in ({"is_perp": True}, {"is_linear": True, "is_spot": False}, {"base": "ETH"}):
+            self.assertEqual(select_instruments(INFOS, **criteria), self.registry.select(**criteria))
+            self.assertEqual(
+                instrument_id_map(INFOS, "symbol", **criteria), instrument_id_map(self.registry, "symbol", **criteria)
+            )
+
+
+class TestInstrument(unittest.TestCase):
+    def setUp(self):
+        self.info = {**instrument("BTC", "USDT", "USDT", "perp", "BTCUSDT"), "tick_size": 0.1}
+        self.info["raw_data"] = {**self.info["raw_data"], "contract_type": "swap", "filters": [{"tickSize": "0.1"}]}
+
+    def test_reads_like_the_parsed_dict(self):
+        record = Instrument(self.info)
+        self.assertEqual(record["base"], "BTC")
+        self.assertTrue(record.get("is_perp"))
+        self.assertIsNone(record.get("listing_time"))
+        self.assertNotIn("listing_time", record)
+        self.assertEqual(record["raw_data"], {"symbol": "BTCUSDT", "contract_type": "swap"})
+        self.assertEqual(record, {**self.info, "raw_data": {"symbol": "BTCUSDT", "contract_type": "swap"}})
+
+    def test_full_raw_data_is_opt_in(self):
+        self.assertEqual(Instrument(self.info, keep_raw=True), self.info)
+        registry = InstrumentRegistry({"BTC/USDT:USDT-PERP": self.info}, keep_raw=True)
+        self.assertIn("filters", registry["BTC/USDT:USDT-PERP"]["raw_data"])
+
+    def test_immutable(self):
+        record = Instrument(self.info)
+        with self.assertRaises(AttributeError):
+            record.base = "ETH"
+        with self.assertRaises(TypeError):
+            record["base"] = "ETH"
+        with self.assertRaises(AttributeError):
+            record["raw_data"].symbol = "ETHUSDT"
+
+    def test_currencies_are_interned(self):
+        first = Instrument({"base": "".join(["B", "TC"])})
+        second = Instrument({"base": "".join(["BT", "C"])})
+        self.assertIs(first["base"], second["base"])
+
+    def test_unknown_fields_are_kept_as_dicts(self):
+        registry = InstrumentRegistry({"x": {"base": "BTC", "extra": 1}, "y": self.info})
+        self.assertIsInstance(registry["x"], dict)
+        self.assertIsInstance(registry["y"], Instrument)
+
+    def test_pickle_and_snapshot_round_trip(self):
+        record = Instrument(self.info)
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "okx.jsonl")
+            save_snapshot(path, "okx", InstrumentRegistry({"BTC/USDT:USDT-PERP": self.info}))
+            self.assertEqual(load_snapshot(path, "okx")["exchange_info"], {"BTC/USDT:USDT-PERP": record})
+
+
+class TestParsedExchangeInfo(unittest.TestCase):
+    def test_matches_pandas_query(self):
+        parser = BinanceParser()
+        infos = {
+            **parser.parse_exchange_info(load("spot_exchange_info"), parser.spot_exchange_info_parser),
+            **parser.parse_exchange_info(load("linear_exchange_info"), parser.futures_exchange_info_parser("linear")),
+        }
+        registry = InstrumentRegistry(infos)
+        for market_type in ("spot", "margin", "futures", "perp", "linear", "inverse"):
+            expected = list(query_dict(infos, f"is_{market_type} == True").keys())
+            self.assertCountEqual(registry.ids(**{f"is_{market_type}": True}), expected)
+            self.assertEqual(parser.query_dict(registry, {f"is_{market_type}": True}).keys(), set(expected))
+
+    def test_registry_exports_like_the_plain_dict(self):
+        registry = InstrumentRegistry(INFOS)
+
+        self.assertEqual(to_dataframe(registry).to_dict(orient="index"), to_dataframe(INFOS).to_dict(orient="index"))
+        self.assertEqual(to_dataframe(registry).loc["BTC/USDT:USDT-PERP", "base"], "BTC")
+        self.assertEqual(list(query_dict(registry, "is_spot == True")), ["BTC/USDT:USDT", "ETH/USDT:USDT"])
+        self.assertEqual(json.loads(json.dumps(registry.to_dict())), INFOS)
+        self.assertIsInstance(registry.to_dict()["BTC/USDT:USDT-PERP"]["raw_data"], dict)
+
+    def test_adaptor_exchange_info_is_indexed(self):
+        okx = Okx()
+        okx.exchange_info = INFOS
+        self.assertIsInstance(okx.exchange_info, InstrumentRegistry)
+        self.assertEqual(okx.exchange_info.ids(is_futures=True), ["BTC/USDT:USDT-240329"])
+        self.assertIsInstance(okx.exchange_info["BTC/USDT:USDT-240329"], Instrument)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import asyncio
+import unittest
+import zlib
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from cex_adaptors.orderbook import (
+    OrderBook,
+    OrderBookArrays,
+    OrderBookOutOfSync,
+    SnapshotSync,
+)
+
+
+def signed_crc32(text: str) -> int:
+    crc = zlib.crc32(text.encode())
+    return crc - (1 << 32) if crc >= 1 << 31 else crc
+
+
+class TestOrderBook(TestCase):
+    def setUp(self):
+        self.book = OrderBook("BTC/USDT:USDT-PERP")
+        self.book.apply(
+            [["3366", "6", "3", "4"], ["3366.1", "7", "0", "3"]],
+            [["3368", "8", "3", "4"], ["3366.8", "9", "10", "3"]],
+            timestamp=1,
+            sequence=10,
+            snapshot=True,
+        )
+
+    def test_levels_are_sorted_best_first(self):
+        top = self.book.top()
+        self.assertEqual([level["price"] for level in top["bids"]], [3366.1, 3366.0])
+        self.assertEqual([level["price"] for level in top["asks"]], [3366.8, 3368.0])
+        self.assertEqual(self.book.best_bid, {"price": 3366.1, "volume": 7.0, "order_number": 3})
+        self.assertEqual(self.book.best_ask["price"], 3366.8)
+        self.assertEqual(self.book.mid_price, 3366.45)
+        self.assertEqual(len(self.book.top(1)["bids"]), 1)
+
+    def test_checksum_interleaves_bids_and_asks(self):
+        # example of the OKX order book checksum documentation
+        self.assertEqual(self.book.checksum(), signed_crc32("3366.1:7:3366.8:9:3366:6:3368:8"))
+
+    def test_diffs_update_and_delete_levels(self):
+        self.book.apply([["3366.1", "0"], ["3366.5", "1"]], [["3368", "2"]], sequence=11, prev_sequence=10)
+
+        self.assertEqual([level["price"] for level in self.book.top()["bids"]], [3366.5, 3366.0])
+        self.assertEqual(self.book.top()["asks"][1], {"price": 3368.0, "volume": 2.0, "order_number": None})
+        self.assertEqual(self.book.sequence, 11)
+
+    def test_deleting_a_missing_level_is_ignored(self):
+        self.book.apply([["3000", "0"]], [], sequence=11)
+        self.assertEqual(len(self.book.bids), 2)
+
+    def test_gap_puts_the_book_out_of_sync(self):
+        with self.assertRaises(OrderBookOutOfSync):
+            self.book.apply([["3366.5", "1"]], [], sequence=13, prev_sequence=12)
+        self.assertFalse(self.book.synced)
+        # ignored until the next snapshot
+        self.assertFalse(self.book.apply([["3366.5", "1"]], [], sequence=14, prev_sequence=13))
+        self.assertTrue(self.book.apply([["1", "1"]], [["2", "1"]], sequence=20, snapshot=True))
+        self.assertEqual(self.book.best_bid["price"], 1.0)
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(OrderBookOutOfSync):
+            self.book.apply([["3366.5", "1"]], [], sequence=11, checksum=self.book.checksum())
+        self.assertFalse(self.book.synced)
+
+    def test_to_arrays(self):
+        arrays = self.book.to_arrays(depth=1)
+        self.assertEqual((arrays.best_bid, arrays.best_ask), ((3366.1, 7.0), (3366.8, 9.0)))
+        self.assertEqual(len(arrays.bids), 1)
+
+    def test_empty_book(self):
+        book = OrderBook("BTC/USDT:USDT-PERP")
+        self.assertIsNone(book.best_bid)
+        self.assertIsNone(book.mid_price)
+        self.assertFalse(book.apply([["1", "1"]], [], sequence=1, prev_sequence=0))
+
+
+class TestOrderBookArrays(TestCase):
+    def setUp(self):
+        self.book = OrderBookArrays.from_levels(
+            "BTC/USDT:USDT-PERP",
+            [["99", "1"], ["100", "2"], ["98", "3"]],
+            [["102", "1"], ["101", "2"], ["104", "5"]],
+            timestamp=1,
+        )
+
+    def test_levels_are_sorted_best_first(self):
+        self.assertEqual(self.book.bids.price.tolist(), [100.0, 99.0, 98.0])
+        self.assertEqual(self.book.asks.price.tolist(), [101.0, 102.0, 104.0])
+        self.assertEqual(self.book.asks.size.tolist(), [2.0, 1.0, 5.0])
+        self.assertEqual(self.book.best_bid, (100.0, 2.0))
+        self.assertEqual((self.book.mid_price, self.book.spread), (100.5, 1.0))
+
+    def test_updates_insert_change_and_delete_levels(self):
+        self.book.update([["99.5", "4"], ["100", "0"], ["98", "1"]], [["103", "1"], ["101", "0"]], timestamp=2)
+
+        self.assertEqual(self.book.bids.price.tolist(), [99.5, 99.0, 98.0])
+        self.assertEqual(self.book.bids.size.tolist(), [4.0, 1.0, 1.0])
+        self.assertEqual(self.book.asks.price.tolist(), [102.0, 103.0, 104.0])
+        self.assertEqual(self.book.timestamp, 2)
+
+    def test_updates_grow_the_arrays(self):
+        # even prices from 2 to 200, 98 and 100 are already in the book
+        self.book.update([[str(price), "1"] for price in range(2, 202, 2)], [])
+
+        self.assertEqual(len(self.book.bids), 101)
+        self.assertEqual(self.book.bids.price[:2].tolist(), [200.0, 198.0])
+        self.assertEqual(self.book.bids.price[-2:].tolist(), [4.0, 2.0])
+        self.assertEqual(self.book.bids.size[self.book.bids.price >= 98].sum(), 53.0)
+
+    def test_depth(self):
+        self.assertEqual(self.book.bids.depth(99), 3.0)
+        self.assertEqual(self.book.asks.depth(102), 3.0)
+        self.assertEqual(self.book.asks.depth(100), 0.0)
+
+    def test_vwap_and_slippage(self):
+        # 2 @ 101 and 1 @ 102
+        self.assertAlmostEqual(self.book.asks.vwap(3), 304 / 3)
+        self.assertAlmostEqual(self.book.asks.slippage(3), (304 / 3 - 101) / 101)
+        self.assertEqual(self.book.bids.vwap(1), 100.0)
+        self.assertEqual(self.book.bids.slippage(1), 0.0)
+        self.assertIsNone(self.book.bids.vwap(10))
+        with self.assertRaises(ValueError):
+            self.book.bids.vwap(0)
+
+    def test_top_is_a_read_only_view(self):
+        top = self.book.top(2)
+        self.assertEqual(top.bids.price.tolist(), [100.0, 99.0])
+        self.assertTrue(top.bids.price.base is not None)
+        with self.assertRaises(ValueError):
+            top.update([["99", "5"]], [])
+
+    def test_truncate(self):
+        self.book.truncate(1)
+        self.assertEqual(self.book.asks.price.tolist(), [101.0])
+        self.book.update([], [["100.5", "1"]])
+        self.assertEqual(self.book.asks.price.tolist(), [100.5, 101.0])
+
+
+def apply_diff(book: OrderBook, diff: dict) -> bool:
+    if diff["sequence"] <= book.sequence:
+        return False
+    return book.apply(diff["bids"], [], sequence=diff["sequence"], prev_sequence=diff["sequence"] - 1)
+
+
+def diff(sequence: int, price: str) -> dict:
+    return {"sequence": sequence, "bids": [[price, "1"]]}
+
+
+class TestSnapshotSync(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.book = OrderBook("BTC/USDT:USDT-PERP")
+        self.snapshots = []
+
+        async def fetch_snapshot():
+            return self.snapshots.pop(0)
+
+        self.sync = SnapshotSync(self.book, fetch_snapshot, apply_diff)
+
+    async def test_buffered_diffs_are_replayed_onto_the_snapshot(self):
+        self.snapshots.append({"bids": [["100", "1"]], "asks": [], "sequence": 2})
+
+        self.assertFalse(self.sync.push(diff(2, "101")))
+        await asyncio.sleep(0)
+        # diff 2 is part of the snapshot, 3 is applied on top
+        self.assertTrue(self.sync.push(diff(3, "102")))
+        self.assertEqual([level["price"] for level in self.book.top()["bids"]], [102.0, 100.0])
+        self.assertTrue(self.sync.push(diff(4, "103")))
+        self.assertEqual(self.book.sequence, 4)
+
+    async def test_gap_fetches_a_new_snapshot(self):
+        self.snapshots.extend([{"bids": [], "asks": [], "sequence": 1}, {"bids": [], "asks": [], "sequence": 5}])
+        self.sync.push(diff(1, "100"))
+        await asyncio.sleep(0)
+        self.assertTrue(self.sync.push(diff(2, "100")))
+
+        self.assertFalse(self.sync.push(diff(5, "101")))
+        await asyncio.sleep(0)
+        self.assertTrue(self.sync.push(diff(6, "102")))
+        self.assertEqual(self.book.sequence, 6)
+        self.assertEqual(self.book.best_bid["price"], 102.0)
+
+    async def test_failed_snapshot_is_fetched_again(self):
+        self.sync.push(diff(1, "100"))
+        await asyncio.sleep(0)
+        # the first fetch found no snapshot
+        self.assertFalse(self.sync.push(diff(2, "100")))
+        self.snapshots.append({"bids": [], "asks": [], "sequence": 2})
+        self.assertFalse(self.sync.push(diff(3, "101")))
+        await asyncio.sleep(0)
+        self.assertTrue(self.sync.push(diff(4, "102")))
+        self.assertEqual(self.book.sequence, 4)
+
+    async def test_cancel(self):
+        self.sync.push(diff(1, "100"))
+        task = self.sync._task
+        self.sync.cancel()
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+
+
+if __name__ == "__main__":
+    unittest.main()
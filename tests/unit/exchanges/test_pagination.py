@@ -0,0 +1,207 @@
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from cex_adaptors.pagination import (
+    SECOND_MS,
+    TimeCursor,
+    TimestampBuffer,
+    fetch_numbered_pages,
+    fetch_time_range,
+    fetch_windows,
+    iter_time_range,
+    plan_windows,
+)
+
+
+class TestPlanWindows(unittest.TestCase):
+    def test_windows_cover_the_range(self):
+        self.assertEqual(plan_windows(0, 249, 100), [(0, 99), (100, 199), (200, 249)])
+        self.assertEqual(plan_windows(5, 5, 100), [(5, 5)])
+
+    def test_invalid_span(self):
+        with self.assertRaises(ValueError):
+            plan_windows(0, 10, 0)
+
+
+class TestTimeCursor(unittest.TestCase):
+    def test_inclusive_milliseconds(self):
+        self.assertEqual(TimeCursor("startTime", "endTime").params(1000, 1999), {"startTime": 1000, "endTime": 1999})
+
+    def test_exclusive_bounds(self):
+        self.assertEqual(
+            TimeCursor("before", "after", exclusive=True).params(1000, 1999), {"before": 999, "after": 2000}
+        )
+
+    def test_seconds_and_slack(self):
+        self.assertEqual(TimeCursor("from", "to", unit=SECOND_MS).params(60_000, 119_999), {"from": 60, "to": 119})
+        self.assertEqual(TimeCursor("s", "e", slack=SECOND_MS).params(60_000, 119_999), {"s": 59_000, "e": 120_999})
+
+
+class TestTimestampBuffer(unittest.TestCase):
+    def test_overlapping_pages_keep_the_latest_item(self):
+        buffer = TimestampBuffer()
+        self.assertEqual(
+            buffer.add([{"timestamp": 3, "v": 0}, {"timestamp": 2, "v": 0}]),
+            [{"timestamp": 3, "v": 0}, {"timestamp": 2, "v": 0}],
+        )
+        self.assertEqual(buffer.add({"timestamp": 1, "v": 0}), [{"timestamp": 1, "v": 0}])
+        buffer.add([{"timestamp": 2, "v": 1}])
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual([(v["timestamp"], v["v"]) for v in buffer.sorted()], [(1, 0), (2, 1), (3, 0)])
+
+    def test_range_and_latest(self):
+        buffer = TimestampBuffer()
+        buffer.add([{"timestamp": t} for t in range(10, 0, -1)])
+        self.assertEqual([v["timestamp"] for v in buffer.sorted(3, 5)], [3, 4, 5])
+        self.assertEqual([v["timestamp"] for v in buffer.sorted(start=9)], [9, 10])
+        self.assertEqual([v["timestamp"] for v in buffer.latest(2)], [9, 10])
+        self.assertEqual(buffer.latest(0), [])
+
+
+class TestFetchWindows(IsolatedAsyncioTestCase):
+    async def test_merges_sorted_and_deduplicated(self):
+        async def fetch(start, end):
+            # overlapping edges, as exchanges widen windows
+            return [{"timestamp": t} for t in range(max(start - 10, 0), end + 1, 10)]
+
+        result = await fetch_windows(fetch, plan_windows(0, 99, 50), limit=100)
+        self.assertEqual([v["timestamp"] for v in result], list(range(0, 100, 10)))
+
+    async def test_full_page_finishes_the_window_serially(self):
+        calls = []
+
+        async def fetch(start, end):
+            calls.append(start)
+            return [{"timestamp": t} for t in range(start, end + 1)][:3]
+
+        result = await fetch_windows(fetch, [(0, 6)], limit=3)
+        self.assertEqual([v["timestamp"] for v in result], list(range(7)))
+        self.assertEqual(calls, [0, 3, 6])
+
+    async def test_full_newest_first_page_finishes_the_window_backwards(self):
+        calls = []
+
+        async def fetch(start, end):
+            calls.append(end)
+            return [{"timestamp": t} for t in range(end, start - 1, -1)][:3]
+
+        result = await fetch_windows(fetch, [(0, 6)], limit=3, newest_first=True)
+        self.assertEqual([v["timestamp"] for v in result], list(range(7)))
+        self.assertEqual(calls, [6, 3, 0])
+
+    async def test_concurrency_is_bounded(self):
+        in_flight, peak = 0, 0
+
+        async def fetch(start, end):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return []
+
+        await fetch_windows(fetch, plan_windows(0, 999, 10), limit=10, concurrency=4)
+        self.assertEqual(peak, 4)
+
+
+class TestFetchTimeRange(IsolatedAsyncioTestCase):
+    async def test_seconds_cursor_and_single_item_pages(self):
+        calls = []
+
+        async def fetch(**window):
+            calls.append(window)
+            items = [{"timestamp": t * SECOND_MS} for t in range(window["from"], window["to"] + 1, 60)]
+            # parsers return a lone candle as a dict
+            return items[0] if len(items) == 1 else items
+
+        result = await fetch_time_range(fetch, TimeCursor("from", "to", unit=SECOND_MS), 0, 299_999, 2, 60_000)
+        self.assertEqual([v["timestamp"] for v in result], [0, 60_000, 120_000, 180_000, 240_000])
+        self.assertEqual(calls, [{"from": 0, "to": 119}, {"from": 120, "to": 239}, {"from": 240, "to": 299}])
+
+    async def test_items_closer_than_planned_are_kept(self):
+        calls = []
+
+        async def fetch(**window):
+            calls.append(window)
+            return [{"timestamp": t} for t in range(window["start"], window["end"] + 1, 10)][:3]
+
+        # windows planned for items 30 apart hold items 10 apart, full pages continue `step` after the last item
+        result = await fetch_time_range(fetch, TimeCursor("start", "end"), 0, 89, 3, 30, step=10)
+        self.assertEqual([v["timestamp"] for v in result], list(range(0, 90, 10)))
+        self.assertEqual([window["start"] for window in calls], [0, 30, 60])
+
+    async def test_newest_first_items_closer_than_planned_are_kept(self):
+        calls = []
+
+        async def fetch(**window):
+            calls.append(window)
+            return [{"timestamp": t} for t in range(window["end"], window["start"] - 1, -10)][:3]
+
+        cursor = TimeCursor("start", "end", newest_first=True)
+        result = await fetch_time_range(fetch, cursor, 0, 89, 3, 30, step=10)
+        self.assertEqual([v["timestamp"] for v in result], list(range(9, 90, 10)))
+        # a full page continues `step` before its oldest item, not after its newest
+        self.assertEqual([window["end"] for window in calls], [89, 59, 29])
+
+
+class TestIterTimeRange(IsolatedAsyncioTestCase):
+    async def test_chunks_follow_time_order_not_completion_order(self):
+        async def fetch(before, after):
+            # later windows answer first
+            await asyncio.sleep(0.001 * (30 - before) / 10)
+            return [{"timestamp": t} for t in range(after - 1, before, -1)]
+
+        cursor = TimeCursor("before", "after", exclusive=True)
+        chunks = [chunk async for chunk in iter_time_range(fetch, cursor, 0, 29, 10, 1, concurrency=3)]
+        self.assertEqual(
+            [[v["timestamp"] for v in chunk] for chunk in chunks], [list(range(i, i + 10)) for i in (0, 10, 20)]
+        )
+
+    async def test_overlapping_windows_are_not_repeated(self):
+        async def fetch(start, end):
+            return [{"timestamp": t} for t in range(max(start, 0), min(end, 29) + 1)]
+
+        cursor = TimeCursor("start", "end", slack=1)
+        chunks = [chunk async for chunk in iter_time_range(fetch, cursor, 0, 29, 12, 1, concurrency=None)]
+        self.assertEqual([v["timestamp"] for chunk in chunks for v in chunk], list(range(30)))
+
+    async def test_closing_cancels_windows_fetched_ahead(self):
+        started, blocked = [], asyncio.Event()
+
+        async def fetch(start, end):
+            started.append(start)
+            if start:
+                await blocked.wait()
+            return [{"timestamp": start}]
+
+        stream = iter_time_range(fetch, TimeCursor("start", "end"), 0, 99, 1, 10, concurrency=3)
+        self.assertEqual(await stream.__anext__(), [{"timestamp": 0}])
+        await stream.aclose()
+        await asyncio.sleep(0)
+        self.assertEqual(started, [0, 10, 20])
+
+
+class TestFetchNumberedPages(IsolatedAsyncioTestCase):
+    async def test_stops_at_the_page_reaching_start(self):
+        # newest first, page 1 holds 90..81, page 2 holds 80..71, ...
+        pages = {n: [{"timestamp": 100 - 10 * n - i} for i in range(10)] for n in range(1, 10)}
+        requested = []
+
+        async def fetch(page_no):
+            requested.append(page_no)
+            return pages.get(page_no, [])
+
+        result = await fetch_numbered_pages(fetch, start=65, end=85, limit=10, concurrency=2)
+        self.assertEqual([v["timestamp"] for v in result], list(range(65, 86)))
+        self.assertEqual(requested, [1, 2, 3, 4])
+
+    async def test_short_page_ends_the_history(self):
+        async def fetch(page_no):
+            return [{"timestamp": 5}] if page_no == 1 else []
+
+        self.assertEqual(await fetch_numbered_pages(fetch, start=0, end=10, limit=10), [{"timestamp": 5}])
+
+
+if __name__ == "__main__":
+    unittest.main()
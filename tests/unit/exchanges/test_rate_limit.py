@@ -0,0 +1,207 @@
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from multidict import CIMultiDict
+
+from cex_adaptors.exchanges.binance import BinanceLinear, BinanceSpot
+from cex_adaptors.exchanges.bybit import BybitUnified
+from cex_adaptors.exchanges.gateio import GateioUnified
+from cex_adaptors.exchanges.kucoin import KucoinFutures
+from cex_adaptors.exchanges.okx import OkxUnified
+from cex_adaptors.exchanges.rate_limit import (
+    ENDPOINT_GROUP,
+    RateLimiter,
+    RateLimitStatus,
+    TokenBucket,
+    weight_by_limit,
+    weight_by_param,
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_within_capacity_does_not_wait(self):
+        bucket = TokenBucket(10, 1)
+        self.assertEqual(bucket.reserve(4), 0)
+        self.assertEqual(bucket.reserve(6), 0)
+
+    def test_reserve_beyond_capacity_waits_for_deficit(self):
+        bucket = TokenBucket(10, 1)
+        bucket.reserve(10)
+        # 5 missing tokens at 10 tokens/sec -> ~0.5 s
+        self.assertAlmostEqual(bucket.reserve(5), 0.5, places=2)
+        # the next caller queues behind the previous reservation
+        self.assertAlmostEqual(bucket.reserve(5), 1.0, places=2)
+
+    def test_weight_larger_than_capacity_rejected(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(10, 1).reserve(11)
+
+
+class TestServerReportedQuota(unittest.TestCase):
+    def test_sync_caps_tokens_at_budget(self):
+        bucket = TokenBucket(100, 60, budget_ratio=0.95)
+        # server says 50 left out of 100 -> only 45 may be spent this window
+        bucket.sync(remaining=50, limit=100, reset_after=30)
+        self.assertEqual(bucket.reserve(45), 0)
+        self.assertAlmostEqual(bucket.reserve(1), 30, delta=0.5)
+
+    def test_drained_window_blocks_until_reset(self):
+        bucket = TokenBucket(100, 60)
+        bucket.sync(remaining=0, limit=100, reset_after=5)
+        self.assertAlmostEqual(bucket.reserve(1), 5, delta=0.1)
+
+    def test_window_reopens_after_reset(self):
+        bucket = TokenBucket(100, 60)
+        bucket.sync(remaining=0, limit=100, reset_after=0)
+        # window already over; only the local bucket applies again
+        bucket.tokens = 100
+        self.assertEqual(bucket.reserve(10), 0)
+        self.assertIsNone(bucket.window_reset_at)
+
+    def test_lowest_report_in_window_wins(self):
+        bucket = TokenBucket(100, 60, budget_ratio=1)
+        bucket.sync(remaining=10, limit=100, reset_after=30)
+        bucket.sync(remaining=80, limit=100, reset_after=30)
+        self.assertEqual(bucket.window_remaining, 10)
+
+    def test_limiter_observe_targets_resolved_or_pinned_group(self):
+        limiter = RateLimiter({"spot": (200, 10), "futures": (200, 10)}, {"/spot/*": [("spot", 1)]})
+        limiter.observe("https://api.gateio.ws/spot/tickers", RateLimitStatus(remaining=20, limit=200))
+        self.assertLessEqual(limiter.buckets["spot"].tokens, 10)
+        self.assertEqual(limiter.buckets["futures"].tokens, 200)
+
+        limiter.observe("https://api.gateio.ws/spot/tickers", RateLimitStatus(remaining=0, group="futures"))
+        self.assertEqual(limiter.buckets["futures"].tokens, 0)
+
+    def test_endpoint_quota_holds_back_only_its_path(self):
+        limiter = RateLimiter({"default": (600, 5)})
+        order_url, ticker_url = "https://api.bybit.com/v5/order/create", "https://api.bybit.com/v5/market/tickers"
+        limiter.observe(order_url, RateLimitStatus(remaining=0, limit=10, reset_after=1, group=ENDPOINT_GROUP))
+
+        self.assertEqual(limiter.buckets["default"].tokens, 600)
+        self.assertEqual(limiter.reserve(ticker_url), 0)
+        self.assertAlmostEqual(limiter.reserve(order_url), 1, delta=0.1)
+
+    def test_endpoint_quota_without_limit_is_ignored(self):
+        limiter = RateLimiter({"default": (600, 5)})
+        limiter.observe("https://api.bybit.com/v5/order/create", RateLimitStatus(remaining=0, group=ENDPOINT_GROUP))
+        self.assertEqual(limiter.endpoint_buckets, {})
+
+
+class TestRateLimitHeaders(unittest.TestCase):
+    def test_binance_used_weight(self):
+        status = BinanceSpot(None, None)._parse_rate_limit_headers(CIMultiDict({"x-mbx-used-weight-1m": "5700"}))
+        self.assertEqual(status.remaining, 300)
+        self.assertEqual(status.limit, 6000)
+        self.assertEqual(status.group, "weight")
+        self.assertLessEqual(status.reset_after, 60)
+
+    def test_bybit_limit_status(self):
+        status = BybitUnified()._parse_rate_limit_headers(
+            CIMultiDict({"X-Bapi-Limit-Status": "99", "X-Bapi-Limit": "100", "X-Bapi-Limit-Reset-Timestamp": "1"})
+        )
+        self.assertEqual(status, RateLimitStatus(remaining=99, limit=100, reset_after=0, group=ENDPOINT_GROUP))
+
+    def test_gateio_remaining_requests(self):
+        status = GateioUnified()._parse_rate_limit_headers(
+            CIMultiDict({"X-Gate-RateLimit-Requests-Remain": "150", "X-Gate-RateLimit-Limit": "200"})
+        )
+        self.assertEqual(status.remaining, 150)
+        self.assertEqual(status.limit, 200)
+
+    def test_kucoin_pool(self):
+        status = KucoinFutures()._parse_rate_limit_headers(
+            CIMultiDict({"gw-ratelimit-remaining": "1990", "gw-ratelimit-limit": "2000", "gw-ratelimit-reset": "15000"})
+        )
+        self.assertEqual(status, RateLimitStatus(remaining=1990, limit=2000, reset_after=15, group="public"))
+
+    def test_missing_headers(self):
+        self.assertIsNone(BinanceLinear()._parse_rate_limit_headers(CIMultiDict()))
+        self.assertIsNone(OkxUnified(None, None, None)._parse_rate_limit_headers(CIMultiDict()))
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.limiter = RateLimiter(
+            {"default": (10, 1), "candles": (40, 2)},
+            {"/api/v5/market/candles": [("candles", 1)], "/futures/*/contracts": [("default", 2)]},
+        )
+
+    def test_resolve_exact_and_pattern_rules(self):
+        self.assertEqual(self.limiter.resolve("https://www.okx.com/api/v5/market/candles"), [("candles", 1)])
+        self.assertEqual(self.limiter.resolve("https://api.gateio.ws/futures/usdt/contracts"), [("default", 2)])
+
+    def test_unmatched_path_falls_back_to_default_group(self):
+        self.assertEqual(self.limiter.resolve("https://www.okx.com/api/v5/market/books"), [("default", 1)])
+
+    def test_groups_are_independent(self):
+        for _ in range(10):
+            self.assertEqual(self.limiter.reserve("https://www.okx.com/api/v5/market/books"), 0)
+        # default group exhausted, candles group untouched
+        self.assertGreater(self.limiter.reserve("https://www.okx.com/api/v5/market/books"), 0)
+        self.assertEqual(self.limiter.reserve("https://www.okx.com/api/v5/market/candles"), 0)
+
+    def test_unknown_group_in_rules_rejected(self):
+        with self.assertRaises(ValueError):
+            RateLimiter({"default": (10, 1)}, {"/x": [("missing", 1)]})
+
+    def test_param_dependent_weights(self):
+        by_limit = weight_by_limit([(100, 5), (500, 25)], default=5)
+        self.assertEqual(by_limit({"limit": 100}), 5)
+        self.assertEqual(by_limit({"limit": 101}), 25)
+        self.assertEqual(by_limit({"limit": 5000}), 25)
+        self.assertEqual(by_limit({}), 5)
+
+        by_param = weight_by_param("symbol", 2, 80)
+        self.assertEqual(by_param({"symbol": "BTCUSDT"}), 2)
+        self.assertEqual(by_param({}), 80)
+
+
+class TestClientRateLimiting(IsolatedAsyncioTestCase):
+    async def test_every_exchange_client_builds_a_limiter(self):
+        self.assertIsNotNone(OkxUnified(None, None, None).rate_limiter)
+        self.assertIsNotNone(BinanceSpot(None, None).rate_limiter)
+        self.assertIsNotNone(BinanceLinear().rate_limiter)
+
+    async def test_binance_spot_weights_follow_params(self):
+        client = BinanceSpot(None, None)
+        bucket = client.rate_limiter.buckets["weight"]
+        client.rate_limiter.reserve(client.base_endpoint + "/api/v3/ticker/24hr", {})
+        self.assertAlmostEqual(bucket.capacity - bucket.tokens, 80, delta=1)
+
+    async def test_request_waits_for_limiter(self):
+        client = OkxUnified(None, None, None)
+        client.rate_limiter = RateLimiter({"default": (1, 1)})
+        client.rate_limiter.reserve(client.BASE_ENDPOINT + "/api/v5/market/books")
+
+        with patch("cex_adaptors.exchanges.rate_limit.asyncio.sleep", new=AsyncMock()) as sleep, patch.object(
+            client, "_get_session", side_effect=RuntimeError("stop")
+        ):
+            with self.assertRaises(RuntimeError):
+                await client._get(client.BASE_ENDPOINT + "/api/v5/market/books")
+            sleep.assert_awaited_once()
+        await client.close()
+
+    async def test_request_is_signed_after_waiting_for_limiter(self):
+        client = BinanceSpot("key", "secret")
+        clock = [1_700_000_000.0]
+
+        async def wait(url, params):
+            clock[0] += 10
+
+        session = MagicMock()
+        session.request.side_effect = RuntimeError("stop")
+        with patch("cex_adaptors.exchanges.auth.time.time", side_effect=lambda: clock[0]), patch.object(
+            client.rate_limiter, "acquire", AsyncMock(side_effect=wait)
+        ), patch.object(client, "_get_session", return_value=session):
+            with self.assertRaises(RuntimeError):
+                await client._send("GET", client.base_endpoint + "/api/v3/account", auth_data=client.auth_data)
+
+        # the timestamp is taken once the limiter let the request go
+        self.assertEqual(session.request.call_args.kwargs["params"]["timestamp"], 1_700_000_010_000)
+        await client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
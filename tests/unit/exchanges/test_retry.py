@@ -0,0 +1,134 @@
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+import aiohttp
+
+from cex_adaptors.errors import ExchangeError, HTTPError, parse_retry_after
+from cex_adaptors.exchanges.okx import OkxUnified
+from cex_adaptors.exchanges.retry import NO_RETRY, RetryPolicy
+from cex_adaptors.parsers.binance import BinanceParser
+from cex_adaptors.parsers.okx import OkxParser
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_delay_is_jittered_below_exponential_cap(self):
+        policy = RetryPolicy(base_delay=1, max_delay=5)
+        for attempt, cap in [(1, 1), (2, 2), (3, 4), (4, 5), (10, 5)]:
+            for _ in range(20):
+                self.assertTrue(0 <= policy.get_delay(attempt) <= cap)
+
+    def test_retry_after_overrides_backoff(self):
+        self.assertEqual(RetryPolicy().get_delay(1, retry_after=7), 7)
+
+    def test_only_idempotent_methods_are_retried(self):
+        policy = RetryPolicy()
+        error = HTTPError(503, "Service Unavailable", "")
+        self.assertTrue(policy.should_retry("GET", 1, error))
+        self.assertFalse(policy.should_retry("POST", 1, error))
+
+    def test_attempts_are_bounded(self):
+        policy = RetryPolicy(max_attempts=3)
+        error = asyncio.TimeoutError()
+        self.assertTrue(policy.should_retry("GET", 2, error))
+        self.assertFalse(policy.should_retry("GET", 3, error))
+        self.assertFalse(NO_RETRY.should_retry("GET", 1, error))
+
+    def test_retryable_classification(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(HTTPError(429, "Too Many Requests", "")))
+        self.assertFalse(policy.is_retryable(HTTPError(400, "Bad Request", "")))
+        self.assertTrue(policy.is_retryable(aiohttp.ServerDisconnectedError()))
+        self.assertTrue(policy.is_retryable(ExchangeError("busy", code="50013", retryable=True)))
+        self.assertFalse(policy.is_retryable(ExchangeError("bad param", code="51000")))
+        self.assertFalse(policy.is_retryable(KeyError("x")))
+
+
+class TestRetryAfter(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("3"), 3)
+
+    def test_http_date_in_the_past(self):
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+
+    def test_invalid(self):
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("soon"))
+
+
+class TestParserErrorCodes(unittest.TestCase):
+    def test_okx_retryable_code(self):
+        with self.assertRaises(ExchangeError) as ctx:
+            OkxParser.check_response({"code": "50011", "msg": "Too Many Requests", "data": []})
+        self.assertTrue(ctx.exception.retryable)
+        self.assertEqual(ctx.exception.code, "50011")
+
+    def test_okx_fatal_code(self):
+        with self.assertRaises(ExchangeError) as ctx:
+            OkxParser.check_response({"code": "51001", "msg": "Instrument ID does not exist", "data": []})
+        self.assertFalse(ctx.exception.retryable)
+
+    def test_binance_error_payload(self):
+        with self.assertRaises(ExchangeError) as ctx:
+            BinanceParser.check_response({"code": -1003, "msg": "Too many requests"})
+        self.assertTrue(ctx.exception.retryable)
+        self.assertEqual(BinanceParser.check_response([1, 2])["data"], [1, 2])
+
+
+class TestClientRetry(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = OkxUnified(None, None, None)
+        self.client.response_checker = OkxParser.check_response
+        self.ok = {"code": "0", "msg": "", "data": [{"instId": "BTC-USDT"}]}
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_transient_errors_are_retried(self):
+        send = AsyncMock(side_effect=[aiohttp.ServerDisconnectedError(), HTTPError(502, "Bad Gateway", ""), self.ok])
+        with patch.object(self.client, "_send", send), patch("asyncio.sleep", new=AsyncMock()) as sleep:
+            result = await self.client._get("https://www.okx.com/api/v5/public/instruments")
+        self.assertEqual(result, self.ok)
+        self.assertEqual(send.await_count, 3)
+        self.assertEqual(sleep.await_count, 2)
+
+    async def test_retry_after_is_honoured(self):
+        send = AsyncMock(side_effect=[HTTPError(429, "Too Many Requests", "", retry_after=2.5), self.ok])
+        with patch.object(self.client, "_send", send), patch("asyncio.sleep", new=AsyncMock()) as sleep:
+            await self.client._get("https://www.okx.com/api/v5/public/instruments")
+        sleep.assert_awaited_once_with(2.5)
+
+    async def test_retryable_exchange_code_is_retried(self):
+        busy = {"code": "50013", "msg": "Systems are busy", "data": []}
+        send = AsyncMock(side_effect=[busy, self.ok])
+        with patch.object(self.client, "_send", send), patch("asyncio.sleep", new=AsyncMock()):
+            result = await self.client._get("https://www.okx.com/api/v5/public/instruments")
+        self.assertEqual(result, self.ok)
+
+    async def test_fatal_exchange_code_returns_payload(self):
+        fatal = {"code": "51001", "msg": "Instrument ID does not exist", "data": []}
+        send = AsyncMock(return_value=fatal)
+        with patch.object(self.client, "_send", send), patch("asyncio.sleep", new=AsyncMock()) as sleep:
+            result = await self.client._get("https://www.okx.com/api/v5/public/instruments")
+        self.assertEqual(result, fatal)
+        self.assertEqual(send.await_count, 1)
+        sleep.assert_not_awaited()
+
+    async def test_post_is_not_retried(self):
+        send = AsyncMock(side_effect=HTTPError(503, "Service Unavailable", ""))
+        with patch.object(self.client, "_send", send), patch("asyncio.sleep", new=AsyncMock()):
+            with self.assertRaises(HTTPError):
+                await self.client._post("https://www.okx.com/api/v5/trade/order")
+        self.assertEqual(send.await_count, 1)
+
+    async def test_gives_up_after_max_attempts(self):
+        send = AsyncMock(side_effect=asyncio.TimeoutError())
+        with patch.object(self.client, "_send", send), patch("asyncio.sleep", new=AsyncMock()):
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.client._get("https://www.okx.com/api/v5/public/instruments", retry_policy=RetryPolicy(3))
+        self.assertEqual(send.await_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from cex_adaptors.binance import Binance
+from cex_adaptors.exchanges.okx import OkxUnified
+from cex_adaptors.exchanges.session import SESSIONS, SessionRegistry
+from cex_adaptors.kucoin import Kucoin
+
+
+class TestSessionRegistry(IsolatedAsyncioTestCase):
+    async def test_session_is_shared_and_reference_counted(self):
+        registry = SessionRegistry()
+        first, second = registry.acquire(), registry.acquire()
+        self.assertIs(first, second)
+
+        await registry.release(first)
+        self.assertFalse(first.closed)
+        await registry.release(second)
+        self.assertTrue(first.closed)
+        self.assertEqual(registry.open_sessions, 0)
+
+    async def test_new_session_after_last_release(self):
+        registry = SessionRegistry()
+        session = registry.acquire()
+        await registry.release(session)
+        renewed = registry.acquire()
+        self.assertIsNot(session, renewed)
+        self.assertFalse(renewed.closed)
+        await registry.release(renewed)
+
+    async def test_stale_release_is_ignored(self):
+        registry = SessionRegistry()
+        session = registry.acquire()
+        await registry.release(session)
+        renewed = registry.acquire()
+        await registry.release(session)
+        self.assertFalse(renewed.closed)
+        await registry.release(renewed)
+
+    async def test_per_host_limits(self):
+        registry = SessionRegistry(limit_per_host=5, host_limits={"fapi.binance.com": 2})
+        default = registry.host_slot("https://api.binance.com/api/v3/ticker/24hr")
+        limited = registry.host_slot("https://fapi.binance.com/fapi/v1/ticker/24hr")
+        self.assertIs(default, registry.host_slot("https://api.binance.com/api/v3/depth"))
+        self.assertEqual(default._value, 5)
+        self.assertEqual(limited._value, 2)
+
+    async def test_host_slot_bounds_concurrency(self):
+        registry = SessionRegistry(host_limits={"www.okx.com": 2})
+        running, peak = 0, 0
+
+        async def request():
+            nonlocal running, peak
+            async with registry.host_slot("https://www.okx.com/api/v5/market/books"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0)
+                running -= 1
+
+        await asyncio.gather(*[request() for _ in range(6)])
+        self.assertEqual(peak, 2)
+
+
+class TestClientLifecycle(IsolatedAsyncioTestCase):
+    async def test_sub_clients_share_one_session(self):
+        binance, kucoin = Binance(), Kucoin()
+        sessions = {
+            client._get_session()
+            for client in (binance.spot, binance.linear, binance.inverse, kucoin.spot, kucoin.futures)
+        }
+        self.assertEqual(len(sessions), 1)
+        session = sessions.pop()
+
+        await binance.close()
+        self.assertFalse(session.closed)
+        await kucoin.close()
+        self.assertTrue(session.closed)
+
+    async def test_async_with_closes_adaptor(self):
+        async with Binance() as binance:
+            session = binance.linear._get_session()
+            self.assertFalse(session.closed)
+        self.assertTrue(session.closed)
+
+    async def test_async_with_on_client(self):
+        async with OkxUnified(None, None, None) as okx:
+            session = okx._get_session()
+        self.assertTrue(session.closed)
+        self.assertIsNone(okx._session)
+
+    async def test_close_is_idempotent(self):
+        okx = OkxUnified(None, None, None)
+        other = OkxUnified(None, None, None)
+        session = okx._get_session()
+        other._get_session()
+        await okx.close()
+        await okx.close()
+        self.assertFalse(session.closed)
+        await other.close()
+        self.assertEqual(SESSIONS.open_sessions, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
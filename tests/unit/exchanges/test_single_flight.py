@@ -0,0 +1,103 @@
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from cex_adaptors.exchanges.okx import OkxUnified
+from cex_adaptors.exchanges.single_flight import SingleFlight, request_key
+
+
+class TestRequestKey(unittest.TestCase):
+    def test_param_order_does_not_matter(self):
+        self.assertEqual(request_key("u", {"a": 1, "b": "x"}), request_key("u", {"b": "x", "a": 1}))
+        self.assertNotEqual(request_key("u", {"a": 1}), request_key("u", {"a": 2}))
+        self.assertEqual(request_key("u"), request_key("u", {}))
+
+
+class TestSingleFlight(IsolatedAsyncioTestCase):
+    async def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"value": calls}
+
+        results = await asyncio.gather(*[flight.do("k", call) for _ in range(10)])
+        self.assertEqual(calls, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual((flight.started, flight.shared), (1, 9))
+        self.assertEqual(len(flight), 0)
+
+    async def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        call = AsyncMock(side_effect=[1, 2])
+        self.assertEqual(await flight.do("k", call), 1)
+        self.assertEqual(await flight.do("k", call), 2)
+
+    async def test_error_is_shared(self):
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("k", call), flight.do("k", call), return_exceptions=True)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(flight.started, 1)
+
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", call))
+        second = asyncio.ensure_future(flight.do("k", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        self.assertEqual(await second, "done")
+
+
+class TestClientCoalescing(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.client = OkxUnified(None, None, None)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_identical_public_gets_share_a_round_trip(self):
+        async def send(method, url, **kwargs):
+            await asyncio.sleep(0.01)
+            return {"code": "0", "data": []}
+
+        with patch.object(self.client, "_send", AsyncMock(side_effect=send)) as mocked:
+            results = await asyncio.gather(*[self.client._get_ticker("BTC-USDT") for _ in range(5)])
+            await self.client._get_ticker("ETH-USDT")
+        self.assertEqual(mocked.await_count, 2)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    async def test_signed_requests_are_not_coalesced(self):
+        async def send(method, url, **kwargs):
+            await asyncio.sleep(0.01)
+            return {"code": "0", "data": []}
+
+        url = self.client.BASE_ENDPOINT + "/api/v5/account/positions"
+        with patch.object(self.client, "_send", AsyncMock(side_effect=send)) as mocked:
+            await asyncio.gather(*[self.client._get(url, auth_data={}) for _ in range(3)])
+        self.assertEqual(mocked.await_count, 3)
+
+    async def test_coalescing_can_be_disabled(self):
+        self.client.coalesce_requests = False
+        with patch.object(self.client, "_send", AsyncMock(return_value={"code": "0", "data": []})) as mocked:
+            await asyncio.gather(*[self.client._get_orderbook("BTC-USDT", 20) for _ in range(3)])
+        self.assertEqual(mocked.await_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+import os
+import tempfile
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from cex_adaptors.binance import Binance
+from cex_adaptors.gateio import Gateio
+from cex_adaptors.store import (
+    CandleStore,
+    FundingRateStore,
+    merge_ranges,
+    missing_ranges,
+    settled_candle_time,
+)
+from tests.unit.binance._fixtures import load
+
+START = 1700000000000
+MINUTE = 60_000
+HOUR = 3_600_000
+
+
+def candle(timestamp, close=1.0):
+    return {
+        "timestamp": timestamp,
+        "market_type": "spot",
+        "open": 1.0,
+        "high": 2.0,
+        "low": 0.5,
+        "close": close,
+        "base_volume": 10.0,
+        "quote_volume": None,
+        "contract_volume": 10.0,
+    }
+
+
+class TestRanges(unittest.TestCase):
+    def test_merge_joins_overlapping_and_adjacent(self):
+        self.assertEqual(merge_ranges([(10, 19), (0, 9), (30, 40), (35, 50)]), [(0, 19), (30, 50)])
+
+    def test_missing_ranges(self):
+        covered = [(0, 19), (30, 50)]
+        self.assertEqual(missing_ranges(covered, 0, 60), [(20, 29), (51, 60)])
+        self.assertEqual(missing_ranges(covered, 5, 15), [])
+        self.assertEqual(missing_ranges([], 5, 15), [(5, 15)])
+
+    def test_settled_candle_time(self):
+        with patch("cex_adaptors.store._now", return_value=START):
+            self.assertEqual(settled_candle_time("1h"), START - HOUR)
+            # months have no fixed length, the longest one is assumed
+            self.assertEqual(settled_candle_time("1M"), START - 31 * 24 * HOUR)
+
+
+class TestCandleStore(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "candles.db")
+        self.store = CandleStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.dir.cleanup()
+
+    def test_write_read_and_coverage_persist(self):
+        self.store.write("okx", "BTC/USDT:USDT", "1m", [candle(START + MINUTE), candle(START)], (START, START + MINUTE))
+        self.store.write(
+            "okx", "BTC/USDT:USDT", "1m", [candle(START + MINUTE, 2.0)], (START + MINUTE, START + 5 * MINUTE)
+        )
+        self.store.close()
+
+        self.store = CandleStore(self.path)
+        candles = self.store.read("okx", "BTC/USDT:USDT", "1m", START, START + 5 * MINUTE)
+        self.assertEqual([(v["timestamp"], v["close"]) for v in candles], [(START, 1.0), (START + MINUTE, 2.0)])
+        self.assertEqual(candles[0]["market_type"], "spot")
+        self.assertIsNone(candles[0]["quote_volume"])
+        self.assertEqual(self.store.coverage("okx", "BTC/USDT:USDT", "1m"), [(START, START + 5 * MINUTE)])
+        self.assertEqual(
+            self.store.gaps("okx", "BTC/USDT:USDT", "1m", START, START + 9 * MINUTE),
+            [(START + 5 * MINUTE + 1, START + 9 * MINUTE)],
+        )
+        self.assertEqual(self.store.read("okx", "BTC/USDT:USDT", "1h", START, START + 5 * MINUTE), [])
+
+    def test_read_as_arrays(self):
+        self.store.write("okx", "BTC/USDT:USDT", "1m", [candle(START), candle(START + MINUTE, 2.0)])
+        candles = self.store.read("okx", "BTC/USDT:USDT", "1m", START, START + MINUTE, as_arrays=True)
+        self.assertEqual(candles.close.tolist(), [1.0, 2.0])
+        self.assertEqual(candles.market_type, "spot")
+
+
+class TestIncrementalBackfill(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.binance = Binance()
+        self.binance.spot._get_exchange_info = AsyncMock(return_value=load("spot_exchange_info"))
+        self.binance.linear._get_exchange_info = AsyncMock(return_value=load("linear_exchange_info"))
+        self.binance.inverse._get_exchange_info = AsyncMock(return_value=load("inverse_exchange_info"))
+        await self.binance.sync_exchange_info()
+
+        async def klines(symbol, interval, limit, startTime, endTime):
+            self.windows.append((startTime, endTime))
+            return [
+                [t, "1", "2", "0.5", "1.5", "10", t + MINUTE - 1, "15"] for t in range(startTime, endTime + 1, MINUTE)
+            ]
+
+        self.windows = []
+        self.binance.spot._get_klines = AsyncMock(side_effect=klines)
+        self.store = CandleStore(":memory:")
+
+    async def asyncTearDown(self):
+        self.store.close()
+        await self.binance.close()
+
+    async def test_stored_candles_read_like_the_adaptor_returns_them(self):
+        end = START + 10 * MINUTE - 1
+        fetched = await self.binance.get_history_candlesticks("BTC/USDT:USDT", "1m", start=START, end=end)
+        stored = await self.store.get_history_candlesticks(self.binance, "BTC/USDT:USDT", "1m", START, end)
+        self.assertEqual(stored, [{k: v for k, v in candle.items() if k != "raw_data"} for candle in fetched])
+
+    async def test_repeat_backfill_reads_locally_and_fetches_only_gaps(self):
+        end = START + 1500 * MINUTE - 1
+        first = await self.store.get_history_candlesticks(self.binance, "BTC/USDT:USDT", "1m", START, end)
+        self.assertEqual(len(first), 1500)
+        self.assertEqual(len(self.windows), 2)
+
+        self.windows.clear()
+        again = await self.store.get_history_candlesticks(self.binance, "BTC/USDT:USDT", "1m", START, end)
+        self.assertEqual(again, first)
+        self.assertEqual(self.windows, [])
+
+        longer = await self.store.get_history_candlesticks(
+            self.binance, "BTC/USDT:USDT", "1m", START, end + 100 * MINUTE
+        )
+        self.assertEqual(len(longer), 1600)
+        self.assertEqual(self.windows, [(end + 1, end + 100 * MINUTE)])
+
+
+class TestRecordCandlesticks(IsolatedAsyncioTestCase):
+    async def test_closed_candles_are_stored_with_coverage(self):
+        async def updates():
+            yield {"BTC/USDT:USDT": {**candle(START), "interval": "1m", "closed": False}}
+            yield {"BTC/USDT:USDT": {**candle(START, 2.0), "interval": "1m", "closed": True}}
+            yield {"BTC/USDT:USDT": {**candle(START + MINUTE), "interval": "1m", "closed": False}}
+            yield {"BTC/USDT:USDT": {**candle(START + MINUTE, 3.0), "interval": "1m", "closed": True}}
+
+        store = CandleStore(":memory:")
+        passed = [update async for update in store.record_candlesticks("binance", updates())]
+
+        self.assertEqual(len(passed), 4)
+        self.assertEqual(store.coverage("binance", "BTC/USDT:USDT", "1m"), [(START, START + 2 * MINUTE - 1)])
+        stored = store.read("binance", "BTC/USDT:USDT", "1m", START, START + 2 * MINUTE)
+        self.assertEqual([v["close"] for v in stored], [2.0, 3.0])
+        store.close()
+
+
+class TestFundingRateStore(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.gateio = Gateio()
+        self.gateio.exchange_info = {
+            "BTC/USDT:USDT-PERP": {
+                "base": "BTC",
+                "quote": "USDT",
+                "settle": "USDT",
+                "multiplier": 1,
+                "is_spot": False,
+                "is_margin": False,
+                "is_futures": False,
+                "is_perp": True,
+                "is_linear": True,
+                "is_inverse": False,
+                "raw_data": {"name": "BTC_USDT"},
+            }
+        }
+
+        async def history(settle, contract, limit, _from, to):
+            self.windows.append((_from, to))
+            # settlements every 8 hours, newest first, timestamps in seconds
+            first = -(-_from // 28_800) * 28_800
+            return [{"t": t, "r": "0.0001"} for t in range(first, to + 1, 28_800)][::-1][:limit]
+
+        self.windows = []
+        self.gateio._get_futures_funding_rate_history = AsyncMock(side_effect=history)
+        self.store = FundingRateStore(":memory:")
+
+    async def asyncTearDown(self):
+        self.store.close()
+        await self.gateio.close()
+
+    async def test_gate_range_is_requested_by_window(self):
+        end = START + 1000 * HOUR - 1
+        rates = await self.gateio.get_history_funding_rate("BTC/USDT:USDT-PERP", start=START, end=end)
+        self.assertEqual(len(rates), 125)
+        self.assertTrue(all(START <= v["timestamp"] <= end for v in rates))
+        self.assertEqual(self.windows, [(START // 1000, end // 1000)])
+
+    async def test_settled_periods_are_served_locally(self):
+        end = START + 1000 * HOUR
+        first = await self.store.get_history_funding_rate(self.gateio, "BTC/USDT:USDT-PERP", START, end)
+        self.assertEqual(len(first), 125)
+        self.assertEqual(first[0]["perp_instrument_id"], "BTC/USDT:USDT-PERP")
+
+        self.windows.clear()
+        again = await self.store.get_history_funding_rate(self.gateio, "BTC/USDT:USDT-PERP", START, end)
+        self.assertEqual(again, first)
+        self.assertEqual(self.windows, [])
+        self.assertEqual(self.store.coverage("gateio", "BTC/USDT:USDT-PERP"), [(START, end)])
+
+    async def test_open_tail_is_fetched_again(self):
+        with patch("cex_adaptors.store._now", return_value=START + 100 * HOUR):
+            await self.store.get_history_funding_rate(self.gateio, "BTC/USDT:USDT-PERP", START, START + 200 * HOUR)
+            self.windows.clear()
+            await self.store.get_history_funding_rate(self.gateio, "BTC/USDT:USDT-PERP", START, START + 200 * HOUR)
+        self.assertEqual(len(self.windows), 1)
+        self.assertEqual(self.windows[0][0], (START + 99 * HOUR + 1) // 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
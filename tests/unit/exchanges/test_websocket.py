@@ -0,0 +1,142 @@
+import asyncio
+import gzip
+import json
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from cex_adaptors.errors import ExchangeError
+from cex_adaptors.exchanges.htx import HtxWebSocket
+from cex_adaptors.exchanges.okx import OkxWebSocket
+from cex_adaptors.exchanges.retry import RetryPolicy
+from cex_adaptors.streaming import Stream, merge_streams
+from tests.unit._ws_server import ReplayServer
+
+NO_DELAY = RetryPolicy(base_delay=0, max_delay=0)
+
+
+def okx_ticker(inst_id: str, last: str) -> dict:
+    return {"arg": {"channel": "tickers", "instId": inst_id}, "data": [{"instId": inst_id, "last": last}]}
+
+
+async def take(messages, num: int, close: bool = True) -> list:
+    results = []
+    async for message in messages:
+        results.append(message)
+        if len(results) == num:
+            break
+    if close:
+        await messages.aclose()
+    return results
+
+
+class TestWebSocketClient(IsolatedAsyncioTestCase):
+    async def test_reconnects_and_resubscribes(self):
+        frames = [{"event": "subscribe", "arg": {"channel": "tickers"}}, okx_ticker("BTC-USDT", "1")]
+        async with ReplayServer(frames, drops=2) as server:
+            topics = [{"channel": "tickers", "instId": "BTC-USDT"}]
+            websocket = OkxWebSocket(server.url, topics, reconnect_policy=NO_DELAY)
+            messages = await take(websocket.messages(), 3)
+            await websocket.close()
+
+        self.assertEqual(messages, [okx_ticker("BTC-USDT", "1")] * 3)
+        self.assertEqual(websocket.reconnects, 2)
+        self.assertEqual(server.received, [(n, {"op": "subscribe", "args": topics}) for n in (1, 2, 3)])
+
+    async def test_topics_added_while_connected_are_kept(self):
+        async with ReplayServer([okx_ticker("BTC-USDT", "1")], drops=1) as server:
+            websocket = OkxWebSocket(
+                server.url, [{"channel": "tickers", "instId": "BTC-USDT"}], reconnect_policy=NO_DELAY
+            )
+            messages = websocket.messages()
+            await take(messages, 1, close=False)
+            await websocket.subscribe([{"channel": "tickers", "instId": "ETH-USDT"}, websocket.topics[0]])
+            await take(messages, 1, close=False)
+            await websocket.close()
+            await messages.aclose()
+
+        self.assertEqual(len(websocket.topics), 2)
+        # the second connection subscribes both topics in one request
+        self.assertEqual(server.received[-1], (2, {"op": "subscribe", "args": websocket.topics}))
+
+    async def test_reconnect_drops_the_connection(self):
+        async with ReplayServer([okx_ticker("BTC-USDT", "1")]) as server:
+            topics = [{"channel": "tickers", "instId": "BTC-USDT"}]
+            websocket = OkxWebSocket(server.url, topics, reconnect_policy=NO_DELAY)
+            messages = websocket.messages()
+            await take(messages, 1, close=False)
+            websocket.reconnect()
+            websocket.reconnect()
+            await take(messages, 1, close=False)
+            await websocket.close()
+            await messages.aclose()
+
+        self.assertEqual(websocket.reconnects, 1)
+        self.assertEqual(server.received, [(n, {"op": "subscribe", "args": topics}) for n in (1, 2)])
+
+    async def test_application_ping(self):
+        class FastPing(OkxWebSocket):
+            PING_INTERVAL = 0.01
+
+        async with ReplayServer([okx_ticker("BTC-USDT", "1")]) as server:
+            websocket = FastPing(server.url, [{"channel": "tickers", "instId": "BTC-USDT"}])
+            messages = websocket.messages()
+            await take(messages, 1, close=False)
+            await asyncio.sleep(0.05)
+            await websocket.close()
+            await messages.aclose()
+
+        self.assertIn((1, "ping"), server.received)
+
+    async def test_error_event_is_raised(self):
+        frames = [{"event": "error", "code": "60018", "msg": "Wrong URL or channel:tickers,instId:NOPE"}]
+        async with ReplayServer(frames) as server:
+            websocket = OkxWebSocket(server.url, [{"channel": "tickers", "instId": "NOPE"}])
+            with self.assertRaises(ExchangeError) as e:
+                await take(websocket.messages(), 1)
+        self.assertEqual(e.exception.code, "60018")
+
+    async def test_gives_up_after_max_reconnects(self):
+        async with ReplayServer([]) as server:
+            url = server.url
+        websocket = OkxWebSocket(url, [], reconnect_policy=NO_DELAY, max_reconnects=2)
+        with self.assertRaises(ConnectionError):
+            await take(websocket.messages(), 1)
+
+    async def test_htx_gzip_frames_and_ping(self):
+        tick = {"ch": "market.btcusdt.detail", "ts": 1700000000000, "tick": {"close": 37000.1}}
+        frames = [gzip.compress(json.dumps(v).encode()) for v in ({"ping": 1700000000000}, tick)]
+        async with ReplayServer(frames) as server:
+            websocket = HtxWebSocket(server.url, ["market.btcusdt.detail"])
+            messages = websocket.messages()
+            self.assertEqual(await take(messages, 1, close=False), [tick])
+            await asyncio.sleep(0.01)
+            await websocket.close()
+            await messages.aclose()
+
+        self.assertEqual(
+            server.received,
+            [(1, {"sub": "market.btcusdt.detail", "id": "market.btcusdt.detail"}), (1, {"pong": 1700000000000})],
+        )
+
+
+class TestMergeStreams(IsolatedAsyncioTestCase):
+    async def test_records_of_every_connection(self):
+        def parse(message):
+            for data in message["data"]:
+                yield data["instId"], data["last"]
+
+        async with ReplayServer([okx_ticker("BTC-USDT", "1")]) as btc, ReplayServer(
+            [okx_ticker("ETH-USDT", "2")]
+        ) as eth:
+            streams = [
+                Stream(OkxWebSocket(server.url, [{"channel": "tickers", "instId": inst_id}]), parse)
+                for server, inst_id in ((btc, "BTC-USDT"), (eth, "ETH-USDT"))
+            ]
+            records = await take(merge_streams(streams), 2)
+
+        self.assertCountEqual(records, [("BTC-USDT", "1"), ("ETH-USDT", "2")])
+        self.assertFalse(any(stream.websocket.connected for stream in streams))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+from cex_adaptors.gateio import Gateio
+
+_1H = 3_600_000
+
+
+def perp_info(funding_interval: int) -> dict:
+    return {
+        "is_spot": False,
+        "is_futures": False,
+        "is_perp": True,
+        "base": "BTC",
+        "quote": "USDT",
+        "settle": "USDT",
+        "multiplier": 1,
+        "raw_data": {"name": "BTC_USDT", "funding_interval": funding_interval},
+    }
+
+
+class TestGateioFundingRate(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.gateio = Gateio()
+        self.gateio._get_futures_funding_rate_history = AsyncMock(return_value=[])
+
+    async def asyncTearDown(self):
+        await self.gateio.close()
+
+    async def test_history_windows_span_the_contract_funding_interval(self):
+        start = 1672531200000
+        end = start + 365 * 24 * _1H - 1
+        for funding_interval, requests in ((28800, 2), (3600, 9)):
+            self.gateio.exchange_info = {"BTC/USDT:USDT-PERP": perp_info(funding_interval)}
+            self.gateio._get_futures_funding_rate_history.reset_mock()
+
+            await self.gateio.get_history_funding_rate("BTC/USDT:USDT-PERP", start=start, end=end)
+            # a year of funding in pages of 1000
+            self.assertEqual(self.gateio._get_futures_funding_rate_history.await_count, requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, patch
+
+from cex_adaptors.kucoin import Kucoin
+from tests.unit.kucoin._fixtures import load
+
+_8H = 28_800_000
+_FIRST = 1_700_006_400_000
+
+
+def futures_klines(symbol: str, granularity: int, start: int = None, end: int = None) -> dict:
+    # the latest 200 candles of 300 before `end`
+    stamps = list(range(_FIRST, min(end, _FIRST + 300 * _8H), _8H))[-200:]
+    return {"code": "200000", "data": [[t, 37000, 37100, 36900, 37050, 10] for t in stamps]}
+
+
+class KucoinAdaptorTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.kucoin = Kucoin()
+
+        # Mock both HTTP clients so no network call happens.
+        self.kucoin.spot._get_symbol_list = AsyncMock(return_value=load("spot_exchange_info"))
+        self.kucoin.futures._get_symbol_list = AsyncMock(return_value=load("futures_exchange_info"))
+        await self.kucoin.sync_exchange_info()
+
+    async def asyncTearDown(self):
+        await self.kucoin.close()
+
+
+class TestKucoinCandlesticks(KucoinAdaptorTestCase):
+    async def test_8h_history_is_fetched_in_windows(self):
+        self.assertIsNotNone(self.kucoin._candlestick_pages("BTC/USDT:USDT-PERP", "8h"))
+
+    async def test_serial_history_follows_full_pages(self):
+        self.kucoin.futures._get_klines = AsyncMock(side_effect=futures_klines)
+        end = _FIRST + 299 * _8H
+
+        with patch.object(self.kucoin, "_candlestick_pages", return_value=None):
+            result = await self.kucoin.get_history_candlesticks("BTC/USDT:USDT-PERP", "8h", start=_FIRST, end=end)
+
+        self.assertEqual(self.kucoin.futures._get_klines.await_count, 2)
+        self.assertEqual([v["timestamp"] for v in result], list(range(_FIRST, end + 1, _8H)))
+
+
+class TestKucoinFundingRate(KucoinAdaptorTestCase):
+    async def test_history_windows_span_the_funding_interval(self):
+        self.kucoin.futures._get_public_funding_history = AsyncMock(return_value={"code": "200000", "data": []})
+
+        start = 1672531200000
+        await self.kucoin.get_history_funding_rate("BTC/USDT:USDT-PERP", start=start, end=start + 100 * _8H - 1)
+        # the contract funds every 8h, 100 of them fit one page
+        self.kucoin.futures._get_public_funding_history.assert_awaited_once()
+
+    async def test_history_windows_of_an_hourly_contract(self):
+        self.kucoin.futures._get_public_funding_history = AsyncMock(return_value={"code": "200000", "data": []})
+        info = self.kucoin.exchange_info["BTC/USDT:USDT-PERP"]
+        self.kucoin.exchange_info["BTC/USDT:USDT-PERP"] = {
+            **info.to_dict(),
+            "raw_data": {**info["raw_data"], "fundingRateGranularity": 3_600_000},
+        }
+
+        start = 1672531200000
+        await self.kucoin.get_history_funding_rate("BTC/USDT:USDT-PERP", start=start, end=start + 100 * _8H - 1)
+        # 800 hourly fundings are 8 pages of 100
+        self.assertEqual(self.kucoin.futures._get_public_funding_history.await_count, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,16 @@
+import asyncio
+import base64
+import hmac
 import unittest
 from unittest import IsolatedAsyncioTestCase
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
+from cex_adaptors.candles import CANDLE_COLUMNS
+from cex_adaptors.errors import ExchangeError
+from cex_adaptors.exchanges.okx import OkxWebSocket
 from cex_adaptors.okx import Okx
+from cex_adaptors.orderbook import OrderBook
+from tests.unit._ws_server import ReplayServer
 from tests.unit.okx._fixtures import load
 
 _EXCHANGE_INFO_BY_INST_TYPE = {
@@ -117,6 +125,209 @@ class TestOkxTickers(OkxAdaptorTestCase):
         self.assertNotIn("BTC/USDT:USDT", result)
 
 
+class TestOkxTickerStream(OkxAdaptorTestCase):
+    async def test_subscribe_tickers_parses_like_get_ticker(self):
+        async with ReplayServer(load("ws_tickers")) as server:
+            with patch.dict(OkxWebSocket.URLS, {"public": server.url}):
+                updates = []
+                stream = self.okx.subscribe_tickers(["BTC/USDT:USDT-PERP", "BTC/USDT:USDT"])
+                async for update in stream:
+                    updates.append(update)
+                    if len(updates) == 2:
+                        break
+                await stream.aclose()
+
+        topics = [{"channel": "tickers", "instId": "BTC-USDT-SWAP"}, {"channel": "tickers", "instId": "BTC-USDT"}]
+        self.assertEqual(server.received, [(1, {"op": "subscribe", "args": topics})])
+
+        perp = updates[0]["BTC/USDT:USDT-PERP"]
+        rest = self.okx.parser.parse_ticker(load("perp_ticker"), "perp", self.okx.exchange_info["BTC/USDT:USDT-PERP"])
+        for key in ("timestamp", "instrument_id", "market_type", "last", "base_volume", "quote_volume"):
+            self.assertEqual(perp[key], rest[key])
+        self.assertEqual(updates[1]["BTC/USDT:USDT"]["last"], 20002.5)
+        self.assertEqual(updates[1]["BTC/USDT:USDT"]["market_type"], "spot")
+
+    async def test_subscribe_tickers_unknown_instrument(self):
+        with self.assertRaises(ValueError):
+            await self.okx.subscribe_tickers(["DOGE/USDT:USDT"]).__anext__()
+
+
+class TestOkxOrderBookStream(OkxAdaptorTestCase):
+    def setUp(self):
+        self.frames = load("ws_books")[1:]
+
+    def _parse(self, frames: list) -> tuple:
+        book = OrderBook("BTC/USDT:USDT-PERP")
+        (stream,) = self.okx._orderbook_streams({book.instrument_id: book})
+        stream.websocket.reconnect = MagicMock()
+        updates = [(update.sequence, update.top()) for frame in frames for _, update in stream.parse(frame)]
+        return book, stream.websocket, updates
+
+    def test_diffs_are_applied_to_the_snapshot(self):
+        book, websocket, updates = self._parse(self.frames[:2])
+
+        self.assertEqual([sequence for sequence, _ in updates], [100, 105])
+        self.assertTrue(book.synced)
+        self.assertEqual(book.best_bid, {"price": 37000.15, "volume": 1.0, "order_number": 1})
+        self.assertEqual(book.best_ask, {"price": 37000.2, "volume": 0.5, "order_number": 1})
+        top = updates[1][1]
+        self.assertEqual([level["price"] for level in top["bids"]], [37000.15, 37000.0, 36999.5])
+        self.assertEqual(top["perp_instrument_id"], "BTC/USDT:USDT-PERP")
+        self.assertEqual(top["timestamp"], 1700000000100)
+        websocket.reconnect.assert_not_called()
+
+    def test_sequence_gap_resubscribes(self):
+        # the third update follows sequence 107 while the book is at 105; the snapshot sent after resubscribing puts
+        # the book back in sync
+        book, websocket, updates = self._parse(self.frames + self.frames[:1])
+
+        self.assertEqual([sequence for sequence, _ in updates], [100, 105, 100])
+        self.assertTrue(book.synced)
+        websocket.reconnect.assert_called_once()
+
+    def test_checksum_mismatch_resubscribes(self):
+        self.frames[1]["data"][0]["checksum"] += 1
+        book, websocket, updates = self._parse(self.frames[:2])
+
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(book.synced)
+        websocket.reconnect.assert_called_once()
+
+    async def test_watch_orderbooks(self):
+        async with ReplayServer(load("ws_books")[:3]) as server:
+            with patch.dict(OkxWebSocket.URLS, {"public": server.url}):
+                async with self.okx.watch_orderbooks(["BTC/USDT:USDT-PERP"]) as books:
+                    await asyncio.wait_for(books.wait_synced(), 1)
+                    book = books["BTC/USDT:USDT-PERP"]
+                    while book.sequence != 105:
+                        await asyncio.sleep(0.01)
+                    self.assertEqual(book.best_bid["price"], 37000.15)
+
+        self.assertEqual(
+            server.received, [(1, {"op": "subscribe", "args": [{"channel": "books", "instId": "BTC-USDT-SWAP"}]})]
+        )
+
+
+async def take(stream, num: int) -> list:
+    updates = []
+    async for update in stream:
+        updates.append(update)
+        if len(updates) == num:
+            break
+    await stream.aclose()
+    return updates
+
+
+class TestOkxCandlestickStream(OkxAdaptorTestCase):
+    async def test_subscribe_candlesticks_flags_closed_candles(self):
+        async with ReplayServer(load("ws_candles")) as server:
+            with patch.dict(OkxWebSocket.URLS, {"business": server.url}):
+                updates = await take(self.okx.subscribe_candlesticks(["BTC/USDT:USDT-PERP"], "1m"), 3)
+
+        topics = [{"channel": "candle1m", "instId": "BTC-USDT-SWAP"}]
+        self.assertEqual(server.received, [(1, {"op": "subscribe", "args": topics})])
+        candles = [update["BTC/USDT:USDT-PERP"] for update in updates]
+        expected = [(1700000040000, False), (1700000040000, True), (1700000100000, False)]
+        self.assertEqual([(v["timestamp"], v["closed"]) for v in candles], expected)
+
+        row = load("ws_candles")[2]["data"][0]
+        rest = self.okx.parser.parse_candlesticks(
+            {"code": "0", "data": [row]}, self.okx.exchange_info["BTC/USDT:USDT-PERP"], "1m"
+        )
+        self.assertEqual(candles[1], {**rest, "closed": True})
+        self.assertEqual((candles[1]["close"], candles[1]["base_volume"]), (37025.0, 3.0))
+
+    async def test_unsupported_interval(self):
+        with self.assertRaises(ValueError):
+            await self.okx.subscribe_candlesticks(["BTC/USDT:USDT-PERP"], "7m").__anext__()
+
+
+class TestOkxTradeStream(OkxAdaptorTestCase):
+    def test_trades_count_contracts(self):
+        (stream,) = self.okx._trade_streams(["BTC/USDT:USDT-PERP"])
+        trades = [trade for frame in load("ws_trades")[1:] for _, trade in stream.parse(frame)]
+
+        self.assertEqual([trade["trade_id"] for trade in trades], ["130639474", "130639475", "130639476"])
+        first = trades[0]
+        self.assertEqual((first["timestamp"], first["side"], first["price"]), (1700000041000, "buy", 37000.0))
+        # 100 contracts of 0.01 BTC
+        self.assertEqual((first["base_volume"], first["contract_volume"]), (1.0, 100.0))
+        self.assertAlmostEqual(first["quote_volume"], 37000.0)
+        self.assertEqual(first["perp_instrument_id"], "BTC/USDT:USDT-PERP")
+
+    async def test_subscribe_trade_candlesticks(self):
+        async with ReplayServer(load("ws_trades")) as server:
+            with patch.dict(OkxWebSocket.URLS, {"public": server.url}):
+                stream = self.okx.subscribe_trade_candlesticks(["BTC/USDT:USDT-PERP"], ["1m", "30s"])
+                updates = await take(stream, 8)
+
+        topics = [{"channel": "trades", "instId": "BTC-USDT-SWAP"}]
+        self.assertEqual(server.received, [(1, {"op": "subscribe", "args": topics})])
+        # the third trade closes the candles of both intervals
+        closed = {v["interval"]: v for update in updates for v in update.values() if v["closed"]}
+        self.assertEqual((closed["30s"]["timestamp"], closed["30s"]["close"]), (1700000040000, 37010.0))
+        minute = closed["1m"]
+        self.assertEqual(minute["timestamp"], 1700000040000)
+        self.assertEqual([minute[k] for k in ("open", "high", "low", "close")], [37000.0, 37010.0, 37000.0, 37010.0])
+        self.assertEqual(minute["contract_volume"], 150.0)
+
+
+class TestOkxAccountStream(OkxAdaptorTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.okx.auth_data.update(api_key="key", api_secret="secret", passphrase="passphrase")
+        self.frames = load("ws_account")
+        self.okx._place_order = AsyncMock(return_value={"code": "0", "data": [{"ordId": "312269865356374016"}]})
+        self.okx._get_order_info = AsyncMock(return_value={"code": "0", "data": self.frames[4]["data"]})
+
+    async def test_logs_in_before_subscribing(self):
+        # the server answers the login before it reads the subscription
+        async with ReplayServer(self.frames) as server:
+            with patch.dict(OkxWebSocket.URLS, {"private_demo": server.url}):
+                with patch("cex_adaptors.exchanges.auth.time.time", return_value=1700000000.5):
+                    updates = await take(self.okx.subscribe_account(), 3)
+
+        login, subscribe = [message for _, message in server.received]
+        sign = base64.b64encode(hmac.new(b"secret", b"1700000000GET/users/self/verify", "sha256").digest()).decode()
+        credentials = {"apiKey": "key", "passphrase": "passphrase", "timestamp": "1700000000", "sign": sign}
+        self.assertEqual(login, {"op": "login", "args": [credentials]})
+        topics = [{"channel": "orders", "instType": "ANY"}, {"channel": "positions", "instType": "ANY"}]
+        self.assertEqual(subscribe, {"op": "subscribe", "args": topics})
+
+        self.assertEqual([kind for kind, _ in updates], ["order", "order", "position"])
+        info = self.okx.exchange_info["BTC/USDT:USDT-PERP"]
+        self.assertEqual(
+            updates[0][1], self.okx.parser.parse_order_info({"code": "0", "data": self.frames[4]["data"]}, info)
+        )
+        self.assertEqual((updates[1][1]["status"], updates[1][1]["fee"]), ("filled", -0.37))
+        self.assertEqual(updates[2][1]["BTC/USDT:USDT-PERP"]["position"], 2.0)
+
+    async def test_rejected_login(self):
+        frames = [{"event": "error", "code": "60009", "msg": "Login failed."}]
+        async with ReplayServer(frames) as server:
+            with patch.dict(OkxWebSocket.URLS, {"private_demo": server.url}):
+                with self.assertRaises(ExchangeError):
+                    await self.okx.subscribe_account().__anext__()
+
+    async def test_placed_orders_are_acknowledged_from_the_stream(self):
+        async with ReplayServer(self.frames) as server:
+            with patch.dict(OkxWebSocket.URLS, {"private_demo": server.url}):
+                async with self.okx.watch_account() as account:
+                    while "BTC/USDT:USDT-PERP" not in account.positions:
+                        await asyncio.sleep(0.01)
+                    order = await self.okx.place_limit_order("BTC/USDT:USDT-PERP", "buy", 37000, 2)
+
+                    self.assertEqual((order["order_id"], order["status"]), ("312269865356374016", "filled"))
+                    self.okx._get_order_info.assert_not_awaited()
+                    self.assertEqual(account.open_orders(), [])
+
+        self.assertIsNone(self.okx._local_account)
+        # polled again once the stream is gone
+        order = await self.okx.place_limit_order("BTC/USDT:USDT-PERP", "buy", 37000, 2)
+        self.assertEqual(order["status"], "live")
+        self.okx._get_order_info.assert_awaited_once_with("BTC-USDT-SWAP", "312269865356374016")
+
+
 class TestOkxCandlesticks(OkxAdaptorTestCase):
     async def test_history_candlesticks_num(self):
         self.okx._get_klines = AsyncMock(return_value=load("perp_candles"))
@@ -141,6 +352,29 @@ class TestOkxCandlesticks(OkxAdaptorTestCase):
             self.assertGreaterEqual(kline["timestamp"], start)
             self.assertLessEqual(kline["timestamp"], end)
 
+    async def test_history_candlesticks_exclusive_windows(self):
+        self.okx._get_klines = AsyncMock(return_value={"code": "0", "msg": "", "data": []})
+        start = 1700000000000
+        end = start + 2 * 300 * 3_600_000 - 1
+
+        await self.okx.get_history_candlesticks("BTC/USDT:USDT-PERP", "1h", start=start, end=end)
+
+        windows = sorted((c.kwargs["before"], c.kwargs["after"]) for c in self.okx._get_klines.await_args_list)
+        self.assertEqual(windows, [(start - 1, start + 1_080_000_000), (start + 1_079_999_999, end + 1)])
+
+    async def test_candles_as_arrays_match_the_dicts(self):
+        info = self.okx.exchange_info["BTC/USDT:USDT-PERP"]
+        records = self.okx.parser.parse_candlesticks(load("perp_candles"), info, "1h")
+        arrays = self.okx.parser.parse_candlesticks(load("perp_candles"), info, "1h", as_arrays=True)
+
+        self.assertEqual(len(arrays), len(records))
+        self.assertEqual(str(arrays.timestamp.dtype), "int64")
+        self.assertEqual(arrays.instrument_id, "BTC/USDT:USDT-PERP")
+        fields = ("timestamp", *CANDLE_COLUMNS)
+        self.assertEqual(
+            [{k: v[k] for k in fields} for v in arrays.to_records()], [{k: v[k] for k in fields} for v in records]
+        )
+
     async def test_current_candlestick(self):
         self.okx._get_klines = AsyncMock(return_value=load("spot_candles_single"))
 
@@ -178,6 +412,33 @@ class TestOkxFundingRate(OkxAdaptorTestCase):
         self.assertTrue(all(start <= item["timestamp"] <= end for item in result))
         self.assertEqual(len(result), 3)
 
+    async def test_history_funding_rate_windows_span_the_funding_interval(self):
+        self.okx._get_history_funding_rate = AsyncMock(return_value={"code": "0", "msg": "", "data": []})
+
+        start = 1672531200000
+        await self.okx.get_history_funding_rate("BTC/USDT:USDT-PERP", start=start, end=start + 365 * 86_400_000 - 1)
+        # a year of 8h funding in pages of 100
+        self.assertEqual(self.okx._get_history_funding_rate.await_count, 11)
+
+    async def test_history_funding_rate_of_a_4h_perp_follows_newest_first_pages(self):
+        start, interval = 1672531200000, 14_400_000
+
+        async def funding_history(instId, before, after, limit):
+            # rows strictly between `before` and `after`, newest first, at most `limit` of them
+            stamps = [t for t in range(start, start + 200 * interval, interval) if before < t < after][::-1][:limit]
+            rows = [
+                {"instId": instId, "fundingRate": "0.0001", "realizedRate": "0.0001", "fundingTime": str(t)}
+                for t in stamps
+            ]
+            return {"code": "0", "msg": "", "data": rows}
+
+        self.okx._get_history_funding_rate = AsyncMock(side_effect=funding_history)
+
+        end = start + 100 * 28_800_000 - 1
+        result = await self.okx.get_history_funding_rate("BTC/USDT:USDT-PERP", start=start, end=end)
+        # the window is planned for 100 8h fundings, the full page of its newest 100 is followed by the older ones
+        self.assertEqual([v["timestamp"] for v in result], list(range(start, end, interval)))
+
 
 class TestOkxDerivedPrices(OkxAdaptorTestCase):
     async def test_index_price(self):
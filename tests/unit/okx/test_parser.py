@@ -316,6 +316,15 @@ class TestOkxOrderbook(unittest.TestCase):
         spot = self.parser.parse_exchange_info(load("spot_exchange_info"), self.parser.spot_margin_exchange_info_parser)
         self.spot_info = spot["BTC/USDT:USDT"]
 
+    def test_parse_orderbook_as_arrays(self):
+        result = self.parser.parse_orderbook(load("orderbook"), self.spot_info, as_arrays=True)
+
+        self.assertEqual(result.instrument_id, "BTC/USDT:USDT")
+        self.assertEqual(result.timestamp, 1700000000000)
+        self.assertEqual(result.asks.price.tolist(), [20001.0, 20002.0, 20003.0])
+        self.assertEqual(result.bids.size.tolist(), [0.75, 1.5, 0.1])
+        self.assertEqual(result.best_bid, (19999.0, 0.75))
+
     def test_parse_orderbook_unwraps_levels(self):
         result = self.parser.parse_orderbook(load("orderbook"), self.spot_info)
 